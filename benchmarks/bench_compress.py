@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Benchmark single-threaded tarfile gzip against the parallel archive writer.
+
+Usage:
+    python benchmarks/bench_compress.py [--size-mb N] [--jobs N] [--level N]
+
+Writes a synthetic project of mixed compressible and random data to a temp
+directory, archives it with ``tarfile.open(..., 'w:gz')`` and with
+ArchiveWriter (gzip, and zstd when available), and reports time and size.
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import tarfile
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from savior.archive import ArchiveWriter, open_backup, zstd_available
+
+
+def build_tree(root: Path, size_mb: int):
+    rng = random.Random(42)
+    words = [b'def', b'class', b'return', b'import', b'self', b'value', b'data', b'\n']
+    remaining = size_mb * 1024 * 1024
+    i = 0
+    while remaining > 0:
+        size = min(remaining, rng.randint(4 * 1024, 4 * 1024 * 1024))
+        if i % 4 == 0:
+            data = os.urandom(size)
+        else:
+            data = b' '.join(rng.choice(words) for _ in range(size // 5))[:size]
+        path = root / f'dir_{i % 16}' / f'file_{i}.dat'
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(data)
+        remaining -= size
+        i += 1
+    return sorted(p for p in root.rglob('*') if p.is_file())
+
+
+def run(label, files, root, archive_path, writer):
+    start = time.perf_counter()
+    with writer(archive_path) as tar:
+        for path in files:
+            tar.add(path, arcname=str(path.relative_to(root)))
+    elapsed = time.perf_counter() - start
+
+    with open_backup(archive_path) as tar:
+        count = sum(1 for m in tar.getmembers() if m.isfile())
+    assert count == len(files), f"{label}: expected {len(files)} members, got {count}"
+
+    print(f"{label:<22} {elapsed:8.2f}s  {archive_path.stat().st_size / 1024 / 1024:8.1f} MB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size-mb', type=int, default=512)
+    parser.add_argument('--jobs', type=int, default=None)
+    parser.add_argument('--level', type=int, default=6)
+    args = parser.parse_args()
+
+    work = Path(tempfile.mkdtemp(prefix='savior_bench_compress_'))
+    try:
+        root = work / 'project'
+        root.mkdir()
+        files = build_tree(root, args.size_mb)
+        print(f"{len(files):,} files, {args.size_mb} MB")
+
+        baseline = run('tarfile w:gz', files, root, work / 'baseline.tar.gz',
+                       lambda p: tarfile.open(p, 'w:gz', compresslevel=args.level))
+        parallel = run('parallel gzip', files, root, work / 'parallel.tar.gz',
+                       lambda p: ArchiveWriter(p, 'gzip', args.level, threads=args.jobs))
+        print(f"gzip speedup: {baseline / parallel:.1f}x")
+
+        if zstd_available():
+            run('parallel zstd', files, root, work / 'parallel.tar.zst',
+                lambda p: ArchiveWriter(p, 'zstd', args.level, threads=args.jobs))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
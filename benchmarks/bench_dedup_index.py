@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Benchmark per-file dedup cost as the index grows.
+
+Usage:
+    python benchmarks/bench_dedup_index.py [--sizes 10000,100000,1000000] [--files N]
+
+For each index size the store is pre-filled with synthetic entries, then
+N small new files plus N already-stored files are pushed through
+DeduplicationStore.store_file inside one batch. The per-file time should
+stay roughly flat as the index grows.
+"""
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from savior.dedup import DeduplicationStore
+
+
+def prefill(store: DeduplicationStore, count: int):
+    with store.batch():
+        for i in range(count):
+            content_hash = hashlib.sha256(f'synthetic-{i}'.encode()).hexdigest()
+            store.index.put(content_hash, 4096, '2025-01-01T00:00:00',
+                            chunk_path=f'chunks/{content_hash[:2]}/{content_hash}')
+            store.index.add_ref(content_hash)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--files', type=int, default=500)
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    print(f"{'index size':>12} {'prefill':>9} {'new/file':>10} {'dup/file':>10}")
+
+    for size in sizes:
+        work = Path(tempfile.mkdtemp(prefix='savior_bench_index_'))
+        try:
+            src = work / 'src'
+            src.mkdir()
+            files = []
+            for i in range(args.files):
+                path = src / f'file_{i}.txt'
+                path.write_bytes(os.urandom(2048))
+                files.append(path)
+
+            store = DeduplicationStore(work / '.savior')
+
+            start = time.perf_counter()
+            prefill(store, size)
+            prefill_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with store.batch():
+                for path in files:
+                    store.store_file(path)
+            new_time = (time.perf_counter() - start) / len(files)
+
+            start = time.perf_counter()
+            with store.batch():
+                for path in files:
+                    store.store_file(path)
+            dup_time = (time.perf_counter() - start) / len(files)
+
+            store.close()
+            print(f"{size:>12,} {prefill_time:>8.1f}s {new_time * 1e6:>8.0f}us {dup_time * 1e6:>8.0f}us")
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Benchmark loading incremental file states: file_states.json vs FileStateTable.
+
+Usage:
+    python benchmarks/bench_file_states.py [--files N] [--lookups N]
+
+Writes N synthetic states both as the old indent=2 file_states.json and
+as a FileStateTable, then loads each in a fresh interpreter and reports
+the load time and how much the process's RSS grew. Each run also looks
+up --lookups states (all of them by default), which is what a full scan
+does next, and reports time and RSS after those too.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import psutil
+
+from savior.filestate import FileStateTable
+
+
+def build_states(count: int):
+    states = {}
+    base = 1_700_000_000_000_000_000
+    for i in range(count):
+        path = f'src/pkg{i // 1000}/sub{i // 100 % 10}/module_{i}.py'
+        states[path] = {
+            'mtime': (base + i) / 1e9,
+            'mtime_ns': base + i,
+            'ctime_ns': base + i,
+            'inode': 1_000_000 + i,
+            'size': 1000 + i,
+            'hash': hashlib.sha256(path.encode()).hexdigest()
+        }
+    return states
+
+
+def child(kind: str, directory: Path, lookups: int):
+    """Runs in a fresh interpreter; prints timings and RSS growth as JSON"""
+    process = psutil.Process()
+    keys = json.loads((directory / 'keys.json').read_text())[:lookups]
+    rss = process.memory_info().rss
+
+    start = time.perf_counter()
+    if kind == 'json':
+        with open(directory / 'file_states.json') as f:
+            states = json.load(f)
+    else:
+        states = FileStateTable(directory / 'file_states.bin')
+    load_time = time.perf_counter() - start
+    load_rss = process.memory_info().rss - rss
+
+    start = time.perf_counter()
+    found = sum(1 for key in keys if states.get(key) is not None)
+    lookup_time = time.perf_counter() - start
+    assert found == len(keys)
+    print(json.dumps({'load': load_time, 'load_rss': load_rss,
+                      'lookup': lookup_time, 'lookup_rss': process.memory_info().rss - rss}))
+
+
+def run(kind: str, directory: Path, lookups: int):
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', kind, '--dir', str(directory), '--lookups', str(lookups)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=500_000)
+    parser.add_argument('--lookups', type=int, default=None)
+    parser.add_argument('--child', choices=['json', 'table'], help=argparse.SUPPRESS)
+    parser.add_argument('--dir', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.dir, args.lookups)
+        return
+
+    lookups = args.files if args.lookups is None else args.lookups
+    directory = Path(tempfile.mkdtemp(prefix='savior_bench_states_'))
+    try:
+        states = build_states(args.files)
+        with open(directory / 'file_states.json', 'w') as f:
+            json.dump(states, f, indent=2)
+        table = FileStateTable(directory / 'file_states.bin')
+        table.update(states)
+        table.compact()
+        keys = list(states)
+        random.Random(42).shuffle(keys)
+        (directory / 'keys.json').write_text(json.dumps(keys))
+        del states, table
+
+        mb = 1024 * 1024
+        print(f"{args.files:,} states: json {os.path.getsize(directory / 'file_states.json') / mb:.0f} MB, "
+              f"table {os.path.getsize(directory / 'file_states.bin') / mb:.0f} MB")
+        results = {kind: run(kind, directory, lookups) for kind in ('json', 'table')}
+        for kind, label in (('json', 'file_states.json'), ('table', 'FileStateTable')):
+            r = results[kind]
+            print(f"{label:17s} load {r['load'] * 1000:8.1f} ms  RSS +{r['load_rss'] / mb:6.1f} MB   "
+                  f"{lookups:,} lookups {r['lookup']:6.2f}s  RSS +{r['lookup_rss'] / mb:6.1f} MB")
+
+        json_r, table_r = results['json'], results['table']
+        print(f"load: {json_r['load'] / table_r['load']:.0f}x faster, "
+              f"{json_r['load_rss'] / max(table_r['load_rss'], 1):.0f}x less RSS; "
+              f"after lookups {json_r['lookup_rss'] / max(table_r['lookup_rss'], 1):.1f}x less RSS")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark serial 4 KB-read hashing against the shared hashing pool.
+
+Usage:
+    python benchmarks/bench_hashing.py [--files N] [--size MB] [--jobs N]
+
+Creates a temporary tree of files, then times the old serial loop and the
+pooled FileHasher over the same files. Run it twice if you want numbers
+from a warm page cache rather than the disk.
+"""
+
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import shutil
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from savior.hashing import FileHasher, default_jobs
+
+
+def serial_hash(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(4096), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--size', type=float, default=4.0, help='MB per file')
+    parser.add_argument('--jobs', type=int, default=default_jobs())
+    args = parser.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix='savior_bench_hash_'))
+    try:
+        block = bytes(range(256)) * 4096
+        size = int(args.size * 1024 * 1024)
+        files = []
+        for i in range(args.files):
+            path = root / f'file_{i}.bin'
+            with open(path, 'wb') as f:
+                written = 0
+                while written < size:
+                    f.write(block[:size - written])
+                    written += len(block)
+            files.append(path)
+        total_mb = args.files * args.size
+        print(f"{args.files} files, {total_mb:.0f} MB total, {args.jobs} jobs")
+
+        start = time.perf_counter()
+        expected = {path: serial_hash(path) for path in files}
+        serial_time = time.perf_counter() - start
+        print(f"serial 4 KB reads: {serial_time:7.2f}s  ({total_mb / serial_time:7.1f} MB/s)")
+
+        hasher = FileHasher(jobs=args.jobs)
+        start = time.perf_counter()
+        digests = hasher.hash_files(files)
+        pool_time = time.perf_counter() - start
+        hasher.shutdown()
+        print(f"hashing pool:      {pool_time:7.2f}s  ({total_mb / pool_time:7.1f} MB/s)")
+
+        if digests != expected:
+            print("MISMATCH between serial and pooled digests")
+            sys.exit(1)
+        print(f"speedup: {serial_time / pool_time:.1f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
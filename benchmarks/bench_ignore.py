@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Benchmark the compiled ignore matcher against the fnmatch loop.
+
+Usage:
+    python benchmarks/bench_ignore.py [--paths N] [--patterns N]
+
+Generates a synthetic monorepo-like path list and an ignore file built from
+the project's own .saviorignore padded with extra patterns, then times both
+matchers over the same paths and checks that they agree.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from savior.ignore import IgnoreMatcher, fnmatch_should_ignore
+
+
+def build_patterns(count: int):
+    base = Path(__file__).resolve().parent.parent / '.saviorignore'
+    patterns = ['.savior/', '__pycache__/', '*.pyc', '.DS_Store']
+    for line in base.read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            patterns.append(line)
+
+    i = 0
+    while len(patterns) < count:
+        patterns.append(f'generated_{i}/' if i % 3 == 0 else f'*.gen{i}')
+        i += 1
+    return patterns[:count]
+
+
+def build_paths(count: int):
+    rng = random.Random(42)
+    dirs = ['src', 'lib', 'packages', 'app', 'tests', 'node_modules', 'build', 'docs']
+    exts = ['.py', '.js', '.ts', '.md', '.json', '.pyc', '.log', '.css', '.txt']
+    paths = []
+    for i in range(count):
+        depth = rng.randint(1, 6)
+        parts = [rng.choice(dirs) + (str(rng.randint(0, 20)) if rng.random() < 0.5 else '')
+                 for _ in range(depth)]
+        parts.append(f'file_{i}{rng.choice(exts)}')
+        paths.append(os.sep.join(parts))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--paths', type=int, default=200_000)
+    parser.add_argument('--patterns', type=int, default=150)
+    args = parser.parse_args()
+
+    patterns = build_patterns(args.patterns)
+    paths = build_paths(args.paths)
+    print(f"{len(paths):,} paths, {len(patterns)} patterns")
+
+    start = time.perf_counter()
+    legacy = [fnmatch_should_ignore(patterns, p) for p in paths]
+    legacy_time = time.perf_counter() - start
+    print(f"fnmatch loop:     {legacy_time:8.3f}s")
+
+    start = time.perf_counter()
+    matcher = IgnoreMatcher(patterns)
+    compiled = [matcher.matches(p) for p in paths]
+    compiled_time = time.perf_counter() - start
+    print(f"compiled matcher: {compiled_time:8.3f}s  (incl. compile)")
+
+    if legacy != compiled:
+        mismatches = sum(1 for a, b in zip(legacy, compiled) if a != b)
+        print(f"MISMATCH: {mismatches} paths disagree")
+        sys.exit(1)
+
+    print(f"speedup: {legacy_time / compiled_time:.1f}x, {sum(compiled):,} ignored")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Benchmark the parallel scanner against the os.walk collection it replaced.
+
+Usage:
+    python benchmarks/bench_scan.py [--files N] [--per-dir N] [--jobs N] [--root DIR]
+
+Builds a tree of small files (500k by default, in nested directories of
+--per-dir files each), then times the old path: os.walk plus a stat for
+the candidate check and another for the size estimate, against
+DirectoryScanner, whose one stat per file is reused for the estimate.
+Both must find the same files. Pass --root to reuse a tree between runs,
+since creating half a million files takes a while; run twice for warm
+page cache numbers.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from savior.core import SaviorIgnore
+from savior.hashing import default_jobs
+from savior.scanner import DirectoryScanner, FileTable, MAX_FILE_SIZE
+
+
+def build_tree(root: Path, count: int, per_dir: int):
+    """count files spread over a two-level directory fan-out"""
+    dirs = max(1, count // per_dir)
+    fanout = max(1, int(dirs ** 0.5))
+    made = 0
+    for d in range(dirs):
+        directory = root / f'pkg{d // fanout}' / f'mod{d % fanout}'
+        directory.mkdir(parents=True, exist_ok=True)
+        for f in range(min(per_dir, count - made)):
+            with open(directory / f'file{f}.py', 'w') as out:
+                out.write('x = 1\n')
+            made += 1
+    (root / 'node_modules' / 'dep').mkdir(parents=True, exist_ok=True)
+    (root / 'node_modules' / 'dep' / 'index.js').write_text('')
+
+
+def walk_collect(project: Path, ignore: SaviorIgnore):
+    """The old _collect_files followed by _estimate_backup_size"""
+    files = set()
+    for root, dirs, filenames in os.walk(project, followlinks=False):
+        root_path = Path(root)
+        rel_root = root_path.relative_to(project)
+        dirs[:] = [d for d in dirs if not ignore.should_ignore(str(rel_root / d))]
+        for filename in filenames:
+            if not ignore.should_ignore(str(rel_root / filename)):
+                file_path = root_path / filename
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    continue
+                if stat.st_size < MAX_FILE_SIZE and os.access(file_path, os.R_OK):
+                    files.add(file_path)
+
+    total = 0
+    for file_path in files:
+        try:
+            total += file_path.stat().st_size
+        except OSError:
+            continue
+    return files, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=500_000)
+    parser.add_argument('--per-dir', type=int, default=50)
+    parser.add_argument('--jobs', type=int, default=default_jobs())
+    parser.add_argument('--root', type=Path, help='existing tree to scan (kept afterwards)')
+    args = parser.parse_args()
+
+    root = args.root or Path(tempfile.mkdtemp(prefix='savior_bench_scan_'))
+    try:
+        if args.root is None:
+            start = time.perf_counter()
+            build_tree(root, args.files, args.per_dir)
+            print(f"built {args.files:,} files in {time.perf_counter() - start:.1f}s")
+        ignore = SaviorIgnore(root / '.saviorignore', extra_patterns=['node_modules/'])
+
+        start = time.perf_counter()
+        expected, expected_total = walk_collect(root, ignore)
+        walk_time = time.perf_counter() - start
+        print(f"os.walk + 2 stats:  {walk_time:7.2f}s  ({len(expected):,} files)")
+
+        start = time.perf_counter()
+        table = DirectoryScanner(root, ignore.should_ignore, jobs=1).scan()
+        total = table.total_size()
+        serial_time = time.perf_counter() - start
+        print(f"scanner, 1 job:     {serial_time:7.2f}s")
+
+        start = time.perf_counter()
+        table = DirectoryScanner(root, ignore.should_ignore, jobs=args.jobs).scan()
+        total = table.total_size()
+        scan_time = time.perf_counter() - start
+        print(f"scanner, {args.jobs:2d} jobs:   {scan_time:7.2f}s")
+
+        if set(table) != expected or total != expected_total:
+            print(f"MISMATCH: scanner found {len(table):,} files, walk {len(expected):,}")
+            sys.exit(1)
+        print(f"speedup: {walk_time / serial_time:.1f}x serial, {walk_time / scan_time:.1f}x parallel")
+    finally:
+        if args.root is None:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
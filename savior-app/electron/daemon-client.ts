@@ -0,0 +1,168 @@
+import * as net from 'net';
+import * as path from 'path';
+import * as fs from 'fs';
+import * as os from 'os';
+
+// Same framing as savior/daemon.py: a 4-byte big-endian length, then
+// that many bytes of UTF-8 JSON. Each request has an id; the daemon
+// answers with any number of progress events and then one result.
+const HEADER_SIZE = 4;
+const MAX_FRAME = 64 * 1024 * 1024;
+
+export interface DaemonProgress {
+  stage: string;
+  done: number;
+  total: number;
+}
+
+// An error the daemon answered with, as opposed to a failure to reach it
+export class DaemonError extends Error {}
+
+interface PendingRequest {
+  resolve: (data: any) => void;
+  reject: (error: Error) => void;
+  onProgress?: (progress: DaemonProgress) => void;
+}
+
+export class DaemonConnection {
+  private socketPath: string;
+  private authPath: string;
+  private socket: net.Socket | null = null;
+  private connecting: Promise<net.Socket> | null = null;
+  private buffer: Buffer = Buffer.alloc(0);
+  private nextId = 0;
+  private pending: Map<number, PendingRequest> = new Map();
+
+  constructor() {
+    const configDir = path.join(os.homedir(), '.savior');
+    this.socketPath = path.join(configDir, 'daemon.sock');
+    this.authPath = path.join(configDir, 'daemon.auth');
+  }
+
+  isAvailable(): boolean {
+    return fs.existsSync(this.socketPath) && fs.existsSync(this.authPath);
+  }
+
+  // Requests share one persistent connection; any number can be in flight
+  async request(type: string, params: any = {}, onProgress?: (progress: DaemonProgress) => void): Promise<any> {
+    const socket = await this.connect();
+    const id = ++this.nextId;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject, onProgress });
+      socket.write(this.encode({ ...params, type, id }));
+    }).then((data: any) => {
+      if (data && data.error) {
+        throw new DaemonError(data.error);
+      }
+      return data;
+    });
+  }
+
+  close() {
+    this.socket?.destroy();
+    this.socket = null;
+  }
+
+  private connect(): Promise<net.Socket> {
+    if (this.socket) {
+      return Promise.resolve(this.socket);
+    }
+    if (this.connecting) {
+      return this.connecting;
+    }
+
+    this.connecting = new Promise<net.Socket>((resolve, reject) => {
+      let token: string;
+      try {
+        token = fs.readFileSync(this.authPath, 'utf-8').trim();
+      } catch (e) {
+        reject(new Error('Authentication token not found'));
+        return;
+      }
+
+      const socket = net.createConnection(this.socketPath);
+      socket.on('data', (chunk) => this.onData(chunk));
+      // Before the hello is sent nothing is pending, so these also settle
+      // the connect itself (a no-op once it has resolved)
+      socket.on('error', (error) => {
+        reject(error);
+        this.onClose(error);
+      });
+      socket.on('close', () => {
+        const error = new Error('Daemon closed the connection');
+        reject(error);
+        this.onClose(error);
+      });
+      socket.once('connect', () => {
+        // Authenticate once for the whole connection
+        const id = ++this.nextId;
+        this.pending.set(id, {
+          resolve: (data: any) => {
+            if (data && data.error) {
+              socket.destroy();
+              reject(new Error(data.error));
+            } else {
+              this.socket = socket;
+              resolve(socket);
+            }
+          },
+          reject
+        });
+        socket.write(this.encode({ id, type: 'hello', auth: token }));
+      });
+    }).finally(() => {
+      this.connecting = null;
+    });
+    return this.connecting;
+  }
+
+  private encode(message: any): Buffer {
+    const body = Buffer.from(JSON.stringify(message), 'utf-8');
+    const header = Buffer.alloc(HEADER_SIZE);
+    header.writeUInt32BE(body.length, 0);
+    return Buffer.concat([header, body]);
+  }
+
+  private onData(chunk: Buffer) {
+    this.buffer = Buffer.concat([this.buffer, chunk]);
+    while (this.buffer.length >= HEADER_SIZE) {
+      const size = this.buffer.readUInt32BE(0);
+      if (size > MAX_FRAME) {
+        this.close();
+        return;
+      }
+      if (this.buffer.length < HEADER_SIZE + size) {
+        break;
+      }
+      const body = this.buffer.subarray(HEADER_SIZE, HEADER_SIZE + size).toString('utf-8');
+      this.buffer = this.buffer.subarray(HEADER_SIZE + size);
+
+      let message: any;
+      try {
+        message = JSON.parse(body);
+      } catch (e) {
+        continue;
+      }
+
+      const request = this.pending.get(message.id);
+      if (!request) {
+        continue;
+      }
+      if (message.event === 'progress') {
+        request.onProgress?.(message.data);
+      } else {
+        this.pending.delete(message.id);
+        request.resolve(message.data);
+      }
+    }
+  }
+
+  private onClose(error: Error) {
+    this.socket = null;
+    this.buffer = Buffer.alloc(0);
+    for (const request of this.pending.values()) {
+      request.reject(error);
+    }
+    this.pending.clear();
+  }
+}
@@ -243,6 +243,10 @@ app.whenReady().then(async () => {
     mainWindow?.webContents.send('backup-completed', data);
   });
 
+  saviorBridge.on('backup-progress', (data: any) => {
+    mainWindow?.webContents.send('backup-progress', data);
+  });
+
   saviorBridge.on('error', (error: any) => {
     mainWindow?.webContents.send('savior-error', error);
   });
@@ -4,6 +4,7 @@ import * as path from 'path';
 import * as fs from 'fs';
 import * as os from 'os';
 import { FSWatcher, watch } from 'chokidar';
+import { DaemonConnection, DaemonError, DaemonProgress } from './daemon-client';
 
 export class SaviorBridge extends EventEmitter {
   private saviorCommand: string = 'savior';
@@ -11,9 +12,11 @@ export class SaviorBridge extends EventEmitter {
   private watchedProjects: Map<string, any>;
   private fileWatchers: Map<string, FSWatcher>;
   private modifiedFiles: Map<string, Map<string, Date>>; // projectPath -> Map of filepath -> lastModified
+  private daemon: DaemonConnection;
 
   constructor() {
     super();
+    this.daemon = new DaemonConnection();
     this.sessionProcesses = new Map();
     this.watchedProjects = new Map();
     this.fileWatchers = new Map();
@@ -738,6 +741,22 @@ export class SaviorBridge extends EventEmitter {
   }
 
   async restoreBackup(projectPath: string, backupId: string | number): Promise<void> {
+    // Through the daemon when it's running, so progress can be shown
+    if (this.daemon.isAvailable()) {
+      try {
+        await this.daemon.request('restore', { path: projectPath, index: Number(backupId), force: true },
+          (progress: DaemonProgress) => this.emit('backup-progress', { path: projectPath, ...progress }));
+        this.emit('restore-completed', { path: projectPath, backupId });
+        return;
+      } catch (err) {
+        // The daemon ran it and it failed; the CLI would fail the same way
+        if (err instanceof DaemonError) {
+          throw err;
+        }
+        console.log('[SaviorBridge] Daemon unreachable for restore, falling back to CLI:', err);
+      }
+    }
+
     return new Promise((resolve, reject) => {
       exec(`${this.saviorCommand} restore ${projectPath} ${backupId} --force`, (error) => {
         if (error) {
@@ -751,10 +770,27 @@ export class SaviorBridge extends EventEmitter {
   }
 
   async saveBackup(projectPath: string, description: string): Promise<void> {
-    return new Promise((resolve, reject) => {
-      console.log('[DEBUG] saveBackup called for:', projectPath);
-      console.log('[DEBUG] Description:', description);
+    console.log('[DEBUG] saveBackup called for:', projectPath);
+    console.log('[DEBUG] Description:', description);
 
+    // Through the daemon when it's running: no process start-up, and
+    // progress events stream back while the backup is written
+    if (this.daemon.isAvailable()) {
+      try {
+        await this.daemon.request('backup', { path: projectPath, description },
+          (progress: DaemonProgress) => this.emit('backup-progress', { path: projectPath, ...progress }));
+        this.onBackupSaved(projectPath, description);
+        return;
+      } catch (err) {
+        // The daemon ran it and it failed; the CLI would fail the same way
+        if (err instanceof DaemonError) {
+          throw err;
+        }
+        console.log('[SaviorBridge] Daemon unreachable for backup, falling back to CLI:', err);
+      }
+    }
+
+    return new Promise((resolve, reject) => {
       // The savior backup command should be run in the project directory
       // Format: cd to directory && savior backup
       const backupCmd = `cd "${projectPath}" && ${this.saviorCommand} save "${description}"`;
@@ -771,28 +807,31 @@ export class SaviorBridge extends EventEmitter {
 
         console.log('[DEBUG] Backup succeeded!');
         console.log('[DEBUG] stdout:', stdout);
-
-        // Update the next backup time for this project
-        const now = new Date();
-        const project = this.watchedProjects.get(projectPath);
-        if (project) {
-          const intervalMs = (project.watchInterval || 20) * 60 * 1000;
-          const nextBackupTime = new Date(now.getTime() + intervalMs);
-          project.lastBackup = now.toISOString();
-          project.nextBackup = nextBackupTime.toISOString();
-          this.watchedProjects.set(projectPath, project);
-        }
-
-        this.emit('backup-completed', {
-          path: projectPath,
-          description,
-          timestamp: now.toISOString()
-        });
+        this.onBackupSaved(projectPath, description);
         resolve();
       });
     });
   }
 
+  private onBackupSaved(projectPath: string, description: string) {
+    // Update the next backup time for this project
+    const now = new Date();
+    const project = this.watchedProjects.get(projectPath);
+    if (project) {
+      const intervalMs = (project.watchInterval || 20) * 60 * 1000;
+      const nextBackupTime = new Date(now.getTime() + intervalMs);
+      project.lastBackup = now.toISOString();
+      project.nextBackup = nextBackupTime.toISOString();
+      this.watchedProjects.set(projectPath, project);
+    }
+
+    this.emit('backup-completed', {
+      path: projectPath,
+      description,
+      timestamp: now.toISOString()
+    });
+  }
+
   async getStatus(): Promise<any> {
     return new Promise((resolve) => {
       exec(`${this.saviorCommand} status --json`, (error, stdout) => {
@@ -1012,6 +1051,7 @@ export class SaviorBridge extends EventEmitter {
     });
     this.fileWatchers.clear();
     this.modifiedFiles.clear();
+    this.daemon.close();
 
     // Stop all session processes
     console.log('Stopping all session watch processes...');
@@ -1,12 +1,33 @@
 #!/usr/bin/env python3
 
 import os
+import sys
 import tarfile
 import json
-import tempfile
 from pathlib import Path
 from typing import Dict, List, Optional
 
+# Use the shared archive reader when the savior package is importable so
+# zstd backups open too; plain tarfile still handles gzip and tar
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+try:
+    from savior.archive import open_backup, BackupIndex
+except ImportError:
+    BackupIndex = None
+
+    def open_backup(path):
+        return tarfile.open(path, 'r:*')
+
+def is_within(path: Path, root: Path) -> bool:
+    """Whether path is root or below it (Path.is_relative_to needs 3.9)"""
+    try:
+        path.relative_to(root)
+        return True
+    except ValueError:
+        return False
+
+IGNORED_NAMES = ['.savior', '__pycache__', '.git', 'node_modules', '.DS_Store']
+
 def build_file_tree(path: Path, base_path: Path = None) -> Dict:
     """Build a file tree structure from a directory."""
     if base_path is None:
@@ -28,7 +49,7 @@ def build_file_tree(path: Path, base_path: Path = None) -> Dict:
         try:
             for item in sorted(path.iterdir(), key=lambda x: (not x.is_dir(), x.name)):
                 # Skip .savior directory and common ignore patterns
-                if item.name in ['.savior', '__pycache__', '.git', 'node_modules', '.DS_Store']:
+                if item.name in IGNORED_NAMES:
                     continue
                 children.append(build_file_tree(item, base_path))
             node['children'] = children
@@ -37,6 +58,52 @@ def build_file_tree(path: Path, base_path: Path = None) -> Dict:
 
     return node
 
+def list_backup_members(backup_file: Path) -> List[tuple]:
+    """(name, size) of every file in a backup, without extracting it.
+
+    Uses the sidecar index written next to the backup when there is one;
+    otherwise reads the tar headers.
+    """
+    index = BackupIndex.load(backup_file) if BackupIndex else None
+    if index is not None:
+        return [(entry['name'], entry['size']) for entry in index.files()]
+
+    with open_backup(backup_file) as tar:
+        return [(m.name, m.size) for m in tar.getmembers() if m.isfile()]
+
+def build_tree_from_members(members: List[tuple], root_name: str) -> Dict:
+    """Build the same structure as build_file_tree from archive member names."""
+    root = {'name': root_name, 'path': '.', 'type': 'directory', 'children': {}}
+
+    for name, size in members:
+        parts = Path(name).parts
+        if any(part in IGNORED_NAMES for part in parts):
+            continue
+
+        node = root
+        for i, part in enumerate(parts[:-1]):
+            node = node['children'].setdefault(part, {
+                'name': part,
+                'path': str(Path(*parts[:i + 1])),
+                'type': 'directory',
+                'children': {}
+            })
+        node['children'][parts[-1]] = {
+            'name': parts[-1],
+            'path': name,
+            'type': 'file',
+            'size': size
+        }
+
+    def finish(node):
+        if node['type'] == 'directory':
+            children = sorted(node['children'].values(),
+                              key=lambda x: (x['type'] != 'directory', x['name']))
+            node['children'] = [finish(child) for child in children]
+        return node
+
+    return finish(root)
+
 def get_backup_contents(backup_path: str) -> Dict:
     """
     Get the contents of a backup folder or tar file.
@@ -85,22 +152,14 @@ def get_backup_contents(backup_path: str) -> Dict:
                     'error': f'Backup file not found: {backup_file}'
                 }
 
-        # Extract and read the tar file
-        if backup_file.suffix in ['.tar', '.gz']:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_path = Path(temp_dir)
-
-                # Extract the backup
-                with tarfile.open(backup_file, 'r:*') as tar:
-                    tar.extractall(temp_path)
+        # Read the file list and build the tree from it
+        if backup_file.suffix in ['.tar', '.gz', '.zst']:
+            members = list_backup_members(backup_file)
 
-                # Build the file tree
-                contents = build_file_tree(temp_path, temp_path)
-
-                return {
-                    'success': True,
-                    'contents': contents
-                }
+            return {
+                'success': True,
+                'contents': build_tree_from_members(members, backup_file.name)
+            }
         else:
             return {
                 'success': False,
@@ -142,8 +201,27 @@ def extract_file_from_backup(backup_path: str, file_path: str, destination: str
 
         destination.mkdir(parents=True, exist_ok=True)
 
+        # With an index, read just this file's bytes
+        index = BackupIndex.load(backup_file) if BackupIndex else None
+        if index is not None:
+            for entry in index.files():
+                if entry['name'] == file_path or entry['name'].endswith(f'/{file_path}'):
+                    extracted_path = destination / entry['name']
+                    if not is_within(extracted_path.resolve(), destination.resolve()):
+                        break
+                    index.extract(entry['name'], extracted_path)
+                    return {
+                        'success': True,
+                        'path': str(extracted_path)
+                    }
+
+            return {
+                'success': False,
+                'error': f'File not found in backup: {file_path}'
+            }
+
         # Extract the specific file
-        with tarfile.open(backup_file, 'r:*') as tar:
+        with open_backup(backup_file) as tar:
             # Find the member
             member = None
             for m in tar.getmembers():
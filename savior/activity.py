@@ -1,18 +1,42 @@
 import time
 import threading
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Optional, Set, Tuple
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 
 class ActivityMonitor(FileSystemEventHandler):
+    # Event types that can change what a backup should contain
+    DIRTY_EVENTS = {'created', 'modified', 'moved', 'deleted', 'closed'}
+
+    # Past this many dirty paths, give up tracking and ask for a full scan
+    MAX_DIRTY = 100_000
+
+    # Events closer together than this are one burst (an editor's save is
+    # often a write, a rename and a chmod) and don't count as a pause
+    COALESCE_WINDOW = 0.5
+
+    # The idle threshold follows the pauses between bursts: someone who
+    # stops for 5 seconds between edits isn't done after 2. It never drops
+    # below the configured threshold or rises above MAX_IDLE; longer
+    # pauses are breaks and don't count towards the cadence
+    CADENCE_FACTOR = 1.5
+    CADENCE_WEIGHT = 0.2
+    MAX_IDLE = 30.0
+
     def __init__(self, idle_threshold: float = 2.0):
         self.idle_threshold = idle_threshold
-        self.last_activity = time.time()
+        # Monotonic, so setting the wall clock (by hand or by NTP) can't
+        # make the project look idle or busy
+        self.last_activity = time.monotonic()
         self.is_active = False
+        self.cadence: Optional[float] = None  # Typical pause between bursts
         self._lock = threading.Lock()
         self._callbacks = []
+        self._dirty_files: Set[Path] = set()
+        self._dirty_dirs: Set[Path] = set()
+        self.overflowed = False
 
     def on_any_event(self, event):
         """Called when any file system event occurs"""
@@ -21,17 +45,76 @@ class ActivityMonitor(FileSystemEventHandler):
             return
 
         with self._lock:
-            self.last_activity = time.time()
+            now = time.monotonic()
+            self._observe_pause(now - self.last_activity)
+            self.last_activity = now
             self.is_active = True
 
+            if event.event_type in self.DIRTY_EVENTS:
+                paths = [event.src_path]
+                if getattr(event, 'dest_path', None):
+                    paths.append(event.dest_path)
+                self._mark(paths, event.is_directory, event.event_type)
+
+    def _observe_pause(self, gap: float):
+        if self.COALESCE_WINDOW <= gap <= self.MAX_IDLE:
+            if self.cadence is None:
+                self.cadence = gap
+            else:
+                self.cadence += self.CADENCE_WEIGHT * (gap - self.cadence)
+
+    def current_idle_threshold(self) -> float:
+        """Seconds without events before the project counts as idle"""
+        if self.cadence is None:
+            return self.idle_threshold
+        return min(self.MAX_IDLE, max(self.idle_threshold, self.CADENCE_FACTOR * self.cadence))
+
+    def _mark(self, paths, is_directory: bool, event_type: str):
+        if self.overflowed:
+            return
+
+        if not is_directory:
+            self._dirty_files.update(Path(p) for p in paths)
+        elif event_type != 'modified':
+            # A directory appearing, moving or vanishing changes everything
+            # under it, which may not produce per-file events
+            self._dirty_dirs.update(Path(p) for p in paths)
+
+        if len(self._dirty_files) + len(self._dirty_dirs) > self.MAX_DIRTY:
+            self.overflowed = True
+            self._dirty_files.clear()
+            self._dirty_dirs.clear()
+
+    def take_dirty(self) -> Optional[Tuple[Set[Path], Set[Path]]]:
+        """Return and reset (changed files, changed directories)
+
+        Returns None if too much changed to track, meaning everything
+        should be treated as changed.
+        """
+        with self._lock:
+            files, self._dirty_files = self._dirty_files, set()
+            dirs, self._dirty_dirs = self._dirty_dirs, set()
+            overflowed, self.overflowed = self.overflowed, False
+        return None if overflowed else (files, dirs)
+
+    def mark_dirty(self, files=(), dirs=()):
+        """Put paths back, e.g. after a save that failed"""
+        with self._lock:
+            self._mark(files, False, 'modified')
+            self._mark(dirs, True, 'created')
+
     def get_idle_time(self) -> float:
         """Returns seconds since last activity"""
         with self._lock:
-            return time.time() - self.last_activity
+            return time.monotonic() - self.last_activity
+
+    def idle_remaining(self) -> float:
+        """Seconds until the project counts as idle, 0 if it already does"""
+        return max(0.0, self.current_idle_threshold() - self.get_idle_time())
 
     def is_idle(self) -> bool:
         """Check if system has been idle for threshold time"""
-        return self.get_idle_time() > self.idle_threshold
+        return self.get_idle_time() > self.current_idle_threshold()
 
     def add_idle_callback(self, callback: Callable):
         """Add a callback to be called when system becomes idle"""
@@ -49,34 +132,95 @@ class ActivityMonitor(FileSystemEventHandler):
 
 
 class SmartWatcher:
-    def __init__(self, project_dir: Path, save_callback: Callable,
-                 idle_time: float = 2.0, check_interval: float = 20 * 60):
+    # Wait before retrying a save that failed
+    RETRY_DELAY = 60.0
+
+    def __init__(self, project_dir: Path, save_callback: Optional[Callable],
+                 idle_time: float = 2.0, check_interval: float = 20 * 60,
+                 reconcile_interval: float = 60 * 60, observer: Optional[Observer] = None):
+        """Watch project_dir and call save_callback when a save is due.
+
+        With no save_callback, something else decides when to save (the
+        daemon's ProjectScheduler) and only the dirty tracking runs. An
+        observer passed in is shared with other watchers: this watcher
+        schedules itself on it but never starts or stops it.
+        """
         self.project_dir = project_dir
         self.save_callback = save_callback
         self.idle_time = idle_time
         self.check_interval = check_interval
+        # Full scans catch anything the observer missed (overflowed event
+        # queues, network filesystems, changes made while not watching)
+        self.reconcile_interval = reconcile_interval
         self.monitor = ActivityMonitor(idle_time)
-        self.observer = Observer()
+        self._owns_observer = observer is None
+        self.observer = observer if observer is not None else Observer()
+        self._watch = None
         self.watching = False
         self._watch_thread = None
-        self._last_save = time.time()
+        # Woken on stop and force_save; otherwise the watch thread sleeps
+        # until the interval is up and then until the project is idle
+        self._wakeup = threading.Condition()
+        self._save_lock = threading.Lock()
+        self._last_save = time.monotonic()
+        self._next_save = self._last_save + check_interval
+        self._last_reconcile: Optional[float] = None
+
+    def take_changes(self) -> Optional[Tuple[Set[Path], Set[Path]]]:
+        """Paths changed since the last call, or None when a full scan is due.
+
+        The first call always asks for a full scan, since nothing was
+        recorded before the observer started.
+        """
+        now = time.monotonic()
+        full_scan = (
+            self._last_reconcile is None
+            or now - self._last_reconcile >= self.reconcile_interval
+        )
+        changes = self.monitor.take_dirty()
+        if full_scan or changes is None:
+            self._last_reconcile = now
+            return None
+        return changes
+
+    def requeue_changes(self, changes: Optional[Tuple[Set[Path], Set[Path]]]):
+        """Give back changes from take_changes when the save using them failed"""
+        if changes is None:
+            self._last_reconcile = None
+        else:
+            self.monitor.mark_dirty(*changes)
+
+    def seconds_until_save(self) -> float:
+        """Time left before the interval is up (the save still waits for idle)"""
+        return max(0.0, self._next_save - time.monotonic())
 
     def _watch_loop(self):
-        """Main watch loop that checks for idle state and triggers saves"""
-        while self.watching:
-            time.sleep(1)
-
-            # Check if we should save
-            time_since_save = time.time() - self._last_save
-
-            if time_since_save >= self.check_interval:
-                # Wait for idle state before saving
-                if self.monitor.is_idle():
-                    try:
-                        self.save_callback()
-                        self._last_save = time.time()
-                    except Exception as e:
-                        print(f"Error during auto-save: {e}")
+        """Sleep until the interval is up, then until idle, then save"""
+        while True:
+            with self._wakeup:
+                if not self.watching:
+                    return
+                wait = self._next_save - time.monotonic()
+                if wait <= 0:
+                    # Activity since the last check pushes this back, so
+                    # a burst of edits ends in one save, not several
+                    wait = self.monitor.idle_remaining()
+                if wait > 0:
+                    self._wakeup.wait(wait)
+                    continue
+            self._save()
+
+    def _save(self):
+        with self._save_lock:
+            try:
+                self.save_callback()
+            except Exception as e:
+                print(f"Error during auto-save: {e}")
+                self._next_save = time.monotonic() + min(self.check_interval, self.RETRY_DELAY)
+                return
+            # The interval counts from the end of the last successful save
+            self._last_save = time.monotonic()
+            self._next_save = self._last_save + self.check_interval
 
     def start(self):
         """Start watching for changes and auto-saving"""
@@ -84,25 +228,36 @@ class SmartWatcher:
             self.watching = True
 
             # Start file system observer
-            self.observer.schedule(
+            self._watch = self.observer.schedule(
                 self.monitor,
                 str(self.project_dir),
                 recursive=True
             )
-            self.observer.start()
+            if self._owns_observer:
+                self.observer.start()
 
             # Start watch thread
-            self._watch_thread = threading.Thread(
-                target=self._watch_loop,
-                daemon=True
-            )
-            self._watch_thread.start()
+            if self.save_callback is not None:
+                self._watch_thread = threading.Thread(
+                    target=self._watch_loop,
+                    daemon=True
+                )
+                self._watch_thread.start()
 
     def stop(self):
         """Stop watching"""
-        self.watching = False
+        with self._wakeup:
+            self.watching = False
+            self._wakeup.notify_all()
 
-        if self.observer.is_alive():
+        if not self._owns_observer:
+            if self._watch is not None:
+                try:
+                    self.observer.unschedule(self._watch)
+                except KeyError:
+                    pass  # Already gone, e.g. the directory was deleted
+                self._watch = None
+        elif self.observer.is_alive():
             self.observer.stop()
             self.observer.join(timeout=5)
 
@@ -111,5 +266,9 @@ class SmartWatcher:
 
     def force_save(self):
         """Force an immediate save"""
-        self.save_callback()
-        self._last_save = time.time()
\ No newline at end of file
+        with self._save_lock:
+            self.save_callback()
+            self._last_save = time.monotonic()
+            self._next_save = self._last_save + self.check_interval
+        with self._wakeup:
+            self._wakeup.notify_all()
\ No newline at end of file
@@ -0,0 +1,807 @@
+"""Pluggable archive writers and readers for backup tarballs.
+
+Backups are written as a plain tar stream that is cut into fixed-size
+blocks, each compressed independently on a thread pool and written out in
+order. With gzip every block becomes its own gzip member, so the result is
+a standard multi-member .tar.gz that ``tarfile`` and ``gunzip`` read
+as-is. With zstd every block is its own frame (.tar.zst), which needs the
+optional ``zstandard`` package to read and write.
+
+Next to each archive, ArchiveWriter writes a sidecar index
+(``<name>.index.json``) listing every member's data offset, size, sha256
+and mode plus the block seek points. BackupIndex uses it to list an
+archive without reading it and to pull single files out by decompressing
+only the blocks that hold them.
+"""
+
+import io
+import os
+import gzip
+import json
+import bisect
+import hashlib
+import zlib
+import stat
+import tarfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import pwd
+    import grp
+except ImportError:
+    pwd = grp = None
+
+try:
+    from .hashing import default_jobs
+    from .throttle import get_throttle
+except ImportError:
+    from hashing import default_jobs
+    from throttle import get_throttle
+
+CODECS = ('gzip', 'zstd', 'none')
+
+EXTENSIONS = {
+    'gzip': '.tar.gz',
+    'zstd': '.tar.zst',
+    'none': '.tar',
+}
+
+# Uncompressed bytes per independently compressed block
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+INDEX_SUFFIX = '.index.json'
+INDEX_VERSION = 1
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def _import_zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise RuntimeError("zstd codec requires the zstandard package. Run: pip install zstandard")
+
+
+def zstd_available() -> bool:
+    """Check whether the optional zstd codec can be used."""
+    try:
+        _import_zstd()
+        return True
+    except RuntimeError:
+        return False
+
+
+def archive_extension(codec: str) -> str:
+    """File extension for backups written with the given codec."""
+    if codec not in EXTENSIONS:
+        raise ValueError(f"Unknown codec: {codec}")
+    return EXTENSIONS[codec]
+
+
+def strip_archive_extension(name: str) -> str:
+    """Remove a known tar extension from a backup file name."""
+    for extension in sorted(EXTENSIONS.values(), key=len, reverse=True):
+        if name.endswith(extension):
+            return name[:-len(extension)]
+    return name
+
+
+def index_path(archive_path: Path) -> Path:
+    """Sidecar index location for an archive.
+
+    The name deliberately has no '.tar' in it so backup globs skip it.
+    """
+    archive_path = Path(archive_path)
+    return archive_path.with_name(strip_archive_extension(archive_path.name) + INDEX_SUFFIX)
+
+
+def is_within(path: Path, root: Path) -> bool:
+    """Whether path is root or below it (Path.is_relative_to needs 3.9)"""
+    try:
+        Path(path).relative_to(root)
+        return True
+    except ValueError:
+        return False
+
+
+def remove_backup(archive_path: Path):
+    """Delete an archive together with its sidecar index."""
+    for path in (Path(archive_path), index_path(archive_path)):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def detect_codec(path: Path) -> str:
+    """Identify an archive's codec from its magic bytes."""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if magic == ZSTD_MAGIC:
+        return 'zstd'
+    return 'none'
+
+
+class ParallelCompressor(io.RawIOBase):
+    """Write-only stream that compresses fixed-size blocks in parallel.
+
+    Blocks are handed to a thread pool as they fill up; finished blocks are
+    written to the underlying file strictly in order. At most ``threads * 2``
+    blocks are in flight, which bounds memory use regardless of archive size.
+    """
+
+    def __init__(self, fileobj, codec: str = 'gzip', level: int = 6,
+                 threads: Optional[int] = None, block_size: int = DEFAULT_BLOCK_SIZE):
+        if codec not in ('gzip', 'zstd'):
+            raise ValueError(f"Unsupported compression codec: {codec}")
+
+        self.fileobj = fileobj
+        self.codec = codec
+        self.threads = max(1, threads or default_jobs())
+        self.block_size = block_size
+
+        if codec == 'gzip':
+            self.level = min(max(level, 1), 9)
+        else:
+            zstd = _import_zstd()
+            self.level = min(max(level, 1), 22)
+            self._zstd_local = threading.local()
+            self._zstd = zstd
+
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.threads,
+            thread_name_prefix='savior-compress'
+        )
+        self._uncompressed_pos = 0
+        self._submitted_pos = 0
+        self._compressed_pos = 0
+
+        # (uncompressed offset, compressed offset) where each block starts
+        self.seek_points: List[Tuple[int, int]] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._uncompressed_pos
+
+    def _compress_block(self, block: bytes) -> bytes:
+        if self.codec == 'gzip':
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+            return compressor.compress(block) + compressor.flush()
+
+        # ZstdCompressor instances aren't thread-safe, keep one per worker
+        compressor = getattr(self._zstd_local, 'compressor', None)
+        if compressor is None:
+            compressor = self._zstd.ZstdCompressor(level=self.level, write_content_size=True)
+            self._zstd_local.compressor = compressor
+        return compressor.compress(block)
+
+    def _submit(self, block: bytes):
+        future = self._executor.submit(self._compress_block, block)
+        self._pending.append((self._submitted_pos, future))
+        self._submitted_pos += len(block)
+
+        while len(self._pending) > self.threads * 2:
+            self._drain_one()
+
+    def _drain_one(self):
+        uncompressed_offset, future = self._pending.popleft()
+        data = future.result()
+        self.seek_points.append((uncompressed_offset, self._compressed_pos))
+        self.fileobj.write(data)
+        self._compressed_pos += len(data)
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed compressor")
+
+        self._buffer += data
+        self._uncompressed_pos += len(data)
+
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def flush(self):
+        # Blocks are only emitted when full; close() writes the remainder
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._drain_one()
+            self.fileobj.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            super().close()
+
+
+class ZstdReader(io.RawIOBase):
+    """Seekable read-only view of a zstd stream.
+
+    Forward seeks decompress and discard; backward seeks restart from the
+    beginning. That mirrors how gzip.GzipFile behaves and is enough for
+    tarfile's random-access mode.
+    """
+
+    def __init__(self, path: Path):
+        self._zstd = _import_zstd()
+        self.path = path
+        self._raw = open(path, 'rb')
+        self._open_stream()
+
+    def _open_stream(self):
+        self._raw.seek(0)
+        self._stream = self._zstd.ZstdDecompressor().stream_reader(
+            self._raw, read_across_frames=True, closefd=False
+        )
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset = self._pos + offset
+        elif whence == io.SEEK_END:
+            raise io.UnsupportedOperation("cannot seek from end of a zstd stream")
+
+        if offset < self._pos:
+            self._open_stream()
+        while self._pos < offset:
+            chunk = self._stream.read(min(offset - self._pos, DEFAULT_BLOCK_SIZE))
+            if not chunk:
+                break
+            self._pos += len(chunk)
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._stream.close()
+            self._raw.close()
+        super().close()
+
+
+class _HashingReader:
+    """File wrapper that hashes everything read through it."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.sha256.update(data)
+        return data
+
+
+class IndexedTarFile(tarfile.TarFile):
+    """TarFile that records where each member's data lands while writing."""
+
+    def __init__(self, *args, **kwargs):
+        self.index_entries: List[Dict] = []
+        self._owner_names: Dict[Tuple[str, int], str] = {}
+        super().__init__(*args, **kwargs)
+
+    def add_file(self, name, arcname: str, known=None):
+        """tar.add for a file the scanner has already stat-ed.
+
+        known is the file's FileStat; without one, or for anything but a
+        regular file, this is plain tar.add. Otherwise the path isn't
+        looked up again: the open file is fstat-ed, so a file that changed
+        since the scan is archived consistently as it is now, and owner
+        names are looked up once per uid/gid rather than once per file.
+        """
+        if known is None or not stat.S_ISREG(known.mode):
+            self.add(name, arcname=arcname)
+            return
+
+        with open(name, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                raise OSError(f"Not a regular file anymore: {name}")
+            tarinfo = self.tarinfo(arcname.replace(os.sep, '/').lstrip('/'))
+            tarinfo.tarfile = self
+            tarinfo.mode = st.st_mode
+            tarinfo.uid = st.st_uid
+            tarinfo.gid = st.st_gid
+            tarinfo.size = st.st_size
+            tarinfo.mtime = st.st_mtime
+            tarinfo.uname = self._owner_name('u', st.st_uid)
+            tarinfo.gname = self._owner_name('g', st.st_gid)
+            self.addfile(tarinfo, f)
+
+    def _owner_name(self, kind: str, owner_id: int) -> str:
+        key = (kind, owner_id)
+        name = self._owner_names.get(key)
+        if name is None:
+            name = ''
+            try:
+                if kind == 'u' and pwd:
+                    name = pwd.getpwuid(owner_id)[0]
+                elif kind == 'g' and grp:
+                    name = grp.getgrgid(owner_id)[0]
+            except KeyError:
+                pass
+            self._owner_names[key] = name
+        return name
+
+    def addfile(self, tarinfo, fileobj=None):
+        reader = _HashingReader(get_throttle().reader(fileobj)) if fileobj is not None else None
+        super().addfile(tarinfo, reader)
+
+        entry = {'name': tarinfo.name, 'type': 'file', 'mode': tarinfo.mode,
+                 'mtime': tarinfo.mtime, 'size': tarinfo.size}
+        if tarinfo.isfile() and reader is not None:
+            # Data ends padded to a whole block just before the new offset
+            padded = -(-tarinfo.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            entry['offset'] = self.offset - padded
+            entry['sha256'] = reader.sha256.hexdigest()
+        else:
+            entry['type'] = 'dir' if tarinfo.isdir() else 'other'
+            entry['size'] = 0
+        self.index_entries.append(entry)
+
+
+class ArchiveWriter:
+    """Context manager that yields a tarfile.TarFile writing with a codec.
+
+    With index=True (the default) a sidecar index is written next to the
+    archive once it has been closed successfully.
+    """
+
+    def __init__(self, path: Path, codec: str = 'gzip', level: int = 6,
+                 threads: Optional[int] = None, block_size: int = DEFAULT_BLOCK_SIZE,
+                 index: bool = True):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.path = Path(path)
+        self.codec = codec
+        self.level = level
+        self.threads = threads
+        self.block_size = block_size
+        self.index = index
+        self.compressor: Optional[ParallelCompressor] = None
+        self._file = None
+        self._tar = None
+
+    def __enter__(self) -> tarfile.TarFile:
+        # A stale sidecar from an archive this one replaces must not survive
+        index_path(self.path).unlink(missing_ok=True)
+        self._file = open(self.path, 'wb')
+        out = get_throttle().writer(self._file)
+        try:
+            if self.codec == 'none':
+                self._tar = IndexedTarFile.open(fileobj=out, mode='w')
+            else:
+                self.compressor = ParallelCompressor(
+                    out, self.codec, self.level, self.threads, self.block_size
+                )
+                self._tar = IndexedTarFile.open(fileobj=self.compressor, mode='w')
+        except Exception:
+            self._file.close()
+            raise
+        return self._tar
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self._tar.close()
+            if self.compressor is not None:
+                self.compressor.close()
+        finally:
+            self._file.close()
+
+        if exc_type is None and self.index:
+            self._write_index()
+        return False
+
+    def _write_index(self):
+        index = {
+            'version': INDEX_VERSION,
+            'codec': self.codec,
+            'archive_size': self.path.stat().st_size,
+            'seek_points': self.seek_points,
+            'members': self._tar.index_entries,
+        }
+        sidecar = index_path(self.path)
+        temp = sidecar.with_name(sidecar.name + '.tmp')
+        with open(temp, 'w') as f:
+            json.dump(index, f)
+        os.replace(temp, sidecar)
+
+    @property
+    def seek_points(self) -> List[Tuple[int, int]]:
+        """Block boundaries recorded while writing (empty for 'none')."""
+        return self.compressor.seek_points if self.compressor else []
+
+    @property
+    def members(self) -> List[Dict]:
+        """Index entries for everything written, in archive order."""
+        return self._tar.index_entries if self._tar is not None else []
+
+
+def open_backup(path: Path) -> tarfile.TarFile:
+    """Open any backup archive for reading, whatever codec wrote it.
+
+    gzip (single- or multi-member) and plain tar go straight to tarfile;
+    zstd goes through ZstdReader. The result supports getmembers(),
+    extractfile() and extractall() like a normal TarFile.
+    """
+    path = Path(path)
+    codec = detect_codec(path)
+
+    if codec == 'zstd':
+        reader = io.BufferedReader(ZstdReader(path), buffer_size=DEFAULT_BLOCK_SIZE)
+        try:
+            tar = tarfile.open(fileobj=reader, mode='r:')
+        except Exception:
+            reader.close()
+            raise
+        # TarFile doesn't close a fileobj it didn't open itself
+        original_close = tar.close
+
+        def close():
+            try:
+                original_close()
+            finally:
+                reader.close()
+
+        tar.close = close
+        return tar
+
+    if codec == 'gzip':
+        return tarfile.open(path, 'r:gz')
+    return tarfile.open(path, 'r:')
+
+
+def open_backup_stream(stream) -> tarfile.TarFile:
+    """Open a backup that can only be read front to back, e.g. a download.
+
+    stream is any readable binary stream; the codec is detected from its
+    first bytes. Members must be read in order, as with tarfile's 'r|'
+    modes. Closing the TarFile doesn't close stream.
+    """
+    reader = io.BufferedReader(stream, buffer_size=DEFAULT_BLOCK_SIZE)
+    magic = reader.peek(4)[:4]
+
+    if magic.startswith(GZIP_MAGIC):
+        # GzipFile reads every member of a multi-member archive
+        fileobj = gzip.GzipFile(fileobj=reader, mode='rb')
+    elif magic == ZSTD_MAGIC:
+        fileobj = _import_zstd().ZstdDecompressor().stream_reader(
+            reader, read_across_frames=True, closefd=False
+        )
+    else:
+        fileobj = reader
+    return tarfile.open(fileobj=fileobj, mode='r|')
+
+
+class BackupIndex:
+    """Random access to a backup archive through its sidecar index.
+
+    Reading one member seeks to the last block boundary before it and
+    decompresses from there, so the cost is bounded by the member's size
+    plus one block rather than by the size of the archive.
+    """
+
+    def __init__(self, archive_path: Path, data: Dict):
+        self.archive_path = Path(archive_path)
+        self.codec = data['codec']
+        self.seek_points = [tuple(point) for point in data['seek_points']]
+        self.members = {entry['name']: entry for entry in data['members']}
+        self._starts = [point[0] for point in self.seek_points]
+
+    @classmethod
+    def load(cls, archive_path: Path) -> Optional['BackupIndex']:
+        """Load the index for an archive, or None if it has no usable one."""
+        archive_path = Path(archive_path)
+        try:
+            with open(index_path(archive_path), 'r') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                return None
+            # An archive rewritten without its index would not match
+            if archive_path.stat().st_size != data['archive_size']:
+                return None
+            return cls(archive_path, data)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def files(self) -> List[Dict]:
+        """Entries for regular file members, in archive order."""
+        return [entry for entry in self.members.values() if entry['type'] == 'file']
+
+    def _open_at(self, offset: int):
+        """Open a decompressed stream positioned at an uncompressed offset."""
+        raw = open(self.archive_path, 'rb')
+        try:
+            if self.codec == 'none':
+                raw.seek(offset)
+                return raw
+
+            i = bisect.bisect_right(self._starts, offset) - 1
+            start, compressed = self.seek_points[i] if i >= 0 else (0, 0)
+            raw.seek(compressed)
+
+            if self.codec == 'gzip':
+                # Every block is a complete gzip member
+                stream = gzip.GzipFile(fileobj=raw, mode='rb')
+            else:
+                stream = _import_zstd().ZstdDecompressor().stream_reader(
+                    raw, read_across_frames=True, closefd=True
+                )
+
+            stream = _ClosingStream(stream, raw)
+            self._skip(stream, offset - start)
+            return stream
+        except Exception:
+            raw.close()
+            raise
+
+    def _skip(self, stream, count: int):
+        while count > 0:
+            chunk = stream.read(min(count, DEFAULT_BLOCK_SIZE))
+            if not chunk:
+                raise IOError(f"{self.archive_path.name} ends early")
+            count -= len(chunk)
+
+    def _block_start(self, offset: int) -> int:
+        i = bisect.bisect_right(self._starts, offset) - 1
+        return self._starts[i] if i >= 0 else 0
+
+    def read(self, name: str) -> bytes:
+        """Return a file member's contents, verified against its hash."""
+        entry = self.members.get(name)
+        if entry is None or entry['type'] != 'file':
+            raise KeyError(name)
+
+        stream = self._open_at(entry['offset'])
+        try:
+            reader = MemberReader(stream, entry, self.archive_path.name)
+            data = reader.read()
+            reader.verify()
+            return data
+        finally:
+            stream.close()
+
+    def read_many(self, names: Iterable[str]) -> Iterator[Tuple[Dict, bytes]]:
+        """Yield (entry, contents) for the named files, in archive order."""
+        for entry, reader in self.open_many(names):
+            data = reader.read()
+            reader.verify()
+            yield entry, data
+
+    def open_many(self, names: Iterable[str]) -> Iterator[Tuple[Dict, 'MemberReader']]:
+        """Yield (entry, reader) for the named files, in archive order.
+
+        One stream is kept open and read forward while that is cheaper
+        than seeking, so pulling many files out of the same block
+        decompresses it once rather than once per file. Each reader is
+        only valid until the next one is yielded; call its verify() once
+        its data has been consumed. Names that aren't file members are
+        skipped.
+        """
+        entries = sorted(
+            (self.members[name] for name in set(names)
+             if name in self.members and self.members[name]['type'] == 'file'),
+            key=lambda entry: entry['offset']
+        )
+
+        stream = None
+        position = 0
+        try:
+            for entry in entries:
+                offset = entry['offset']
+                if stream is not None and self.codec == 'none':
+                    stream.seek(offset)
+                elif stream is not None and position <= offset and self._block_start(offset) <= position:
+                    # Still in (or just before) the block holding this file
+                    self._skip(stream, offset - position)
+                else:
+                    if stream is not None:
+                        stream.close()
+                    stream = self._open_at(offset)
+                reader = MemberReader(stream, entry, self.archive_path.name)
+                yield entry, reader
+                reader.verify()
+                position = offset + entry['size']
+        finally:
+            if stream is not None:
+                stream.close()
+
+    def extract(self, name: str, destination: Path):
+        """Write a file member to destination with its mode and mtime."""
+        self._write(self.members[name], self.read(name), destination)
+
+    @staticmethod
+    def _write(entry: Dict, data: bytes, destination: Path):
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        with open(destination, 'wb') as f:
+            f.write(data)
+        os.chmod(destination, entry['mode'] & 0o7777)
+        os.utime(destination, (entry['mtime'], entry['mtime']))
+
+
+class MemberReader:
+    """Reads one member's data from a shared stream, checking its hash."""
+
+    def __init__(self, stream, entry: Dict, archive_name: str):
+        self.stream = stream
+        self.entry = entry
+        self.archive_name = archive_name
+        self.remaining = entry['size']
+        self.sha256 = hashlib.sha256()
+        self._verified = False
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = max(self.remaining, 0)
+        data = self.stream.read(size) if size else b''
+        self.remaining -= len(data)
+        self.sha256.update(data)
+        if size and not data:
+            self.remaining = -1  # Truncated archive; verify() will fail
+        return data
+
+    def verify(self):
+        """Read whatever is left and raise IOError if the data doesn't match"""
+        if self._verified:
+            return
+        while self.remaining > 0:
+            if not self.read(DEFAULT_BLOCK_SIZE):
+                break
+        self._verified = True
+        if self.remaining != 0 or self.sha256.hexdigest() != self.entry['sha256']:
+            raise IOError(f"{self.entry['name']} in {self.archive_name} does not match its index")
+
+
+class _ClosingStream:
+    """Close a decompression stream together with the file under it."""
+
+    def __init__(self, stream, raw):
+        self.stream = stream
+        self.raw = raw
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            return self.stream.read()
+        parts = []
+        while size > 0:
+            chunk = self.stream.read(size)
+            if not chunk:
+                break
+            parts.append(chunk)
+            size -= len(chunk)
+        return b''.join(parts)
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self.raw.close()
+
+
+def list_backup_files(archive_path: Path) -> List[str]:
+    """Names of the regular files in a backup.
+
+    Uses the sidecar index when there is one; otherwise the archive is
+    scanned (decompressed, but nothing is written to disk).
+    """
+    index = BackupIndex.load(archive_path)
+    if index is not None:
+        return [entry['name'] for entry in index.files()]
+
+    with open_backup(archive_path) as tar:
+        return [member.name for member in tar.getmembers() if member.isfile()]
+
+
+def backup_file_digests(archive_path: Path) -> Dict[str, Optional[str]]:
+    """{name: sha256} for a backup's files; digests are None without an index."""
+    index = BackupIndex.load(archive_path)
+    if index is not None:
+        return {entry['name']: entry['sha256'] for entry in index.files()}
+    return {name: None for name in list_backup_files(archive_path)}
+
+
+def backup_file_entries(archive_path: Path) -> List[Dict]:
+    """Index entries (name, size, mtime, mode, sha256) for a backup's files.
+
+    Archives without a sidecar index are streamed once and hashed, so
+    this is as expensive as reading the whole archive for them.
+    """
+    index = BackupIndex.load(archive_path)
+    if index is not None:
+        return index.files()
+
+    entries = []
+    with open_backup(archive_path) as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            digest = hashlib.sha256()
+            extracted = tar.extractfile(member)
+            for block in iter(lambda: extracted.read(DEFAULT_BLOCK_SIZE), b''):
+                digest.update(block)
+            entries.append({'name': member.name, 'type': 'file', 'mode': member.mode,
+                            'mtime': member.mtime, 'size': member.size,
+                            'sha256': digest.hexdigest()})
+    return entries
+
+
+def read_backup_file(archive_path: Path, name: str) -> Optional[bytes]:
+    """Contents of one file in a backup, or None if it isn't there."""
+    index = BackupIndex.load(archive_path)
+    if index is not None:
+        try:
+            return index.read(name)
+        except KeyError:
+            return None
+
+    with open_backup(archive_path) as tar:
+        try:
+            member = tar.getmember(name)
+        except KeyError:
+            return None
+        extracted = tar.extractfile(member)
+        return extracted.read() if extracted else None
+
+
+def extract_backup_files(archive_path: Path, names: Iterable[str], destination: Path) -> int:
+    """Extract just the named files into destination; returns how many.
+
+    With an index each file is read from its own offset. Without one the
+    archive is streamed once and only the wanted members are written.
+    """
+    wanted = set(names)
+    destination = Path(destination)
+    extracted = 0
+
+    index = BackupIndex.load(archive_path)
+    if index is not None:
+        root = destination.resolve()
+        for entry, data in index.read_many(wanted):
+            target = destination / entry['name']
+            if not is_within(target.resolve(), root):
+                continue  # Same protection tarfile's 'data' filter gives
+            index._write(entry, data, target)
+            extracted += 1
+        return extracted
+
+    with open_backup(archive_path) as tar:
+        for member in tar:
+            if member.isfile() and member.name in wanted:
+                tar.extract(member, destination, filter='data')
+                extracted += 1
+    return extracted
@@ -0,0 +1,172 @@
+"""SQLite catalog of which files are in which backups."""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL,
+    description TEXT,
+    archive_size INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS paths (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    path_id INTEGER NOT NULL,
+    backup_id INTEGER NOT NULL,
+    hash TEXT,
+    size INTEGER,
+    mtime INTEGER,
+    PRIMARY KEY (path_id, backup_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS files_backup ON files (backup_id);
+"""
+
+VERSION_COLUMNS = ('b.key, b.timestamp, b.description, b.archive_size, '
+                   'f.hash, f.size, f.mtime')
+
+
+class BackupCatalog:
+    """One row per (backup, file) with the file's hash, size and mtime.
+
+    Backups are identified by a key, their path relative to the backup
+    directory. File paths are stored once in their own table, so asking
+    for a file's history or searching by name reads the path table and
+    then only that file's rows, whatever the number of backups.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(
+            str(db_path), isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def batch(self):
+        """Group every update made inside the block into one transaction."""
+        with self._lock:
+            depth = self._depth
+            if depth == 0:
+                self._conn.execute('BEGIN')
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if depth == 0:
+                    self._conn.execute('ROLLBACK')
+                raise
+            self._depth -= 1
+            if depth == 0:
+                self._conn.execute('COMMIT')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _path_id(self, path: str) -> int:
+        self._conn.execute('INSERT OR IGNORE INTO paths (path) VALUES (?)', (path,))
+        return self._conn.execute('SELECT id FROM paths WHERE path = ?', (path,)).fetchone()[0]
+
+    def add_backup(self, key: str, timestamp: datetime, description: str,
+                   archive_size: int, entries: Iterable[Dict]):
+        """Record a backup and its files, replacing any earlier record of it.
+
+        entries are archive index entries: dicts with name, sha256, size
+        and mtime.
+        """
+        with self.batch():
+            self.remove_backup(key)
+            backup_id = self._conn.execute(
+                'INSERT INTO backups (key, timestamp, description, archive_size) '
+                'VALUES (?, ?, ?, ?)',
+                (key, timestamp.isoformat(), description, archive_size)
+            ).lastrowid
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO files (path_id, backup_id, hash, size, mtime) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(self._path_id(entry['name']), backup_id, entry.get('sha256'),
+                  entry.get('size'), entry.get('mtime')) for entry in entries]
+            )
+
+    def remove_backup(self, key: str):
+        """Forget a backup and its files."""
+        with self.batch():
+            row = self._conn.execute('SELECT id FROM backups WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return
+            self._conn.execute('DELETE FROM files WHERE backup_id = ?', row)
+            self._conn.execute('DELETE FROM backups WHERE id = ?', row)
+            # Drop names no remaining backup contains
+            self._conn.execute(
+                'DELETE FROM paths WHERE NOT EXISTS '
+                '(SELECT 1 FROM files WHERE files.path_id = paths.id)'
+            )
+
+    def backups(self) -> Dict[str, int]:
+        """{key: archive size} of every cataloged backup."""
+        with self._lock:
+            return dict(self._conn.execute('SELECT key, archive_size FROM backups'))
+
+    @staticmethod
+    def _version(row) -> Dict:
+        key, timestamp, description, archive_size, content_hash, size, mtime = row
+        return {
+            'backup': key,
+            'timestamp': datetime.fromisoformat(timestamp),
+            'description': description,
+            'archive_size': archive_size,
+            'hash': content_hash,
+            'size': size,
+            'mtime': mtime,
+        }
+
+    def history(self, path: str) -> List[Dict]:
+        """Every backed-up version of a file, newest backup first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT {VERSION_COLUMNS} FROM paths p '
+                'JOIN files f ON f.path_id = p.id '
+                'JOIN backups b ON b.id = f.backup_id '
+                'WHERE p.path = ? ORDER BY b.timestamp DESC',
+                (path,)
+            ).fetchall()
+        return [self._version(row) for row in rows]
+
+    def search(self, pattern: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """{path: versions, newest first} for files whose path contains pattern.
+
+        With no pattern every cataloged file is returned.
+        """
+        query = (f'SELECT p.path, {VERSION_COLUMNS} FROM paths p '
+                 'JOIN files f ON f.path_id = p.id '
+                 'JOIN backups b ON b.id = f.backup_id ')
+        params = ()
+        if pattern:
+            query += 'WHERE instr(p.path, ?) > 0 '
+            params = (pattern,)
+        query += 'ORDER BY p.path, b.timestamp DESC'
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        found: Dict[str, List[Dict]] = {}
+        for row in rows:
+            found.setdefault(row[0], []).append(self._version(row[1:]))
+        return found
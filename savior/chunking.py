@@ -0,0 +1,118 @@
+"""Content-defined chunking (FastCDC-style gear hash).
+
+Cut points are chosen from the content itself, so inserting or deleting
+bytes only changes the chunks around the edit; everything after it
+re-aligns to the same boundaries and deduplicates against earlier
+backups.
+"""
+
+import hashlib
+from typing import BinaryIO, Iterator, List
+
+DEFAULT_MIN_SIZE = 16 * 1024
+DEFAULT_AVG_SIZE = 64 * 1024
+DEFAULT_MAX_SIZE = 256 * 1024
+
+_MASK64 = (1 << 64) - 1
+
+# Deterministic gear table so chunk boundaries are stable across runs and
+# Python versions
+GEAR = tuple(
+    int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], 'big')
+    for i in range(256)
+)
+
+
+def _top_bits_mask(bits: int) -> int:
+    # With a left-shifting gear hash the high bits depend on the most
+    # recent bytes, so test those rather than the low ones
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+class Chunker:
+    """Splits byte streams into variable-size chunks at content boundaries.
+
+    Uses FastCDC's normalized chunking: a stricter mask below the average
+    size and a looser one above it keeps chunk sizes tightly grouped
+    around ``avg_size`` while never going below ``min_size`` or above
+    ``max_size``.
+    """
+
+    def __init__(self, min_size: int = DEFAULT_MIN_SIZE,
+                 avg_size: int = DEFAULT_AVG_SIZE,
+                 max_size: int = DEFAULT_MAX_SIZE):
+        if not 0 < min_size <= avg_size <= max_size:
+            raise ValueError("Chunk sizes must satisfy 0 < min <= avg <= max")
+
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+
+        bits = max(1, avg_size.bit_length() - 1)
+        self._mask_small = _top_bits_mask(bits + 1)
+        self._mask_large = _top_bits_mask(max(1, bits - 1))
+
+    def find_cut(self, data, start: int, end: int) -> int:
+        """Return the length of the next chunk in data[start:end]."""
+        length = end - start
+        if length <= self.min_size:
+            return length
+        if length > self.max_size:
+            length = self.max_size
+        normal = min(self.avg_size, length)
+
+        gear = GEAR
+        mask = _MASK64
+        h = 0
+        i = start + self.min_size
+
+        limit = start + normal
+        mask_small = self._mask_small
+        while i < limit:
+            h = ((h << 1) + gear[data[i]]) & mask
+            if not h & mask_small:
+                return i - start + 1
+            i += 1
+
+        limit = start + length
+        mask_large = self._mask_large
+        while i < limit:
+            h = ((h << 1) + gear[data[i]]) & mask
+            if not h & mask_large:
+                return i - start + 1
+            i += 1
+
+        return length
+
+    def split(self, data: bytes) -> List[bytes]:
+        """Chunk an in-memory buffer."""
+        chunks = []
+        pos = 0
+        while pos < len(data):
+            cut = self.find_cut(data, pos, len(data))
+            chunks.append(data[pos:pos + cut])
+            pos += cut
+        return chunks
+
+    def iter_chunks(self, stream: BinaryIO, read_size: int = 4 * 1024 * 1024) -> Iterator[bytes]:
+        """Chunk a file object without reading it all into memory."""
+        read_size = max(read_size, self.max_size)
+        buffer = b''
+        pos = 0
+        eof = False
+
+        while True:
+            if not eof and len(buffer) - pos < self.max_size:
+                data = stream.read(read_size)
+                if data:
+                    buffer = buffer[pos:] + data
+                    pos = 0
+                else:
+                    eof = True
+
+            if pos >= len(buffer):
+                return
+
+            cut = self.find_cut(buffer, pos, len(buffer))
+            yield buffer[pos:pos + cut]
+            pos += cut
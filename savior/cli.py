@@ -2,10 +2,8 @@ import click
 import time
 import sys
 import os
-import tempfile
-import tarfile
-import shutil
 import select
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
 from colorama import init, Fore, Style
@@ -16,18 +14,28 @@ try:
     from .diff import BackupDiffer
     from .recovery import DeepRecovery
     from .activity import SmartWatcher
-    from .incremental import IncrementalBackup
+    from .incremental import (
+        IncrementalBackup, resolve_chain, read_manifest, chain_files, extract_chain_files
+    )
     from .zombie import ZombieScanner, QuarantineManager, RuntimeTracer
     from .cloud import CloudStorage
+    from .archive import extract_backup_files, is_within
+    from .hashing import get_hasher
+    from .throttle import PRIORITIES, parse_rate, configure_throttle
 except ImportError:
     # Fall back to absolute imports (when run as script)
     from core import Savior, Backup
     from diff import BackupDiffer
     from recovery import DeepRecovery
     from activity import SmartWatcher
-    from incremental import IncrementalBackup
+    from incremental import (
+        IncrementalBackup, resolve_chain, read_manifest, chain_files, extract_chain_files
+    )
     from zombie import ZombieScanner, QuarantineManager, RuntimeTracer
     from cloud import CloudStorage
+    from archive import extract_backup_files, is_within
+    from hashing import get_hasher
+    from throttle import PRIORITIES, parse_rate, configure_throttle
 
 init(autoreset=True)
 
@@ -57,6 +65,30 @@ def format_size(size_bytes: int) -> str:
     return f"{size_bytes:.1f} TB"
 
 
+def _rate_callback(ctx, param, value):
+    try:
+        return parse_rate(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def throttle_options(f):
+    """Add the I/O limit and priority options shared by watch and daemon add."""
+    options = [
+        click.option('--read-limit', default='0', callback=_rate_callback,
+                     help='Max disk read rate for backups, e.g. 20M (default: unlimited)'),
+        click.option('--write-limit', default='0', callback=_rate_callback,
+                     help='Max archive write rate, e.g. 10M (default: unlimited)'),
+        click.option('--cloud-limit', default='0', callback=_rate_callback,
+                     help='Max cloud transfer rate, e.g. 2M (default: unlimited)'),
+        click.option('--priority', type=click.Choice(PRIORITIES), default='normal',
+                     help='normal, low (always low CPU/IO priority) or adaptive (back off while the machine is busy)'),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
 def check_keyboard_input():
     """Check if a key has been pressed (non-blocking)"""
     if sys.platform == 'win32':
@@ -115,16 +147,19 @@ def show_all_commands(ctx):
             ('list/saves', 'Show all saved backups'),
             ('diff', 'See what changed between backups'),
             ('purge', 'Delete old backups to free space'),
+            ('synthesize', 'Merge an incremental chain into a full backup'),
             ('tree', 'Show project file tree'),
         ],
         'Recovery': [
             ('resurrect', 'Recover specific deleted files'),
+            ('history', 'Show every backed-up version of a file'),
             ('pray', '🙏 Hail Mary recovery attempt'),
         ],
         'Advanced': [
             ('daemon', 'Manage background daemon'),
             ('projects', 'Manage multiple projects'),
             ('cloud', '☁️ Self-hosted cloud backup'),
+            ('dedup', 'Garbage-collect and repack the dedup store'),
             ('zombie', '🧟 Dead code detection'),
         ],
         'Information': [
@@ -159,18 +194,24 @@ def show_flags():
             ('--no-smart', 'Disable smart mode (save even during activity)'),
             ('--full', 'Use full backups instead of incremental'),
             ('--exclude-git', 'Exclude .git directory'),
-            ('--compression N', 'Compression level 0-9 (default: 6)'),
+            ('--compression N', 'Compression level 0-9, up to 22 for zstd (default: 6)'),
+            ('--codec NAME', 'Compression codec: gzip or zstd (default: gzip)'),
+            ('--paranoid', 'Rehash every file instead of trusting file stats'),
+            ('-j, --jobs N', 'Worker threads for hashing and compression (default: CPU count)'),
             ('--tree', 'Show project tree before starting'),
             ('-b, --background', 'Run in background as daemon'),
         ],
         'save': [
-            ('--compression N', 'Compression level 0-9 (default: 6)'),
+            ('--compression N', 'Compression level 0-9, up to 22 for zstd (default: 6)'),
+            ('--codec NAME', 'Compression codec: gzip or zstd (default: gzip)'),
             ('--tree', 'Show what will be backed up'),
             ('--no-progress', 'Disable progress bar'),
+            ('-j, --jobs N', 'Worker threads for hashing and compression (default: CPU count)'),
         ],
         'restore': [
             ('--files PATTERN', 'Restore only specific files'),
             ('--preview', 'See what would be restored'),
+            ('-j, --jobs N', 'Worker threads for hashing (default: CPU count)'),
         ],
         'diff': [
             ('--show-content', 'Show actual file differences'),
@@ -221,18 +262,23 @@ def show_flags():
 @click.option('--full', is_flag=True, help='Use full backups instead of incremental')
 @click.option('--exclude-git', is_flag=True, help='Exclude .git directory from backups (saves space)')
 @click.option('--ignore', default='', help='Additional patterns to ignore (comma-separated, e.g. "*.mp4,temp/*")')
-@click.option('--compression', '-c', type=click.IntRange(0, 9), default=6, help='Compression level (0=none, 9=max, default: 6)')
+@click.option('--compression', '-c', type=click.IntRange(0, 22), default=6, help='Compression level (0=none, 9=max for gzip, 22=max for zstd, default: 6)')
+@click.option('--codec', type=click.Choice(['gzip', 'zstd']), default='gzip', help='Compression codec (zstd requires the zstandard package)')
 @click.option('--background', '-b', is_flag=True, help='Run in background as daemon')
 @click.option('--tree', is_flag=True, help='Show project tree before starting')
 @click.option('--cloud', is_flag=True, help='Enable automatic cloud backup syncing')
-def watch(interval, no_smart, full, exclude_git, ignore, compression, background, tree, cloud):
+@click.option('--paranoid', is_flag=True, help='Rehash every file on each save instead of trusting unchanged file stats')
+@click.option('--jobs', '-j', type=click.IntRange(1, 256), default=None, help='Worker threads for hashing (default: CPU count)')
+@throttle_options
+def watch(interval, no_smart, full, exclude_git, ignore, compression, codec, background, tree, cloud, paranoid, jobs,
+          read_limit, write_limit, cloud_limit, priority):
     """Start auto-saving current directory"""
     project_dir = Path.cwd()
 
     # Parse additional ignore patterns
     extra_ignores = [p.strip() for p in ignore.split(',') if p.strip()] if ignore else []
 
-    savior = Savior(project_dir, exclude_git=exclude_git, extra_ignores=extra_ignores, enable_cloud=cloud)
+    savior = Savior(project_dir, exclude_git=exclude_git, extra_ignores=extra_ignores, enable_cloud=cloud, jobs=jobs)
 
     # Show project tree if requested
     if tree:
@@ -269,7 +315,11 @@ def watch(interval, no_smart, full, exclude_git, ignore, compression, background
             interval=interval,
             smart=not no_smart,
             incremental=not full,
-            exclude_git=exclude_git
+            exclude_git=exclude_git,
+            read_limit=read_limit,
+            write_limit=write_limit,
+            cloud_limit=cloud_limit,
+            priority=priority
         )
 
         if 'error' in result:
@@ -280,27 +330,59 @@ def watch(interval, no_smart, full, exclude_git, ignore, compression, background
             click.echo(f"  Use '{Fore.CYAN}savior sessions{Style.RESET_ALL}' to see watch history")
         return
 
+    configure_throttle(read_limit, write_limit, cloud_limit, priority)
+    if read_limit or write_limit or cloud_limit or priority != 'normal':
+        limits = [f"{name} {format_size(rate)}/s" for name, rate in
+                  (('read', read_limit), ('write', write_limit), ('cloud', cloud_limit)) if rate]
+        click.echo(f"{Fore.CYAN}🐢 Background I/O: " + ', '.join([f"{priority} priority"] + limits))
+
     last_backup_time = datetime.now()
     next_backup_time = datetime.now() + timedelta(minutes=interval)
     backup_count = 0
     total_size = 0
+    inc_backup = IncrementalBackup(savior.backup_dir, savior.project_dir, paranoid=paranoid)
+    watcher = None
+    synthesizer = None
+
+    def synthesize_in_background(backup_path):
+        try:
+            savior.synthesize_full(backup_path)
+        except Exception as e:
+            click.echo(f"\r{Fore.YELLOW}⚠️ Could not merge backup chain: {e}")
 
     def save_callback():
-        nonlocal last_backup_time, backup_count, total_size, next_backup_time
+        nonlocal last_backup_time, backup_count, total_size, next_backup_time, synthesizer
         if full:
             # Use full backup
-            backup = savior.create_backup("Automatic backup")
+            backup = savior.create_backup("Automatic backup", compression_level=compression, codec=codec)
             size = backup.size
             click.echo(f"\r{Fore.GREEN}✓ Backup saved ({format_size(size)}){' ' * 50}")
         else:
-            # Use incremental backup (default)
-            inc_backup = IncrementalBackup(savior.backup_dir)
-            files = savior._collect_files()
+            # Use incremental backup (default). With the smart watcher only
+            # the paths it saw change are scanned, apart from periodic full
+            # reconciliation scans
+            changes = watcher.take_changes() if watcher else None
 
             backups = savior.list_backups()
             base_backup = backups[0].path if backups else None
 
-            backup_path = inc_backup.create_incremental_backup(files, base_backup)
+            try:
+                if changes is None:
+                    files = savior._collect_files()
+                    backup_path = inc_backup.create_incremental_backup(
+                        files, base_backup, codec=codec, level=compression
+                    )
+                else:
+                    dirty_files, dirty_dirs = changes
+                    files = savior._collect_dirty(dirty_files, dirty_dirs)
+                    backup_path = inc_backup.create_incremental_backup(
+                        files, base_backup, scope=dirty_files | dirty_dirs,
+                        codec=codec, level=compression
+                    )
+            except Exception:
+                if watcher:
+                    watcher.requeue_changes(changes)
+                raise
             size = backup_path.stat().st_size
 
             # Save to metadata
@@ -310,11 +392,27 @@ def watch(interval, no_smart, full, exclude_git, ignore, compression, background
                 description="Incremental backup",
                 size=size
             )
-            metadata = savior._load_metadata()
-            metadata['backups'].append(backup.to_dict())
-            savior._save_metadata(metadata)
+            with savior._metadata_lock:
+                metadata = savior._load_metadata()
+                metadata['backups'].append(backup.to_dict())
+                savior._save_metadata(metadata)
 
             click.echo(f"\r{Fore.GREEN}✓ Incremental backup saved ({format_size(size)}){' ' * 50}")
+            # Only the changed files go up, so this is usually kilobytes
+            savior.upload_to_cloud(backup_path)
+
+            # Long chains make restores read many archives; fold this one
+            # into a full backup in the background
+            if not (synthesizer and synthesizer.is_alive()):
+                try:
+                    chain_length = len(resolve_chain(backup_path))
+                except (OSError, ValueError):
+                    chain_length = 0
+                if chain_length > IncrementalBackup.MAX_CHAIN:
+                    synthesizer = threading.Thread(
+                        target=synthesize_in_background, args=(backup_path,), daemon=True
+                    )
+                    synthesizer.start()
 
         last_backup_time = datetime.now()
         next_backup_time = datetime.now() + timedelta(minutes=interval)
@@ -400,8 +498,8 @@ def watch(interval, no_smart, full, exclude_git, ignore, compression, background
             total_size += size
             click.echo(f"{Fore.GREEN}✓ Initial backup saved ({format_size(size)})")
         else:
-            # Regular save callback
-            save_callback()
+            # Regular save, which also starts the watcher's interval
+            watcher.force_save()
 
         last_backup_time = datetime.now()
         next_backup_time = datetime.now() + timedelta(minutes=interval)
@@ -415,14 +513,15 @@ def watch(interval, no_smart, full, exclude_git, ignore, compression, background
                 key = check_keyboard_input()
                 if key == 's':
                     click.echo(f"\r{Fore.YELLOW}Manual save triggered...{' ' * 50}")
-                    save_callback()
+                    # Through the watcher, so it can't overlap an automatic
+                    # save and the interval restarts from here
+                    watcher.force_save()
                     click.echo(f"{Fore.GREEN}✓ Manual backup completed!{' ' * 50}")
                     time.sleep(1)
 
                 # Calculate time until next backup
-                now = datetime.now()
                 time_since = format_time_ago(last_backup_time)
-                time_until = int((next_backup_time - now).total_seconds())
+                time_until = int(watcher.seconds_until_save())
 
                 if time_until > 0:
                     mins, secs = divmod(time_until, 60)
@@ -568,7 +667,7 @@ def tree(depth, no_size, all, exclude_git, ignore):
 
     # Show summary
     files = savior._collect_files()
-    total_size = sum(f.stat().st_size for f in files if f.exists())
+    total_size = files.total_size()
     click.echo(f"\n{Fore.GREEN}Summary:{Style.RESET_ALL}")
     click.echo(f"  Files to backup: {len(files)}")
     click.echo(f"  Total size: {format_size(total_size)}")
@@ -750,10 +849,11 @@ def start(interval, no_smart, full, exclude_git, ignore, background):
 @click.option('--force', is_flag=True, help='Force restore without conflict checking')
 @click.option('--no-backup', is_flag=True, help='Skip creating pre-restore safety backup')
 @click.option('--check-conflicts', is_flag=True, help='Check for conflicts and show report without restoring')
-def restore(files, preview, force, no_backup, check_conflicts):
+@click.option('--jobs', '-j', type=click.IntRange(1, 256), default=None, help='Worker threads for hashing (default: CPU count)')
+def restore(files, preview, force, no_backup, check_conflicts, jobs):
     """See all backups and restore one"""
     project_dir = Path.cwd()
-    savior = Savior(project_dir)
+    savior = Savior(project_dir, jobs=jobs)
 
     backups = savior.list_backups()
 
@@ -775,48 +875,29 @@ def restore(files, preview, force, no_backup, check_conflicts):
         backup = backups[backup_index]
 
         if files or preview:
-            # Partial restore or preview
+            # Partial restore or preview, straight from the backup's index
             import fnmatch
-            temp_dir = Path(tempfile.mkdtemp(prefix='savior_restore_'))
-
-            with tarfile.open(backup.path, 'r:gz') as tar:
-                tar.extractall(temp_dir)
-
-            files_to_restore = []
-            for file_path in temp_dir.rglob('*'):
-                if file_path.is_file():
-                    rel_path = file_path.relative_to(temp_dir)
-
-                    if files:
-                        if not fnmatch.fnmatch(str(rel_path), files):
-                            continue
-
-                    files_to_restore.append((file_path, rel_path))
+            files_to_restore = [
+                name for name in chain_files(backup.path)
+                if not files or fnmatch.fnmatch(name, files)
+            ]
 
             if not files_to_restore:
                 click.echo(f"{Fore.YELLOW}No files match pattern '{files}'")
-                shutil.rmtree(temp_dir)
                 return
 
             if preview:
                 click.echo(f"{Fore.CYAN}Files that would be restored:")
-                for _, rel_path in files_to_restore[:20]:
+                for rel_path in files_to_restore[:20]:
                     click.echo(f"  - {rel_path}")
                 if len(files_to_restore) > 20:
                     click.echo(f"  ... and {len(files_to_restore) - 20} more")
-                shutil.rmtree(temp_dir)
                 return
 
             click.echo(f"{Fore.YELLOW}⚠ WARNING: This will overwrite {len(files_to_restore)} file(s)!")
             if click.confirm('Are you sure?'):
-                for src_file, rel_path in files_to_restore:
-                    dst_file = project_dir / rel_path
-                    dst_file.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(src_file, dst_file)
-
-                click.echo(f"{Fore.GREEN}✓ Restored {len(files_to_restore)} file(s) from {format_time_ago(backup.timestamp)}!")
-
-            shutil.rmtree(temp_dir)
+                restored = extract_chain_files(backup.path, files_to_restore, project_dir)
+                click.echo(f"{Fore.GREEN}✓ Restored {restored} file(s) from {format_time_ago(backup.timestamp)}!")
         else:
             # Full restore
             if check_conflicts:
@@ -868,6 +949,10 @@ def restore(files, preview, force, no_backup, check_conflicts):
                                        auto_backup=not no_backup,
                                        force=force):
                     click.echo(f"{Fore.GREEN}✓ Restored to {format_time_ago(backups[backup_index].timestamp)}!")
+                    stats = savior.last_restore_stats
+                    click.echo(f"  {Fore.CYAN}{stats['written']} file(s) written "
+                               f"({format_size(stats['bytes_written'])}), {stats['deleted']} deleted, "
+                               f"{stats['chmodded']} permission fix(es), {stats['skipped']} unchanged")
                 else:
                     click.echo(f"{Fore.RED}✗ Failed to restore backup")
     else:
@@ -876,13 +961,15 @@ def restore(files, preview, force, no_backup, check_conflicts):
 
 @cli.command()
 @click.argument('description', default='Manual backup')
-@click.option('--compression', '-c', type=click.IntRange(0, 9), default=6, help='Compression level (0=none, 9=max, default: 6)')
+@click.option('--compression', '-c', type=click.IntRange(0, 22), default=6, help='Compression level (0=none, 9=max for gzip, 22=max for zstd, default: 6)')
+@click.option('--codec', type=click.Choice(['gzip', 'zstd']), default='gzip', help='Compression codec (zstd requires the zstandard package)')
 @click.option('--tree', is_flag=True, help='Show what will be backed up')
 @click.option('--no-progress', is_flag=True, help='Disable progress bar')
-def save(description, compression, tree, no_progress):
+@click.option('--jobs', '-j', type=click.IntRange(1, 256), default=None, help='Worker threads for hashing (default: CPU count)')
+def save(description, compression, codec, tree, no_progress, jobs):
     """Force a save right now (without watching)"""
     project_dir = Path.cwd()
-    savior = Savior(project_dir)
+    savior = Savior(project_dir, jobs=jobs)
 
     # Show tree if requested
     if tree:
@@ -893,11 +980,12 @@ def save(description, compression, tree, no_progress):
             return
 
     try:
-        backup = savior.create_backup(description, compression_level=compression, show_progress=not no_progress)
+        backup = savior.create_backup(description, compression_level=compression,
+                                      show_progress=not no_progress, codec=codec)
         click.echo(f"{Fore.GREEN}✓ Saved backup: \"{description}\"")
         click.echo(f"  Size: {format_size(backup.size)}")
-        click.echo(f"  Compression: level {compression}")
-    except IOError as e:
+        click.echo(f"  Compression: {codec} level {compression}")
+    except (IOError, RuntimeError) as e:
         click.echo(f"{Fore.RED}✗ Backup failed: {e}{Style.RESET_ALL}")
         sys.exit(1)
     except ValueError as e:
@@ -933,6 +1021,36 @@ def purge(keep, force):
     click.echo(f"  Freed {format_size(space_freed)}")
 
 
+@cli.command()
+@click.option('--truncate', is_flag=True, help='Delete the incremental backups it replaces')
+def synthesize(truncate):
+    """Merge the latest incremental chain into a full backup"""
+    project_dir = Path.cwd()
+    savior = Savior(project_dir)
+
+    backups = savior.list_backups()
+    if not backups:
+        click.echo(f"{Fore.YELLOW}No backups found")
+        return
+
+    try:
+        chain = resolve_chain(backups[0].path)
+    except (OSError, ValueError) as e:
+        click.echo(f"{Fore.RED}✗ {e}")
+        sys.exit(1)
+
+    if len(chain) == 1 and not read_manifest(chain[0]):
+        click.echo(f"{Fore.YELLOW}The latest backup is already a full backup")
+        return
+
+    click.echo(f"{Fore.CYAN}Merging {len(chain)} backups into a full backup...")
+    removed = savior.synthesize_full(backups[0].path, truncate=truncate)
+    click.echo(f"{Fore.GREEN}✓ Latest backup is now a full backup "
+               f"({format_size(backups[0].path.stat().st_size)})")
+    if removed:
+        click.echo(f"  Deleted {len(removed)} incremental backup(s) it replaces")
+
+
 @cli.command()
 @click.option('--backup1', '-b1', type=int, default=1, help='First backup index (newer)')
 @click.option('--backup2', '-b2', type=int, default=0, help='Second backup index (0=current, 1=latest backup)')
@@ -999,6 +1117,65 @@ def diff(backup1, backup2, show_content):
         click.echo(f"{Fore.GREEN}No changes found")
 
 
+@cli.group()
+def dedup():
+    """Manage the deduplicated content store"""
+    pass
+
+
+def _dedup_savior():
+    try:
+        from .core_dedup import SaviorWithDedup
+    except ImportError:
+        from core_dedup import SaviorWithDedup
+    return SaviorWithDedup(Path.cwd(), enable_dedup=True)
+
+
+@dedup.command('gc')
+def dedup_gc():
+    """Delete stored content no backup manifest references"""
+    savior = _dedup_savior()
+
+    try:
+        result = savior.garbage_collect_dedup()
+    except ValueError as e:
+        click.echo(f"{Fore.RED}✗ Garbage collection aborted: {e}")
+        return
+
+    click.echo(f"{Fore.GREEN}✓ Garbage collection complete")
+    click.echo(f"  Live objects: {result['live_objects']}")
+    click.echo(f"  Deleted objects: {result['deleted_objects'] + result['orphaned_files']}")
+    click.echo(f"  Freed: {format_size(result['bytes_freed'])}")
+
+
+@dedup.command('repack')
+@click.option('--min-live', default=0.5, type=click.FloatRange(0.0, 1.0),
+              help='Rewrite packs whose live share is below this ratio')
+def dedup_repack(min_live):
+    """Compact packfiles, reclaiming space from deleted objects"""
+    savior = _dedup_savior()
+
+    result = savior.repack_dedup(min_live)
+
+    click.echo(f"{Fore.GREEN}✓ Repack complete")
+    click.echo(f"  Packs deleted: {result['packs_deleted']}")
+    click.echo(f"  Packs rewritten: {result['packs_rewritten']}")
+    click.echo(f"  Loose objects packed: {result['objects_packed']}")
+    click.echo(f"  Freed: {format_size(result['bytes_reclaimed'])}")
+
+
+@dedup.command('delete')
+@click.argument('backup_id')
+def dedup_delete(backup_id):
+    """Delete one deduplicated backup by its ID"""
+    savior = _dedup_savior()
+
+    if savior.delete_backup_dedup(backup_id):
+        click.echo(f"{Fore.GREEN}✓ Deleted deduplicated backup {backup_id}")
+    else:
+        click.echo(f"{Fore.RED}✗ No deduplicated backup named {backup_id}")
+
+
 @cli.group()
 def cloud():
     """☁️ Self-hosted cloud backup management"""
@@ -1033,21 +1210,36 @@ def cloud_sync(upload_only, download_only):
         # Upload local backups
         backups = savior.list_backups()
         uploaded = 0
-        for backup in backups:
-            if storage.upload_backup(backup.path, project_name):
+        results = storage.upload_backups([backup.path for backup in backups], project_name,
+                                         savior.backup_dir)
+        for backup_path, ok in results.items():
+            if ok:
                 uploaded += 1
-                click.echo(f"{Fore.GREEN}  ↑ Uploaded {backup.path.name}")
+                click.echo(f"{Fore.GREEN}  ↑ Uploaded {backup_path.name}")
 
         if uploaded > 0:
             click.echo(f"{Fore.GREEN}✓ Uploaded {uploaded} backup(s)")
 
+        if (savior.backup_dir / '.dedup_store').exists():
+            stats = storage.sync_dedup_store(savior.backup_dir, project_name)
+            if stats['manifests']:
+                click.echo(f"{Fore.GREEN}✓ Uploaded {stats['manifests']} dedup manifest(s), "
+                           f"{stats['objects']} new object(s) ({format_size(stats['bytes'])}); "
+                           f"{stats['skipped_objects']} already in the cloud")
+            for error in stats['errors']:
+                click.echo(f"{Fore.YELLOW}  ⚠️ {error}")
+
     if not upload_only:
         # Download cloud backups
         cloud_backups = storage.list_backups(project_name)
         downloaded = 0
 
+        root = savior.backup_dir.resolve()
         for cloud_backup in cloud_backups:
-            local_path = savior.backup_dir / Path(cloud_backup['key']).name
+            # Keys mirror the backup directory: <project>/<path under .savior>
+            local_path = savior.backup_dir / cloud_backup['key'][len(project_name) + 1:]
+            if not is_within(local_path.resolve(), root):
+                continue
             if not local_path.exists():
                 if storage.download_backup(cloud_backup['key'], local_path):
                     downloaded += 1
@@ -1095,7 +1287,9 @@ def cloud_list():
 
 @cloud.command('download')
 @click.argument('backup_name')
-def cloud_download(backup_name):
+@click.option('--restore', is_flag=True,
+              help='Restore the project straight from the download, without keeping a local copy')
+def cloud_download(backup_name, restore):
     """Download specific backup from cloud"""
     storage = CloudStorage()
 
@@ -1106,6 +1300,22 @@ def cloud_download(backup_name):
     project_name = Path.cwd().name
     cloud_key = f"{project_name}/{backup_name}"
 
+    if restore:
+        click.echo(f"{Fore.YELLOW}⚠️  This will replace your project files with {backup_name}")
+        if not click.confirm('Are you sure?'):
+            return
+        click.echo(f"{Fore.CYAN}Restoring from {backup_name}...")
+        try:
+            stats = storage.restore_from_cloud(cloud_key, Path.cwd())
+        except Exception as e:
+            click.echo(f"{Fore.RED}✗ Failed to restore {backup_name}: {e}")
+            return
+        click.echo(f"{Fore.GREEN}✓ Restored from {backup_name}")
+        click.echo(f"  {Fore.CYAN}{stats['written']} file(s) written "
+                   f"({format_size(stats['bytes_written'])}), {stats['deleted']} deleted, "
+                   f"{stats['chmodded']} permission fix(es), {stats['skipped']} unchanged")
+        return
+
     savior = Savior(Path.cwd())
     destination = savior.backup_dir / backup_name
 
@@ -1129,30 +1339,8 @@ def resurrect(filename):
         click.echo(f"{Fore.YELLOW}No backups found")
         return
 
-    found_files = {}
-
-    for backup in backups:
-        temp_dir = Path(tempfile.mkdtemp(prefix='savior_resurrect_'))
-
-        with tarfile.open(backup.path, 'r:gz') as tar:
-            tar.extractall(temp_dir)
-
-        for file_path in temp_dir.rglob('*'):
-            if file_path.is_file():
-                rel_path = file_path.relative_to(temp_dir)
-
-                if filename:
-                    if filename not in str(rel_path):
-                        continue
-
-                if str(rel_path) not in found_files:
-                    found_files[str(rel_path)] = []
-
-                found_files[str(rel_path)].append({
-                    'backup': backup,
-                    'path': file_path,
-                    'temp_dir': temp_dir
-                })
+    # Answered from the catalog; archives are only opened to restore
+    found_files = savior.find_in_backups(filename)
 
     if not found_files:
         click.echo(f"{Fore.YELLOW}No files found matching '{filename}'")
@@ -1181,20 +1369,55 @@ def resurrect(filename):
 
             if not file_path.exists():
                 latest = versions[0]
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(latest['path'], file_path)
-                restored += 1
-                click.echo(f"{Fore.GREEN}✓ Restored {file_name}")
+                if extract_backup_files(latest['backup'].path, [file_name], project_dir):
+                    restored += 1
+                    click.echo(f"{Fore.GREEN}✓ Restored {file_name}")
 
         click.echo(f"\n{Fore.GREEN}✓ Resurrected {restored} file(s) from the dead!")
 
-    # Cleanup temp dirs
-    for versions in found_files.values():
-        for v in versions:
-            try:
-                shutil.rmtree(v['temp_dir'])
-            except:
-                pass
+
+@cli.command()
+@click.argument('file_path')
+def history(file_path):
+    """Show every backed-up version of a file"""
+    project_dir = Path.cwd()
+    savior = Savior(project_dir)
+
+    rel_path = os.path.relpath(Path(file_path).resolve(), savior.project_dir)
+    rel_path = Path(rel_path).as_posix()
+
+    versions = savior.file_history(rel_path)
+    if not versions:
+        click.echo(f"{Fore.YELLOW}'{rel_path}' is not in any backup")
+        return
+
+    current = project_dir / rel_path
+    current_hash = None
+    if current.is_file():
+        current_hash = get_hasher().hash_file(current, 'sha256')
+
+    click.echo(f"{Fore.CYAN}{rel_path}: {len(versions)} version(s) in backups\n")
+
+    for i, version in enumerate(versions):
+        older = versions[i + 1] if i + 1 < len(versions) else None
+        if older is None:
+            change = 'first seen'
+        elif older['hash'] == version['hash']:
+            change = 'unchanged'
+        else:
+            change = 'changed'
+
+        marker = f" {Fore.GREEN}[CURRENT]{Style.RESET_ALL}" if version['hash'] == current_hash else ""
+        backup = version['backup']
+        click.echo(
+            f"  {backup.timestamp.strftime('%Y-%m-%d %H:%M')} "
+            f"({format_time_ago(backup.timestamp)}) - {format_size(version['size'] or 0)}, "
+            f"{change}{marker}"
+        )
+        click.echo(f"    {Fore.WHITE}{backup.description}{Style.RESET_ALL}")
+
+    if current_hash is None:
+        click.echo(f"\n{Fore.RED}The file no longer exists; 'savior resurrect {rel_path}' brings it back")
 
 
 @cli.command()
@@ -1359,6 +1582,8 @@ def daemon_status():
                 mode.append('smart')
             if options.get('incremental'):
                 mode.append('incremental')
+            if options.get('priority', 'normal') != 'normal':
+                mode.append(f"{options['priority']} priority")
             mode_str = f" ({', '.join(mode)})" if mode else ""
 
             click.echo(f"  • {path}")
@@ -1372,7 +1597,8 @@ def daemon_status():
 @click.option('--no-smart', is_flag=True, help='Disable smart mode (save even during activity)')
 @click.option('--full', is_flag=True, help='Use full backups instead of incremental')
 @click.option('--exclude-git', is_flag=True, help='Exclude .git directory from backups (saves space)')
-def daemon_add(paths, interval, no_smart, full, exclude_git):
+@throttle_options
+def daemon_add(paths, interval, no_smart, full, exclude_git, read_limit, write_limit, cloud_limit, priority):
     """Add projects to daemon watch list"""
     try:
         from .daemon import DaemonClient, SaviorDaemon
@@ -1401,7 +1627,11 @@ def daemon_add(paths, interval, no_smart, full, exclude_git):
             interval=interval,
             smart=not no_smart,  # Invert flag (smart is default)
             incremental=not full,  # Invert flag (incremental is default)
-            exclude_git=exclude_git
+            exclude_git=exclude_git,
+            read_limit=read_limit,
+            write_limit=write_limit,
+            cloud_limit=cloud_limit,
+            priority=priority
         )
 
         if 'error' in result:
@@ -8,7 +8,7 @@ from colorama import init
 init(autoreset=True)
 
 # Import all command modules
-from .commands import backup, restore, cloud, recovery
+from .commands import backup, restore, cloud, recovery, dedup
 from .commands import utility, daemon as daemon_cmds, zombie as zombie_cmds
 
 
@@ -40,13 +40,18 @@ cli.add_command(backup.status)
 cli.add_command(restore.restore)
 cli.add_command(restore.list, name='list')
 cli.add_command(restore.purge)
+cli.add_command(restore.synthesize)
 
 # Register cloud commands
 cli.add_command(cloud.cloud)
 
+# Register dedup store commands
+cli.add_command(dedup.dedup)
+
 # Register recovery commands
 cli.add_command(recovery.diff)
 cli.add_command(recovery.resurrect)
+cli.add_command(recovery.history)
 cli.add_command(recovery.pray)
 
 # Register utility commands
@@ -77,14 +82,16 @@ def watch_alias(ctx):
 
 @cli.command('s')
 @click.argument('description', required=False)
-@click.option('--compression', default=6, help='Compression level (0-9)')
+@click.option('--compression', default=6, help='Compression level (0-9, up to 22 for zstd)')
+@click.option('--codec', type=click.Choice(['gzip', 'zstd']), default='gzip', help='Compression codec')
 @click.option('--tree', is_flag=True, help='Show project structure before saving')
 @click.option('--no-progress', is_flag=True, help='Disable progress bar')
+@click.option('--jobs', '-j', type=int, default=None, help='Worker threads for hashing')
 @click.pass_context
-def save_alias(ctx, description, compression, tree, no_progress):
+def save_alias(ctx, description, compression, codec, tree, no_progress, jobs):
     """Alias for 'save' command."""
-    ctx.invoke(backup.save, description=description, compression=compression,
-               tree=tree, no_progress=no_progress)
+    ctx.invoke(backup.save, description=description, compression=compression, codec=codec,
+               tree=tree, no_progress=no_progress, jobs=jobs)
 
 
 @cli.command('r')
@@ -93,11 +100,12 @@ def save_alias(ctx, description, compression, tree, no_progress):
 @click.option('--force', is_flag=True, help='Force restore without conflict checking')
 @click.option('--no-backup', is_flag=True, help='Skip creating pre-restore safety backup')
 @click.option('--check-conflicts', is_flag=True, help='Check for conflicts without restoring')
+@click.option('--jobs', '-j', type=int, default=None, help='Worker threads for hashing')
 @click.pass_context
-def restore_alias(ctx, files, preview, force, no_backup, check_conflicts):
+def restore_alias(ctx, files, preview, force, no_backup, check_conflicts, jobs):
     """Alias for 'restore' command."""
     ctx.invoke(restore.restore, files=files, preview=preview, force=force,
-               no_backup=no_backup, check_conflicts=check_conflicts)
+               no_backup=no_backup, check_conflicts=check_conflicts, jobs=jobs)
 
 
 @cli.command('l')
@@ -127,14 +135,17 @@ def kill_alias(ctx):
 @click.option('--no-smart', is_flag=True, help='Disable smart mode')
 @click.option('--full', is_flag=True, help='Use full backups instead of incremental')
 @click.option('--exclude-git', is_flag=True, help='Exclude .git directory')
-@click.option('--compression', default=6, help='Compression level (0-9)')
+@click.option('--compression', default=6, help='Compression level (0-9, up to 22 for zstd)')
+@click.option('--codec', type=click.Choice(['gzip', 'zstd']), default='gzip', help='Compression codec')
 @click.option('--cloud', is_flag=True, help='Enable cloud sync')
 @click.option('--tree', is_flag=True, help='Show project structure first')
+@click.option('--jobs', '-j', type=int, default=None, help='Worker threads for hashing')
 @click.pass_context
-def start_alias(ctx, interval, no_smart, full, exclude_git, compression, cloud, tree):
+def start_alias(ctx, interval, no_smart, full, exclude_git, compression, codec, cloud, tree, jobs):
     """Start auto-saving (alias for 'watch')."""
     ctx.invoke(backup.watch, interval=interval, no_smart=no_smart, full=full,
-               exclude_git=exclude_git, compression=compression, cloud=cloud, tree=tree)
+               exclude_git=exclude_git, compression=compression, codec=codec, cloud=cloud, tree=tree,
+               jobs=jobs)
 
 
 def main():
@@ -8,6 +8,8 @@ from typing import Optional, List, Dict
 import click
 from colorama import Fore, Style
 
+from .throttle import PRIORITIES, parse_rate
+
 
 def format_time_ago(timestamp: datetime) -> str:
     """Format timestamp as human-readable time ago."""
@@ -36,6 +38,30 @@ def format_size(size_bytes: int) -> str:
     return f"{size_bytes:.1f} TB"
 
 
+def _rate_callback(ctx, param, value):
+    try:
+        return parse_rate(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def throttle_options(f):
+    """Add the I/O limit and priority options shared by watch and daemon add."""
+    options = [
+        click.option('--read-limit', default='0', callback=_rate_callback,
+                     help='Max disk read rate for backups, e.g. 20M (default: unlimited)'),
+        click.option('--write-limit', default='0', callback=_rate_callback,
+                     help='Max archive write rate, e.g. 10M (default: unlimited)'),
+        click.option('--cloud-limit', default='0', callback=_rate_callback,
+                     help='Max cloud transfer rate, e.g. 2M (default: unlimited)'),
+        click.option('--priority', type=click.Choice(PRIORITIES), default='normal',
+                     help='normal, low (always low CPU/IO priority) or adaptive (back off while the machine is busy)'),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
 def check_keyboard_input():
     """Check if a key has been pressed (non-blocking)."""
     if sys.platform == 'win32':
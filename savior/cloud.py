@@ -1,9 +1,38 @@
+import io
 import hashlib
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, List
 from datetime import datetime
 import configparser
 
+try:
+    from .uploader import (
+        MultipartUploader, S3Target, LocalTarget,
+        PART_SIZE, MIN_PART_SIZE, DEFAULT_CONCURRENCY, DEFAULT_FILES
+    )
+    from .downloader import ParallelDownloader, S3Source, LocalSource, ChunkReader, save_stream
+    from .restorer import PipedRestorer
+    from .archive import EXTENSIONS, is_within
+    from .dedup import DeduplicationStore
+    from .dedup_sync import DedupCloudSync
+except ImportError:
+    from uploader import (
+        MultipartUploader, S3Target, LocalTarget,
+        PART_SIZE, MIN_PART_SIZE, DEFAULT_CONCURRENCY, DEFAULT_FILES
+    )
+    from downloader import ParallelDownloader, S3Source, LocalSource, ChunkReader, save_stream
+    from restorer import PipedRestorer
+    from archive import EXTENSIONS, is_within
+    from dedup import DeduplicationStore
+    from dedup_sync import DedupCloudSync
+
+S3_PROVIDERS = ['aws', 's3', 'minio', 'wasabi', 'backblaze']
+
+
+def is_backup_archive(name: str) -> bool:
+    """Whether a file or key name is a backup archive, whatever its codec"""
+    return any(name.endswith(extension) for extension in EXTENSIONS.values())
+
 
 class CloudStorage:
     """
@@ -15,6 +44,8 @@ class CloudStorage:
         self.config_file = config_file or Path.home() / '.savior' / 'cloud.conf'
         self.config = self._load_config()
         self.client = None
+        self._uploader = None
+        self._downloader = None
         self._init_client()
 
     def _load_config(self) -> Dict:
@@ -34,7 +65,11 @@ class CloudStorage:
             'provider': config.get('cloud', 'provider', fallback='s3'),  # aws, gcs, azure, s3, minio, backblaze, etc.
             'region': config.get('cloud', 'region', fallback='us-east-1'),
             'project_id': config.get('cloud', 'project_id', fallback=''),  # For GCS
-            'auto_sync': config.getboolean('cloud', 'auto_sync', fallback=False)
+            'auto_sync': config.getboolean('cloud', 'auto_sync', fallback=False),
+            # Parts uploaded at once, shared by every file being uploaded
+            'upload_concurrency': config.getint('cloud', 'upload_concurrency', fallback=DEFAULT_CONCURRENCY),
+            'download_concurrency': config.getint('cloud', 'download_concurrency', fallback=DEFAULT_CONCURRENCY),
+            'part_size_mb': config.getint('cloud', 'part_size_mb', fallback=PART_SIZE // (1024 * 1024))
         }
 
     def _init_client(self):
@@ -58,12 +93,14 @@ class CloudStorage:
         """Initialize AWS S3 client"""
         try:
             import boto3
+            from botocore.client import Config
 
             self.client = boto3.client(
                 's3',
                 aws_access_key_id=self.config['access_key'],
                 aws_secret_access_key=self.config['secret_key'],
-                region_name=self.config.get('region', 'us-east-1')
+                region_name=self.config.get('region', 'us-east-1'),
+                config=Config(max_pool_connections=self._pool_size())
             )
 
             # Create bucket if it doesn't exist
@@ -152,7 +189,7 @@ class CloudStorage:
                 endpoint_url=self.config['endpoint'],
                 aws_access_key_id=self.config['access_key'],
                 aws_secret_access_key=self.config['secret_key'],
-                config=Config(signature_version='s3v4')
+                config=Config(signature_version='s3v4', max_pool_connections=self._pool_size())
             )
 
             # Create bucket if it doesn't exist
@@ -176,140 +213,258 @@ class CloudStorage:
         """Check if cloud storage is configured"""
         return self.client is not None
 
-    def upload_backup(self, backup_path: Path, project_name: str) -> bool:
-        """Upload a backup to cloud storage"""
-        if not self.client:
-            return False
+    def _pool_size(self) -> int:
+        """HTTP connections to keep: one per part in flight, plus one per file"""
+        return max(10, self.config.get('upload_concurrency', DEFAULT_CONCURRENCY)
+                   + self.config.get('download_concurrency', DEFAULT_CONCURRENCY) + DEFAULT_FILES)
 
-        try:
-            # Generate cloud path
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            cloud_key = f"{project_name}/{backup_path.name}"
-
-            # Calculate checksum
-            checksum = self._calculate_checksum(backup_path)
+    @property
+    def uploader(self) -> Optional[MultipartUploader]:
+        """Streaming upload engine for S3-style and local storage.
 
-            # Encrypt if enabled
-            if self.config.get('encrypt'):
-                backup_data = self._encrypt_backup(backup_path)
+        Built once and reused, so every upload shares its threads and the
+        client's connection pool. GCS and Azure upload through their own
+        SDKs instead.
+        """
+        if self._uploader is None and self.client is not None:
+            provider = self.config.get('provider')
+            if provider in S3_PROVIDERS:
+                target = S3Target(self.client, self.config['bucket'])
+                # S3 rejects smaller parts
+                part_size = max(MIN_PART_SIZE, self.config.get('part_size_mb', 0) * 1024 * 1024)
+            elif isinstance(self.client, LocalStorageClient):
+                target = LocalTarget(self.client)
+                part_size = max(1, self.config.get('part_size_mb', 0)) * 1024 * 1024
             else:
-                with open(backup_path, 'rb') as f:
-                    backup_data = f.read()
+                return None
+            self._uploader = MultipartUploader(
+                target,
+                state_file=self.config_file.parent / 'uploads.json',
+                part_size=part_size,
+                concurrency=self.config.get('upload_concurrency', DEFAULT_CONCURRENCY)
+            )
+        return self._uploader
+
+    @property
+    def downloader(self) -> Optional[ParallelDownloader]:
+        """Ranged, read-ahead download engine for S3-style and local storage."""
+        if self._downloader is None and self.client is not None:
+            if self.config.get('provider') in S3_PROVIDERS:
+                source = S3Source(self.client, self.config['bucket'])
+            elif isinstance(self.client, LocalStorageClient):
+                source = LocalSource(self.client)
+            else:
+                return None
+            self._downloader = ParallelDownloader(
+                source,
+                part_size=max(1, self.config.get('part_size_mb', 0)) * 1024 * 1024,
+                concurrency=self.config.get('download_concurrency', DEFAULT_CONCURRENCY)
+            )
+        return self._downloader
 
-            # Upload to cloud
-            provider = self.config.get('provider')
+    def _upload_metadata(self, project_name: str) -> Dict[str, str]:
+        return {
+            'project': project_name,
+            'timestamp': datetime.now().strftime('%Y%m%d_%H%M%S')
+        }
 
-            if provider in ['aws', 's3', 'minio', 'wasabi', 'backblaze']:
-                self.client.put_object(
-                    Bucket=self.config['bucket'],
-                    Key=cloud_key,
-                    Body=backup_data,
-                    Metadata={
-                        'checksum': checksum,
-                        'project': project_name,
-                        'timestamp': timestamp
-                    }
-                )
-            elif provider == 'gcs':
-                blob = self.bucket.blob(cloud_key)
-                blob.metadata = {
-                    'checksum': checksum,
-                    'project': project_name,
-                    'timestamp': timestamp
-                }
-                blob.upload_from_string(backup_data)
-            elif provider == 'azure':
-                blob_client = self.container.get_blob_client(cloud_key)
-                blob_client.upload_blob(
-                    backup_data,
-                    overwrite=True,
-                    metadata={
-                        'checksum': checksum,
-                        'project': project_name,
-                        'timestamp': timestamp
-                    }
-                )
-            else:
-                # Local storage
-                self.client.save(cloud_key, backup_data)
+    @staticmethod
+    def _cloud_key(project_name: str, backup_path: Path, backup_dir: Optional[Path] = None) -> str:
+        """Backups keep their place under the backup directory, e.g.
+        <project>/[HH:MM] [MM-DD-YYYY]/<description>.tar.gz"""
+        if backup_dir is not None and is_within(backup_path, backup_dir):
+            return f"{project_name}/{backup_path.relative_to(backup_dir).as_posix()}"
+        return f"{project_name}/{backup_path.name}"
+
+    def upload_backup(self, backup_path: Path, project_name: str,
+                      backup_dir: Optional[Path] = None) -> bool:
+        """Upload a backup to cloud storage"""
+        if not self.client:
+            return False
 
+        try:
+            self.upload_file(backup_path, self._cloud_key(project_name, backup_path, backup_dir),
+                             self._upload_metadata(project_name))
             return True
 
         except Exception as e:
             print(f"Upload failed: {e}")
             return False
 
+    def upload_file(self, file_path: Path, cloud_key: str, metadata: Optional[Dict[str, str]] = None):
+        """Upload one file under cloud_key; raises if the upload fails."""
+        metadata = dict(metadata or {})
+        provider = self.config.get('provider')
+
+        if self.uploader is not None:
+            # Streamed in parts, hashing on the way. Encryption is still
+            # a pass-through (see _encrypt_backup), so the file goes as is
+            self.uploader.upload(file_path, cloud_key, metadata)
+        elif provider == 'gcs':
+            metadata['checksum'] = self._calculate_checksum(file_path)
+            if self.config.get('encrypt'):
+                backup_data = self._encrypt_backup(file_path)
+            else:
+                with open(file_path, 'rb') as f:
+                    backup_data = f.read()
+
+            blob = self.bucket.blob(cloud_key)
+            blob.metadata = metadata
+            blob.upload_from_string(backup_data)
+        elif provider == 'azure':
+            metadata['checksum'] = self._calculate_checksum(file_path)
+            blob_client = self.container.get_blob_client(cloud_key)
+            # The SDK reads the stream in blocks rather than all at once
+            with open(file_path, 'rb') as f:
+                blob_client.upload_blob(f, overwrite=True, metadata=metadata)
+        else:
+            # Other clients only take whole objects
+            with open(file_path, 'rb') as f:
+                self.client.save(cloud_key, f.read())
+
+    def put_object(self, cloud_key: str, data: bytes):
+        """Store a small object (a manifest or index) in one request."""
+        provider = self.config.get('provider')
+
+        if self.uploader is not None:
+            self.uploader.target.put(cloud_key, data, {})
+        elif provider == 'gcs':
+            self.bucket.blob(cloud_key).upload_from_string(data)
+        elif provider == 'azure':
+            self.container.get_blob_client(cloud_key).upload_blob(data, overwrite=True)
+        else:
+            self.client.save(cloud_key, data)
+
+    def read_object(self, cloud_key: str) -> bytes:
+        """Fetch a small object whole."""
+        with self.open_backup_stream(cloud_key) as stream:
+            return stream.read()
+
+    def upload_backups(self, backup_paths: List[Path], project_name: str,
+                       backup_dir: Optional[Path] = None) -> Dict[Path, bool]:
+        """Upload several backups at once; returns {path: uploaded}"""
+        if not self.client:
+            return {path: False for path in backup_paths}
+        if self.uploader is None:
+            return {path: self.upload_backup(path, project_name, backup_dir) for path in backup_paths}
+
+        metadata = self._upload_metadata(project_name)
+        results = self.uploader.upload_many(
+            (path, self._cloud_key(project_name, path, backup_dir), metadata) for path in backup_paths
+        )
+
+        uploaded = {}
+        for path, result in zip(backup_paths, results):
+            if isinstance(result, Exception):
+                print(f"Upload of {path.name} failed: {result}")
+            uploaded[path] = not isinstance(result, Exception)
+        return uploaded
+
     def download_backup(self, cloud_key: str, destination: Path) -> bool:
         """Download a backup from cloud storage"""
         if not self.client:
             return False
 
         try:
-            provider = self.config.get('provider')
-
-            if provider in ['aws', 's3', 'minio', 'wasabi', 'backblaze']:
-                response = self.client.get_object(
-                    Bucket=self.config['bucket'],
-                    Key=cloud_key
-                )
-                backup_data = response['Body'].read()
-            elif provider == 'gcs':
-                blob = self.bucket.blob(cloud_key)
-                backup_data = blob.download_as_bytes()
-            elif provider == 'azure':
-                blob_client = self.container.get_blob_client(cloud_key)
-                backup_data = blob_client.download_blob().readall()
-            else:
-                # Local storage
-                backup_data = self.client.load(cloud_key)
-
-            # Decrypt if needed
-            if self.config.get('encrypt'):
-                backup_data = self._decrypt_backup(backup_data)
-
-            # Save to destination
-            with open(destination, 'wb') as f:
-                f.write(backup_data)
-
+            # Written to disk as it arrives. Decryption is still a
+            # pass-through (see _decrypt_backup), so nothing is buffered
+            with self.open_backup_stream(cloud_key) as stream:
+                save_stream(stream, destination)
             return True
 
         except Exception as e:
             print(f"Download failed: {e}")
             return False
 
-    def list_backups(self, project_name: str) -> List[Dict]:
-        """List all backups for a project in cloud storage"""
-        if not self.client:
-            return []
-
-        try:
-            backups = []
+    def open_backup_stream(self, cloud_key: str):
+        """Readable stream of a backup in cloud storage.
 
-            if hasattr(self.client, 'list_objects_v2'):
-                response = self.client.list_objects_v2(
-                    Bucket=self.config['bucket'],
-                    Prefix=f"{project_name}/"
-                )
+        S3-style and local storage are read in ranges fetched ahead in
+        parallel; GCS and Azure stream through their SDKs' chunked readers.
+        Either way memory use doesn't grow with the backup's size.
+        """
+        provider = self.config.get('provider')
 
+        if self.downloader is not None:
+            return self.downloader.open(cloud_key)
+        elif provider == 'gcs':
+            return self.bucket.blob(cloud_key).open('rb')
+        elif provider == 'azure':
+            blob_client = self.container.get_blob_client(cloud_key)
+            return ChunkReader(blob_client.download_blob().chunks())
+        else:
+            # Other clients only return whole objects
+            return io.BytesIO(self.client.load(cloud_key))
+
+    def restore_from_cloud(self, cloud_key: str, project_dir: Path) -> Dict[str, int]:
+        """Restore a full backup from cloud storage straight into project_dir.
+
+        The download is piped into the restore, so no copy of the archive
+        is stored locally. Returns counts of files written, deleted,
+        chmodded and skipped.
+        """
+        with self.open_backup_stream(cloud_key) as stream:
+            return PipedRestorer(project_dir).restore(stream)
+
+    def list_keys(self, prefix: str) -> List[Dict]:
+        """Every object whose key starts with prefix: key, size and modified."""
+        provider = self.config.get('provider')
+        objects = []
+
+        if provider in S3_PROVIDERS:
+            kwargs = {'Bucket': self.config['bucket'], 'Prefix': prefix}
+            while True:
+                response = self.client.list_objects_v2(**kwargs)
                 for obj in response.get('Contents', []):
-                    backups.append({
+                    objects.append({
                         'key': obj['Key'],
                         'size': obj['Size'],
                         'modified': obj['LastModified'],
                         'metadata': obj.get('Metadata', {})
                     })
-            else:
-                # Local storage
-                backups = self.client.list(project_name)
+                # Listings stop at 1000 keys a page
+                if not response.get('IsTruncated'):
+                    break
+                kwargs['ContinuationToken'] = response['NextContinuationToken']
+        elif provider == 'gcs':
+            for blob in self.client.list_blobs(self.config['bucket'], prefix=prefix):
+                objects.append({'key': blob.name, 'size': blob.size, 'modified': blob.updated})
+        elif provider == 'azure':
+            for blob in self.container.list_blobs(name_starts_with=prefix):
+                objects.append({'key': blob.name, 'size': blob.size, 'modified': blob.last_modified})
+        else:
+            objects = self.client.keys(prefix)
+
+        return objects
 
-            return backups
+    def list_backups(self, project_name: str) -> List[Dict]:
+        """List all backups for a project in cloud storage"""
+        if not self.client:
+            return []
+
+        try:
+            # The dedup store's objects live under the same prefix
+            dedup_prefix = f"{project_name}/{DedupCloudSync.FOLDER}/"
+            return [
+                obj for obj in self.list_keys(f"{project_name}/")
+                if is_backup_archive(obj['key']) and not obj['key'].startswith(dedup_prefix)
+            ]
 
         except Exception as e:
             print(f"List failed: {e}")
             return []
 
-    def sync_backups(self, local_backup_dir: Path, project_name: str) -> Dict:
-        """Sync local backups with cloud storage"""
+    def sync_backups(self, local_backup_dir: Path, project_name: str,
+                     progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+        """Sync local backups with cloud storage.
+
+        Archives are matched by their path under the backup directory, so
+        backups in [HH:MM] [MM-DD-YYYY]/ folders and incremental ones at
+        the top level are all covered. The dedup store, if there is one,
+        is synced too, uploading only the objects the cloud doesn't have.
+        progress(stage, done, total) is called around the uploads and
+        after each download.
+        """
         if not self.client:
             return {'error': 'Cloud storage not configured'}
 
@@ -320,37 +475,77 @@ class CloudStorage:
         }
 
         try:
-            # Get local backups
-            local_backups = set()
-            for backup in local_backup_dir.glob('*.tar.gz'):
-                local_backups.add(backup.name)
+            # Get local backups, skipping .dedup_store and other work dirs
+            local_backups = {}
+            for backup in local_backup_dir.rglob('*'):
+                relative = backup.relative_to(local_backup_dir)
+                if (is_backup_archive(backup.name) and backup.is_file()
+                        and not any(part.startswith('.') for part in relative.parts)):
+                    local_backups[relative.as_posix()] = backup
 
             # Get cloud backups
-            cloud_backups = self.list_backups(project_name)
-            cloud_names = {b['key'].split('/')[-1] for b in cloud_backups}
+            prefix = f"{project_name}/"
+            cloud_names = {b['key'][len(prefix):] for b in self.list_backups(project_name)}
 
             # Upload missing backups to cloud
-            for backup_name in local_backups - cloud_names:
-                backup_path = local_backup_dir / backup_name
-                if self.upload_backup(backup_path, project_name):
+            to_upload = [local_backups[name] for name in sorted(local_backups.keys() - cloud_names)]
+            if progress:
+                progress('upload', 0, len(to_upload))
+            uploaded = self.upload_backups(to_upload, project_name, local_backup_dir)
+            if progress:
+                progress('upload', len(to_upload), len(to_upload))
+            for backup_path, ok in uploaded.items():
+                if ok:
                     results['uploaded'] += 1
                 else:
-                    results['errors'].append(f"Failed to upload {backup_name}")
+                    results['errors'].append(f"Failed to upload {backup_path.name}")
 
             # Download missing backups from cloud
-            for backup_name in cloud_names - local_backups:
-                cloud_key = f"{project_name}/{backup_name}"
+            root = local_backup_dir.resolve()
+            to_download = sorted(cloud_names - local_backups.keys())
+            for done, backup_name in enumerate(to_download, 1):
                 destination = local_backup_dir / backup_name
-                if self.download_backup(cloud_key, destination):
+                if not is_within(destination.resolve(), root):
+                    results['errors'].append(f"Skipped {backup_name}: outside the backup directory")
+                    continue
+                if self.download_backup(prefix + backup_name, destination):
                     results['downloaded'] += 1
                 else:
                     results['errors'].append(f"Failed to download {backup_name}")
+                if progress:
+                    progress('download', done, len(to_download))
+
+            if (local_backup_dir / '.dedup_store').exists():
+                results['dedup'] = self.sync_dedup_store(local_backup_dir, project_name)
+                results['errors'].extend(results['dedup'].pop('errors'))
 
             return results
 
         except Exception as e:
             return {'error': str(e)}
 
+    def sync_dedup_store(self, local_backup_dir: Path, project_name: str,
+                         store: Optional[DeduplicationStore] = None) -> Dict:
+        """Upload the dedup manifests and objects the cloud is missing.
+
+        store is the project's open DeduplicationStore, if the caller has
+        one. Returns counts of manifests and objects uploaded, objects
+        skipped because the cloud already had them, bytes sent and any
+        errors.
+        """
+        own_store = store is None
+        if own_store:
+            store = DeduplicationStore(local_backup_dir)
+        sync = None
+        try:
+            sync = DedupCloudSync(self, store, local_backup_dir / '.dedup_manifests', project_name)
+            return sync.sync()
+        finally:
+            if sync is not None:
+                sync.close()
+            if own_store:
+                store.close()
+
     def _calculate_checksum(self, file_path: Path) -> str:
         """Calculate SHA256 checksum of a file"""
         sha256 = hashlib.sha256()
@@ -463,14 +658,30 @@ class LocalStorageClient:
         with open(file_path, 'rb') as f:
             return f.read()
 
-    def list(self, prefix: str) -> List[Dict]:
+    def keys(self, prefix: str) -> List[Dict]:
+        """Every stored file whose key starts with prefix"""
         results = []
+        # Walk from the deepest directory the prefix names
         search_path = self.base_path / prefix
-        if search_path.exists():
-            for file_path in search_path.glob('*.tar.gz'):
-                results.append({
-                    'key': str(file_path.relative_to(self.base_path)),
-                    'size': file_path.stat().st_size,
-                    'modified': datetime.fromtimestamp(file_path.stat().st_mtime)
-                })
-        return results
\ No newline at end of file
+        if not prefix.endswith('/'):
+            search_path = search_path.parent
+        if not search_path.is_dir():
+            return results
+
+        for file_path in search_path.rglob('*'):
+            key = file_path.relative_to(self.base_path).as_posix()
+            if not key.startswith(prefix) or not file_path.is_file():
+                continue
+            # Multipart staging and half-written temp files aren't objects yet
+            if any(part.startswith('.') for part in key.split('/')):
+                continue
+            stat = file_path.stat()
+            results.append({
+                'key': key,
+                'size': stat.st_size,
+                'modified': datetime.fromtimestamp(stat.st_mtime)
+            })
+        return results
+
+    def list(self, prefix: str) -> List[Dict]:
+        return [obj for obj in self.keys(f"{prefix}/") if is_backup_archive(obj['key'])]
\ No newline at end of file
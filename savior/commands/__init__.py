@@ -7,11 +7,12 @@ from . import recovery
 from . import utility
 from . import daemon
 from . import zombie
+from . import dedup
 
 from .backup import watch, save, stop, status
-from .restore import restore, list, purge
+from .restore import restore, list, purge, synthesize
 from .cloud import cloud
-from .recovery import diff, resurrect, pray
+from .recovery import diff, resurrect, history, pray
 
 __all__ = [
     'backup',
@@ -21,13 +22,16 @@ __all__ = [
     'utility',
     'daemon',
     'zombie',
+    'dedup',
     'watch',
     'save',
     'stop',
     'status',
     'list',
     'purge',
+    'synthesize',
     'diff',
     'resurrect',
+    'history',
     'pray'
 ]
\ No newline at end of file
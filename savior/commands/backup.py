@@ -11,11 +11,12 @@ from ..core import Savior
 from ..core_dedup import SaviorWithDedup
 from ..cli_utils import (
     print_success, print_error, print_warning, print_info,
-    format_time_ago, format_size, check_keyboard_input
+    format_time_ago, format_size, check_keyboard_input, throttle_options
 )
 from ..activity import SmartWatcher
 from ..incremental import IncrementalBackup
 from ..dedup import SmartDeduplicator
+from ..throttle import configure_throttle
 
 
 @click.command()
@@ -23,13 +24,19 @@ from ..dedup import SmartDeduplicator
 @click.option('--no-smart', is_flag=True, help='Disable smart mode (immediate backups)')
 @click.option('--full', is_flag=True, help='Force full backups instead of incremental')
 @click.option('--exclude-git', is_flag=True, help='Exclude .git directory')
-@click.option('--compression', '-c', type=click.IntRange(0, 9), default=6,
-              help='Compression level (0=none, 9=max)')
+@click.option('--compression', '-c', type=click.IntRange(0, 22), default=6,
+              help='Compression level (0=none, 9=max for gzip, 22=max for zstd)')
+@click.option('--codec', type=click.Choice(['gzip', 'zstd']), default='gzip',
+              help='Compression codec (zstd requires the zstandard package)')
 @click.option('--ignore', multiple=True, help='Additional patterns to ignore')
 @click.option('--background', '-b', is_flag=True, help='Run in background')
 @click.option('--tree', is_flag=True, help='Show project structure before starting')
 @click.option('--cloud', is_flag=True, help='Enable cloud backup sync')
-def watch(interval, no_smart, full, exclude_git, compression, ignore, background, tree, cloud):
+@click.option('--jobs', '-j', type=click.IntRange(1, 256), default=None,
+              help='Worker threads for hashing and compression (default: CPU count)')
+@throttle_options
+def watch(interval, no_smart, full, exclude_git, compression, codec, ignore, background, tree, cloud, jobs,
+          read_limit, write_limit, cloud_limit, priority):
     """Start watching for changes and auto-backup."""
     project_dir = Path.cwd()
 
@@ -38,7 +45,8 @@ def watch(interval, no_smart, full, exclude_git, compression, ignore, background
         project_dir,
         exclude_git=exclude_git,
         extra_ignores=list(ignore),
-        enable_cloud=cloud
+        enable_cloud=cloud,
+        jobs=jobs
     )
 
     # Show tree if requested
@@ -59,9 +67,11 @@ def watch(interval, no_smart, full, exclude_git, compression, ignore, background
             print_error("Background mode not supported on Windows")
             return
 
+    configure_throttle(read_limit, write_limit, cloud_limit, priority)
+
     # Create initial backup
     print_info("Creating initial backup...")
-    backup = savior.create_backup("Initial backup", compression_level=compression)
+    backup = savior.create_backup("Initial backup", compression_level=compression, codec=codec)
 
     if backup:
         print_success(f"Initial backup created ({format_size(backup.size)})")
@@ -108,7 +118,8 @@ def watch(interval, no_smart, full, exclude_git, compression, ignore, background
                 time.sleep(interval * 60)
                 backup = savior.create_backup(
                     "Automatic backup",
-                    compression_level=compression
+                    compression_level=compression,
+                    codec=codec
                 )
                 if backup:
                     print_success(f"Backup saved ({format_size(backup.size)})")
@@ -122,14 +133,18 @@ def watch(interval, no_smart, full, exclude_git, compression, ignore, background
 
 @click.command()
 @click.argument('description', default='Manual backup')
-@click.option('--compression', '-c', type=click.IntRange(0, 9), default=6,
-              help='Compression level (0=none, 9=max)')
+@click.option('--compression', '-c', type=click.IntRange(0, 22), default=6,
+              help='Compression level (0=none, 9=max for gzip, 22=max for zstd)')
+@click.option('--codec', type=click.Choice(['gzip', 'zstd']), default='gzip',
+              help='Compression codec (zstd requires the zstandard package)')
 @click.option('--tree', is_flag=True, help='Show what will be backed up')
 @click.option('--no-progress', is_flag=True, help='Disable progress bar')
-def save(description, compression, tree, no_progress):
+@click.option('--jobs', '-j', type=click.IntRange(1, 256), default=None,
+              help='Worker threads for hashing and compression (default: CPU count)')
+def save(description, compression, codec, tree, no_progress, jobs):
     """Create a backup right now."""
     project_dir = Path.cwd()
-    savior = Savior(project_dir)
+    savior = Savior(project_dir, jobs=jobs)
 
     # Show tree if requested
     if tree:
@@ -146,13 +161,14 @@ def save(description, compression, tree, no_progress):
     backup = savior.create_backup(
         description,
         compression_level=compression,
-        show_progress=not no_progress
+        show_progress=not no_progress,
+        codec=codec
     )
 
     if backup:
         print_success(f"Saved backup: \"{description}\"")
         click.echo(f"  Size: {format_size(backup.size)}")
-        click.echo(f"  Compression: level {compression}")
+        click.echo(f"  Compression: {codec} level {compression}")
 
         # Show deduplication stats if available
         try:
@@ -221,6 +237,7 @@ def status():
                 click.echo(f"\n{Fore.CYAN}Deduplication Statistics:")
                 click.echo(f"  Space saved: {format_size(stats['space_saved'])}")
                 click.echo(f"  Dedup ratio: {stats['dedup_ratio']:.1%}")
+                click.echo(f"  Compression ratio: {stats['compression_ratio']:.1%}")
                 click.echo(f"  Unique chunks: {stats['unique_chunks']}")
         except:
             pass
\ No newline at end of file
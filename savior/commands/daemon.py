@@ -10,7 +10,8 @@ from ..cli_utils import (
     print_success,
     print_error,
     print_warning,
-    print_info
+    print_info,
+    throttle_options
 )
 
 
@@ -73,6 +74,8 @@ def daemon_status():
                 mode.append('smart')
             if options.get('incremental'):
                 mode.append('incremental')
+            if options.get('priority', 'normal') != 'normal':
+                mode.append(f"{options['priority']} priority")
             mode_str = f" ({', '.join(mode)})" if mode else ""
 
             click.echo(f"  • {path}")
@@ -86,7 +89,8 @@ def daemon_status():
 @click.option('--no-smart', is_flag=True, help='Disable smart mode (save even during activity)')
 @click.option('--full', is_flag=True, help='Use full backups instead of incremental')
 @click.option('--exclude-git', is_flag=True, help='Exclude .git directory from backups (saves space)')
-def daemon_add(paths, interval, no_smart, full, exclude_git):
+@throttle_options
+def daemon_add(paths, interval, no_smart, full, exclude_git, read_limit, write_limit, cloud_limit, priority):
     """Add projects to daemon watch list."""
     daemon = SaviorDaemon()
     if not daemon.is_running():
@@ -109,7 +113,11 @@ def daemon_add(paths, interval, no_smart, full, exclude_git):
             interval=interval,
             smart=not no_smart,  # Invert flag (smart is default)
             incremental=not full,  # Invert flag (incremental is default)
-            exclude_git=exclude_git
+            exclude_git=exclude_git,
+            read_limit=read_limit,
+            write_limit=write_limit,
+            cloud_limit=cloud_limit,
+            priority=priority
         )
 
         if 'error' in result:
@@ -0,0 +1,58 @@
+"""Deduplicated store maintenance commands."""
+
+import click
+from pathlib import Path
+
+from ..core_dedup import SaviorWithDedup
+from ..cli_utils import print_success, print_error, format_size
+
+
+@click.group()
+def dedup():
+    """Manage the deduplicated content store."""
+    pass
+
+
+@dedup.command('gc')
+def dedup_gc():
+    """Delete stored content no backup manifest references."""
+    savior = SaviorWithDedup(Path.cwd(), enable_dedup=True)
+
+    try:
+        result = savior.garbage_collect_dedup()
+    except ValueError as e:
+        print_error(f"Garbage collection aborted: {e}")
+        return
+
+    print_success("Garbage collection complete")
+    click.echo(f"  Live objects: {result['live_objects']}")
+    click.echo(f"  Deleted objects: {result['deleted_objects'] + result['orphaned_files']}")
+    click.echo(f"  Freed: {format_size(result['bytes_freed'])}")
+
+
+@dedup.command('repack')
+@click.option('--min-live', default=0.5, type=click.FloatRange(0.0, 1.0),
+              help='Rewrite packs whose live share is below this ratio')
+def dedup_repack(min_live):
+    """Compact packfiles, reclaiming space from deleted objects."""
+    savior = SaviorWithDedup(Path.cwd(), enable_dedup=True)
+
+    result = savior.repack_dedup(min_live)
+
+    print_success("Repack complete")
+    click.echo(f"  Packs deleted: {result['packs_deleted']}")
+    click.echo(f"  Packs rewritten: {result['packs_rewritten']}")
+    click.echo(f"  Loose objects packed: {result['objects_packed']}")
+    click.echo(f"  Freed: {format_size(result['bytes_reclaimed'])}")
+
+
+@dedup.command('delete')
+@click.argument('backup_id')
+def dedup_delete(backup_id):
+    """Delete one deduplicated backup by its ID."""
+    savior = SaviorWithDedup(Path.cwd(), enable_dedup=True)
+
+    if savior.delete_backup_dedup(backup_id):
+        print_success(f"Deleted deduplicated backup {backup_id}")
+    else:
+        print_error(f"No deduplicated backup named {backup_id}")
@@ -1,11 +1,14 @@
 """Recovery and analysis CLI commands."""
 
+import os
 import click
 from pathlib import Path
 from datetime import datetime
-from colorama import Fore
+from colorama import Fore, Style
 
 from ..core import Savior
+from ..archive import extract_backup_files
+from ..hashing import get_hasher
 from ..diff import BackupDiffer
 from ..recovery import DeepRecovery
 from ..cli_utils import (
@@ -91,35 +94,81 @@ def resurrect(filename, all):
     project_dir = Path.cwd()
     savior = Savior(project_dir)
 
+    # The catalog covers every backup, so no archive is opened to search
     if filename:
-        # Search for specific file
         print_info(f"Searching for '{filename}' in backups...")
-
-        found_in = []
-        backups = savior.list_backups()
-
-        for backup in backups:
-            # Check if file exists in backup
-            # (This would need implementation in core)
-            pass
-
-        if found_in:
-            print_success(f"Found '{filename}' in {len(found_in)} backup(s)")
-            # Offer to restore
-        else:
+        found = savior.find_in_backups(filename)
+        if not found:
             print_warning(f"'{filename}' not found in any backup")
+            return
+        print_success(f"Found {len(found)} file(s) matching '{filename}'")
     else:
-        # Find all deleted files
         print_info("Analyzing backups for deleted files...")
+        found = savior.find_in_backups()
+
+    deleted_files = {
+        path: versions for path, versions in found.items()
+        if not (project_dir / path).exists()
+    }
+
+    for path, versions in found.items():
+        if path in deleted_files:
+            click.echo(f"  {Fore.RED}[DELETED]{Style.RESET_ALL} {path}")
+        elif filename:
+            click.echo(f"  {Fore.YELLOW}[EXISTS]{Style.RESET_ALL} {path}")
+        else:
+            continue
+        click.echo(f"    last backed up {format_time_ago(versions[0]['backup'].timestamp)}, "
+                   f"in {len(versions)} backup(s)")
+
+    if not deleted_files:
+        print_info("No deleted files found")
+        return
+
+    if confirm_action(f"Restore {len(deleted_files)} deleted file(s)?"):
+        restored = 0
+        for path, versions in deleted_files.items():
+            if extract_backup_files(versions[0]['backup'].path, [path], project_dir):
+                restored += 1
+        print_success(f"Resurrected {restored} file(s)")
+
 
-        # This would need implementation to track deleted files
-        deleted_files = []
+@click.command()
+@click.argument('file_path')
+def history(file_path):
+    """Show every backed-up version of a file."""
+    project_dir = Path.cwd()
+    savior = Savior(project_dir)
 
-        if deleted_files:
-            print_info(f"Found {len(deleted_files)} deleted file(s)")
-            # List and offer to restore
+    rel_path = Path(os.path.relpath(Path(file_path).resolve(), savior.project_dir)).as_posix()
+
+    versions = savior.file_history(rel_path)
+    if not versions:
+        print_warning(f"'{rel_path}' is not in any backup")
+        return
+
+    current = project_dir / rel_path
+    current_hash = get_hasher().hash_file(current, 'sha256') if current.is_file() else None
+
+    print_info(f"{rel_path}: {len(versions)} version(s) in backups")
+    for i, version in enumerate(versions):
+        older = versions[i + 1] if i + 1 < len(versions) else None
+        if older is None:
+            change = 'first seen'
+        elif older['hash'] == version['hash']:
+            change = 'unchanged'
         else:
-            print_info("No deleted files found")
+            change = 'changed'
+        if version['hash'] == current_hash:
+            change += ', current'
+
+        backup = version['backup']
+        click.echo(f"  {backup.timestamp.strftime('%Y-%m-%d %H:%M')} "
+                   f"({format_time_ago(backup.timestamp)}) - "
+                   f"{format_size(version['size'] or 0)}, {change}")
+
+    if current_hash is None:
+        print_warning(f"The file no longer exists; 'savior resurrect {rel_path}' brings it back")
 
 
 @click.command()
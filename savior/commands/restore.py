@@ -1,9 +1,6 @@
 """Restore-related CLI commands."""
 
 import click
-import tempfile
-import tarfile
-import shutil
 import fnmatch
 from pathlib import Path
 from colorama import Fore
@@ -14,6 +11,8 @@ from ..cli_utils import (
     format_time_ago, format_size, select_from_list, confirm_action
 )
 from ..conflicts import ConflictDetector, ConflictResolver
+from ..archive import remove_backup
+from ..incremental import chain_files, extract_chain_files, resolve_chain, read_manifest
 
 
 @click.command()
@@ -22,10 +21,12 @@ from ..conflicts import ConflictDetector, ConflictResolver
 @click.option('--force', is_flag=True, help='Force restore without conflict checking')
 @click.option('--no-backup', is_flag=True, help='Skip creating pre-restore safety backup')
 @click.option('--check-conflicts', is_flag=True, help='Check for conflicts without restoring')
-def restore(files, preview, force, no_backup, check_conflicts):
+@click.option('--jobs', '-j', type=click.IntRange(1, 256), default=None,
+              help='Worker threads for hashing (default: CPU count)')
+def restore(files, preview, force, no_backup, check_conflicts, jobs):
     """Restore from a backup."""
     project_dir = Path.cwd()
-    savior = Savior(project_dir)
+    savior = Savior(project_dir, jobs=jobs)
 
     backups = savior.list_backups()
     if not backups:
@@ -56,43 +57,28 @@ def restore(files, preview, force, no_backup, check_conflicts):
 
 def handle_partial_restore(savior, backup, pattern, preview, project_dir):
     """Handle partial file restore or preview."""
-    temp_dir = Path(tempfile.mkdtemp(prefix='savior_restore_'))
-
-    try:
-        with tarfile.open(backup.path, 'r:gz') as tar:
-            tar.extractall(temp_dir)
-
-        files_to_restore = []
-        for file_path in temp_dir.rglob('*'):
-            if file_path.is_file():
-                rel_path = file_path.relative_to(temp_dir)
-
-                if pattern and not fnmatch.fnmatch(str(rel_path), pattern):
-                    continue
-
-                files_to_restore.append((file_path, rel_path))
-
-        if not files_to_restore:
-            print_warning(f"No files match pattern '{pattern}'")
-            return
-
-        if preview:
-            print_info("Files that would be restored:")
-            for _, rel_path in files_to_restore[:20]:
-                click.echo(f"  - {rel_path}")
-            if len(files_to_restore) > 20:
-                click.echo(f"  ... and {len(files_to_restore) - 20} more")
-        else:
-            print_warning(f"This will overwrite {len(files_to_restore)} file(s)!")
-            if confirm_action('Are you sure?'):
-                for src_file, rel_path in files_to_restore:
-                    dst_file = project_dir / rel_path
-                    dst_file.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(src_file, dst_file)
+    # Reads the backups' indexes (or scans them) instead of unpacking them;
+    # files in an incremental backup's chain come from the archive holding them
+    files_to_restore = [
+        name for name in chain_files(backup.path)
+        if not pattern or fnmatch.fnmatch(name, pattern)
+    ]
+
+    if not files_to_restore:
+        print_warning(f"No files match pattern '{pattern}'")
+        return
 
-                print_success(f"Restored {len(files_to_restore)} file(s)")
-    finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
+    if preview:
+        print_info("Files that would be restored:")
+        for rel_path in files_to_restore[:20]:
+            click.echo(f"  - {rel_path}")
+        if len(files_to_restore) > 20:
+            click.echo(f"  ... and {len(files_to_restore) - 20} more")
+    else:
+        print_warning(f"This will overwrite {len(files_to_restore)} file(s)!")
+        if confirm_action('Are you sure?'):
+            restored = extract_chain_files(backup.path, files_to_restore, project_dir)
+            print_success(f"Restored {restored} file(s)")
 
 
 def handle_full_restore(savior, backup, backup_index, check_conflicts,
@@ -140,6 +126,10 @@ def handle_full_restore(savior, backup, backup_index, check_conflicts,
             force=force
         ):
             print_success(f"Restored to {format_time_ago(backup.timestamp)}!")
+            stats = savior.last_restore_stats
+            click.echo(f"  {Fore.CYAN}{stats['written']} file(s) written "
+                       f"({format_size(stats['bytes_written'])}), {stats['deleted']} deleted, "
+                       f"{stats['chmodded']} permission fix(es), {stats['skipped']} unchanged")
         else:
             print_error("Failed to restore backup")
 
@@ -223,7 +213,7 @@ def purge(keep, older_than, dry_run):
         for backup in to_remove:
             if backup.path.exists():
                 size = backup.path.stat().st_size
-                backup.path.unlink()
+                remove_backup(backup.path)
                 removed += 1
                 freed += size
 
@@ -233,4 +223,33 @@ def purge(keep, older_than, dry_run):
         metadata['backups'] = [b.to_dict() for b in remaining]
         savior._save_metadata(metadata)
 
-        print_success(f"Removed {removed} backup(s), freed {format_size(freed)}")
\ No newline at end of file
+        print_success(f"Removed {removed} backup(s), freed {format_size(freed)}")
+
+
+@click.command()
+@click.option('--truncate', is_flag=True, help='Delete the incremental backups it replaces')
+def synthesize(truncate):
+    """Merge the latest incremental chain into a full backup."""
+    project_dir = Path.cwd()
+    savior = Savior(project_dir)
+
+    backups = savior.list_backups()
+    if not backups:
+        print_info("No backups found")
+        return
+
+    try:
+        chain = resolve_chain(backups[0].path)
+    except (OSError, ValueError) as e:
+        print_error(str(e))
+        return
+
+    if len(chain) == 1 and not read_manifest(chain[0]):
+        print_info("The latest backup is already a full backup")
+        return
+
+    print_info(f"Merging {len(chain)} backups into a full backup...")
+    removed = savior.synthesize_full(backups[0].path, truncate=truncate)
+    print_success(f"Latest backup is now a full backup ({format_size(backups[0].path.stat().st_size)})")
+    if removed:
+        print_info(f"Deleted {len(removed)} incremental backup(s) it replaces")
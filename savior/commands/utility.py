@@ -38,7 +38,7 @@ def tree(depth, no_size, all, exclude_git, ignore):
 
     # Show summary
     files = savior._collect_files()
-    total_size = sum(f.stat().st_size for f in files if f.exists())
+    total_size = files.total_size()
     click.echo(f"\n{Fore.GREEN}Summary:{Style.RESET_ALL}")
     click.echo(f"  Files to backup: {len(files)}")
     click.echo(f"  Total size: {format_size(total_size)}")
@@ -240,10 +240,12 @@ def show_all_commands():
             ('status', 'Check if Savior is watching'),
             ('list', 'Show all saved backups'),
             ('purge', 'Delete old backups to free space'),
+            ('synthesize', 'Merge an incremental chain into a full backup'),
         ],
         'Recovery Commands': [
             ('diff', 'Compare backups to see what changed'),
             ('resurrect', 'Find and restore deleted files'),
+            ('history', 'Show every backed-up version of a file'),
             ('pray', '🙏 Deep recovery attempt (searches everywhere)'),
         ],
         'Cloud Commands': [
@@ -252,6 +254,11 @@ def show_all_commands():
             ('cloud list', 'List cloud backups'),
             ('cloud download', 'Download specific backup from cloud'),
         ],
+        'Dedup Commands': [
+            ('dedup gc', 'Delete content no backup references'),
+            ('dedup repack', 'Compact packfiles and reclaim space'),
+            ('dedup delete', 'Delete one deduplicated backup'),
+        ],
         'Daemon Commands': [
             ('daemon start', 'Start background daemon'),
             ('daemon stop', 'Stop daemon'),
@@ -296,14 +303,18 @@ def flags():
             ('--no-smart', 'Disable smart mode'),
             ('--full', 'Use full backups instead of incremental'),
             ('--exclude-git', 'Exclude .git directory'),
-            ('--compression N', 'Set compression level (0-9)'),
+            ('--compression N', 'Set compression level (0-9, up to 22 for zstd)'),
+            ('--codec NAME', 'Compression codec: gzip or zstd'),
             ('--cloud', 'Enable cloud sync'),
             ('--tree', 'Show project structure first'),
+            ('--jobs N', 'Worker threads for hashing and compression'),
         ],
         'save': [
-            ('--compression N', 'Set compression level (0-9)'),
+            ('--compression N', 'Set compression level (0-9, up to 22 for zstd)'),
+            ('--codec NAME', 'Compression codec: gzip or zstd'),
             ('--tree', 'Preview what will be backed up'),
             ('--no-progress', 'Disable progress bar'),
+            ('--jobs N', 'Worker threads for hashing and compression'),
         ],
         'restore': [
             ('--files PATTERN', 'Restore only specific files'),
@@ -311,6 +322,7 @@ def flags():
             ('--check-conflicts', 'Check for uncommitted changes'),
             ('--force', 'Skip conflict detection'),
             ('--no-backup', 'Don\'t create safety backup'),
+            ('--jobs N', 'Worker threads for hashing'),
         ],
         'diff': [
             ('--show-content', 'Show actual file differences'),
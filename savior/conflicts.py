@@ -1,13 +1,17 @@
 import os
 import shutil
 import subprocess
-import hashlib
 import json
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Set, Optional, Tuple
 from enum import Enum
 
+try:
+    from .hashing import get_hasher
+except ImportError:
+    from hashing import get_hasher
+
 
 class ConflictType(Enum):
     UNCOMMITTED_CHANGES = "uncommitted_changes"
@@ -41,11 +45,7 @@ class ConflictDetector:
         if not file_path.exists():
             return ""
 
-        hasher = hashlib.sha256()
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
-                hasher.update(chunk)
-        return hasher.hexdigest()
+        return get_hasher().hash_file(file_path, 'sha256')
 
     def detect_git_conflicts(self) -> Dict[str, List[Path]]:
         """Detect uncommitted changes using git"""
@@ -122,6 +122,7 @@ class ConflictDetector:
         current_files = {}
 
         # Scan current directory state
+        scanned = []
         for root, dirs, files in os.walk(self.project_dir):
             # Skip .savior directory
             if '.savior' in Path(root).parts:
@@ -129,19 +130,24 @@ class ConflictDetector:
 
             for file in files:
                 file_path = Path(root) / file
-                rel_path = file_path.relative_to(self.project_dir)
-
                 try:
-                    stat = file_path.stat()
-                    current_files[rel_path] = {
-                        'hash': self._get_file_hash(file_path),
-                        'mtime': stat.st_mtime,
-                        'size': stat.st_size,
-                        'mode': stat.st_mode
-                    }
+                    scanned.append((file_path, file_path.stat()))
                 except (OSError, IOError):
                     continue
 
+        # Hash everything found in parallel
+        digests = get_hasher().map(self._get_file_hash, [path for path, _ in scanned])
+
+        for (file_path, stat), digest in zip(scanned, digests):
+            if digest is None:
+                continue
+            current_files[file_path.relative_to(self.project_dir)] = {
+                'hash': digest,
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'mode': stat.st_mode
+            }
+
         # Compare with backup
         for backup_path, backup_meta in backup_files.items():
             if backup_path in current_files:
@@ -1,16 +1,15 @@
 import os
 import time
 import json
-import shutil
+import sqlite3
 import tarfile
-import hashlib
 import threading
 import tempfile
 import psutil
 from datetime import datetime, timedelta
+from stat import S_IFREG
 from pathlib import Path
-from typing import List, Dict, Set, Tuple
-import fnmatch
+from typing import List, Dict, Set, Tuple, Optional, Iterable, Callable
 from tqdm import tqdm
 try:
     from .cloud import CloudStorage
@@ -30,10 +29,35 @@ try:
     from .dedup import DeduplicationStore, DedupBackupManifest, SmartDeduplicator
 except ImportError:
     from dedup import DeduplicationStore, DedupBackupManifest, SmartDeduplicator
+try:
+    from .incremental import IncrementalBackup, read_manifest, base_backup_of, resolve_chain, MANIFEST_NAME
+    from .restorer import StreamingRestorer
+except ImportError:
+    from incremental import IncrementalBackup, read_manifest, base_backup_of, resolve_chain, MANIFEST_NAME
+    from restorer import StreamingRestorer
+try:
+    from .ignore import IgnoreMatcher
+    from .hashing import get_hasher, set_default_jobs
+    from .archive import (
+        ArchiveWriter, archive_extension, strip_archive_extension,
+        remove_backup, backup_file_entries
+    )
+    from .catalog import BackupCatalog
+    from .scanner import DirectoryScanner, FileTable, MAX_FILE_SIZE
+except ImportError:
+    from ignore import IgnoreMatcher
+    from hashing import get_hasher, set_default_jobs
+    from archive import (
+        ArchiveWriter, archive_extension, strip_archive_extension,
+        remove_backup, backup_file_entries
+    )
+    from catalog import BackupCatalog
+    from scanner import DirectoryScanner, FileTable, MAX_FILE_SIZE
 
 class SaviorIgnore:
     def __init__(self, ignore_file: Path, exclude_git: bool = False, extra_patterns: List[str] = None):
         self.patterns = self._load_ignore_patterns(ignore_file, exclude_git, extra_patterns)
+        self._matcher = IgnoreMatcher(self.patterns)
 
     def _load_ignore_patterns(self, ignore_file: Path, exclude_git: bool, extra_patterns: List[str]) -> List[str]:
         # Always ignore .savior to prevent recursion
@@ -60,12 +84,7 @@ class SaviorIgnore:
         return patterns
 
     def should_ignore(self, path: str) -> bool:
-        for pattern in self.patterns:
-            if fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(os.path.basename(path), pattern):
-                return True
-            if pattern.endswith('/') and (pattern[:-1] in path.split(os.sep)):
-                return True
-        return False
+        return self._matcher.matches(path)
 
 
 class Backup:
@@ -94,10 +113,12 @@ class Backup:
 
 
 class Savior:
-    def __init__(self, project_dir: Path, exclude_git: bool = False, extra_ignores: List[str] = None, enable_cloud: bool = False):
+    def __init__(self, project_dir: Path, exclude_git: bool = False, extra_ignores: List[str] = None,
+                 enable_cloud: bool = False, jobs: int = None):
         self.project_dir = Path(project_dir).resolve()
         self.backup_dir = self.project_dir / '.savior'
         self.metadata_file = self.backup_dir / 'metadata.json'
+        self.catalog_file = self.backup_dir / 'catalog.db'
         self.lock_file = self.backup_dir / '.lock'
         self.ignore_file = self.project_dir / '.saviorignore'
         self.exclude_git = exclude_git
@@ -106,14 +127,139 @@ class Savior:
         self.watch_interval = 20 * 60  # 20 minutes in seconds
         self.watching = False
         self._watch_thread = None
-        self._last_activity = time.time()
-        self._metadata_lock = threading.Lock()
+        self._stop_watching = threading.Event()
+        self._last_save = time.monotonic()
+        # Re-entrant so read-modify-write updates can hold it across load and save
+        self._metadata_lock = threading.RLock()
+        self._catalog: Optional[BackupCatalog] = None
+        # Counts from the last restore_backup(): written, bytes_written,
+        # deleted, chmodded and skipped (already identical) files
+        self.last_restore_stats: Dict[str, int] = {}
         self.enable_cloud = enable_cloud
         self.cloud_storage = CloudStorage() if enable_cloud else None
+        self.jobs = jobs
+        if jobs:
+            # Size the shared hashing pool used by every hashing call site
+            set_default_jobs(jobs)
 
     def _ensure_backup_dir(self):
         self.backup_dir.mkdir(exist_ok=True)
 
+    @property
+    def catalog(self) -> BackupCatalog:
+        """Catalog of every file in every backup (.savior/catalog.db)"""
+        if self._catalog is None:
+            self._ensure_backup_dir()
+            self._catalog = BackupCatalog(self.catalog_file)
+        return self._catalog
+
+    def _catalog_key(self, backup_path: Path) -> str:
+        try:
+            return Path(backup_path).relative_to(self.backup_dir).as_posix()
+        except ValueError:
+            return str(backup_path)
+
+    def _catalog_backup(self, backup: Backup, entries: List[Dict], archive_size: int):
+        try:
+            self.catalog.add_backup(
+                self._catalog_key(backup.path), backup.timestamp,
+                backup.description, archive_size, entries
+            )
+        except sqlite3.Error:
+            pass  # sync_catalog() picks the backup up next time
+
+    @staticmethod
+    def _catalog_entries(backup_path: Path) -> List[Dict]:
+        """Entries for a backup's project files.
+
+        An incremental archive's MANIFEST.json is its own bookkeeping, not
+        a file of the project, so it's left out.
+        """
+        entries = backup_file_entries(backup_path)
+        if read_manifest(backup_path) is not None:
+            entries = [entry for entry in entries if entry['name'] != MANIFEST_NAME]
+        return entries
+
+    def _uncatalog_backup(self, backup: Backup):
+        if not self.catalog_file.exists():
+            return
+        try:
+            self.catalog.remove_backup(self._catalog_key(backup.path))
+        except sqlite3.Error:
+            pass
+
+    def sync_catalog(self, show_progress: bool = False) -> int:
+        """Bring the catalog in line with the backups on disk.
+
+        Backups made before the catalog existed (or whose cataloging
+        failed) are read once and added; entries for deleted backups are
+        dropped. Returns the number of backups added.
+        """
+        backups = {self._catalog_key(b.path): b for b in self.list_backups()}
+        cataloged = self.catalog.backups()
+
+        for key in set(cataloged) - set(backups):
+            self.catalog.remove_backup(key)
+
+        # A size change means the archive was replaced since it was cataloged
+        missing = []
+        for key, backup in backups.items():
+            try:
+                size = backup.path.stat().st_size
+            except OSError:
+                continue
+            if cataloged.get(key) != size:
+                missing.append((backup, size))
+
+        # Incremental backups cataloged with their manifest as a file
+        queued = {backup.path for backup, _ in missing}
+        for version in self.catalog.history(MANIFEST_NAME):
+            backup = backups.get(version['backup'])
+            if backup is None or backup.path in queued:
+                continue
+            try:
+                if read_manifest(backup.path) is not None:
+                    missing.append((backup, backup.path.stat().st_size))
+            except (tarfile.TarError, OSError, EOFError, ValueError):
+                continue
+
+        added = 0
+        for backup, size in tqdm(missing, desc="Cataloging backups", unit="backups",
+                                 disable=not show_progress or not missing):
+            try:
+                entries = self._catalog_entries(backup.path)
+            except (tarfile.TarError, OSError, EOFError, ValueError):
+                continue  # Unreadable or not a tar backup
+            self._catalog_backup(backup, entries, size)
+            added += 1
+        return added
+
+    def file_history(self, rel_path: str) -> List[Dict]:
+        """Every backed-up version of a file, newest first.
+
+        Each version is a dict with the Backup it's in plus the file's
+        hash, size and mtime in that backup.
+        """
+        self.sync_catalog()
+        return [self._with_backup(v) for v in self.catalog.history(rel_path)]
+
+    def find_in_backups(self, pattern: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """{path: versions, newest first} for backed-up files whose path contains pattern"""
+        self.sync_catalog()
+        return {
+            path: [self._with_backup(v) for v in versions]
+            for path, versions in self.catalog.search(pattern).items()
+        }
+
+    def _with_backup(self, version: Dict) -> Dict:
+        version['backup'] = Backup(
+            timestamp=version['timestamp'],
+            path=self.backup_dir / version['backup'],
+            description=version['description'],
+            size=version['archive_size'] or 0
+        )
+        return version
+
     def _load_metadata(self) -> Dict:
         with self._metadata_lock:
             if self.metadata_file.exists():
@@ -142,38 +288,61 @@ class Savior:
                 raise
 
     def _get_file_hash(self, filepath: Path) -> str:
-        hasher = hashlib.md5()
-        with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
-                hasher.update(chunk)
-        return hasher.hexdigest()
-
-    def _collect_files(self) -> Set[Path]:
-        files = set()
-        # Use followlinks=False to avoid symlink loops
-        for root, dirs, filenames in os.walk(self.project_dir, followlinks=False):
-            root_path = Path(root)
-            try:
-                rel_root = root_path.relative_to(self.project_dir)
-            except ValueError:
-                continue  # Skip if path is outside project dir
+        return get_hasher().hash_file(filepath, 'md5')
 
-            # Filter directories to skip
-            dirs[:] = [d for d in dirs if not self.ignore.should_ignore(str(rel_root / d))]
+    def _collect_files(self, root: Optional[Path] = None) -> FileTable:
+        """Scan the project (or just the subtree at root) for backup files.
 
-            for filename in filenames:
-                rel_path = rel_root / filename
-                if not self.ignore.should_ignore(str(rel_path)):
-                    file_path = root_path / filename
-                    try:
-                        # Check if file is readable and not too large
-                        stat = file_path.stat()
-                        if stat.st_size < 100 * 1024 * 1024 and os.access(file_path, os.R_OK):
-                            files.add(file_path)
-                    except (OSError, IOError):
-                        # Skip files we can't access
-                        continue
+        The result is a set of paths that also carries each file's stat,
+        so the rest of the backup doesn't have to stat them again.
+        """
+        root = Path(root) if root is not None else self.project_dir
+        if root != self.project_dir and self._is_ignored(root):
+            return FileTable()
+        scanner = DirectoryScanner(self.project_dir, self.ignore.should_ignore, jobs=self.jobs)
+        return scanner.scan(root)
+
+    def _is_backup_candidate(self, file_path: Path) -> bool:
+        try:
+            # Check if file is readable and not too large
+            stat = file_path.stat()
+            return stat.st_size < MAX_FILE_SIZE and os.access(file_path, os.R_OK)
+        except (OSError, IOError):
+            # Skip files we can't access
+            return False
+
+    def _is_ignored(self, path: Path) -> bool:
+        """Check a path and each of its parents, as the walk would"""
+        try:
+            rel_path = Path(path).relative_to(self.project_dir)
+        except ValueError:
+            return True
+
+        parts = rel_path.parts
+        return any(
+            self.ignore.should_ignore(os.path.join(*parts[:i]))
+            for i in range(1, len(parts) + 1)
+        )
+
+    def _collect_dirty(self, paths: Iterable[Path], dirs: Iterable[Path] = ()) -> FileTable:
+        """Backup files among changed paths, walking changed directories.
 
+        Gives the same answer as _collect_files restricted to those paths,
+        without walking the rest of the tree.
+        """
+        files = FileTable()
+        for directory in dirs:
+            files.update(self._collect_files(directory))
+
+        # One stat per file, kept in the table like the scanner's
+        scanner = DirectoryScanner(self.project_dir, jobs=1)
+        for path in paths:
+            path = Path(path)
+            if self._is_ignored(path):
+                continue
+            stat = scanner.stat_file(path)
+            if stat is not None:
+                files.add(path, stat)
         return files
 
     def _check_disk_space(self, required_bytes: int) -> Tuple[bool, str]:
@@ -193,16 +362,16 @@ class Savior:
 
     def _estimate_backup_size(self, files: Set[Path]) -> int:
         """Estimate the size of the backup."""
-        total_size = 0
-        for file_path in files:
-            try:
-                total_size += file_path.stat().st_size
-            except (OSError, IOError):
-                continue
+        # Scanned files already know their size
+        if not isinstance(files, FileTable):
+            files = FileTable(files)
+        total_size = files.total_size()
         # Estimate compressed size as ~40% of original
         return int(total_size * 0.4)
 
-    def create_backup(self, description: str = "", compression_level: int = 6, show_progress: bool = True) -> Backup:
+    def create_backup(self, description: str = "", compression_level: int = 6, show_progress: bool = True,
+                      codec: str = 'gzip', progress: Optional[Callable[[str, int, int], None]] = None) -> Backup:
+        """Create a full backup; progress(stage, done, total) is called per file."""
         self._ensure_backup_dir()
 
         # Auto-cleanup old backups (30+ days)
@@ -220,7 +389,11 @@ class Savior:
             raise IOError(error_msg)
 
         timestamp = datetime.now()
-        extension = ".tar.gz" if compression_level > 0 else ".tar"
+
+        # Level 0 always means an uncompressed tar, whatever the codec
+        if compression_level == 0:
+            codec = 'none'
+        extension = archive_extension(codec)
 
         # Create folder with format: [HH:MM] [MM-DD-YYYY]
         # Example: [14:30] [09-21-2025]
@@ -244,36 +417,21 @@ class Savior:
 
         backup_path = backup_folder / backup_filename
 
-        # Set compression level (0=none, 9=max)
-        if compression_level == 0:
-            compress_mode = 'w'
-            tar_kwargs = {}
-        else:
-            compress_mode = 'w:gz'
-            tar_kwargs = {'compresslevel': min(max(compression_level, 1), 9)}
-
-        # Create backup with progress bar
-        if show_progress:
-            file_list = list(files)
-            with tqdm(total=len(file_list), desc="Creating backup", unit="files", disable=not show_progress) as pbar:
-                with tarfile.open(backup_path, compress_mode, **tar_kwargs) as tar:
-                    for file_path in file_list:
-                        try:
-                            rel_path = file_path.relative_to(self.project_dir)
-                            tar.add(file_path, arcname=str(rel_path))
-                            pbar.update(1)
-                        except (OSError, IOError):
-                            # Skip files that can't be added (permissions, etc)
-                            pbar.update(1)
-                            continue
-        else:
-            with tarfile.open(backup_path, compress_mode, **tar_kwargs) as tar:
-                for file_path in files:
+        # Blocks are compressed in parallel on self.jobs threads
+        file_list = list(files)
+        writer = ArchiveWriter(backup_path, codec, compression_level, threads=self.jobs)
+        with tqdm(total=len(file_list), desc="Creating backup", unit="files", disable=not show_progress) as pbar:
+            with writer as tar:
+                for done, file_path in enumerate(file_list, 1):
                     try:
                         rel_path = file_path.relative_to(self.project_dir)
-                        tar.add(file_path, arcname=str(rel_path))
+                        tar.add_file(file_path, str(rel_path), files.stat(file_path))
                     except (OSError, IOError):
-                        continue
+                        # Skip files that can't be added (permissions, etc)
+                        pass
+                    pbar.update(1)
+                    if progress:
+                        progress('backup', done, len(file_list))
 
         backup = Backup(
             timestamp=timestamp,
@@ -286,27 +444,32 @@ class Savior:
         metadata['backups'].append(backup.to_dict())
         self._save_metadata(metadata)
 
-        # Upload to cloud if enabled and configured
+        self._catalog_backup(backup, [m for m in writer.members if m['type'] == 'file'], backup.size)
+
+        self.upload_to_cloud(backup_path)
+
+        self._cleanup_old_backups()
+
+        return backup
+
+    def upload_to_cloud(self, backup_path: Path):
+        """Upload a new backup if cloud storage is enabled, configured and set to auto-sync"""
         if self.cloud_storage and self.cloud_storage.is_configured():
             if self.cloud_storage.config.get('auto_sync', False):
                 project_name = self.project_dir.name
                 try:
-                    if self.cloud_storage.upload_backup(backup_path, project_name):
+                    if self.cloud_storage.upload_backup(backup_path, project_name, self.backup_dir):
                         print(f"  ☁️ Uploaded to cloud storage")
                 except Exception as e:
                     print(f"  ⚠️ Cloud upload failed: {e}")
 
-        self._cleanup_old_backups()
-
-        return backup
-
-    def sync_with_cloud(self) -> Dict:
+    def sync_with_cloud(self, progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
         """Sync local backups with cloud storage"""
         if not self.cloud_storage or not self.cloud_storage.is_configured():
             return {'error': 'Cloud storage not configured'}
 
         project_name = self.project_dir.name
-        return self.cloud_storage.sync_backups(self.backup_dir, project_name)
+        return self.cloud_storage.sync_backups(self.backup_dir, project_name, progress=progress)
 
     def _cleanup_old_backups(self):
         """Smart cleanup: Keep recent backups, transition to daily/weekly, remove 30+ day old backups"""
@@ -331,7 +494,8 @@ class Savior:
             # Remove backups older than 30 days
             if age > timedelta(days=30):
                 if backup.path.exists():
-                    backup.path.unlink()
+                    remove_backup(backup.path)
+                    self._uncatalog_backup(backup)
                     removed_count += 1
             elif age < timedelta(hours=24):
                 # Keep all backups from last 24 hours
@@ -345,7 +509,8 @@ class Savior:
             else:
                 # Remove intermediate backups
                 if backup.path.exists():
-                    backup.path.unlink()
+                    remove_backup(backup.path)
+                    self._uncatalog_backup(backup)
                     removed_count += 1
                     # If this was in a folder and the folder is now empty, remove it
                     parent = backup.path.parent
@@ -371,7 +536,8 @@ class Savior:
             print(f"  (Cleaned up {removed_count} old backup{'s' if removed_count != 1 else ''})")
 
     def restore_backup(self, backup_index: int, check_conflicts: bool = True,
-                       auto_backup: bool = True, force: bool = False) -> bool:
+                       auto_backup: bool = True, force: bool = False,
+                       progress: Optional[Callable[[str, int, int], None]] = None) -> bool:
         """Restore a backup with conflict detection and resolution.
 
         Args:
@@ -379,6 +545,7 @@ class Savior:
             check_conflicts: Whether to check for conflicts before restoring
             auto_backup: Whether to create a pre-restore backup
             force: Force restore without conflict checking
+            progress: Called as progress(stage, done, total) while writing files
         """
         metadata = self._load_metadata()
         backups = [Backup.from_dict(b) for b in metadata['backups']]
@@ -391,38 +558,25 @@ class Savior:
         if not backup.path.exists():
             return False
 
-        # Use tempfile for cross-platform compatibility
-        temp_dir = Path(tempfile.mkdtemp(prefix='savior_restore_'))
-        temp_dir.mkdir(exist_ok=True)
-
         try:
-            # Extract backup to temp directory first
-            with tarfile.open(backup.path, 'r:gz') as tar:
-                tar.extractall(temp_dir, filter='data')
-
-            # Build backup file metadata
-            backup_files = {}
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    src_file = Path(root) / file
-                    rel_path = src_file.relative_to(temp_dir)
-
-                    # Calculate hash for conflict detection
-                    import hashlib
-                    hasher = hashlib.sha256()
-                    with open(src_file, 'rb') as f:
-                        for chunk in iter(lambda: f.read(4096), b''):
-                            hasher.update(chunk)
-
-                    stat = src_file.stat()
-                    backup_files[rel_path] = {
-                        'hash': hasher.hexdigest(),
-                        'size': stat.st_size,
-                        'mode': stat.st_mode
-                    }
+            # Files are streamed from the archive(s) straight into place; for
+            # an incremental backup that is the final state of its chain
+            # Hashes from the last incremental scan spare rehashing files
+            # whose stat hasn't changed since
+            restorer = StreamingRestorer(
+                self.project_dir, resolve_chain(backup.path),
+                stat_cache=IncrementalBackup(self.backup_dir, self.project_dir).file_states,
+                jobs=self.jobs
+            )
 
             # Conflict detection and resolution
             if check_conflicts and not force:
+                backup_files = {
+                    Path(name): {'hash': entry['sha256'] or '', 'size': entry['size'],
+                                 'mode': S_IFREG | (entry['mode'] & 0o7777)}
+                    for name, entry in restorer.entries(with_hashes=True).items()
+                }
+
                 detector = ConflictDetector(self.project_dir)
                 resolver = ConflictResolver(self.project_dir, self.backup_dir)
 
@@ -453,36 +607,11 @@ class Savior:
                     if actions['skipped']:
                         print(f"  Skipping {len(actions['skipped'])} files")
 
-            # Perform the actual restoration
-            # Remove files that don't exist in the backup (except .savior directory)
-            for root, dirs, files in os.walk(self.project_dir, followlinks=False):
-                # Skip the .savior directory itself
-                if '.savior' in Path(root).parts:
-                    continue
-                for file in files:
-                    file_path = Path(root) / file
-                    try:
-                        rel_path = file_path.relative_to(self.project_dir)
-                        if rel_path not in backup_files and not str(rel_path).startswith('.savior'):
-                            file_path.unlink()
-                    except (OSError, ValueError):
-                        continue  # Skip files we can't remove
-
-            # Restore files from backup
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    src_file = Path(root) / file
-                    rel_path = src_file.relative_to(temp_dir)
-                    dst_file = self.project_dir / rel_path
-
-                    dst_file.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(src_file, dst_file)
-
-            shutil.rmtree(temp_dir)
+            # Perform the actual restoration: only files that differ from
+            # the backup are deleted, rewritten or chmodded
+            self.last_restore_stats = restorer.restore(progress)
             return True
         except Exception as e:
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
             print(f"Restore failed: {e}")
             return False
 
@@ -584,7 +713,7 @@ class Savior:
                             # Look for backup files in the folder
                             for backup_file in folder.glob('*.tar*'):
                                 # Get description from filename
-                                desc = backup_file.stem
+                                desc = strip_archive_extension(backup_file.name)
                                 if desc == 'backup':
                                     desc = "Manual backup"
                                 else:
@@ -603,13 +732,15 @@ class Savior:
         return sorted(backups, key=lambda b: b.timestamp, reverse=True)
 
     def _watch_loop(self):
-        while self.watching:
-            time.sleep(2)
-
-            if time.time() - self._last_activity > 2:
-                if time.time() % self.watch_interval < 2:
-                    self.create_backup("Automatic backup")
-                    self._last_activity = time.time()
+        """Save every watch_interval, counted from the last successful save"""
+        while not self._stop_watching.wait(max(0.0, self._last_save + self.watch_interval - time.monotonic())):
+            try:
+                self.create_backup("Automatic backup")
+                self._last_save = time.monotonic()
+            except Exception as e:
+                print(f"Error during auto-save: {e}")
+                # Try again in a minute rather than a whole interval
+                self._last_save = time.monotonic() - self.watch_interval + min(self.watch_interval, 60)
 
     def start_watching(self):
         if not self.watching:
@@ -618,6 +749,8 @@ class Savior:
             metadata['watching'] = True
             self._save_metadata(metadata)
 
+            self._last_save = time.monotonic()
+            self._stop_watching.clear()
             self._watch_thread = threading.Thread(target=self._watch_loop, daemon=True)
             self._watch_thread.start()
 
@@ -625,6 +758,7 @@ class Savior:
 
     def stop_watching(self):
         self.watching = False
+        self._stop_watching.set()
         metadata = self._load_metadata()
         metadata['watching'] = False
         self._save_metadata(metadata)
@@ -636,6 +770,69 @@ class Savior:
         metadata = self._load_metadata()
         return metadata.get('watching', False)
 
+    def synthesize_full(self, backup_path: Optional[Path] = None, truncate: bool = False) -> List[Path]:
+        """Turn an incremental backup (the latest by default) into a full one.
+
+        The backup is rebuilt from its chain rather than from the project
+        directory, so it's safe to run in the background while watching.
+        With truncate, the incremental backups it no longer needs are
+        deleted, unless another backup still builds on them. Returns the
+        deleted backup paths.
+        """
+        if backup_path is None:
+            backups = self.list_backups()
+            if not backups:
+                return []
+            backup_path = backups[0].path
+        backup_path = Path(backup_path)
+
+        redundant = IncrementalBackup(self.backup_dir, self.project_dir).synthesize_full(backup_path)
+
+        with self._metadata_lock:
+            metadata = self._load_metadata()
+            backups = [Backup.from_dict(b) for b in metadata['backups']]
+            for backup in backups:
+                if backup.path == backup_path:
+                    backup.size = backup_path.stat().st_size
+                    self._catalog_backup(backup, self._catalog_entries(backup_path), backup.size)
+
+            removed = []
+            if truncate and redundant:
+                removed = self._truncate_chain(redundant, backups, backup_path)
+                backups = [b for b in backups if b.path not in removed]
+
+            metadata['backups'] = [b.to_dict() for b in backups]
+            self._save_metadata(metadata)
+
+        return removed
+
+    def _truncate_chain(self, chain: List[Path], backups: List[Backup], kept: Path) -> List[Path]:
+        """Delete chain members, newest first, until one is still in use"""
+        # Which backups build directly on which
+        referrers: Dict[Path, Set[Path]] = {}
+        for backup in backups:
+            if backup.path == kept or not backup.path.exists():
+                continue
+            try:
+                base = base_backup_of(backup.path)
+            except (tarfile.TarError, OSError, ValueError):
+                continue
+            if base is not None:
+                referrers.setdefault(base.resolve(), set()).add(backup.path.resolve())
+
+        removed = []
+        for path in reversed(chain):
+            if read_manifest(path) is None:
+                break  # Keep full backups; they are restore points of their own
+            if referrers.get(path.resolve(), set()) - {p.resolve() for p in removed}:
+                break  # Something else still builds on it
+            backup = next((b for b in backups if b.path == path), None)
+            remove_backup(path)
+            if backup is not None:
+                self._uncatalog_backup(backup)
+            removed.append(path)
+        return removed
+
     def purge_backups(self, keep_recent: int = 5):
         metadata = self._load_metadata()
         backups = [Backup.from_dict(b) for b in metadata['backups']]
@@ -644,7 +841,8 @@ class Savior:
 
         for backup in sorted_backups[keep_recent:]:
             if backup.path.exists():
-                backup.path.unlink()
+                remove_backup(backup.path)
+            self._uncatalog_backup(backup)
 
         metadata['backups'] = [b.to_dict() for b in sorted_backups[:keep_recent]]
         self._save_metadata(metadata)
\ No newline at end of file
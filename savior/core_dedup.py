@@ -7,6 +7,7 @@ import tarfile
 
 from .core import Savior, Backup
 from .dedup import DeduplicationStore, DedupBackupManifest, SmartDeduplicator
+from .hashing import get_hasher
 from .cli_utils import format_size
 from tqdm import tqdm
 
@@ -55,39 +56,50 @@ class SaviorWithDedup(Savior):
 
         # Process files with deduplication
         file_list = list(files)
+
+        # Hash every dedup candidate up front on the shared pool
+        candidates = [f for f in file_list if SmartDeduplicator.should_deduplicate(f)]
+        content_hashes = get_hasher().hash_files(candidates, 'sha256')
+
         if show_progress:
             pbar = tqdm(total=len(file_list), desc="Deduplicating files", unit="files")
 
-        for file_path in file_list:
-            try:
-                # Check if file should be deduplicated
-                if SmartDeduplicator.should_deduplicate(file_path):
-                    # Store with deduplication
-                    rel_path = file_path.relative_to(self.project_dir)
-                    metadata = self.dedup_store.store_file(file_path, backup_id)
-
-                    if metadata:
-                        dedup_files[rel_path] = metadata
-                        if metadata.get('deduplicated'):
-                            deduplicated += 1
+        # Garbage collection waits until the manifest references the objects
+        with self.dedup_store.writing():
+            # One index transaction for the whole backup
+            with self.dedup_store.batch():
+                for file_path in file_list:
+                    try:
+                        # Check if file should be deduplicated
+                        if file_path in content_hashes:
+                            # Store with deduplication
+                            rel_path = file_path.relative_to(self.project_dir)
+                            metadata = self.dedup_store.store_file(
+                                file_path, content_hash=content_hashes[file_path]
+                            )
+
+                            if metadata:
+                                dedup_files[rel_path] = metadata
+                                if metadata.get('deduplicated'):
+                                    deduplicated += 1
+                                else:
+                                    new_files += 1
                         else:
-                            new_files += 1
-                else:
-                    # Skip deduplication for this file type
-                    skipped += 1
-
-                if show_progress:
-                    pbar.update(1)
-            except Exception:
-                if show_progress:
-                    pbar.update(1)
-                continue
+                            # Skip deduplication for this file type
+                            skipped += 1
 
-        if show_progress:
-            pbar.close()
+                        if show_progress:
+                            pbar.update(1)
+                    except Exception:
+                        if show_progress:
+                            pbar.update(1)
+                        continue
+
+            if show_progress:
+                pbar.close()
 
-        # Create manifest
-        manifest_path = self.manifest_manager.create_manifest(backup_id, dedup_files)
+            # Create manifest
+            manifest_path = self.manifest_manager.create_manifest(backup_id, dedup_files)
 
         # Get dedup stats
         stats = self.dedup_store.get_dedup_stats()
@@ -105,6 +117,8 @@ class SaviorWithDedup(Savior):
         metadata['backups'].append(backup.to_dict())
         self._save_metadata(metadata)
 
+        self._sync_dedup_to_cloud()
+
         # Print stats
         if show_progress:
             print(f"✓ Backup created with deduplication")
@@ -114,9 +128,28 @@ class SaviorWithDedup(Savior):
             if stats['space_saved'] > 0:
                 print(f"  Space saved: {format_size(stats['space_saved'])}")
                 print(f"  Dedup ratio: {stats['dedup_ratio']:.1%}")
+            if stats['compression_ratio'] > 0:
+                print(f"  Compression: {stats['compression_ratio']:.1%} smaller on disk")
 
         return backup
 
+    def _sync_dedup_to_cloud(self):
+        """Upload the new manifest and only the objects the cloud lacks, if auto-sync is on"""
+        if not (self.cloud_storage and self.cloud_storage.is_configured()):
+            return
+        if not self.cloud_storage.config.get('auto_sync', False):
+            return
+        try:
+            stats = self.cloud_storage.sync_dedup_store(self.backup_dir, self.project_dir.name,
+                                                        self.dedup_store)
+            if stats['manifests']:
+                print(f"  ☁️ Uploaded {stats['objects']} new object(s) to cloud storage "
+                      f"({format_size(stats['bytes'])})")
+            for error in stats['errors']:
+                print(f"  ⚠️ Cloud sync: {error}")
+        except Exception as e:
+            print(f"  ⚠️ Cloud upload failed: {e}")
+
     def restore_backup_dedup(self, backup_index: int) -> bool:
         """Restore from a deduplicated backup."""
         metadata = self._load_metadata()
@@ -142,18 +175,14 @@ class SaviorWithDedup(Savior):
 
         print(f"Restoring {len(manifest['files'])} files from deduplicated backup...")
 
-        # Restore files from dedup store
-        restored = 0
-        failed = 0
-
-        for file_path_str, metadata in manifest['files'].items():
-            file_path = self.project_dir / file_path_str
-            content_hash = metadata['hash']
-
-            if self.dedup_store.retrieve_file(content_hash, file_path):
-                restored += 1
-            else:
-                failed += 1
+        # Restore files from dedup store in pack order; chunked files carry
+        # their ordered chunk list in the manifest
+        results = self.dedup_store.retrieve_files(
+            (metadata['hash'], self.project_dir / file_path_str, metadata.get('chunks'))
+            for file_path_str, metadata in manifest['files'].items()
+        )
+        restored = sum(1 for ok in results.values() if ok)
+        failed = len(results) - restored
 
         print(f"✓ Restored {restored} files")
         if failed > 0:
@@ -166,6 +195,40 @@ class SaviorWithDedup(Savior):
         files = list(self._collect_files())
         return SmartDeduplicator.estimate_dedup_savings(files)
 
+    def delete_backup_dedup(self, backup_id: str) -> bool:
+        """Delete a deduplicated backup and release the content it referenced."""
+        if not self.enable_dedup:
+            return False
+
+        manifest = self.manifest_manager.load_manifest(backup_id)
+        if not manifest:
+            return False
+
+        self.dedup_store.delete_backup(manifest)
+        self.manifest_manager.delete_manifest(backup_id)
+
+        metadata = self._load_metadata()
+        metadata['backups'] = [
+            b for b in metadata['backups']
+            if Path(b['path']).stem != backup_id or '[DEDUP]' not in b['description']
+        ]
+        self._save_metadata(metadata)
+        return True
+
+    def garbage_collect_dedup(self) -> Dict:
+        """Mark-and-sweep the dedup store against the manifests on disk."""
+        if not self.enable_dedup:
+            return {}
+
+        return self.dedup_store.garbage_collect(self.manifest_manager.iter_manifests())
+
+    def repack_dedup(self, min_live_ratio: float = 0.5) -> Dict:
+        """Reclaim space held by dead objects in the dedup packfiles."""
+        if not self.enable_dedup:
+            return {}
+
+        return self.dedup_store.repack(min_live_ratio)
+
     def cleanup_dedup_store(self) -> int:
         """Clean up orphaned chunks in dedup store."""
         if not self.enable_dedup:
@@ -1,18 +1,83 @@
 import os
 import sys
 import json
+import hmac
+import time
+import struct
 import signal
 import socket
+import asyncio
 import threading
-import subprocess
-import hashlib
 import secrets
 import stat
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 from datetime import datetime
 import psutil
 
+try:
+    from .core import Savior
+    from .scheduler import ProjectScheduler
+except ImportError:
+    from core import Savior
+    from scheduler import ProjectScheduler
+
+# Every message, either way, is a 4-byte big-endian length and then that
+# many bytes of UTF-8 JSON. Requests carry an 'id'; the daemon answers
+# each with zero or more {'id', 'event': 'progress', 'data'} messages and
+# then one {'id', 'event': 'result', 'data'}.
+FRAME_HEADER = struct.Struct('>I')
+MAX_RESPONSE_SIZE = 64 * 1024 * 1024
+PROGRESS_INTERVAL = 0.1
+# Longest a client waits between messages of a backup, restore or sync
+LONG_OPERATION_TIMEOUT = 10 * 60
+
+
+class FrameError(ValueError):
+    """A message that is too large or not a JSON object"""
+
+
+def encode_frame(message: Dict) -> bytes:
+    data = json.dumps(message).encode('utf-8')
+    return FRAME_HEADER.pack(len(data)) + data
+
+
+def decode_frame(data: bytes) -> Dict:
+    try:
+        message = json.loads(data.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise FrameError('Invalid JSON')
+    if not isinstance(message, dict):
+        raise FrameError('Invalid JSON')
+    return message
+
+
+async def read_frame(reader: asyncio.StreamReader, max_size: int) -> Dict:
+    header = await reader.readexactly(FRAME_HEADER.size)
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > max_size:
+        raise FrameError(f'Request too large ({size} bytes)')
+    return decode_frame(await reader.readexactly(size))
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError('Daemon closed the connection')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock: socket.socket, max_size: int = MAX_RESPONSE_SIZE) -> Dict:
+    (size,) = FRAME_HEADER.unpack(_recv_exactly(sock, FRAME_HEADER.size))
+    if size > max_size:
+        raise FrameError(f'Response too large ({size} bytes)')
+    return decode_frame(_recv_exactly(sock, size))
+
 
 class SaviorDaemon:
     def __init__(self):
@@ -23,12 +88,17 @@ class SaviorDaemon:
         self.projects_file = self.config_dir / 'projects.json'
         self.log_file = self.config_dir / 'daemon.log'
         self.auth_file = self.config_dir / 'daemon.auth'
-        self.processes = {}
+        self.scheduler: Optional[ProjectScheduler] = None
         self.running = False
         self.auth_token = self._get_or_create_auth_token()
-        self.max_projects = 20  # Limit concurrent projects
+        self.max_projects = 200  # All watched from this one process
+        self.max_concurrent_backups = 4  # Backups running at once, across projects
         self.max_request_size = 1024 * 10  # 10KB max request
-        self.client_threads = []
+        self.max_connections = 64
+        self.max_operations = 8  # Blocking commands running at once
+        self._connections = 0
+        self._writers = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
     def _load_projects(self) -> Dict:
         if self.projects_file.exists():
@@ -93,19 +163,34 @@ class SaviorDaemon:
         with open(self.pid_file, 'w') as f:
             f.write(str(os.getpid()))
 
-        # Set up signal handlers
-        signal.signal(signal.SIGTERM, self._handle_signal)
-        signal.signal(signal.SIGINT, self._handle_signal)
-
         self.running = True
         self._log("Daemon started")
 
+        # One observer and worker pool for every project
+        self.scheduler = ProjectScheduler(self.max_concurrent_backups, log=self._log)
+        self.scheduler.start()
+        self._resume_projects()
+
         # Start socket server
         self._start_server()
 
+    def _resume_projects(self):
+        """Watch the projects saved by a previous run again"""
+        projects = self._load_projects()
+        for path, info in list(projects.items()):
+            if not self._validate_project_path(path) or not Path(path).is_dir():
+                del projects[path]
+                continue
+            try:
+                self.scheduler.add(path, info.get('options', {}))
+            except Exception as e:
+                self._log(f"Could not resume {path}: {e}")
+                del projects[path]
+        self._save_projects(projects)
+
     def _handle_signal(self, signum, frame):
         self._log(f"Received signal {signum}")
-        self.stop()
+        self._request_stop()
 
     def _get_or_create_auth_token(self) -> str:
         """Get or create authentication token."""
@@ -154,75 +239,146 @@ class SaviorDaemon:
             return False
 
     def _start_server(self):
+        try:
+            asyncio.run(self._serve())
+        except Exception as e:
+            self._log(f"Server error: {e}")
+        finally:
+            if self.socket_file.exists():
+                self.socket_file.unlink()
+        self.stop()
+
+    async def _serve(self):
         # Clean up old socket
         if self.socket_file.exists():
             self.socket_file.unlink()
 
-        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        server.bind(str(self.socket_file))
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        # Blocking commands (backups, restores, syncs) run here, so a
+        # slow one never holds up the event loop or other connections
+        self._executor = ThreadPoolExecutor(max_workers=self.max_operations,
+                                            thread_name_prefix='savior-rpc')
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                self._loop.add_signal_handler(signum, self._handle_signal, signum, None)
+
+        server = await asyncio.start_unix_server(
+            self._handle_connection, path=str(self.socket_file),
+            limit=self.max_request_size + FRAME_HEADER.size
+        )
         # Restrict socket permissions
         os.chmod(self.socket_file, stat.S_IRUSR | stat.S_IWUSR)
-        server.listen(5)
-
         self._log("Server listening on socket")
 
-        while self.running:
-            try:
-                server.settimeout(1.0)
-                client, addr = server.accept()
-
-                # Limit concurrent client connections
-                if len(self.client_threads) >= 10:
-                    client.close()
-                    continue
-
-                thread = threading.Thread(
-                    target=self._handle_client,
-                    args=(client,),
-                    daemon=True
-                )
-                thread.start()
-                self.client_threads.append(thread)
-
-                # Clean up finished threads
-                self.client_threads = [t for t in self.client_threads if t.is_alive()]
+        async with server:
+            await self._stopping.wait()
+            # Persistent connections would otherwise hold the server open
+            for writer in list(self._writers):
+                writer.close()
+        self._executor.shutdown(wait=False)
 
-            except socket.timeout:
-                continue
-            except Exception as e:
-                self._log(f"Server error: {e}")
+    def _request_stop(self):
+        self.running = False
+        self._loop.call_soon_threadsafe(self._stopping.set)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one persistent connection.
+
+        The first request must carry the auth token; later ones on the
+        same connection don't need it. Each request runs as its own task,
+        so responses may come back in any order, matched by 'id'.
+        """
+        if self._connections >= self.max_connections:
+            writer.write(encode_frame({'id': None, 'event': 'result',
+                                       'data': {'error': 'Too many connections'}}))
+            writer.close()
+            return
+
+        self._connections += 1
+        self._writers.add(writer)
+        authenticated = False
+        tasks = set()
+
+        def send(message: Dict):
+            if not writer.is_closing():
+                writer.write(encode_frame(message))
 
-        server.close()
-        if self.socket_file.exists():
-            self.socket_file.unlink()
+        try:
+            while self.running:
+                try:
+                    command = await read_frame(reader, self.max_request_size)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except FrameError as e:
+                    send({'id': None, 'event': 'result', 'data': {'error': str(e)}})
+                    break
+
+                request_id = command.get('id')
+                if not authenticated:
+                    token = command.get('auth')
+                    if not isinstance(token, str) or not hmac.compare_digest(token, self.auth_token):
+                        send({'id': request_id, 'event': 'result',
+                              'data': {'error': 'Authentication failed'}})
+                        break
+                    authenticated = True
+
+                if command.get('type') == 'hello':
+                    send({'id': request_id, 'event': 'result', 'data': {'status': 'ok'}})
+                    continue
+                if command.get('type') == 'stop':
+                    # Answered here, before the server starts closing connections
+                    send({'id': request_id, 'event': 'result', 'data': {'status': 'stopping'}})
+                    await writer.drain()
+                    self._request_stop()
+                    break
+
+                task = asyncio.create_task(self._run_command(command, send, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            # Long operations keep running; their results just go nowhere
+            self._connections -= 1
+            self._writers.discard(writer)
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _run_command(self, command: Dict, send: Callable[[Dict], None],
+                           writer: asyncio.StreamWriter):
+        request_id = command.get('id')
+        loop = self._loop
+
+        last_sent = 0.0
+
+        def progress(stage: str, done: int, total: int):
+            # Called from the worker thread; at most ~10 events a second
+            nonlocal last_sent
+            now = time.monotonic()
+            if done < total and now - last_sent < PROGRESS_INTERVAL:
+                return
+            last_sent = now
+            loop.call_soon_threadsafe(send, {
+                'id': request_id, 'event': 'progress',
+                'data': {'stage': stage, 'done': done, 'total': total}
+            })
 
-    def _handle_client(self, client: socket.socket):
         try:
-            # Set timeout for client operations
-            client.settimeout(5.0)
-
-            # Receive data with size limit
-            data = client.recv(self.max_request_size).decode('utf-8')
-            command = json.loads(data)
-
-            # Validate authentication
-            if command.get('auth') != self.auth_token:
-                response = {'error': 'Authentication failed'}
-            else:
-                response = self._process_command(command)
-
-            client.send(json.dumps(response).encode('utf-8'))
-        except socket.timeout:
-            client.send(json.dumps({'error': 'Request timeout'}).encode('utf-8'))
-        except json.JSONDecodeError:
-            client.send(json.dumps({'error': 'Invalid JSON'}).encode('utf-8'))
+            response = await loop.run_in_executor(
+                self._executor, self._process_command, command, progress
+            )
         except Exception as e:
             self._log(f"Client error: {e}")
-            client.send(json.dumps({'error': 'Internal error'}).encode('utf-8'))
-        finally:
-            client.close()
+            response = {'error': 'Internal error'}
+
+        send({'id': request_id, 'event': 'result', 'data': response})
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
 
-    def _process_command(self, command: Dict) -> Dict:
+    def _process_command(self, command: Dict,
+                         progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
         cmd_type = command.get('type')
 
         if cmd_type == 'add_project':
@@ -233,8 +389,15 @@ class SaviorDaemon:
             return self._list_projects()
         elif cmd_type == 'status':
             return self._get_status()
+        elif cmd_type == 'backup':
+            return self._backup(command['path'], command.get('description', ''), progress)
+        elif cmd_type == 'restore':
+            return self._restore(command['path'], int(command.get('index', 0)),
+                                 bool(command.get('force')), progress)
+        elif cmd_type == 'sync':
+            return self._sync(command['path'], progress)
         elif cmd_type == 'stop':
-            self.stop()
+            self._request_stop()
             return {'status': 'stopping'}
         else:
             return {'error': f'Unknown command: {cmd_type}'}
@@ -244,112 +407,98 @@ class SaviorDaemon:
         if not self._validate_project_path(path):
             return {'error': 'Invalid or forbidden project path'}
 
-        projects = self._load_projects()
-
         # Limit number of projects
-        if len(projects) >= self.max_projects:
+        if len(self.scheduler) >= self.max_projects:
             return {'error': f'Maximum number of projects ({self.max_projects}) reached'}
 
-        if path in projects:
+        if path in self.scheduler:
             return {'error': 'Project already being watched'}
 
-        # Start watching process with resource limits
-        # Set resource limits for child process
-        import resource
-        def set_limits():
-            # Limit memory (500MB)
-            resource.setrlimit(resource.RLIMIT_AS, (500 * 1024 * 1024, 500 * 1024 * 1024))
-            # Limit CPU time (1 hour)
-            resource.setrlimit(resource.RLIMIT_CPU, (3600, 3600))
-
-        cmd = [
-            sys.executable, '-m', 'savior.cli', 'watch',
-            '--interval', str(min(options.get('interval', 20), 1440))  # Max 1 day interval
-        ]
-
-        if options.get('smart'):
-            cmd.append('--smart')
-        if options.get('incremental'):
-            cmd.append('--incremental')
-        if options.get('exclude_git'):
-            cmd.append('--exclude-git')
-
         try:
-            process = subprocess.Popen(
-                cmd,
-                cwd=path,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                start_new_session=True,
-                preexec_fn=None  # Temporarily disabled due to macOS compatibility issues
-            )
-
-            projects[path] = {
-                'pid': process.pid,
-                'started': datetime.now().isoformat(),
-                'options': options
-            }
-            self._save_projects(projects)
-            self.processes[path] = process
-
-            self._log(f"Added project: {path} (PID: {process.pid})")
-            return {'status': 'added', 'pid': process.pid}
+            project = self.scheduler.add(path, options)
         except Exception as e:
             return {'error': str(e)}
 
-    def _remove_project(self, path: str) -> Dict:
         projects = self._load_projects()
+        projects[path] = {
+            'started': project.started.isoformat(),
+            'options': options
+        }
+        self._save_projects(projects)
 
-        if path not in projects:
-            return {'error': 'Project not being watched'}
-
-        project = projects[path]
+        self._log(f"Added project: {path}")
+        return {'status': 'added', 'pid': os.getpid()}
 
-        # Kill the process
-        try:
-            os.kill(project['pid'], signal.SIGTERM)
-        except:
-            pass
+    def _remove_project(self, path: str) -> Dict:
+        if not self.scheduler.remove(path):
+            return {'error': 'Project not being watched'}
 
-        del projects[path]
+        projects = self._load_projects()
+        projects.pop(path, None)
         self._save_projects(projects)
 
-        if path in self.processes:
-            del self.processes[path]
-
         self._log(f"Removed project: {path}")
         return {'status': 'removed'}
 
     def _list_projects(self) -> Dict:
-        projects = self._load_projects()
-
-        # Check if processes are still running
-        for path, info in list(projects.items()):
-            if not psutil.pid_exists(info['pid']):
-                del projects[path]
-                self._save_projects(projects)
-
-        return {'projects': projects}
+        return {'projects': self.scheduler.projects()}
 
     def _get_status(self) -> Dict:
-        projects = self._load_projects()
+        projects = self.scheduler.projects()
         return {
             'daemon_pid': os.getpid(),
             'projects_count': len(projects),
+            'saving': sum(1 for info in projects.values() if info['running']),
+            'max_concurrent_backups': self.max_concurrent_backups,
             'running': True
         }
 
+    def _savior_for(self, path: str, enable_cloud: bool = False) -> Optional[Savior]:
+        """The watched project's Savior, or a new one for a valid path"""
+        if not self._validate_project_path(path) or not Path(path).is_dir():
+            return None
+        savior = self.scheduler.savior_for(path) if self.scheduler else None
+        if savior is None:
+            savior = Savior(Path(path), enable_cloud=enable_cloud)
+        elif enable_cloud and savior.cloud_storage is None:
+            savior = Savior(Path(path), exclude_git=savior.exclude_git, enable_cloud=True)
+        return savior
+
+    def _backup(self, path: str, description: str, progress=None) -> Dict:
+        savior = self._savior_for(path)
+        if savior is None:
+            return {'error': 'Invalid or forbidden project path'}
+        try:
+            backup = savior.create_backup(description or "Manual backup", show_progress=False,
+                                          progress=progress)
+        except Exception as e:
+            return {'error': str(e)}
+        self._log(f"Backed up {path}")
+        return {'status': 'saved', 'backup': backup.to_dict()}
+
+    def _restore(self, path: str, index: int, force: bool, progress=None) -> Dict:
+        savior = self._savior_for(path)
+        if savior is None:
+            return {'error': 'Invalid or forbidden project path'}
+        if not savior.restore_backup(index, force=force, progress=progress):
+            return {'error': 'Restore failed'}
+        self._log(f"Restored {path} from backup {index}")
+        return {'status': 'restored', 'stats': savior.last_restore_stats}
+
+    def _sync(self, path: str, progress=None) -> Dict:
+        savior = self._savior_for(path, enable_cloud=True)
+        if savior is None:
+            return {'error': 'Invalid or forbidden project path'}
+        return savior.sync_with_cloud(progress=progress)
+
     def stop(self):
         self._log("Stopping daemon")
         self.running = False
 
-        # Stop all project watchers
-        projects = self._load_projects()
-        for path, info in projects.items():
-            try:
-                os.kill(info['pid'], signal.SIGTERM)
-            except:
-                pass
+        # Stop all project watchers; projects.json keeps them for next start
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
 
         # Clean up
         if self.pid_file.exists():
@@ -359,11 +508,22 @@ class SaviorDaemon:
 
 
 class DaemonClient:
-    def __init__(self):
+    """Talks to the daemon over one persistent, authenticated connection.
+
+    The connection is opened on first use and reused for every command
+    until close(); if the daemon went away in between, it is reopened
+    once. Safe to share between threads: commands take turns.
+    """
+
+    def __init__(self, timeout: float = 5.0):
         self.config_dir = Path.home() / '.savior'
         self.socket_file = self.config_dir / 'daemon.sock'
         self.auth_file = self.config_dir / 'daemon.auth'
         self.auth_token = self._load_auth_token()
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._next_id = 0
+        self._lock = threading.Lock()
 
     def _load_auth_token(self) -> Optional[str]:
         """Load authentication token."""
@@ -375,28 +535,78 @@ class DaemonClient:
                 pass
         return None
 
-    def send_command(self, command: Dict) -> Dict:
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(str(self.socket_file))
+            # Authenticate once; later commands on this connection skip it
+            sock.sendall(encode_frame({'id': 0, 'type': 'hello', 'auth': self.auth_token}))
+            response = recv_frame(sock)
+        except Exception:
+            sock.close()
+            raise
+        error = response.get('data', {}).get('error')
+        if error:
+            sock.close()
+            raise PermissionError(error)
+        return sock
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def _request(self, command: Dict, on_progress: Optional[Callable[[Dict], None]],
+                 timeout: Optional[float]) -> Dict:
+        if self._sock is None:
+            self._sock = self._connect()
+        self._next_id += 1
+        request_id = self._next_id
+        self._sock.settimeout(timeout)
+        self._sock.sendall(encode_frame(dict(command, id=request_id)))
+        while True:
+            message = recv_frame(self._sock)
+            if message.get('id') not in (request_id, None):
+                continue  # Left over from a command that timed out
+            if message.get('event') == 'progress':
+                if on_progress:
+                    on_progress(message.get('data', {}))
+                continue
+            return message.get('data', {})
+
+    def send_command(self, command: Dict, on_progress: Optional[Callable[[Dict], None]] = None,
+                     timeout: Optional[float] = None) -> Dict:
+        """Send a command and wait for its result.
+
+        on_progress gets each progress event ({'stage', 'done', 'total'})
+        of a long operation. timeout bounds the wait for each message,
+        not the whole command; None uses the client's default.
+        """
         if not self.socket_file.exists():
             return {'error': 'Daemon not running'}
 
         if not self.auth_token:
             return {'error': 'Authentication token not found'}
 
-        # Add authentication to command
-        command['auth'] = self.auth_token
-
-        try:
-            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            client.settimeout(5.0)
-            client.connect(str(self.socket_file))
-
-            client.send(json.dumps(command).encode('utf-8'))
-            response = client.recv(4096).decode('utf-8')
-            client.close()
-
-            return json.loads(response)
-        except Exception as e:
-            return {'error': str(e)}
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    return self._request(command, on_progress, timeout)
+                except (ConnectionError, BrokenPipeError) as e:
+                    # A reused connection may have been closed by a restart
+                    if self._sock is not None:
+                        self._sock.close()
+                        self._sock = None
+                    if attempt:
+                        return {'error': str(e)}
+                except Exception as e:
+                    if self._sock is not None:
+                        self._sock.close()
+                        self._sock = None
+                    return {'error': str(e)}
 
     def add_project(self, path: str, **options) -> Dict:
         return self.send_command({
@@ -417,5 +627,30 @@ class DaemonClient:
     def status(self) -> Dict:
         return self.send_command({'type': 'status'})
 
+    def backup(self, path: str, description: str = '',
+               on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        return self.send_command({
+            'type': 'backup',
+            'path': path,
+            'description': description
+        }, on_progress, timeout=LONG_OPERATION_TIMEOUT)
+
+    def restore(self, path: str, index: int = 0, force: bool = False,
+                on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        return self.send_command({
+            'type': 'restore',
+            'path': path,
+            'index': index,
+            'force': force
+        }, on_progress, timeout=LONG_OPERATION_TIMEOUT)
+
+    def sync(self, path: str, on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        return self.send_command({
+            'type': 'sync',
+            'path': path
+        }, on_progress, timeout=LONG_OPERATION_TIMEOUT)
+
     def stop(self) -> Dict:
-        return self.send_command({'type': 'stop'})
\ No newline at end of file
+        result = self.send_command({'type': 'stop'})
+        self.close()
+        return result
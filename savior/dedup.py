@@ -1,226 +1,638 @@
 """Content-based deduplication for efficient backup storage."""
 
+import io
 import os
 import json
+import fcntl
 import hashlib
 import shutil
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Set, Optional, Tuple, List
+from typing import Dict, Set, Optional, Tuple, List, Iterable, Iterator
 from datetime import datetime
-import threading
 
+try:
+    from .hashing import get_hasher
+    from .chunking import Chunker, DEFAULT_MIN_SIZE, DEFAULT_AVG_SIZE, DEFAULT_MAX_SIZE
+    from .dedup_index import DedupIndex
+    from .packfile import PackStore, PackReader, HEADER, DEFAULT_MAX_PACK_SIZE
+    from .object_codec import ObjectCodec
+except ImportError:
+    from hashing import get_hasher
+    from chunking import Chunker, DEFAULT_MIN_SIZE, DEFAULT_AVG_SIZE, DEFAULT_MAX_SIZE
+    from dedup_index import DedupIndex
+    from packfile import PackStore, PackReader, HEADER, DEFAULT_MAX_PACK_SIZE
+    from object_codec import ObjectCodec
 
-class DeduplicationStore:
-    """Manages deduplicated storage of file content."""
 
-    def __init__(self, backup_dir: Path):
+class DeduplicationStore:
+    """Manages deduplicated storage of file content.
+
+    Small files are stored whole. Files of at least ``chunk_threshold``
+    bytes are split with content-defined chunking: each chunk is stored
+    once under its own hash and the file's index entry records the ordered
+    chunk list, so editing part of a large file only stores the chunks
+    around the edit.
+
+    Objects smaller than ``pack_threshold`` (small files and every chunk)
+    are appended to packfiles rather than written one file each; larger
+    ones stay loose under ``chunks/``. Dead objects in packs are reclaimed
+    by ``repack()``.
+
+    Each object is compressed on its own (see ObjectCodec) unless it comes
+    from a file type in SmartDeduplicator.SKIP_DEDUP_EXTENSIONS or samples
+    show it doesn't shrink.
+
+    The index, references and counters live in ``index.db`` (SQLite, WAL).
+    Wrap many store_file calls in ``batch()`` to commit them together, and
+    a whole backup (up to writing its manifest) in ``writing()`` so
+    garbage_collect() can't sweep its objects in between.
+    """
+
+    # Files at least this large are split into content-defined chunks
+    CHUNK_THRESHOLD = 1024 * 1024  # 1MB
+
+    # Objects smaller than this are stored in packfiles
+    PACK_THRESHOLD = 1024 * 1024  # 1MB
+
+    def __init__(self, backup_dir: Path, chunking: bool = True,
+                 chunk_threshold: int = CHUNK_THRESHOLD,
+                 min_chunk_size: int = DEFAULT_MIN_SIZE,
+                 avg_chunk_size: int = DEFAULT_AVG_SIZE,
+                 max_chunk_size: int = DEFAULT_MAX_SIZE,
+                 pack_threshold: int = PACK_THRESHOLD,
+                 max_pack_size: int = DEFAULT_MAX_PACK_SIZE,
+                 compression: bool = True):
         self.backup_dir = backup_dir
         self.store_dir = backup_dir / '.dedup_store'
         self.chunks_dir = self.store_dir / 'chunks'
+        self.packs_dir = self.store_dir / 'packs'
+        self.db_file = self.store_dir / 'index.db'
+        # Shared by backups while they write, exclusive for garbage_collect
+        self.lock_file = self.store_dir / 'lock'
+        # Legacy JSON files, migrated into db_file on first open
         self.index_file = self.store_dir / 'index.json'
         self.stats_file = self.store_dir / 'stats.json'
-        self._lock = threading.Lock()
-        self._index_cache: Optional[Dict] = None
+        self.chunking = chunking
+        self.chunk_threshold = chunk_threshold
+        self.chunker = Chunker(min_chunk_size, avg_chunk_size, max_chunk_size)
+        self.pack_threshold = pack_threshold
+        self.max_pack_size = max_pack_size
+        self.compression = compression
+        self._writers = 0
+        self._writers_fd: Optional[int] = None
+        self._writers_lock = threading.Lock()
         self._init_store()
 
     def _init_store(self):
-        """Initialize deduplication store directories."""
+        """Initialize deduplication store directories and index."""
         self.store_dir.mkdir(parents=True, exist_ok=True)
         self.chunks_dir.mkdir(parents=True, exist_ok=True)
 
-        # Initialize index if it doesn't exist
-        if not self.index_file.exists():
-            self._save_index({})
-
-        # Initialize stats if it doesn't exist
-        if not self.stats_file.exists():
-            self._save_stats({
-                'total_stored': 0,
-                'total_deduplicated': 0,
-                'space_saved': 0,
-                'dedup_ratio': 0.0
-            })
+        self.packs = PackStore(self.packs_dir, self.max_pack_size)
+        self.codec = ObjectCodec(self.store_dir / 'dicts')
+        self.index = DedupIndex(self.db_file)
+        self._migrate_json_index()
 
-    def _load_index(self) -> Dict:
-        """Load deduplication index from disk."""
-        if self._index_cache is not None:
-            return self._index_cache
+    def _migrate_json_index(self):
+        """One-time import of index.json/stats.json into the database."""
+        if not self.index_file.exists():
+            return
 
         try:
             with open(self.index_file, 'r') as f:
-                self._index_cache = json.load(f)
-                return self._index_cache
+                legacy_index = json.load(f)
         except (json.JSONDecodeError, IOError):
-            return {}
+            legacy_index = {}
+
+        legacy_stats = None
+        if self.stats_file.exists():
+            try:
+                with open(self.stats_file, 'r') as f:
+                    legacy_stats = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                pass
+
+        with self.index.batch():
+            self.index.import_entries(legacy_index)
+            if legacy_stats:
+                legacy_stats.setdefault('stored_bytes', legacy_stats.get('total_stored', 0))
+                self.index.set_stats(legacy_stats)
+
+        # Keep the old files around, but out of the way
+        self.index_file.rename(self.index_file.with_suffix('.json.migrated'))
+        if self.stats_file.exists():
+            self.stats_file.rename(self.stats_file.with_suffix('.json.migrated'))
+
+    @contextmanager
+    def batch(self):
+        """Commit every store/remove made inside the block in one transaction.
+
+        Pack appends are flushed before the index commits, so a committed
+        entry never points past the end of its pack.
+        """
+        with self.index.batch():
+            yield self
+            self.packs.flush()
+
+    @contextmanager
+    def writing(self):
+        """Keep garbage_collect() out while objects are being stored.
+
+        Objects are committed before the manifest that references them is
+        written; until then a sweep would see them as unreferenced. Holds a
+        shared lock on the store, so any number of backups (in this process
+        or others) can write at once.
+        """
+        with self._writers_lock:
+            if self._writers == 0:
+                fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_SH)
+                except OSError:
+                    os.close(fd)
+                    raise
+                self._writers_fd = fd
+            self._writers += 1
+        try:
+            yield self
+        finally:
+            with self._writers_lock:
+                self._writers -= 1
+                if self._writers == 0:
+                    os.close(self._writers_fd)  # Releases the lock
+                    self._writers_fd = None
+
+    @contextmanager
+    def _collecting(self):
+        """Exclusive lock on the store: waits for every writing() to end"""
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self.packs.close()
+        self.index.close()
+
+    def _load_index(self) -> Dict:
+        """Return the whole index as a {hash: entry} dict.
+
+        Materializes every row, so it is meant for inspection and tests;
+        store operations query the database directly.
+        """
+        return dict(self.index.entries())
 
     def _save_index(self, index: Dict):
-        """Save deduplication index to disk."""
-        with self._lock:
-            with open(self.index_file, 'w') as f:
-                json.dump(index, f, indent=2)
-            self._index_cache = index
+        """Replace the whole index with a {hash: entry} dict."""
+        with self.index.batch():
+            self.index.clear()
+            self.index.import_entries(index)
 
     def _load_stats(self) -> Dict:
         """Load deduplication statistics."""
-        try:
-            with open(self.stats_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {
-                'total_stored': 0,
-                'total_deduplicated': 0,
-                'space_saved': 0,
-                'dedup_ratio': 0.0
-            }
+        stats = self.index.get_stats()
+        stats['dedup_ratio'] = 0.0
+        return stats
 
     def _save_stats(self, stats: Dict):
         """Save deduplication statistics."""
-        with open(self.stats_file, 'w') as f:
-            json.dump(stats, f, indent=2)
+        self.index.set_stats(stats)
 
-    def _calculate_file_hash(self, file_path: Path, chunk_size: int = 65536) -> str:
+    def _calculate_file_hash(self, file_path: Path) -> str:
         """Calculate SHA256 hash of a file."""
-        hasher = hashlib.sha256()
-
         try:
-            with open(file_path, 'rb') as f:
-                while True:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
-                    hasher.update(chunk)
-            return hasher.hexdigest()
+            return get_hasher().hash_file(file_path, 'sha256')
         except (IOError, OSError):
             return None
 
     def _get_chunk_path(self, content_hash: str) -> Path:
         """Get storage path for a content chunk."""
         # Use first 2 chars as directory for better file system performance
-        subdir = self.chunks_dir / content_hash[:2]
-        subdir.mkdir(exist_ok=True)
-        return subdir / content_hash
+        return self.chunks_dir / content_hash[:2] / content_hash
 
-    def store_file(self, file_path: Path, backup_id: str) -> Optional[Dict]:
+    def _put_object(self, content_hash: str, size: int, first_seen: str,
+                    data: Optional[bytes] = None, source: Optional[Path] = None,
+                    compress: bool = True):
+        """Write a new object's data and index entry.
+
+        Small objects go into the active pack, larger ones are written (or
+        streamed from source) to their own file. Either way the data is
+        compressed when compress is set and it pays off.
+        """
+        compress = compress and self.compression
+
+        if size < self.pack_threshold:
+            if data is None:
+                with open(source, 'rb') as f:
+                    data = f.read()
+            codec, payload = self.codec.compress(data, compress)
+            location = self.packs.append(content_hash, payload)
+            self.index.put(content_hash, size, first_seen, location=location,
+                           codec=codec, stored_size=len(payload))
+            self.index.add_stats(stored_bytes=len(payload))
+            return
+
+        chunk_path = self._get_chunk_path(content_hash)
+        chunk_path.parent.mkdir(exist_ok=True)
+        with (open(source, 'rb') if data is None else io.BytesIO(data)) as src:
+            with open(chunk_path, 'wb') as dst:
+                codec, stored_size = self.codec.compress_file(src, dst, compress)
+        if codec is None and source is not None:
+            shutil.copystat(source, chunk_path)
+        self.index.put(
+            content_hash, size, first_seen,
+            chunk_path=str(chunk_path.relative_to(self.store_dir)),
+            codec=codec, stored_size=stored_size
+        )
+        self.index.add_stats(stored_bytes=stored_size)
+
+    def store_file(self, file_path: Path, content_hash: Optional[str] = None) -> Optional[Dict]:
         """
         Store a file with deduplication.
+        content_hash may be passed in when the caller has already hashed the
+        file (e.g. in a parallel batch).
+        Each call adds one reference; the caller records the returned
+        metadata in its backup's manifest, inside writing() if the store
+        may be garbage collected meanwhile.
         Returns metadata about the stored file.
         """
         if not file_path.exists() or not file_path.is_file():
             return None
 
         # Calculate file hash
-        content_hash = self._calculate_file_hash(file_path)
+        if content_hash is None:
+            content_hash = self._calculate_file_hash(file_path)
         if not content_hash:
             return None
 
         file_size = file_path.stat().st_size
-        chunk_path = self._get_chunk_path(content_hash)
 
-        # Load current index
-        index = self._load_index()
-
-        # Check if content already exists
-        if content_hash in index:
-            # Content already stored, just update references
-            if isinstance(index[content_hash]['refs'], list):
-                refs = set(index[content_hash]['refs'])
-            else:
-                refs = index[content_hash]['refs']
-            refs.add(backup_id)
-            index[content_hash]['refs'] = list(refs)  # Store as list for JSON
-            index[content_hash]['ref_count'] = len(refs)
-
-            # Update stats for deduplication
-            stats = self._load_stats()
-            stats['total_deduplicated'] += file_size
-            stats['space_saved'] += file_size
-            self._save_stats(stats)
-        else:
-            # New content, store it
-            try:
-                # Copy file to chunk store
-                shutil.copy2(file_path, chunk_path)
-
-                # Add to index
-                index[content_hash] = {
-                    'size': file_size,
-                    'refs': [backup_id],  # Store as list for JSON
-                    'ref_count': 1,
-                    'first_seen': datetime.now().isoformat(),
-                    'chunk_path': str(chunk_path.relative_to(self.store_dir))
-                }
-
-                # Update stats for new storage
-                stats = self._load_stats()
-                stats['total_stored'] += file_size
-                self._save_stats(stats)
-            except (IOError, OSError) as e:
-                return None
-
-        # Save updated index
-        self._save_index(index)
+        # Already-compressed formats are stored as they are
+        compress = file_path.suffix.lower() not in SmartDeduplicator.SKIP_DEDUP_EXTENSIONS
+
+        try:
+            with self.writing(), self.batch():
+                entry = self.index.get(content_hash)
+
+                # Check if content already exists
+                if entry is not None:
+                    # Content already stored, just update references
+                    ref_count = self.index.add_ref(content_hash)
+                    for chunk_hash in entry.get('chunks', []):
+                        self.index.add_ref(chunk_hash)
+
+                    # Update stats for deduplication
+                    self.index.add_stats(total_deduplicated=file_size, space_saved=file_size)
+                elif self.chunking and file_size >= self.chunk_threshold:
+                    # Large new content, store only the chunks not seen before
+                    entry = self._store_chunked(file_path, content_hash, file_size, compress)
+                    ref_count = 1
+                else:
+                    # New content, copy file to the store
+                    entry = {}
+                    self._put_object(
+                        content_hash, file_size, datetime.now().isoformat(),
+                        source=file_path, compress=compress
+                    )
+                    ref_count = self.index.add_ref(content_hash)
+
+                    # Update stats for new storage
+                    self.index.add_stats(total_stored=file_size)
+        except (IOError, OSError):
+            # Index changes for this file were rolled back
+            return None
 
         # Return metadata for manifest
-        return {
+        metadata = {
             'hash': content_hash,
             'size': file_size,
-            'deduplicated': content_hash in index and index[content_hash]['ref_count'] > 1
+            'deduplicated': ref_count > 1
         }
+        if 'chunks' in entry:
+            metadata['chunks'] = list(entry['chunks'])
+        return metadata
 
-    def retrieve_file(self, content_hash: str, destination: Path) -> bool:
-        """Retrieve a deduplicated file by its hash."""
-        index = self._load_index()
+    def _store_chunked(self, file_path: Path, content_hash: str, file_size: int,
+                       compress: bool = True) -> Dict:
+        """Split a file into content-defined chunks and store the new ones.
 
-        if content_hash not in index:
-            return False
+        Raises OSError if the file can't be read; the caller's batch then
+        rolls back the chunk references added so far.
+        """
+        chunk_hashes = []
+        stored = 0
+        reused = 0
+        now = datetime.now().isoformat()
+
+        with open(file_path, 'rb') as f:
+            for chunk in self.chunker.iter_chunks(f):
+                chunk_hash = hashlib.sha256(chunk).hexdigest()
+                chunk_hashes.append(chunk_hash)
+
+                if chunk_hash in self.index:
+                    self.index.add_ref(chunk_hash)
+                    reused += len(chunk)
+                    continue
+
+                self._put_object(chunk_hash, len(chunk), now, data=chunk, compress=compress)
+                self.index.add_ref(chunk_hash)
+                stored += len(chunk)
+
+        # The file entry is a recipe: no data of its own, just chunk order
+        self.index.put(content_hash, file_size, now, chunks=chunk_hashes)
+        self.index.add_ref(content_hash)
+
+        self.index.add_stats(total_stored=stored, total_deduplicated=reused, space_saved=reused)
+        return {'chunks': chunk_hashes}
+
+    def retrieve_file(self, content_hash: str, destination: Path,
+                      chunks: Optional[List[str]] = None) -> bool:
+        """Retrieve a deduplicated file by its hash.
+
+        Chunked files are reassembled by streaming their chunks in order;
+        chunks may be passed in from a manifest, otherwise the index recipe
+        is used.
+        """
+        with self.packs.reader() as reader:
+            return self._retrieve(content_hash, destination, chunks, reader)
 
-        chunk_path = self._get_chunk_path(content_hash)
+    def retrieve_files(self, items: Iterable[Tuple[str, Path, Optional[List[str]]]]) -> Dict[Path, bool]:
+        """Retrieve many files, given (hash, destination, chunks) triples.
 
-        if not chunk_path.exists():
+        Files are written in the order their data sits in the packs, so
+        restoring a whole backup reads each pack front to back instead of
+        seeking around it. Returns {destination: success}.
+        """
+        planned = []
+        for content_hash, destination, chunks in items:
+            entry = self.index.get(content_hash)
+            first = entry
+            if entry is not None:
+                recipe = chunks if chunks is not None else entry.get('chunks')
+                if recipe:
+                    first = self.index.get(recipe[0]) or entry
+            key = (first.get('pack', ''), first.get('offset', 0)) if first else ('', 0)
+            planned.append((key, content_hash, destination, chunks))
+
+        planned.sort(key=lambda item: item[0])
+
+        results = {}
+        with self.packs.reader() as reader:
+            for _, content_hash, destination, chunks in planned:
+                results[destination] = self._retrieve(content_hash, destination, chunks, reader)
+        return results
+
+    def _retrieve(self, content_hash: str, destination: Path,
+                  chunks: Optional[List[str]], reader: PackReader) -> bool:
+        entry = self.index.get(content_hash)
+
+        if entry is None:
             return False
 
+        if chunks is None:
+            chunks = entry.get('chunks')
+
+        if chunks is not None:
+            parts = [(chunk_hash, self.index.get(chunk_hash)) for chunk_hash in chunks]
+        else:
+            parts = [(content_hash, entry)]
+
+        # Check everything is present before touching the destination
+        for part_hash, part in parts:
+            if part is None:
+                return False
+            if 'pack' not in part and not self._get_chunk_path(part_hash).exists():
+                return False
+
         try:
             destination.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(chunk_path, destination)
+            if len(parts) == 1 and 'pack' not in parts[0][1] and 'codec' not in parts[0][1]:
+                shutil.copy2(self._get_chunk_path(parts[0][0]), destination)
+                return True
+
+            with open(destination, 'wb') as out:
+                for part_hash, part in parts:
+                    self._copy_object(part_hash, part, out, reader)
             return True
         except (IOError, OSError):
             return False
 
-    def remove_reference(self, content_hash: str, backup_id: str) -> bool:
+    def _copy_object(self, content_hash: str, entry: Dict, out, reader: PackReader):
+        """Write one stored object's data to an open file."""
+        codec = entry.get('codec')
+        if 'pack' in entry:
+            payload = reader.read(entry['pack'], entry['offset'], entry['length'])
+            out.write(self.codec.decompress(codec, payload))
+        else:
+            with open(self._get_chunk_path(content_hash), 'rb') as f:
+                self.codec.decompress_file(codec, f, out)
+
+    def remove_reference(self, content_hash: str) -> bool:
         """
-        Remove a reference to deduplicated content.
+        Remove one reference to deduplicated content.
         If no references remain, delete the content.
         """
-        index = self._load_index()
+        with self.index.batch():
+            entry = self.index.get(content_hash)
 
-        if content_hash not in index:
-            return False
+            if entry is None:
+                return False
 
-        # Convert to set, remove reference, convert back to list
-        refs = set(index[content_hash].get('refs', []))
-        refs.discard(backup_id)
-        index[content_hash]['refs'] = list(refs)
-        index[content_hash]['ref_count'] = len(refs)
+            for chunk_hash in entry.get('chunks', []):
+                chunk_entry = self.index.get(chunk_hash)
+                if chunk_entry is not None:
+                    self._drop_reference(chunk_hash, chunk_entry)
+            self._drop_reference(content_hash, entry)
 
+        return True
+
+    def _drop_reference(self, content_hash: str, entry: Dict):
+        """Decrement an entry's count, deleting it once unreferenced."""
         # If no more references, delete the chunk
-        if index[content_hash]['ref_count'] == 0:
+        if self.index.drop_ref(content_hash) == 0:
+            self._delete_object(content_hash, entry)
+
+    def _delete_object(self, content_hash: str, entry: Dict) -> int:
+        """Delete an object's data and index entry; returns bytes freed.
+
+        Packed objects only lose their index entry; the space they take in
+        the pack is reclaimed by repack().
+        """
+        if 'pack' not in entry:
             chunk_path = self._get_chunk_path(content_hash)
             try:
                 if chunk_path.exists():
                     chunk_path.unlink()
+            except (IOError, OSError):
+                return 0
+
+        # Recipes hold no data; their chunks are accounted for separately
+        freed = 0
+        if 'chunks' not in entry:
+            freed = entry.get('stored_size', entry['size'])
+            self.index.add_stats(total_stored=-entry['size'], stored_bytes=-freed)
+
+        # Remove from index
+        self.index.delete(content_hash)
+        return freed
+
+    def delete_backup(self, manifest: Dict) -> int:
+        """Release every reference held by one backup's manifest.
+
+        Only the objects listed in the manifest are touched. Returns the
+        number of objects deleted because nothing else referenced them.
+        """
+        deleted = 0
+        with self.index.batch():
+            for metadata in manifest.get('files', {}).values():
+                content_hash = metadata['hash']
+                entry = self.index.get(content_hash)
+                if entry is None:
+                    continue
+
+                for chunk_hash in metadata.get('chunks', entry.get('chunks', [])):
+                    chunk_entry = self.index.get(chunk_hash)
+                    if chunk_entry is not None and self.index.drop_ref(chunk_hash) == 0:
+                        self._delete_object(chunk_hash, chunk_entry)
+                        deleted += 1
+
+                if self.index.drop_ref(content_hash) == 0:
+                    self._delete_object(content_hash, entry)
+                    deleted += 1
+        return deleted
+
+    def garbage_collect(self, manifests: Iterable[Dict]) -> Dict:
+        """Mark-and-sweep the store against the given backup manifests.
+
+        Mark counts every reference the manifests make (files plus the
+        chunks of chunked files); sweep resets the stored counts to match
+        and deletes unreferenced objects and stray chunk files. Repairs any
+        drift left by backups whose manifests were removed directly.
+
+        Waits for backups still writing (see writing()), so every object
+        it keeps or sweeps belongs to a manifest that is already on disk.
+        """
+        with self._collecting():
+            return self._garbage_collect(manifests)
+
+    def _garbage_collect(self, manifests: Iterable[Dict]) -> Dict:
+        # Mark
+        counts: Dict[str, int] = {}
+        for manifest in manifests:
+            for metadata in manifest.get('files', {}).values():
+                content_hash = metadata['hash']
+                counts[content_hash] = counts.get(content_hash, 0) + 1
+
+                chunks = metadata.get('chunks')
+                if chunks is None:
+                    entry = self.index.get(content_hash)
+                    chunks = entry.get('chunks', []) if entry else []
+                for chunk_hash in chunks:
+                    counts[chunk_hash] = counts.get(chunk_hash, 0) + 1
+
+        # Sweep
+        deleted = 0
+        freed = 0
+        with self.index.batch():
+            for content_hash, entry in list(self.index.entries()):
+                if content_hash not in counts:
+                    freed += self._delete_object(content_hash, entry)
+                    deleted += 1
+            self.index.set_ref_counts(counts)
+
+        orphans = self.cleanup_orphaned_chunks()
+
+        return {
+            'live_objects': len(counts),
+            'deleted_objects': deleted,
+            'orphaned_files': orphans,
+            'bytes_freed': freed
+        }
+
+    def repack(self, min_live_ratio: float = 0.5) -> Dict:
+        """Reclaim space held by dead objects in packfiles.
 
-                # Update stats
-                stats = self._load_stats()
-                stats['total_stored'] -= index[content_hash]['size']
-                self._save_stats(stats)
+        Packs with nothing live are deleted. Packs whose live share has
+        dropped below min_live_ratio have their live objects copied into new
+        packs and are then deleted. Small objects still stored as loose
+        files are moved into packs as well.
 
-                # Remove from index
-                del index[content_hash]
+        Like garbage_collect, waits for backups still writing: a pack they
+        are appending to has no committed objects yet and would look dead.
+        """
+        with self._collecting():
+            return self._repack(min_live_ratio)
+
+    def _repack(self, min_live_ratio: float) -> Dict:
+        # Never rewrite into a pack that is being compacted
+        self.packs.seal()
+
+        sizes = self.packs.pack_sizes()
+        usage = self.index.pack_usage()
+
+        dead = []
+        sparse = []
+        for pack, size in sizes.items():
+            count, live = usage.get(pack, (0, 0))
+            if count == 0:
+                dead.append(pack)
+            elif (live + count * HEADER.size) < size * min_live_ratio:
+                sparse.append(pack)
+
+        loose = [
+            (content_hash, entry) for content_hash, entry in self.index.entries()
+            if 'pack' not in entry and 'chunks' not in entry
+            and entry['size'] < self.pack_threshold
+        ]
+
+        written = 0
+        packed = []
+        with self.batch():
+            with self.packs.reader() as reader:
+                for pack in sparse:
+                    for content_hash, offset, length in self.index.objects_in_pack(pack):
+                        data = reader.read(pack, offset, length)
+                        self.index.set_location(content_hash, *self.packs.append(content_hash, data))
+                        written += HEADER.size + length
+
+            for content_hash, entry in loose:
+                chunk_path = self._get_chunk_path(content_hash)
+                try:
+                    with open(chunk_path, 'rb') as f:
+                        data = f.read()
+                except (IOError, OSError):
+                    continue
+                self.index.set_location(content_hash, *self.packs.append(content_hash, data))
+                written += HEADER.size + len(data)
+                packed.append(content_hash)
+
+            # The old copies are deleted right after the commit
+            self.packs.flush(sync=True)
+
+        self.packs.seal()
+
+        reclaimed = 0
+        for pack in dead + sparse:
+            reclaimed += sizes[pack]
+            self.packs.delete_pack(pack)
+        for content_hash in packed:
+            chunk_path = self._get_chunk_path(content_hash)
+            try:
+                reclaimed += chunk_path.stat().st_size
+                chunk_path.unlink()
             except (IOError, OSError):
                 pass
 
-        self._save_index(index)
-        return True
+        return {
+            'packs_deleted': len(dead),
+            'packs_rewritten': len(sparse),
+            'objects_packed': len(packed),
+            'bytes_reclaimed': max(reclaimed - written, 0)
+        }
 
     def get_dedup_stats(self) -> Dict:
         """Get deduplication statistics."""
@@ -233,16 +645,20 @@ class DeduplicationStore:
         else:
             stats['dedup_ratio'] = 0.0
 
+        # Compression is measured on the unique data only, so it is
+        # independent of how much deduplication saved
+        if stats['total_stored'] > 0:
+            stats['compression_ratio'] = 1 - stats['stored_bytes'] / stats['total_stored']
+        else:
+            stats['compression_ratio'] = 0.0
+
         # Add current index stats
-        index = self._load_index()
-        stats['unique_chunks'] = len(index)
-        stats['total_references'] = sum(item['ref_count'] for item in index.values())
+        stats.update(self.index.counts())
 
         return stats
 
     def cleanup_orphaned_chunks(self) -> int:
         """Remove chunks that have no references."""
-        index = self._load_index()
         cleaned = 0
 
         # Find orphaned chunks in the filesystem
@@ -253,7 +669,7 @@ class DeduplicationStore:
                         chunk_hash = chunk_file.name
 
                         # If not in index or has no refs, delete
-                        if chunk_hash not in index or index[chunk_hash]['ref_count'] == 0:
+                        if self.index.ref_count(chunk_hash) == 0:
                             try:
                                 chunk_file.unlink()
                                 cleaned += 1
@@ -297,7 +713,8 @@ class DedupBackupManifest:
         manifest['stats'] = {
             'total_files': len(files),
             'total_size': sum(m['size'] for m in files.values()),
-            'deduplicated_files': sum(1 for m in files.values() if m.get('deduplicated', False))
+            'deduplicated_files': sum(1 for m in files.values() if m.get('deduplicated', False)),
+            'chunked_files': sum(1 for m in files.values() if 'chunks' in m)
         }
 
         # Save manifest
@@ -340,6 +757,29 @@ class DedupBackupManifest:
 
         return sorted(manifests, key=lambda m: m['timestamp'], reverse=True)
 
+    def iter_manifests(self) -> Iterator[Dict]:
+        """Yield every full manifest, for garbage collection.
+
+        Raises ValueError on an unreadable manifest: skipping it would let
+        GC delete content that backup still needs.
+        """
+        for manifest_file in sorted(self.manifests_dir.glob('*.json')):
+            try:
+                with open(manifest_file, 'r') as f:
+                    yield json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                raise ValueError(f"Unreadable manifest {manifest_file.name}: {e}")
+
+    def delete_manifest(self, backup_id: str) -> bool:
+        """Delete a backup manifest."""
+        manifest_path = self.manifests_dir / f"{backup_id}.json"
+
+        try:
+            manifest_path.unlink()
+            return True
+        except (IOError, OSError):
+            return False
+
 
 class SmartDeduplicator:
     """Smart deduplication with file type awareness."""
@@ -0,0 +1,295 @@
+"""SQLite-backed index for the deduplication store."""
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# total_stored counts object bytes before compression, stored_bytes after
+STAT_KEYS = ('total_stored', 'total_deduplicated', 'space_saved', 'stored_bytes')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    first_seen TEXT,
+    chunk_path TEXT,
+    chunks TEXT,
+    pack TEXT,
+    pack_offset INTEGER,
+    pack_length INTEGER,
+    codec TEXT,
+    stored_size INTEGER
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS stats (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class DedupIndex:
+    """Object index, reference counts and counters in a single WAL database.
+
+    Every lookup and update touches one row by primary key, so the cost of
+    storing a file no longer depends on how big the index is. Mutations
+    outside ``batch()`` commit on their own; inside it they share one
+    transaction.
+
+    Only a count of references is kept per object. Which backups use an
+    object is recorded in the backup manifests, which are the source of
+    truth for garbage collection.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(
+            str(db_path), isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._migrate_columns()
+        self._conn.execute('CREATE INDEX IF NOT EXISTS objects_pack ON objects (pack)')
+        with self.batch():
+            # Per-backup reference lists were replaced by counts; the
+            # counts were kept in step, so the old table can just go
+            self._conn.execute('DROP TABLE IF EXISTS refs')
+            # Everything stored before compression existed is stored raw
+            self._conn.execute(
+                "INSERT OR IGNORE INTO stats (key, value) "
+                "SELECT 'stored_bytes', value FROM stats WHERE key = 'total_stored'"
+            )
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO stats (key, value) VALUES (?, 0)',
+                [(key,) for key in STAT_KEYS]
+            )
+
+    def _migrate_columns(self):
+        """Add columns introduced after the database was created."""
+        existing = {row[1] for row in self._conn.execute('PRAGMA table_info(objects)')}
+        for column, kind in (('pack', 'TEXT'), ('pack_offset', 'INTEGER'), ('pack_length', 'INTEGER'),
+                             ('codec', 'TEXT'), ('stored_size', 'INTEGER')):
+            if column not in existing:
+                self._conn.execute(f'ALTER TABLE objects ADD COLUMN {column} {kind}')
+
+    @contextmanager
+    def batch(self):
+        """Group every update made inside the block into one transaction.
+
+        Nested batches become savepoints, so a failure inside one only
+        undoes that block's changes.
+        """
+        with self._lock:
+            depth = self._depth
+            if depth == 0:
+                self._conn.execute('BEGIN')
+            else:
+                self._conn.execute(f'SAVEPOINT batch_{depth}')
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if depth == 0:
+                    self._conn.execute('ROLLBACK')
+                else:
+                    self._conn.execute(f'ROLLBACK TO batch_{depth}')
+                    self._conn.execute(f'RELEASE batch_{depth}')
+                raise
+            self._depth -= 1
+            if depth == 0:
+                self._conn.execute('COMMIT')
+            else:
+                self._conn.execute(f'RELEASE batch_{depth}')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    COLUMNS = ('size, ref_count, first_seen, chunk_path, chunks, '
+               'pack, pack_offset, pack_length, codec, stored_size')
+
+    def _row_to_entry(self, row) -> Dict:
+        size, ref_count, first_seen, chunk_path, chunks, pack, offset, length, codec, stored_size = row
+        entry = {'size': size, 'ref_count': ref_count, 'first_seen': first_seen}
+        if chunk_path is not None:
+            entry['chunk_path'] = chunk_path
+        if chunks is not None:
+            entry['chunks'] = json.loads(chunks)
+        if pack is not None:
+            entry['pack'] = pack
+            entry['offset'] = offset
+            entry['length'] = length
+        if codec is not None:
+            entry['codec'] = codec
+        if stored_size is not None:
+            entry['stored_size'] = stored_size
+        return entry
+
+    def get(self, content_hash: str) -> Optional[Dict]:
+        """Return the entry for a hash, or None if it isn't stored."""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {self.COLUMNS} FROM objects WHERE hash = ?', (content_hash,)
+            ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def __contains__(self, content_hash: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM objects WHERE hash = ?', (content_hash,)
+            ).fetchone() is not None
+
+    def put(self, content_hash: str, size: int, first_seen: str,
+            chunk_path: Optional[str] = None, chunks: Optional[List[str]] = None,
+            location: Optional[Tuple[str, int, int]] = None,
+            codec: Optional[str] = None, stored_size: Optional[int] = None):
+        """Insert or replace an object entry (its reference count is kept).
+
+        location is (pack, offset, length) for objects stored in a pack;
+        codec and stored_size describe how the data was compressed.
+        """
+        pack, offset, length = location or (None, None, None)
+        with self.batch():
+            self._conn.execute(
+                'INSERT INTO objects (hash, size, ref_count, first_seen, chunk_path, chunks, '
+                'pack, pack_offset, pack_length, codec, stored_size) '
+                'VALUES (?, ?, 0, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(hash) DO UPDATE SET size = excluded.size, '
+                'first_seen = excluded.first_seen, chunk_path = excluded.chunk_path, '
+                'chunks = excluded.chunks, pack = excluded.pack, '
+                'pack_offset = excluded.pack_offset, pack_length = excluded.pack_length, '
+                'codec = excluded.codec, stored_size = excluded.stored_size',
+                (content_hash, size, first_seen, chunk_path,
+                 json.dumps(chunks) if chunks is not None else None,
+                 pack, offset, length, codec, stored_size)
+            )
+
+    def set_location(self, content_hash: str, pack: str, offset: int, length: int):
+        """Point an object at a new place in a pack (used by repacking)."""
+        with self.batch():
+            self._conn.execute(
+                'UPDATE objects SET pack = ?, pack_offset = ?, pack_length = ?, '
+                'chunk_path = NULL WHERE hash = ?',
+                (pack, offset, length, content_hash)
+            )
+
+    def objects_in_pack(self, pack: str) -> List[Tuple[str, int, int]]:
+        """(hash, offset, length) of every live object in a pack, in file order."""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT hash, pack_offset, pack_length FROM objects '
+                'WHERE pack = ? ORDER BY pack_offset', (pack,)
+            ).fetchall()
+
+    def pack_usage(self) -> Dict[str, Tuple[int, int]]:
+        """(live object count, live data bytes) per pack."""
+        with self._lock:
+            return {
+                pack: (count, size) for pack, count, size in self._conn.execute(
+                    'SELECT pack, COUNT(*), SUM(pack_length) FROM objects '
+                    'WHERE pack IS NOT NULL GROUP BY pack'
+                )
+            }
+
+    def add_ref(self, content_hash: str, count: int = 1) -> int:
+        """Increment an object's reference count; returns the new count."""
+        with self.batch():
+            self._conn.execute(
+                'UPDATE objects SET ref_count = ref_count + ? WHERE hash = ?',
+                (count, content_hash)
+            )
+            return self.ref_count(content_hash)
+
+    def drop_ref(self, content_hash: str, count: int = 1) -> int:
+        """Decrement an object's reference count; returns the new count."""
+        with self.batch():
+            self._conn.execute(
+                'UPDATE objects SET ref_count = MAX(ref_count - ?, 0) WHERE hash = ?',
+                (count, content_hash)
+            )
+            return self.ref_count(content_hash)
+
+    def ref_count(self, content_hash: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT ref_count FROM objects WHERE hash = ?', (content_hash,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def set_ref_counts(self, counts: Dict[str, int]):
+        """Overwrite reference counts, zeroing every object not in counts."""
+        with self.batch():
+            self._conn.execute('UPDATE objects SET ref_count = 0')
+            self._conn.executemany(
+                'UPDATE objects SET ref_count = ? WHERE hash = ?',
+                [(count, content_hash) for content_hash, count in counts.items()]
+            )
+
+    def delete(self, content_hash: str):
+        """Remove an object entry."""
+        with self.batch():
+            self._conn.execute('DELETE FROM objects WHERE hash = ?', (content_hash,))
+
+    def clear(self):
+        with self.batch():
+            self._conn.execute('DELETE FROM objects')
+
+    def entries(self) -> Iterator:
+        """Yield (hash, entry) for every object."""
+        with self._lock:
+            rows = self._conn.execute(f'SELECT hash, {self.COLUMNS} FROM objects').fetchall()
+        for row in rows:
+            yield row[0], self._row_to_entry(row[1:])
+
+    def counts(self) -> Dict:
+        """Aggregate object and reference counts."""
+        with self._lock:
+            plain, chunked, references = self._conn.execute(
+                'SELECT '
+                'COALESCE(SUM(chunks IS NULL), 0), '
+                'COALESCE(SUM(chunks IS NOT NULL), 0), '
+                'COALESCE(SUM(ref_count), 0) FROM objects'
+            ).fetchone()
+        return {'unique_chunks': plain, 'chunked_files': chunked, 'total_references': references}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self._conn.execute('SELECT key, value FROM stats'))
+
+    def add_stats(self, **deltas):
+        """Increment counters, e.g. add_stats(total_stored=1024)."""
+        with self.batch():
+            self._conn.executemany(
+                'UPDATE stats SET value = value + ? WHERE key = ?',
+                [(delta, key) for key, delta in deltas.items() if delta]
+            )
+
+    def set_stats(self, stats: Dict):
+        with self.batch():
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO stats (key, value) VALUES (?, ?)',
+                [(key, int(stats.get(key, 0))) for key in STAT_KEYS]
+            )
+
+    def import_entries(self, index: Dict):
+        """Bulk load a legacy {hash: entry} dict (index.json format)."""
+        with self.batch():
+            for content_hash, entry in index.items():
+                location = None
+                if 'pack' in entry:
+                    location = (entry['pack'], entry['offset'], entry['length'])
+                self.put(
+                    content_hash, entry['size'], entry.get('first_seen'),
+                    entry.get('chunk_path'), entry.get('chunks'), location,
+                    entry.get('codec'), entry.get('stored_size')
+                )
+                ref_count = entry.get('ref_count', len(entry.get('refs', [])))
+                self.add_ref(content_hash, ref_count)
@@ -0,0 +1,269 @@
+"""Cloud sync for the deduplication store.
+
+Only objects the cloud doesn't have yet are uploaded. Remote layout,
+under <project>/dedup/:
+
+    packs/<segment>.pack        up to SEGMENT_SIZE of objects one sync uploaded, back to back
+    index/<segment>.json        {hash: [offset, length, size, codec]} for that pack
+    manifests/<backup id>.json  backup manifests, as stored locally
+    dicts/<id>.zdict            zstd dictionaries objects were compressed with
+
+Objects go up as stored, already compressed. A pack is uploaded before
+its index segment, and manifests after every object they reference, so
+an interrupted sync never leaves a remote manifest pointing at data the
+cloud doesn't have.
+
+Which objects the cloud holds is cached in remote.db next to the store's
+index, so a sync only downloads the index segments it hasn't seen.
+"""
+
+import json
+import shutil
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Set
+
+REMOTE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    segment TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS objects_segment ON objects (segment);
+"""
+
+COPY_BLOCK = 1024 * 1024
+
+
+class RemoteObjectCache:
+    """The object hashes a remote dedup store holds, by index segment.
+
+    remote identifies the bucket and prefix; if it changes (the cloud
+    was reconfigured) the cache is emptied and rebuilt from the remote.
+    """
+
+    def __init__(self, db_path: Path, remote: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(REMOTE_SCHEMA)
+
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'remote'").fetchone()
+        if row is None or row[0] != remote:
+            with self._conn:
+                self._conn.execute('BEGIN')
+                self._conn.execute('DELETE FROM objects')
+                self._conn.execute('DELETE FROM segments')
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('remote', ?)",
+                                   (remote,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def segments(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute('SELECT name FROM segments')}
+
+    def add_segment(self, name: str, hashes: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.execute('INSERT OR IGNORE INTO segments (name) VALUES (?)', (name,))
+            self._conn.executemany('INSERT OR REPLACE INTO objects (hash, segment) VALUES (?, ?)',
+                                   [(content_hash, name) for content_hash in hashes])
+
+    def drop_segment(self, name: str):
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN')
+            self._conn.execute('DELETE FROM objects WHERE segment = ?', (name,))
+            self._conn.execute('DELETE FROM segments WHERE name = ?', (name,))
+
+    def missing(self, hashes: Iterable[str]) -> Set[str]:
+        """The hashes the remote doesn't have."""
+        with self._lock:
+            return {content_hash for content_hash in hashes
+                    if self._conn.execute('SELECT 1 FROM objects WHERE hash = ?',
+                                          (content_hash,)).fetchone() is None}
+
+
+class DedupCloudSync:
+    """Uploads a dedup store's manifests and missing objects to a CloudStorage."""
+
+    FOLDER = 'dedup'
+
+    # Objects are staged locally one pack at a time, so a sync never needs
+    # more scratch space than this, whatever it uploads
+    SEGMENT_SIZE = 128 * 1024 * 1024
+
+    def __init__(self, storage, store, manifests_dir: Path, project_name: str):
+        self.storage = storage
+        self.store = store
+        self.manifests_dir = manifests_dir
+        self.prefix = f"{project_name}/{self.FOLDER}"
+
+        config = storage.config
+        remote = '|'.join((config.get('provider', ''), config.get('endpoint', ''),
+                           config.get('bucket', ''), self.prefix))
+        self.cache = RemoteObjectCache(store.store_dir / 'remote.db', remote)
+
+    def close(self):
+        self.cache.close()
+
+    def _remote_names(self, folder: str, suffix: str) -> Set[str]:
+        base = f"{self.prefix}/{folder}/"
+        return {obj['key'][len(base):-len(suffix)] for obj in self.storage.list_keys(base)
+                if obj['key'].endswith(suffix)}
+
+    def refresh(self):
+        """Bring the cache in line with the index segments in the cloud."""
+        remote = self._remote_names('index', '.json')
+        known = self.cache.segments()
+        for name in known - remote:
+            self.cache.drop_segment(name)
+        for name in sorted(remote - known):
+            segment = json.loads(self.storage.read_object(f"{self.prefix}/index/{name}.json"))
+            self.cache.add_segment(name, segment)
+
+    def _needed(self, manifest: Dict) -> Set[str]:
+        """Hashes of the stored objects a manifest's files are made of"""
+        needed = set()
+        for metadata in manifest.get('files', {}).values():
+            chunks = metadata.get('chunks')
+            if chunks is None:
+                entry = self.store.index.get(metadata['hash'])
+                chunks = entry.get('chunks') if entry else None
+            needed.update(chunks or [metadata['hash']])
+        return needed
+
+    def sync(self) -> Dict:
+        """Upload every local manifest the cloud lacks, with its missing objects.
+
+        Returns counts of manifests and objects uploaded, objects skipped
+        because the cloud already had them, bytes sent and any errors.
+        """
+        stats = {'manifests': 0, 'objects': 0, 'skipped_objects': 0, 'bytes': 0, 'errors': []}
+
+        self.refresh()
+        remote_manifests = self._remote_names('manifests', '.json')
+
+        pending = {}
+        for path in sorted(self.manifests_dir.glob('*.json')):
+            if path.stem in remote_manifests:
+                continue
+            try:
+                with open(path) as f:
+                    pending[path.stem] = (path, json.load(f))
+            except (json.JSONDecodeError, IOError) as e:
+                stats['errors'].append(f"Unreadable manifest {path.name}: {e}")
+        if not pending:
+            return stats
+
+        needed = {backup_id: self._needed(manifest) for backup_id, (_, manifest) in pending.items()}
+        all_needed = set().union(*needed.values())
+        missing = self.cache.missing(all_needed)
+        stats['skipped_objects'] = len(all_needed) - len(missing)
+
+        unavailable = self._upload_objects(missing, stats) if missing else set()
+
+        for backup_id, (path, _) in pending.items():
+            if needed[backup_id] & unavailable:
+                stats['errors'].append(f"{backup_id}: objects missing from the local store")
+                continue
+            data = path.read_bytes()
+            self.storage.put_object(f"{self.prefix}/manifests/{backup_id}.json", data)
+            stats['manifests'] += 1
+            stats['bytes'] += len(data)
+        return stats
+
+    def _upload_objects(self, hashes: Set[str], stats: Dict) -> Set[str]:
+        """Upload objects as packs of up to SEGMENT_SIZE, each with its index segment.
+
+        Returns the hashes that couldn't be uploaded because the local
+        store doesn't have their data.
+        """
+        # Shared store lock: GC and repack would otherwise delete or move
+        # the packs and loose files being read
+        with self.store.writing():
+            unavailable = set()
+            entries = {}
+            for content_hash in hashes:
+                entry = self.store.index.get(content_hash)
+                if entry is None or 'chunks' in entry:
+                    unavailable.add(content_hash)
+                elif 'pack' not in entry and not self.store._get_chunk_path(content_hash).exists():
+                    unavailable.add(content_hash)
+                else:
+                    entries[content_hash] = entry
+            if not entries:
+                return unavailable
+
+            self._upload_dicts(entries.values(), stats)
+
+            # Read the local packs front to back; loose objects go last
+            order = sorted(entries.items(), key=lambda item: ('pack' not in item[1],
+                                                              item[1].get('pack', ''),
+                                                              item[1].get('offset', 0)))
+            self.store.packs.flush()
+            with self.store.packs.reader() as reader:
+                batch = []
+                batch_size = 0
+                for content_hash, entry in order:
+                    batch.append((content_hash, entry))
+                    batch_size += entry.get('length') or entry.get('stored_size') or entry['size']
+                    if batch_size >= self.SEGMENT_SIZE:
+                        self._upload_segment(batch, reader, stats)
+                        batch = []
+                        batch_size = 0
+                if batch:
+                    self._upload_segment(batch, reader, stats)
+            return unavailable
+
+    def _upload_segment(self, batch, reader, stats: Dict):
+        """Upload one pack of objects, then the index segment that lists them"""
+        segment = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        pack_path = self.store.store_dir / f".upload-{segment}.pack"
+        index = {}
+        try:
+            with open(pack_path, 'wb') as out:
+                for content_hash, entry in batch:
+                    offset = out.tell()
+                    if 'pack' in entry:
+                        out.write(reader.read(entry['pack'], entry['offset'], entry['length']))
+                    else:
+                        with open(self.store._get_chunk_path(content_hash), 'rb') as f:
+                            shutil.copyfileobj(f, out, COPY_BLOCK)
+                    index[content_hash] = [offset, out.tell() - offset, entry['size'], entry.get('codec')]
+
+            self.storage.upload_file(pack_path, f"{self.prefix}/packs/{segment}.pack")
+            stats['bytes'] += pack_path.stat().st_size
+        finally:
+            pack_path.unlink(missing_ok=True)
+
+        data = json.dumps(index).encode()
+        self.storage.put_object(f"{self.prefix}/index/{segment}.json", data)
+        self.cache.add_segment(segment, index)
+        stats['objects'] += len(index)
+        stats['bytes'] += len(data)
+
+    def _upload_dicts(self, entries: Iterable[Dict], stats: Dict):
+        """Upload the zstd dictionaries these objects need, if the cloud lacks them"""
+        dict_ids = {entry['codec'].partition(':')[2] for entry in entries
+                    if entry.get('codec') and ':' in entry['codec']}
+        if not dict_ids:
+            return
+        for dict_id in sorted(dict_ids - self._remote_names('dicts', '.zdict')):
+            data = (self.store.codec.dicts_dir / f"{dict_id}.zdict").read_bytes()
+            self.storage.put_object(f"{self.prefix}/dicts/{dict_id}.zdict", data)
+            stats['bytes'] += len(data)
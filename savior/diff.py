@@ -1,23 +1,38 @@
 import difflib
-import tarfile
 import tempfile
 import shutil
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from colorama import Fore, Style
 import fnmatch
 
+try:
+    from .archive import backup_file_digests, extract_backup_files
+    from .hashing import get_hasher
+except ImportError:
+    from archive import backup_file_digests, extract_backup_files
+    from hashing import get_hasher
+
 
 class BackupDiffer:
     def __init__(self):
         self.ignore_patterns = ['.git/', '__pycache__/', '*.pyc', '.DS_Store']
 
-    def extract_backup(self, backup_path: Path) -> Path:
+    def extract_backup(self, backup_path: Path, names: Optional[Iterable[str]] = None) -> Path:
+        """Extract a backup (or just the named files) to a temp directory"""
         temp_dir = Path(tempfile.mkdtemp(prefix='savior_diff_'))
-        with tarfile.open(backup_path, 'r:gz') as tar:
-            tar.extractall(temp_dir)
+        if names is None:
+            names = backup_file_digests(backup_path)
+        extract_backup_files(backup_path, names, temp_dir)
         return temp_dir
 
+    def _listing(self, backup_path: Path) -> Dict[str, Optional[str]]:
+        """{file: sha256} for comparable files; hashes are None without an index"""
+        return {
+            name: digest for name, digest in backup_file_digests(backup_path).items()
+            if self.should_compare(name)
+        }
+
     def should_compare(self, path: str) -> bool:
         for pattern in self.ignore_patterns:
             if fnmatch.fnmatch(path, pattern):
@@ -57,30 +72,26 @@ class BackupDiffer:
         return '\n'.join(output)
 
     def diff_backups(self, backup1_path: Path, backup2_path: Path) -> Tuple[List[str], List[str], List[str], List[Tuple[str, str]]]:
-        temp1 = self.extract_backup(backup1_path)
-        temp2 = self.extract_backup(backup2_path)
-
-        files1 = set()
-        files2 = set()
+        listing1 = self._listing(backup1_path)
+        listing2 = self._listing(backup2_path)
 
-        for path in temp1.rglob('*'):
-            if path.is_file():
-                rel_path = path.relative_to(temp1)
-                if self.should_compare(str(rel_path)):
-                    files1.add(str(rel_path))
-
-        for path in temp2.rglob('*'):
-            if path.is_file():
-                rel_path = path.relative_to(temp2)
-                if self.should_compare(str(rel_path)):
-                    files2.add(str(rel_path))
+        files1 = set(listing1)
+        files2 = set(listing2)
 
         added = list(files2 - files1)
         deleted = list(files1 - files2)
         modified = []
         diffs = []
 
-        for file in files1 & files2:
+        # Files whose indexed hashes match can't differ; extract the rest
+        candidates = [
+            file for file in files1 & files2
+            if listing1[file] is None or listing1[file] != listing2[file]
+        ]
+        temp1 = self.extract_backup(backup1_path, candidates)
+        temp2 = self.extract_backup(backup2_path, candidates)
+
+        for file in candidates:
             file1 = temp1 / file
             file2 = temp2 / file
 
@@ -95,17 +106,11 @@ class BackupDiffer:
         return added, deleted, modified, diffs
 
     def diff_backup_with_current(self, backup_path: Path, project_dir: Path) -> Tuple[List[str], List[str], List[str], List[Tuple[str, str]]]:
-        temp = self.extract_backup(backup_path)
+        listing = self._listing(backup_path)
 
-        files_backup = set()
+        files_backup = set(listing)
         files_current = set()
 
-        for path in temp.rglob('*'):
-            if path.is_file():
-                rel_path = path.relative_to(temp)
-                if self.should_compare(str(rel_path)):
-                    files_backup.add(str(rel_path))
-
         for path in project_dir.rglob('*'):
             if path.is_file():
                 try:
@@ -120,7 +125,20 @@ class BackupDiffer:
         modified = []
         diffs = []
 
-        for file in files_backup & files_current:
+        # Hashing a local file is much cheaper than extracting it, so skip
+        # the ones that still match the backup's index
+        common = files_backup & files_current
+        current_hashes = get_hasher().hash_files(
+            [project_dir / file for file in common if listing[file] is not None], 'sha256'
+        )
+        candidates = [
+            file for file in common
+            if listing[file] is None or current_hashes.get(project_dir / file) != listing[file]
+        ]
+
+        temp = self.extract_backup(backup_path, candidates)
+
+        for file in candidates:
             file_backup = temp / file
             file_current = project_dir / file
 
@@ -131,4 +149,4 @@ class BackupDiffer:
 
         shutil.rmtree(temp)
 
-        return added, deleted, modified, diffs
\ No newline at end of file
+        return added, deleted, modified, diffs
@@ -0,0 +1,197 @@
+"""Ranged, parallel downloads of backups from cloud storage.
+
+An object is fetched as a series of byte ranges. The next `window` ranges
+are requested ahead on a thread pool while the current one is consumed,
+and RangedReader hands them out in order as a plain read-only stream. It
+can be copied to disk or fed straight into a restore, and memory stays
+at about window * part size whatever the size of the backup.
+"""
+
+import io
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+try:
+    from .uploader import PART_SIZE, DEFAULT_CONCURRENCY
+    from .throttle import get_throttle
+except ImportError:
+    from uploader import PART_SIZE, DEFAULT_CONCURRENCY
+    from throttle import get_throttle
+
+COPY_BLOCK = 1024 * 1024
+
+
+def _total_size(content_range: Optional[str]) -> Optional[int]:
+    """Object size from a Content-Range header ('bytes 0-99/1234')"""
+    if not content_range or '/' not in content_range:
+        return None
+    total = content_range.rsplit('/', 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+class S3Source:
+    """Download source for boto3 S3 clients (AWS and S3-compatible stores)."""
+
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    def read_range(self, key: str, start: int, end: int) -> Tuple[bytes, Optional[int]]:
+        """Bytes start..end (inclusive) of an object, and its total size if known"""
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=f'bytes={start}-{end}')
+        return response['Body'].read(), _total_size(response.get('ContentRange'))
+
+
+class LocalSource:
+    """Download source for a LocalStorageClient (NAS or shared drive)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def read_range(self, key: str, start: int, end: int) -> Tuple[bytes, Optional[int]]:
+        with open(Path(self.client.base_path) / key, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start + 1), os.fstat(f.fileno()).st_size
+
+
+class RangedReader(io.RawIOBase):
+    """Sequential read-only stream over an object, fetched range by range.
+
+    The first range is fetched up front to learn the object's size; later
+    ranges are requested `window` at a time on pool and consumed in order.
+    """
+
+    def __init__(self, source, key: str, pool: ThreadPoolExecutor,
+                 part_size: int = PART_SIZE, window: int = DEFAULT_CONCURRENCY):
+        self.source = source
+        self.key = key
+        self.part_size = part_size
+        self.window = max(1, window)
+        self._pool = pool
+        self._pending = deque()
+
+        first, total = source.read_range(key, 0, part_size - 1)
+        # A store that ignores Range sends the whole object with no size
+        self.size = total if total is not None else len(first)
+        self._current = first
+        self._offset = 0
+        self._next_start = len(first)
+        self._fill()
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self):
+        while len(self._pending) < self.window and self._next_start < self.size:
+            end = min(self._next_start + self.part_size, self.size) - 1
+            self._pending.append(self._pool.submit(self._fetch, self._next_start, end))
+            self._next_start = end + 1
+
+    def _fetch(self, start: int, end: int) -> bytes:
+        get_throttle().network.consume(end - start + 1)
+        data, _ = self.source.read_range(self.key, start, end)
+        if len(data) != end - start + 1:
+            raise IOError(f"Short read of {self.key} at byte {start}: "
+                          f"got {len(data)} of {end - start + 1} bytes")
+        return data
+
+    def readinto(self, buffer) -> int:
+        while self._offset >= len(self._current):
+            if not self._pending:
+                return 0
+            self._current = self._pending.popleft().result()
+            self._offset = 0
+            self._fill()
+
+        n = min(len(buffer), len(self._current) - self._offset)
+        buffer[:n] = self._current[self._offset:self._offset + n]
+        self._offset += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            for future in self._pending:
+                future.cancel()
+            self._pending.clear()
+            self._current = b''
+        super().close()
+
+
+class ChunkReader(io.RawIOBase):
+    """Read-only stream over an iterator of byte chunks (e.g. an SDK download)."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._current = b''
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._offset >= len(self._current):
+            self._current = next(self._chunks, None)
+            self._offset = 0
+            if self._current is None:
+                self._current = b''
+                return 0
+
+        n = min(len(buffer), len(self._current) - self._offset)
+        buffer[:n] = self._current[self._offset:self._offset + n]
+        self._offset += n
+        return n
+
+
+class ParallelDownloader:
+    """Downloads objects from a source as ranged requests on a shared pool.
+
+    source is an S3Source or LocalSource. One pool of `concurrency` threads
+    serves every download, so the client's connections are reused.
+    """
+
+    def __init__(self, source, part_size: int = PART_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, window: Optional[int] = None):
+        self.source = source
+        self.part_size = part_size
+        self.concurrency = max(1, concurrency)
+        self.window = max(1, window or self.concurrency * 2)
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency,
+                                        thread_name_prefix='savior-download')
+
+    def close(self):
+        self._pool.shutdown()
+
+    def open(self, key: str) -> RangedReader:
+        """Stream an object, reading ahead in parallel."""
+        return RangedReader(self.source, key, self._pool, self.part_size, self.window)
+
+    def download(self, key: str, destination: Path) -> int:
+        """Write an object to destination; returns its size."""
+        with self.open(key) as reader:
+            return save_stream(reader, destination)
+
+
+def save_stream(stream, destination: Path) -> int:
+    """Copy a stream to destination; returns the number of bytes written.
+
+    Data goes to a temp file next to destination that is renamed over it
+    at the end, so a failed download never leaves a partial backup.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=destination.parent, prefix='.savior-download-')
+    try:
+        size = 0
+        with os.fdopen(fd, 'wb') as out:
+            for block in iter(lambda: stream.read(COPY_BLOCK), b''):
+                out.write(block)
+                size += len(block)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return size
@@ -0,0 +1,409 @@
+"""Compact on-disk table of the file states incremental backups compare against.
+
+IncrementalBackup used to keep every file's stat info and hash as a dict
+of dicts, loaded from and rewritten to an indented file_states.json on
+every save. For a large project that is hundreds of megabytes of Python
+objects and seconds of parsing before a scan can even start.
+
+FileStateTable keeps the states in two files instead:
+
+- a snapshot (file_states.bin) of fixed-width records sorted by path
+  hash, with the paths stored once in a path table at the end. It is
+  memory-mapped, so loading it costs nothing until states are looked up.
+  A fan-out table of where each hash prefix starts (as in git's pack
+  indexes) narrows a lookup to a handful of rows to bisect;
+- a journal (file_states.journal) that each save appends its changes to
+  (new or changed states, and tombstones for deleted files). It is
+  replayed over the snapshot on load, and folded into a fresh snapshot
+  once it grows past a quarter of it.
+
+A file_states.json from before is imported on first load. Either file
+being unreadable just means starting empty: the states are a cache, and
+the next scan rehashes what it has to.
+"""
+
+import os
+import mmap
+import zlib
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    from .gitindex import HASH_PREFIX as GIT_HASH_PREFIX
+except ImportError:
+    from gitindex import HASH_PREFIX as GIT_HASH_PREFIX
+
+MAGIC = b'SVFS'
+VERSION = 1
+
+# Native byte order throughout: the table is a local cache, and a table
+# from another architecture fails the version check and is rebuilt
+# magic, version, record count, path table size
+HEADER = struct.Struct('=4sIQQ')
+# Rows are bucketed by the top FANOUT_BITS of their path hash
+FANOUT_BITS = 16
+FANOUT_SHIFT = 32 - FANOUT_BITS
+FANOUT_SIZE = (1 << FANOUT_BITS) + 1
+# size, mtime_ns, ctime_ns, inode, flags, digest
+RECORD = struct.Struct('=qqqQB32s')
+# A journal entry: path length, a record, then the path
+JOURNAL_ENTRY = struct.Struct('=I' + RECORD.format[1:])
+
+FLAG_RACY = 0x01
+FLAG_GIT = 0x02      # digest is a 20-byte git blob id rather than a sha256
+FLAG_DELETED = 0x04  # journal tombstone
+
+# Fold the journal into the snapshot once it holds this many entries, or
+# a quarter of the snapshot's, whichever is more
+COMPACT_MIN = 4096
+
+
+def path_hash(path: bytes) -> int:
+    """Stable 32-bit hash of a path (Python's own hash() is salted).
+
+    Collisions only cost an extra path comparison.
+    """
+    return zlib.crc32(path)
+
+
+def encode_state(info: Dict) -> bytes:
+    """A state dict as a fixed-width record. Raises ValueError for hashes
+    that are neither sha256 nor git blob ids."""
+    digest = info['hash']
+    flags = FLAG_RACY if info.get('racy') else 0
+    if digest.startswith(GIT_HASH_PREFIX):
+        flags |= FLAG_GIT
+        raw = bytes.fromhex(digest[len(GIT_HASH_PREFIX):])
+        expected = 20
+    else:
+        raw = bytes.fromhex(digest)
+        expected = 32
+    if len(raw) != expected:
+        raise ValueError(f"Unsupported hash: {digest}")
+    return RECORD.pack(info.get('size', 0), info.get('mtime_ns', 0), info.get('ctime_ns', 0),
+                       info.get('inode', 0), flags, raw)
+
+
+def decode_state(buffer, offset: int = 0) -> Dict:
+    """The state dict of the record at offset"""
+    size, mtime_ns, ctime_ns, inode, flags, raw = RECORD.unpack_from(buffer, offset)
+    if flags & FLAG_GIT:
+        digest = GIT_HASH_PREFIX + raw[:20].hex()
+    else:
+        digest = raw.hex()
+    info = {
+        'mtime': mtime_ns / 1e9,
+        'mtime_ns': mtime_ns,
+        'ctime_ns': ctime_ns,
+        'inode': inode,
+        'size': size,
+        'hash': digest
+    }
+    if flags & FLAG_RACY:
+        info['racy'] = True
+    return info
+
+
+class FileStateTable(MutableMapping):
+    """{relative path: state dict}, backed by a snapshot and a journal.
+
+    It reads and writes like the dict it replaces; state dicts are built
+    on lookup, so changing one has no effect until it is assigned back.
+    Changes are kept in memory until save().
+    """
+
+    def __init__(self, path: Path, legacy_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix('.journal')
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+
+        self._map: Optional[mmap.mmap] = None
+        self._views: List[memoryview] = []
+        self._size = 0  # Records in the snapshot
+        self._fanout = ()
+        self._hashes = ()
+        self._offsets = ()
+        self._records_at = 0
+        self._paths = b''
+
+        # Changes on top of the snapshot (None for deleted), those not yet
+        # in the journal, and how many entries the journal holds
+        self._overlay: Dict[str, Optional[Dict]] = {}
+        self._pending: List[bytes] = []
+        self._journaled = 0
+        self._count = 0
+
+        self._open_snapshot()
+        self._count = self._size
+        self._replay_journal()
+        if self._size == 0 and not self._overlay and self.legacy_path and self.legacy_path.exists():
+            self._import_legacy()
+
+    # Snapshot
+
+    def _open_snapshot(self):
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < HEADER.size:
+                    return
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return
+
+        magic, version, count, paths_size = HEADER.unpack_from(mapped)
+        fanout_at = HEADER.size
+        hashes_at = fanout_at + 4 * FANOUT_SIZE
+        offsets_at = hashes_at + 4 * count
+        records_at = offsets_at + 4 * (count + 1)
+        paths_at = records_at + RECORD.size * count
+        if magic != MAGIC or version != VERSION or paths_at + paths_size != len(mapped):
+            mapped.close()
+            return
+
+        view = memoryview(mapped)
+        self._map = mapped
+        self._views = [view]
+        self._fanout = self._view(view, fanout_at, hashes_at).cast('I')
+        self._hashes = self._view(view, hashes_at, offsets_at).cast('I')
+        self._offsets = self._view(view, offsets_at, records_at).cast('I')
+        self._views += [self._fanout, self._hashes, self._offsets]
+        self._records_at = records_at
+        self._paths = self._view(view, paths_at, paths_at + paths_size)
+        self._size = count
+
+    def _view(self, view: memoryview, start: int, end: int) -> memoryview:
+        part = view[start:end]
+        self._views.append(part)
+        return part
+
+    def _close_snapshot(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._size = 0
+        self._fanout = self._hashes = self._offsets = ()
+        self._paths = b''
+
+    def close(self):
+        """Unmap the snapshot; unsaved changes are dropped"""
+        self._close_snapshot()
+        self._overlay.clear()
+        self._pending.clear()
+        self._count = 0
+
+    def _path_at(self, row: int) -> bytes:
+        # Paths are NUL-terminated; offsets hold each one's start
+        return self._paths[self._offsets[row]:self._offsets[row + 1] - 1].tobytes()
+
+    def _find(self, encoded: bytes) -> int:
+        """Snapshot row of a path, or -1"""
+        if not self._size:
+            return -1
+        key = path_hash(encoded)
+        bucket = key >> FANOUT_SHIFT
+        end = self._fanout[bucket + 1]
+        row = bisect_left(self._hashes, key, self._fanout[bucket], end)
+        while row < end and self._hashes[row] == key:
+            if self._path_at(row) == encoded:
+                return row
+            row += 1
+        return -1
+
+    def _record_at(self, row: int) -> bytes:
+        start = self._records_at + row * RECORD.size
+        return self._map[start:start + RECORD.size]
+
+    # Journal
+
+    def _replay_journal(self):
+        try:
+            data = self.journal_path.read_bytes()
+        except OSError:
+            return
+
+        pos = 0
+        while pos + JOURNAL_ENTRY.size <= len(data):
+            length, *_, flags, _ = JOURNAL_ENTRY.unpack_from(data, pos)
+            start = pos + JOURNAL_ENTRY.size
+            if start + length > len(data):
+                break  # Torn write at the end of the journal
+            try:
+                key = data[start:start + length].decode('utf-8')
+            except UnicodeDecodeError:
+                break
+            if flags & FLAG_DELETED:
+                self._apply(key, None)
+            else:
+                self._apply(key, decode_state(data, pos + 4))
+            self._journaled += 1
+            pos = start + length
+
+        if pos < len(data):
+            # Cut the torn tail off, or the next save would append after it
+            # and every entry from then on would be lost on replay
+            try:
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(pos)
+            except OSError:
+                pass
+
+    def _apply(self, key: str, info: Optional[Dict]):
+        existed = key in self
+        self._overlay[key] = info
+        self._count += (info is not None) - existed
+
+    def _journal_entry(self, key: str, record: bytes) -> bytes:
+        encoded = key.encode('utf-8')
+        return JOURNAL_ENTRY.pack(len(encoded), *RECORD.unpack(record)) + encoded
+
+    def _import_legacy(self):
+        """Take over the states of a file_states.json"""
+        import json
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                states = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, info in states.items():
+            try:
+                self[key] = info
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue  # Rehashed by the next scan
+        self.compact()
+        self.legacy_path.unlink(missing_ok=True)
+
+    # Mapping interface
+
+    def __getitem__(self, key: str) -> Dict:
+        if key in self._overlay:
+            info = self._overlay[key]
+            if info is None:
+                raise KeyError(key)
+            return dict(info)
+        row = self._find(key.encode('utf-8'))
+        if row < 0:
+            raise KeyError(key)
+        return decode_state(self._map, self._records_at + row * RECORD.size)
+
+    def get(self, key: str, default=None):
+        # Skips Mapping.get's KeyError round trip, since scans miss often
+        if key in self._overlay:
+            info = self._overlay[key]
+            return default if info is None else dict(info)
+        row = self._find(key.encode('utf-8'))
+        if row < 0:
+            return default
+        return decode_state(self._map, self._records_at + row * RECORD.size)
+
+    def __contains__(self, key) -> bool:
+        if key in self._overlay:
+            return self._overlay[key] is not None
+        return isinstance(key, str) and self._find(key.encode('utf-8')) >= 0
+
+    def __setitem__(self, key: str, info: Dict):
+        record = encode_state(info)
+        self._apply(key, decode_state(record))
+        self._pending.append(self._journal_entry(key, record))
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        self._apply(key, None)
+        tombstone = RECORD.pack(0, 0, 0, 0, FLAG_DELETED, b'')
+        self._pending.append(self._journal_entry(key, tombstone))
+
+    def _snapshot_keys(self) -> List[str]:
+        if not self._size:
+            return []
+        return self._paths.tobytes().decode('utf-8').split('\0')[:-1]
+
+    def __iter__(self) -> Iterator[str]:
+        overlay = self._overlay
+        for key in self._snapshot_keys():
+            if key not in overlay:
+                yield key
+        for key, info in list(overlay.items()):
+            if info is not None:
+                yield key
+
+    def __len__(self) -> int:
+        return self._count
+
+    # Persistence
+
+    def save(self):
+        """Append the changes since the last save to the journal"""
+        if not self._pending:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_path, 'ab') as f:
+            f.write(b''.join(self._pending))
+        self._journaled += len(self._pending)
+        self._pending = []
+
+        if self._journaled > max(COMPACT_MIN, self._size // 4):
+            self.compact()
+
+    def compact(self):
+        """Write every state into a new snapshot and empty the journal"""
+        entries: List[Tuple[int, bytes, bytes]] = []
+        overlay = self._overlay
+        for row, key in enumerate(self._snapshot_keys()):
+            if key not in overlay:
+                entries.append((self._hashes[row], key.encode('utf-8'), self._record_at(row)))
+        for key, info in overlay.items():
+            if info is not None:
+                encoded = key.encode('utf-8')
+                entries.append((path_hash(encoded), encoded, encode_state(info)))
+        entries.sort()
+
+        hashes = array('I', (entry[0] for entry in entries))
+        fanout = array('I', [0]) * FANOUT_SIZE
+        for key in hashes:
+            fanout[(key >> FANOUT_SHIFT) + 1] += 1
+        for bucket in range(1, FANOUT_SIZE):
+            fanout[bucket] += fanout[bucket - 1]
+        offsets = array('I', [0])
+        position = 0
+        for entry in entries:
+            position += len(entry[1]) + 1
+            offsets.append(position)
+        paths = b''.join(entry[1] + b'\0' for entry in entries)
+        records = b''.join(entry[2] for entry in entries)
+        del entries
+
+        # Unmapped first: Windows can't replace a mapped file
+        self._close_snapshot()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_fd, temp_path = tempfile.mkstemp(dir=self.path.parent, prefix='.file_states_', suffix='.tmp')
+        try:
+            with os.fdopen(temp_fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, len(hashes), len(paths)))
+                f.write(fanout.tobytes())
+                f.write(hashes.tobytes())
+                f.write(offsets.tobytes())
+                f.write(records)
+                f.write(paths)
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        # Replaying a journal over the snapshot it went into changes
+        # nothing, so a crash before this truncation loses nothing
+        with open(self.journal_path, 'wb'):
+            pass
+        self._journaled = 0
+        self._pending = []
+        self._overlay = {}
+        self._open_snapshot()
+        self._count = self._size
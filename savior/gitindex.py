@@ -0,0 +1,201 @@
+"""Read git's index (.git/index) for change detection.
+
+For every tracked file the index records the stat info git saw when it
+last hashed the file, plus the file's blob id. When a file's current stat
+still matches, git itself would trust that blob id, and so can we: a
+tracked, unmodified file needs neither a read nor a hash. After a fresh
+clone or a checkout that touched thousands of files, that's every one of
+them.
+
+Only the parts of the format needed for that are read: versions 2, 3
+and 4, stage-0 entries, and no extensions. See
+https://git-scm.com/docs/index-format.
+"""
+
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    from .scanner import FileStat
+except ImportError:
+    from scanner import FileStat
+
+SIGNATURE = b'DIRC'
+HEADER = struct.Struct('>4sII')
+# ctime s/ns, mtime s/ns, dev, ino, mode, uid, gid, size, sha1, flags
+ENTRY = struct.Struct('>IIIIIIIIII20sH')
+
+FLAG_EXTENDED = 0x4000
+FLAG_STAGE = 0x3000
+FLAG_NAME_LENGTH = 0x0FFF
+# Extended flags (version 3+)
+FLAG_SKIP_WORKTREE = 0x4000
+FLAG_INTENT_TO_ADD = 0x2000
+
+MODE_TYPE = 0o170000
+MODE_GITLINK = 0o160000
+MODE_SYMLINK = 0o120000
+
+# Prefix for hashes that are git blob ids, so they're never compared
+# with the sha256 hashes Savior uses elsewhere
+HASH_PREFIX = 'git:'
+
+_U32 = 0xFFFFFFFF
+
+# (ctime_s, ctime_ns, mtime_s, mtime_ns, ino, size, blob id)
+IndexEntry = Tuple[int, int, int, int, int, int, str]
+
+# Parsed indexes by file, with the (mtime_ns, size, inode) they were read
+# at: a large index takes about a second to parse, and the daemon loads
+# it on every save while git rewrites it far less often
+_loaded: Dict[Path, Tuple[Tuple[int, int, int], 'GitIndex']] = {}
+
+
+def find_git_dir(project_dir: Path) -> Optional[Path]:
+    """The repository directory of a work tree root, following .git files"""
+    dot_git = Path(project_dir) / '.git'
+    if dot_git.is_dir():
+        return dot_git
+    if dot_git.is_file():
+        # Worktrees and submodules: ".git" holds "gitdir: <path>"
+        try:
+            text = dot_git.read_text(encoding='utf-8').strip()
+        except (OSError, UnicodeDecodeError):
+            return None
+        if text.startswith('gitdir:'):
+            git_dir = Path(text[len('gitdir:'):].strip())
+            if not git_dir.is_absolute():
+                git_dir = Path(project_dir) / git_dir
+            return git_dir if git_dir.is_dir() else None
+    return None
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """Git's offset varint (used by index v4 path compression)"""
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, pos
+
+
+class GitIndex:
+    """Tracked files of a git work tree, with git's stat info and blob ids."""
+
+    def __init__(self, entries: Dict[str, IndexEntry], index_mtime_ns: int):
+        self.entries = entries
+        # Entries written in the same second as the index may have been
+        # modified after git hashed them ("racily clean"); git rehashes
+        # those, and so do we
+        self.index_mtime_ns = index_mtime_ns
+
+    @classmethod
+    def load(cls, project_dir: Path) -> Optional['GitIndex']:
+        """The index of the repository rooted at project_dir, or None.
+
+        None means there is no repository there, or its index is in a
+        format this reader doesn't handle; callers then hash as usual.
+        """
+        git_dir = find_git_dir(project_dir)
+        if git_dir is None:
+            return None
+        index_file = git_dir / 'index'
+        try:
+            with open(index_file, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                cached = _loaded.get(index_file)
+                if cached is not None and cached[0] == key:
+                    return cached[1]
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            index = cls(cls._parse(data), stat.st_mtime_ns)
+        except (ValueError, struct.error, IndexError, UnicodeDecodeError):
+            return None
+        _loaded[index_file] = (key, index)
+        return index
+
+    @staticmethod
+    def _parse(data: bytes) -> Dict[str, IndexEntry]:
+        signature, version, count = HEADER.unpack_from(data, 0)
+        if signature != SIGNATURE or version not in (2, 3, 4):
+            raise ValueError('Unsupported git index')
+
+        entries = {}
+        pos = HEADER.size
+        previous_name = b''
+        for _ in range(count):
+            start = pos
+            (ctime_s, ctime_ns, mtime_s, mtime_ns, _dev, ino, mode,
+             _uid, _gid, size, sha1, flags) = ENTRY.unpack_from(data, pos)
+            pos += ENTRY.size
+
+            extended = 0
+            if flags & FLAG_EXTENDED:
+                if version < 3:
+                    raise ValueError('Extended flag in a version 2 index')
+                (extended,) = struct.unpack_from('>H', data, pos)
+                pos += 2
+
+            if version == 4:
+                # Name is the previous name minus N bytes, plus a suffix
+                strip, pos = _read_varint(data, pos)
+                end = data.index(b'\0', pos)
+                name = previous_name[:len(previous_name) - strip] + data[pos:end]
+                pos = end + 1
+            else:
+                length = flags & FLAG_NAME_LENGTH
+                if length == FLAG_NAME_LENGTH:
+                    end = data.index(b'\0', pos)
+                else:
+                    end = pos + length
+                name = data[pos:end]
+                # Entries are NUL-padded to a multiple of 8 bytes
+                pos = start + ((end - start + 8) // 8) * 8
+            previous_name = name
+
+            if flags & FLAG_STAGE or extended & (FLAG_SKIP_WORKTREE | FLAG_INTENT_TO_ADD):
+                continue  # Conflicted, not checked out, or not really added yet
+            if mode & MODE_TYPE in (MODE_GITLINK, MODE_SYMLINK):
+                continue
+            entries[name.decode('utf-8')] = (
+                ctime_s, ctime_ns, mtime_s, mtime_ns, ino, size, sha1.hex()
+            )
+        return entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, rel_path: str) -> bool:
+        return rel_path in self.entries
+
+    def blob_id(self, rel_path: str, stat: FileStat) -> Optional[str]:
+        """The file's blob id if git would trust it unchanged, else None.
+
+        rel_path is relative to the work tree root with '/' separators.
+        The index keeps 32-bit stat fields, so they're compared that way.
+        """
+        entry = self.entries.get(rel_path)
+        if entry is None:
+            return None
+        ctime_s, ctime_ns, mtime_s, mtime_ns, ino, size, blob = entry
+
+        # Nanoseconds of 0 mean git was built without them; skip those
+        if (size != stat.size & _U32
+                or mtime_s != (stat.mtime_ns // 1_000_000_000) & _U32
+                or (mtime_ns and mtime_ns != stat.mtime_ns % 1_000_000_000)
+                or ctime_s != (stat.ctime_ns // 1_000_000_000) & _U32
+                or (ctime_ns and ctime_ns != stat.ctime_ns % 1_000_000_000)
+                or (ino and ino != stat.inode & _U32)):
+            return None
+
+        if mtime_s >= self.index_mtime_ns // 1_000_000_000:
+            return None  # Racily clean
+        return blob
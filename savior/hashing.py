@@ -0,0 +1,117 @@
+"""Shared file hashing service backed by a thread pool."""
+
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    from .throttle import get_throttle
+except ImportError:
+    from throttle import get_throttle
+
+# Algorithm name for git's blob id: sha1 over "blob <size>\0" + content
+GIT_BLOB = 'git-blob'
+
+# Large reads keep syscall overhead low; hashlib releases the GIL while
+# digesting buffers this size, so threads hash in parallel
+DEFAULT_READ_SIZE = 1024 * 1024
+
+
+def default_jobs() -> int:
+    """Default worker count: one per CPU, capped to avoid thrashing disks."""
+    return min(32, os.cpu_count() or 1)
+
+
+class FileHasher:
+    """Hashes files with large reads, fanning batches out over a thread pool."""
+
+    def __init__(self, jobs: Optional[int] = None, read_size: int = DEFAULT_READ_SIZE):
+        self.jobs = max(1, jobs or default_jobs())
+        self.read_size = read_size
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.jobs,
+                    thread_name_prefix='savior-hash'
+                )
+            return self._executor
+
+    def hash_file(self, file_path: Path, algorithm: str = 'sha256') -> str:
+        """Hash a single file in the calling thread. Raises OSError on failure."""
+        buffer = bytearray(self.read_size)
+        view = memoryview(buffer)
+        bucket = get_throttle().read
+
+        with open(file_path, 'rb', buffering=0) as f:
+            if algorithm == GIT_BLOB:
+                hasher = hashlib.sha1(b'blob %d\0' % os.fstat(f.fileno()).st_size)
+            else:
+                hasher = hashlib.new(algorithm)
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                bucket.consume(n)
+                hasher.update(view[:n])
+        return hasher.hexdigest()
+
+    def map(self, func: Callable, items: Iterable) -> List:
+        """Apply func to every item on the pool, preserving order.
+
+        Items whose call raises OSError produce None instead of aborting the
+        whole batch, matching how the callers skip unreadable files.
+        """
+        items = list(items)
+
+        def safe_call(item):
+            try:
+                return func(item)
+            except (IOError, OSError):
+                return None
+
+        if self.jobs == 1 or len(items) < 2:
+            return [safe_call(item) for item in items]
+        return list(self._get_executor().map(safe_call, items))
+
+    def hash_files(self, file_paths: Iterable[Path], algorithm: str = 'sha256') -> Dict[Path, Optional[str]]:
+        """Hash many files in parallel. Unreadable files map to None."""
+        file_paths = list(file_paths)
+        digests = self.map(lambda path: self.hash_file(path, algorithm), file_paths)
+        return dict(zip(file_paths, digests))
+
+    def shutdown(self):
+        """Stop the worker threads."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_default_hasher: Optional[FileHasher] = None
+_default_lock = threading.Lock()
+
+
+def get_hasher() -> FileHasher:
+    """Return the process-wide hasher shared by all hashing call sites."""
+    global _default_hasher
+    with _default_lock:
+        if _default_hasher is None:
+            _default_hasher = FileHasher()
+        return _default_hasher
+
+
+def set_default_jobs(jobs: Optional[int]):
+    """Resize the shared hasher's thread pool (None restores the default)."""
+    global _default_hasher
+    with _default_lock:
+        old = _default_hasher
+        _default_hasher = FileHasher(jobs)
+    if old is not None:
+        old.shutdown()
@@ -0,0 +1,64 @@
+"""Compiled matching for .saviorignore patterns."""
+
+import os
+import re
+import fnmatch
+from typing import List, Iterable
+
+
+class IgnoreMatcher:
+    """Matches paths against a fixed list of ignore patterns in one pass.
+
+    Semantics are identical to checking each pattern in turn with
+    ``fnmatch.fnmatch`` against both the full path and its basename, plus
+    treating ``dir/`` patterns as an exact match on any path component.
+    All glob patterns are folded into a single alternation regex and the
+    directory patterns into a set, so the per-path cost no longer grows
+    with the number of patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(patterns)
+
+        # fnmatch normalizes case on both sides (a no-op on POSIX)
+        translated = [
+            fnmatch.translate(os.path.normcase(pattern))
+            for pattern in self.patterns
+        ]
+        if translated:
+            self._regex = re.compile('|'.join(f'(?:{t})' for t in translated))
+        else:
+            self._regex = None
+
+        # Anchored directory names from "dir/" patterns
+        self.dir_names = frozenset(
+            pattern[:-1] for pattern in self.patterns if pattern.endswith('/')
+        )
+
+    def matches(self, path: str) -> bool:
+        """Return True if the path should be ignored."""
+        if self.dir_names and not self.dir_names.isdisjoint(path.split(os.sep)):
+            return True
+
+        if self._regex is None:
+            return False
+
+        match = self._regex.match
+        normalized = os.path.normcase(path)
+        if match(normalized):
+            return True
+        return match(os.path.basename(normalized)) is not None
+
+
+def fnmatch_should_ignore(patterns: List[str], path: str) -> bool:
+    """Reference matcher: checks every pattern with fnmatch in turn.
+
+    Kept for benchmarking and for verifying that IgnoreMatcher stays in
+    step with the original .saviorignore semantics.
+    """
+    for pattern in patterns:
+        if fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(os.path.basename(path), pattern):
+            return True
+        if pattern.endswith('/') and (pattern[:-1] in path.split(os.sep)):
+            return True
+    return False
@@ -1,76 +1,351 @@
+import os
 import json
-import hashlib
-import tarfile
+import time
 import shutil
+import tempfile
 from pathlib import Path
-from typing import Dict, Set, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional, Iterable
 from datetime import datetime
 
+try:
+    from .hashing import get_hasher, GIT_BLOB
+    from .gitindex import GitIndex, HASH_PREFIX as GIT_HASH_PREFIX
+    from .scanner import FileStat, known_stat
+    from .filestate import FileStateTable
+    from .archive import (
+        ArchiveWriter, open_backup, detect_codec, index_path, archive_extension,
+        list_backup_files, read_backup_file, extract_backup_files
+    )
+except ImportError:
+    from hashing import get_hasher, GIT_BLOB
+    from gitindex import GitIndex, HASH_PREFIX as GIT_HASH_PREFIX
+    from scanner import FileStat, known_stat
+    from filestate import FileStateTable
+    from archive import (
+        ArchiveWriter, open_backup, detect_codec, index_path, archive_extension,
+        list_backup_files, read_backup_file, extract_backup_files
+    )
+
+MANIFEST_NAME = 'MANIFEST.json'
+
+
+def read_manifest(backup_path: Path) -> Optional[Dict]:
+    """The MANIFEST.json of an incremental backup, or None for a full one"""
+    data = read_backup_file(backup_path, MANIFEST_NAME)
+    return json.loads(data) if data is not None else None
+
+
+def _base_path(backup_path: Path, base: str) -> Path:
+    """Locate a manifest's base_backup, even if the project has moved"""
+    base_path = Path(base)
+    if base_path.exists():
+        return base_path
+
+    # Bases are recorded as absolute paths; re-root them on this .savior
+    savior_dir = next((p for p in backup_path.parents if p.name == '.savior'), backup_path.parent)
+    parts = base_path.parts
+    if '.savior' in parts:
+        return savior_dir.joinpath(*parts[len(parts) - parts[::-1].index('.savior'):])
+    return savior_dir / base_path
+
+
+def base_backup_of(backup_path: Path) -> Optional[Path]:
+    """The backup an incremental backup builds on (None for a full one)"""
+    manifest = read_manifest(backup_path)
+    base = manifest.get('base_backup') if manifest else None
+    return _base_path(Path(backup_path), base) if base else None
+
+
+def resolve_chain(backup_path: Path) -> List[Path]:
+    """Follow base_backup links; returns the chain oldest (full) first.
+
+    A full backup is a chain of one. Raises FileNotFoundError if a link
+    is missing, since restoring the rest would silently lose files.
+    """
+    chain = []
+    seen = set()
+    current: Optional[Path] = Path(backup_path)
+    while current is not None:
+        if not current.exists():
+            raise FileNotFoundError(f"Backup chain is broken: {current} is missing")
+        key = current.resolve()
+        if key in seen:
+            raise ValueError(f"Backup chain loops back to {current}")
+        seen.add(key)
+        chain.append(current)
+        current = base_backup_of(current)
+
+    chain.reverse()
+    return chain
+
+
+def plan_chain(chain: List[Path]) -> Tuple[Dict[str, Path], Set[str]]:
+    """Work out which archive holds the final version of each file.
+
+    Returns ({path: archive}, paths deleted along the way and not
+    re-added). Only archive listings and manifests are read.
+    """
+    winners: Dict[str, Path] = {}
+    deleted: Set[str] = set()
+    for archive in chain:
+        manifest = read_manifest(archive)
+        if manifest:
+            for rel_path in manifest.get('deleted_files', []):
+                winners.pop(rel_path, None)
+                deleted.add(rel_path)
+        for rel_path in list_backup_files(archive):
+            if rel_path != MANIFEST_NAME or manifest is None:
+                winners[rel_path] = archive
+    return winners, deleted - winners.keys()
+
+
+def chain_files(backup_path: Path) -> List[str]:
+    """Every file a backup restores, following its chain if incremental"""
+    winners, _ = plan_chain(resolve_chain(backup_path))
+    return sorted(winners)
+
+
+def extract_chain_files(backup_path: Path, names: Iterable[str], destination: Path) -> int:
+    """Extract just the named files as of backup_path; returns how many"""
+    chain = resolve_chain(backup_path)
+    winners, _ = plan_chain(chain)
+    wanted = set(names)
+    return extract_chain(chain, destination, {
+        rel_path: source for rel_path, source in winners.items() if rel_path in wanted
+    })
+
+
+def extract_chain(chain: List[Path], destination: Path,
+                  winners: Optional[Dict[str, Path]] = None) -> int:
+    """Extract the final state of a chain into destination.
+
+    Each file is read once, from the newest archive that has it. winners
+    is a plan from plan_chain, computed here if not given. Returns the
+    number of files extracted.
+    """
+    if winners is None:
+        winners, _ = plan_chain(chain)
+    extracted = 0
+    for archive in chain:
+        names = [rel_path for rel_path, source in winners.items() if source == archive]
+        if names:
+            extracted += extract_backup_files(archive, names, destination)
+    return extracted
+
 
 class IncrementalBackup:
-    def __init__(self, backup_dir: Path):
-        self.backup_dir = backup_dir
-        self.state_file = backup_dir / 'file_states.json'
-        self.file_states = self._load_states()
+    # Stat fields that must all match before a stored hash is trusted
+    STAT_KEYS = ('size', 'mtime_ns', 'inode', 'ctime_ns')
+
+    # Files modified this close to the scan may change again without a
+    # visible mtime change, so their stat is not trusted on the next cycle
+    RACY_WINDOW_NS = 2 * 1_000_000_000
 
-    def _load_states(self) -> Dict:
-        if self.state_file.exists():
-            with open(self.state_file, 'r') as f:
-                return json.load(f)
-        return {}
+    # Incremental backups building on each other before the newest is
+    # synthesized into a full backup
+    MAX_CHAIN = 32
+
+    def __init__(self, backup_dir: Path, project_dir: Optional[Path] = None, paranoid: bool = False):
+        self.backup_dir = backup_dir
+        self.project_dir = Path(project_dir) if project_dir else backup_dir.parent
+        self.paranoid = paranoid  # Rehash every file, ignoring stat info
+        self.state_file = backup_dir / 'file_states.bin'
+        # Memory-mapped, so opening it doesn't read the states in
+        self.file_states = FileStateTable(self.state_file, legacy_path=backup_dir / 'file_states.json')
 
     def _save_states(self):
-        # Ensure backup directory exists before saving
-        self.backup_dir.mkdir(parents=True, exist_ok=True)
-        with open(self.state_file, 'w') as f:
-            json.dump(self.file_states, f, indent=2)
-
-    def _get_file_hash(self, filepath: Path) -> str:
-        hasher = hashlib.sha256()
-        with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(8192), b''):
-                hasher.update(chunk)
-        return hasher.hexdigest()
-
-    def _get_file_info(self, filepath: Path) -> Dict:
-        stat = filepath.stat()
-        return {
-            'hash': self._get_file_hash(filepath),
-            'mtime': stat.st_mtime,
-            'size': stat.st_size
+        # Appends just what changed since the table was opened
+        self.file_states.save()
+
+    def _discard_states(self):
+        """Drop unsaved state changes by reopening the table"""
+        self.file_states.close()
+        self.file_states = FileStateTable(self.state_file)
+
+    def _get_file_hash(self, filepath: Path, git: bool = False) -> str:
+        """Content hash of a file: a git blob id in git projects, else sha256"""
+        if git:
+            return GIT_HASH_PREFIX + get_hasher().hash_file(filepath, GIT_BLOB)
+        return get_hasher().hash_file(filepath, 'sha256')
+
+    def _stat_matches(self, previous: Dict, info: Dict) -> bool:
+        """Check whether a stored state can be trusted without rehashing"""
+        if previous.get('racy') or 'hash' not in previous:
+            return False
+        return all(k in previous and previous[k] == info[k] for k in self.STAT_KEYS)
+
+    def _get_stat_info(self, filepath: Path, previous: Optional[Dict] = None,
+                       scan_started_ns: Optional[int] = None,
+                       git_index: Optional[GitIndex] = None,
+                       known: Optional[FileStat] = None) -> Dict:
+        """Stat a file, reusing the previous hash if its stat is unchanged.
+
+        Failing that, a git index whose entry for the file still matches
+        its stat supplies git's blob id. The returned info has no 'hash'
+        key when the file must be rehashed. known is the file's stat from
+        the scanner, if it has one, and saves stat-ing it again.
+        """
+        stat = known if known is not None else FileStat.from_stat(filepath.stat())
+        info = {
+            'mtime': stat.mtime_ns / 1e9,
+            'mtime_ns': stat.mtime_ns,
+            'ctime_ns': stat.ctime_ns,
+            'inode': stat.inode,
+            'size': stat.size
         }
 
-    def find_changed_files(self, files: Set[Path]) -> Tuple[Set[Path], Set[Path], Set[Path]]:
-        """Returns (added, modified, deleted) files since last backup"""
+        if not self.paranoid and previous and self._stat_matches(previous, info):
+            # Trust stat: metadata is unchanged, so reuse the stored hash
+            info['hash'] = previous['hash']
+        elif not self.paranoid and git_index is not None:
+            # Tracked and unmodified according to git: its blob id will do
+            rel_path = filepath.relative_to(self.project_dir).as_posix()
+            blob = git_index.blob_id(rel_path, stat)
+            if blob is not None:
+                info['hash'] = GIT_HASH_PREFIX + blob
+
+        if scan_started_ns is not None and stat.mtime_ns >= scan_started_ns - self.RACY_WINDOW_NS:
+            info['racy'] = True
+        return info
+
+    def _get_file_info(self, filepath: Path, previous: Optional[Dict] = None,
+                       scan_started_ns: Optional[int] = None) -> Dict:
+        info = self._get_stat_info(filepath, previous, scan_started_ns)
+        if 'hash' not in info:
+            info['hash'] = self._get_file_hash(filepath)
+        return info
+
+    def _state_changed(self, previous: Optional[Dict], info: Dict) -> bool:
+        """Whether a scanned state differs from the stored one"""
+        if previous is None or previous['hash'] != info['hash']:
+            return True
+        if previous.get('racy') != info.get('racy'):
+            return True
+        return any(previous.get(k) != info[k] for k in self.STAT_KEYS)
+
+    def _scan(self, files: Set[Path]) -> Tuple[Set[str], Dict, Set[Path], Set[Path]]:
+        """Stat and (where needed) hash files.
+
+        Returns (seen, changed, added, modified): the relative paths
+        scanned, the states that differ from the stored ones, and the
+        added and modified files.
+
+        In a git work tree, tracked files git considers unmodified take
+        their hash from the git index, and everything else is hashed as a
+        git blob too, so a file keeps the same hash when it's committed.
+        """
         added = set()
         modified = set()
-        current_files = {}
+        seen = set()
+        changed = {}
+        scan_started_ns = time.time_ns()
+        git_index = GitIndex.load(self.project_dir)
 
+        # Stat pass: collect the files whose stored hash can't be reused
+        stat_infos = {}
         for file_path in files:
             try:
-                # FIX: Correctly calculate relative path from project directory
                 rel_path = str(file_path.relative_to(self.project_dir))
-                info = self._get_file_info(file_path)
-                current_files[rel_path] = info
-
-                if rel_path not in self.file_states:
-                    added.add(file_path)
-                elif self.file_states[rel_path]['hash'] != info['hash']:
-                    modified.add(file_path)
+                previous = self.file_states.get(rel_path)
+                stat_infos[file_path] = (
+                    rel_path,
+                    previous,
+                    self._get_stat_info(file_path, previous, scan_started_ns, git_index,
+                                        known_stat(files, file_path))
+                )
             except Exception:
                 pass
 
-        # Find deleted files
-        deleted_paths = set(self.file_states.keys()) - set(current_files.keys())
+        # Hash pass: rehash only the changed (or untracked) files, in parallel
+        git = git_index is not None
+        to_hash = [path for path, (_, _, info) in stat_infos.items() if 'hash' not in info]
+        digests = dict(zip(to_hash, get_hasher().map(lambda path: self._get_file_hash(path, git), to_hash)))
+
+        for file_path, (rel_path, previous, info) in stat_infos.items():
+            if 'hash' not in info:
+                if digests.get(file_path) is None:
+                    continue  # Unreadable, leave it out like before
+                info['hash'] = digests[file_path]
+            seen.add(rel_path)
+            # Only changed states are written back (and journaled)
+            if self._state_changed(previous, info):
+                changed[rel_path] = info
+
+            if previous is None:
+                added.add(file_path)
+            elif previous['hash'] != info['hash']:
+                modified.add(file_path)
 
-        # Update states with atomic write to prevent corruption
-        self.file_states = current_files
+        return seen, changed, added, modified
+
+    def find_changed_files(self, files: Set[Path]) -> Tuple[Set[Path], Set[Path], Set[Path]]:
+        """Returns (added, modified, deleted) files since last backup"""
+        changes = self._changes(files)
         self._save_states()
+        return changes
+
+    def find_changed_in(self, files: Set[Path], scope: Iterable[Path]) -> Tuple[Set[Path], Set[Path], Set[Path]]:
+        """Like find_changed_files, but only for the paths in scope.
+
+        scope holds the files and directories known to have changed (the
+        watcher's dirty set); files holds the backup candidates found
+        within it. Stored states outside scope are kept as they are, so the
+        cost depends on how much changed rather than on the size of the tree.
+        """
+        changes = self._changes(files, scope)
+        self._save_states()
+        return changes
+
+    def _changes(self, files: Set[Path], scope: Optional[Iterable[Path]] = None
+                 ) -> Tuple[Set[Path], Set[Path], Set[Path]]:
+        """find_changed_files/find_changed_in, leaving the new states unsaved"""
+        seen, changed, added, modified = self._scan(files)
+
+        if scope is None:
+            deleted_paths = {rel_path for rel_path in self.file_states if rel_path not in seen}
+        else:
+            deleted_paths = self._deleted_in(scope, seen)
+
+        for rel_path in deleted_paths:
+            del self.file_states[rel_path]
+        self.file_states.update(changed)
 
         return added, modified, deleted_paths
 
-    def create_incremental_backup(self, files: Set[Path], base_backup: Optional[Path] = None) -> Path:
-        """Creates an incremental backup containing only changed files"""
+    def _deleted_in(self, scope: Iterable[Path], seen: Set[str]) -> Set[str]:
+        """States inside scope that no longer have a file behind them"""
+        exact = set()
+        prefixes = []
+        for path in scope:
+            try:
+                rel_path = str(Path(path).relative_to(self.project_dir))
+            except ValueError:
+                continue
+            exact.add(rel_path)
+            prefixes.append(rel_path + os.sep)
+
+        deleted_paths = {rel_path for rel_path in exact if rel_path in self.file_states}
+        if prefixes:
+            prefixes = tuple(prefixes)
+            deleted_paths.update(
+                rel_path for rel_path in self.file_states if rel_path.startswith(prefixes)
+            )
+        return deleted_paths - seen
+
+    def create_incremental_backup(self, files: Set[Path], base_backup: Optional[Path] = None,
+                                  scope: Optional[Iterable[Path]] = None,
+                                  codec: str = 'gzip', level: int = 6) -> Path:
+        """Creates an incremental backup containing only changed files
+
+        With scope, files only needs to cover the paths in scope (see
+        find_changed_in); without it, files is the whole project. codec
+        and level work as for Savior.create_backup.
+        """
+        # Level 0 always means an uncompressed tar, whatever the codec
+        if level == 0:
+            codec = 'none'
+        extension = archive_extension(codec)
+
         # Ensure backup directory exists
         self.backup_dir.mkdir(parents=True, exist_ok=True)
 
@@ -78,10 +353,19 @@ class IncrementalBackup:
         # Create human-readable backup name
         # Format: incremental_2025-09-20_5-03pm.tar.gz
         time_str = timestamp.strftime("%Y-%m-%d_%I-%M%p").lower()
-        backup_name = f"incremental_{time_str}.tar.gz"
+        backup_name = f"incremental_{time_str}{extension}"
         backup_path = self.backup_dir / backup_name
+        # Another save in the same minute must not overwrite this one's
+        # base, which would make the chain loop back on itself
+        counter = 2
+        while backup_path.exists():
+            backup_name = f"incremental_{time_str}-{counter}{extension}"
+            backup_path = self.backup_dir / backup_name
+            counter += 1
 
-        added, modified, deleted = self.find_changed_files(files)
+        # The new states are only saved once the archive holding the
+        # changes exists; otherwise the next save would skip them
+        added, modified, deleted = self._changes(files, scope)
 
         # Create manifest
         manifest = {
@@ -92,55 +376,90 @@ class IncrementalBackup:
         }
 
         manifest_file = self.backup_dir / f"{backup_name}.manifest"
-        with open(manifest_file, 'w') as f:
-            json.dump(manifest, f, indent=2)
+        try:
+            with open(manifest_file, 'w') as f:
+                json.dump(manifest, f, indent=2)
 
-        # Create backup with only changed files
-        with tarfile.open(backup_path, 'w:gz') as tar:
-            # Add manifest
-            tar.add(manifest_file, arcname='MANIFEST.json')
+            # Create backup with only changed files
+            with ArchiveWriter(backup_path, codec, level) as tar:
+                # Add manifest
+                tar.add(manifest_file, arcname='MANIFEST.json')
 
-            # Add changed files
-            for file_path in added | modified:
-                rel_path = file_path.relative_to(file_path.parent.parent)
-                tar.add(file_path, arcname=str(rel_path))
-
-        manifest_file.unlink()  # Clean up temp manifest
+                # Add changed files
+                for file_path in added | modified:
+                    rel_path = file_path.relative_to(self.project_dir)
+                    tar.add_file(file_path, str(rel_path), known_stat(files, file_path))
+        except BaseException:
+            backup_path.unlink(missing_ok=True)
+            index_path(backup_path).unlink(missing_ok=True)
+            self._discard_states()
+            raise
+        finally:
+            manifest_file.unlink(missing_ok=True)  # Clean up temp manifest
 
+        self._save_states()
         return backup_path
 
     def restore_incremental(self, incremental_backup: Path, base_backup: Path, target_dir: Path):
-        """Restores from an incremental backup"""
-        import tempfile
-
-        # First restore base backup
-        with tarfile.open(base_backup, 'r:gz') as tar:
-            tar.extractall(target_dir)
-
-        # Then apply incremental changes
-        temp_dir = Path(tempfile.mkdtemp(prefix='savior_incremental_'))
-
-        with tarfile.open(incremental_backup, 'r:gz') as tar:
-            tar.extractall(temp_dir)
-
-        # Read manifest
-        manifest_path = temp_dir / 'MANIFEST.json'
-        if manifest_path.exists():
-            with open(manifest_path, 'r') as f:
-                manifest = json.load(f)
-
-            # Delete files that were deleted
-            for deleted_file in manifest.get('deleted_files', []):
-                file_to_delete = target_dir / deleted_file
-                if file_to_delete.exists():
-                    file_to_delete.unlink()
-
-        # Apply modified/added files
-        for file_path in temp_dir.rglob('*'):
-            if file_path.is_file() and file_path.name != 'MANIFEST.json':
-                rel_path = file_path.relative_to(temp_dir)
-                target_file = target_dir / rel_path
-                target_file.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(file_path, target_file)
-
-        shutil.rmtree(temp_dir)
\ No newline at end of file
+        """Restores from an incremental backup applied on top of base_backup"""
+        self._restore(resolve_chain(base_backup) + [incremental_backup], target_dir)
+
+    def restore_chain(self, backup: Path, target_dir: Path) -> int:
+        """Restore a backup along with every incremental it builds on.
+
+        Files deleted along the chain are removed from target_dir. Returns
+        the number of files written.
+        """
+        return self._restore(resolve_chain(backup), target_dir)
+
+    def _restore(self, chain: List[Path], target_dir: Path) -> int:
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        winners, deleted = plan_chain(chain)
+        extracted = extract_chain(chain, target_dir, winners)
+
+        for rel_path in deleted:
+            file_to_delete = target_dir / rel_path
+            if file_to_delete.is_file():
+                file_to_delete.unlink()
+        return extracted
+
+    def synthesize_full(self, backup: Path, level: int = 6) -> Path:
+        """Rewrite an incremental backup in place as a full backup.
+
+        The final state of the chain is merged from the archives that
+        already hold it, so the project directory isn't read. Afterwards
+        the backup no longer depends on its bases, so they can be removed
+        without breaking it or anything built on it. Returns the chain
+        members that it no longer needs, oldest first.
+        """
+        backup = Path(backup)
+        chain = resolve_chain(backup)
+        if len(chain) == 1 and read_manifest(backup) is None:
+            return []  # Already a full backup
+
+        winners, _ = plan_chain(chain)
+        codec = detect_codec(backup)
+
+        # Written beside the original under the same name, then swapped in,
+        # so the sidecar index lands under the right name too
+        work_dir = Path(tempfile.mkdtemp(prefix='.synthesize_', dir=backup.parent))
+        try:
+            merged = work_dir / backup.name
+            with ArchiveWriter(merged, codec, level) as out:
+                for archive in chain:
+                    wanted = {rel_path for rel_path, source in winners.items() if source == archive}
+                    if not wanted:
+                        continue
+                    with open_backup(archive) as tar:
+                        for member in tar:
+                            if member.isfile() and member.name in wanted:
+                                out.addfile(member, tar.extractfile(member))
+
+            index_path(backup).unlink(missing_ok=True)
+            os.replace(merged, backup)
+            os.replace(index_path(merged), index_path(backup))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        return chain[:-1]
\ No newline at end of file
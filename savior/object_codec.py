@@ -0,0 +1,211 @@
+"""Per-object compression for the dedup store.
+
+Objects are compressed one at a time so any chunk can still be read on its
+own. zstd is used when the optional zstandard package is installed, zlib
+otherwise. Small objects compress poorly alone, so once enough of them have
+been seen a zstd dictionary is trained from them and used for later small
+objects. Data that doesn't shrink (media, archives, random bytes) is
+detected by compressing a few samples and stored as-is.
+"""
+
+import threading
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+try:
+    from .archive import zstd_available
+except ImportError:
+    from archive import zstd_available
+
+# Compress this many bytes from a few spots to judge compressibility
+SAMPLE_SIZE = 16 * 1024
+# Store raw unless the samples shrink below this fraction
+COMPRESSIBLE_RATIO = 0.9
+
+# Dictionary training: objects up to DICT_MAX_OBJECT bytes are sampled until
+# DICT_TRAIN_SAMPLES of them have been seen
+DICT_SIZE = 16 * 1024
+DICT_MAX_OBJECT = 64 * 1024
+DICT_TRAIN_SAMPLES = 256
+
+STREAM_BLOCK = 1024 * 1024
+
+
+class ObjectCodec:
+    """Compresses and decompresses store objects.
+
+    Codec names are kept per object in the index: None (raw), 'zlib',
+    'zstd', or 'zstd:<dict id>' for objects compressed with a trained
+    dictionary, which is kept under ``dicts/`` for as long as the store.
+    """
+
+    def __init__(self, dicts_dir: Path, use_zstd: Optional[bool] = None,
+                 zlib_level: int = 6, zstd_level: int = 3):
+        self.dicts_dir = dicts_dir
+        self._zstd = None
+        if zstd_available():
+            import zstandard
+            self._zstd = zstandard
+        self.use_zstd = self._zstd is not None and use_zstd is not False
+        self.zlib_level = zlib_level
+        self.zstd_level = zstd_level
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._dicts: Dict[int, object] = {}
+        self._samples = []
+        self._dict_id: Optional[int] = None
+
+        if self.use_zstd:
+            self._dict_id = self._load_latest_dict()
+
+    def _load_latest_dict(self) -> Optional[int]:
+        if not self.dicts_dir.exists():
+            return None
+        files = sorted(self.dicts_dir.glob('*.zdict'), key=lambda p: p.stat().st_mtime)
+        return int(files[-1].stem) if files else None
+
+    def _get_dict(self, dict_id: int):
+        zdict = self._dicts.get(dict_id)
+        if zdict is None:
+            data = (self.dicts_dir / f"{dict_id}.zdict").read_bytes()
+            zdict = self._zstd.ZstdCompressionDict(data)
+            self._dicts[dict_id] = zdict
+        return zdict
+
+    def _compressor(self, dict_id: Optional[int]):
+        # zstd contexts aren't thread-safe, so keep one per thread and dict
+        cache = getattr(self._local, 'compressors', None)
+        if cache is None:
+            cache = self._local.compressors = {}
+        cctx = cache.get(dict_id)
+        if cctx is None:
+            kwargs = {'dict_data': self._get_dict(dict_id)} if dict_id is not None else {}
+            cctx = cache[dict_id] = self._zstd.ZstdCompressor(level=self.zstd_level, **kwargs)
+        return cctx
+
+    def _decompressor(self, dict_id: Optional[int]):
+        if self._zstd is None:
+            raise IOError("Object is zstd-compressed; install zstandard to read it")
+        kwargs = {'dict_data': self._get_dict(dict_id)} if dict_id is not None else {}
+        return self._zstd.ZstdDecompressor(**kwargs)
+
+    @staticmethod
+    def is_compressible(data: bytes) -> bool:
+        """Guess from the start, middle and end of data whether it compresses."""
+        if len(data) <= 3 * SAMPLE_SIZE:
+            samples = [data]
+        else:
+            middle = len(data) // 2
+            samples = [data[:SAMPLE_SIZE], data[middle:middle + SAMPLE_SIZE], data[-SAMPLE_SIZE:]]
+
+        raw = sum(len(s) for s in samples)
+        packed = sum(len(zlib.compress(s, 1)) for s in samples)
+        return raw > 0 and packed < raw * COMPRESSIBLE_RATIO
+
+    def compress(self, data: bytes, allow: bool = True) -> Tuple[Optional[str], bytes]:
+        """Compress one object; returns (codec, payload), codec None if raw."""
+        if not allow or not data or not self.is_compressible(data):
+            return None, data
+
+        if self.use_zstd:
+            dict_id = self._dict_id if len(data) <= DICT_MAX_OBJECT else None
+            payload = self._compressor(dict_id).compress(data)
+            codec = 'zstd' if dict_id is None else f'zstd:{dict_id}'
+            if dict_id is None and len(data) <= DICT_MAX_OBJECT:
+                self._add_sample(data)
+        else:
+            payload = zlib.compress(data, self.zlib_level)
+            codec = 'zlib'
+
+        if len(payload) >= len(data):
+            return None, data
+        return codec, payload
+
+    def compress_file(self, src: BinaryIO, dst: BinaryIO, allow: bool = True) -> Tuple[Optional[str], int]:
+        """Stream-compress a large object; returns (codec, bytes written)."""
+        head = src.read(STREAM_BLOCK)
+        codec = None
+        if allow and head and self.is_compressible(head):
+            codec = 'zstd' if self.use_zstd else 'zlib'
+
+        if codec is None:
+            written = 0
+            block = head
+            while block:
+                dst.write(block)
+                written += len(block)
+                block = src.read(STREAM_BLOCK)
+            return None, written
+
+        if codec == 'zstd':
+            compressor = self._compressor(None).compressobj()
+        else:
+            compressor = zlib.compressobj(self.zlib_level)
+
+        written = 0
+        block = head
+        while block:
+            out = compressor.compress(block)
+            dst.write(out)
+            written += len(out)
+            block = src.read(STREAM_BLOCK)
+        out = compressor.flush()
+        dst.write(out)
+        return codec, written + len(out)
+
+    def decompress(self, codec: Optional[str], payload: bytes) -> bytes:
+        if codec is None:
+            return payload
+        if codec == 'zlib':
+            return zlib.decompress(payload)
+        # Streamed objects carry no content size, so use a streaming context
+        return self._decompressor(self._dict_of(codec)).decompressobj().decompress(payload)
+
+    def decompress_file(self, codec: Optional[str], src: BinaryIO, dst: BinaryIO):
+        """Stream-decompress a loose object into dst."""
+        if codec == 'zlib':
+            decompressor = zlib.decompressobj()
+            block = src.read(STREAM_BLOCK)
+            while block:
+                dst.write(decompressor.decompress(block))
+                block = src.read(STREAM_BLOCK)
+            dst.write(decompressor.flush())
+            return
+
+        if codec is None:
+            reader = src
+        else:
+            reader = self._decompressor(self._dict_of(codec)).stream_reader(src)
+        block = reader.read(STREAM_BLOCK)
+        while block:
+            dst.write(block)
+            block = reader.read(STREAM_BLOCK)
+
+    @staticmethod
+    def _dict_of(codec: str) -> Optional[int]:
+        _, _, dict_id = codec.partition(':')
+        return int(dict_id) if dict_id else None
+
+    def _add_sample(self, data: bytes):
+        with self._lock:
+            if self._dict_id is not None:
+                return
+            self._samples.append(data)
+            if len(self._samples) >= DICT_TRAIN_SAMPLES:
+                self._train()
+
+    def _train(self):
+        samples, self._samples = self._samples, []
+        try:
+            zdict = self._zstd.train_dictionary(DICT_SIZE, samples)
+        except self._zstd.ZstdError:
+            # Too little variety to train on; keep compressing without one
+            return
+
+        dict_id = zdict.dict_id()
+        self.dicts_dir.mkdir(parents=True, exist_ok=True)
+        (self.dicts_dir / f"{dict_id}.zdict").write_bytes(zdict.as_bytes())
+        self._dicts[dict_id] = zdict
+        self._dict_id = dict_id
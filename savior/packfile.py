@@ -0,0 +1,165 @@
+"""Append-only packfiles for small dedup objects.
+
+Instead of one file per object, small objects are appended to a few large
+pack files. Each record is a fixed header (sha256 digest and length)
+followed by the data, so a pack can be scanned and verified without the
+index; the index stores each object's pack, data offset and length for
+direct reads.
+"""
+
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# Packs are closed and a new one started once they reach this size
+DEFAULT_MAX_PACK_SIZE = 64 * 1024 * 1024
+
+HEADER = struct.Struct('>32sQ')
+
+
+class PackReader:
+    """Reads objects while keeping one open handle per pack.
+
+    Reading objects in (pack, offset) order turns a restore into a
+    sequential scan of each pack.
+    """
+
+    def __init__(self, packs_dir: Path):
+        self.packs_dir = packs_dir
+        self._handles: Dict[str, object] = {}
+
+    def read(self, pack: str, offset: int, length: int) -> bytes:
+        handle = self._handles.get(pack)
+        if handle is None:
+            handle = open(self.packs_dir / pack, 'rb')
+            self._handles[pack] = handle
+        if handle.tell() != offset:
+            handle.seek(offset)
+        data = handle.read(length)
+        if len(data) != length:
+            raise IOError(f"Truncated object in {pack} at offset {offset}")
+        return data
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class PackStore:
+    """Manages the pack directory and the single pack being appended to."""
+
+    def __init__(self, packs_dir: Path, max_pack_size: int = DEFAULT_MAX_PACK_SIZE):
+        self.packs_dir = packs_dir
+        self.max_pack_size = max_pack_size
+        self.packs_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._active_name: Optional[str] = None
+        self._active = None
+
+    def _pack_names(self):
+        return sorted(p.name for p in self.packs_dir.glob('pack-*.pack'))
+
+    def _next_number(self) -> int:
+        numbers = [int(name[5:-5]) for name in self._pack_names()]
+        return max(numbers, default=0) + 1
+
+    def _create_pack(self) -> Tuple[str, object]:
+        """Create a new, empty pack no other process is writing to.
+
+        O_EXCL makes the creation itself the claim: two processes that
+        pick the same number can't both open it, and the loser moves on.
+        """
+        number = self._next_number()
+        while True:
+            name = f"pack-{number:06d}.pack"
+            try:
+                fd = os.open(self.packs_dir / name, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                number += 1
+                continue
+            return name, os.fdopen(fd, 'wb')
+
+    def _open_active(self):
+        if self._active is not None and self._active.tell() < self.max_pack_size:
+            return
+        if self._active is not None:
+            self._active.close()
+
+        # Always start a fresh pack per process so packs written earlier
+        # are never appended to after their index entries were committed
+        self._active_name, self._active = self._create_pack()
+
+    def append(self, content_hash: str, data: bytes) -> Tuple[str, int, int]:
+        """Append an object; returns (pack name, data offset, length)."""
+        header = HEADER.pack(bytes.fromhex(content_hash), len(data))
+        with self._lock:
+            self._open_active()
+            offset = self._active.tell() + HEADER.size
+            self._active.write(header)
+            self._active.write(data)
+            return self._active_name, offset, len(data)
+
+    def flush(self, sync: bool = False):
+        """Push buffered appends to the OS (and to disk with sync=True)."""
+        with self._lock:
+            if self._active is not None:
+                self._active.flush()
+                if sync:
+                    os.fsync(self._active.fileno())
+
+    def seal(self):
+        """Close the active pack so the next append starts a new one."""
+        with self._lock:
+            if self._active is not None:
+                self._active.close()
+                self._active = None
+                self._active_name = None
+
+    @property
+    def active_name(self) -> Optional[str]:
+        return self._active_name
+
+    def reader(self) -> PackReader:
+        self.flush()
+        return PackReader(self.packs_dir)
+
+    def read(self, pack: str, offset: int, length: int) -> bytes:
+        with self.reader() as reader:
+            return reader.read(pack, offset, length)
+
+    def iter_pack(self, pack: str) -> Iterator[Tuple[str, int, bytes]]:
+        """Scan a pack front to back, yielding (hash, offset, data)."""
+        self.flush()
+        with open(self.packs_dir / pack, 'rb') as f:
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+                digest, length = HEADER.unpack(header)
+                offset = f.tell()
+                yield digest.hex(), offset, f.read(length)
+
+    def pack_sizes(self) -> Dict[str, int]:
+        self.flush()
+        return {name: (self.packs_dir / name).stat().st_size for name in self._pack_names()}
+
+    def delete_pack(self, pack: str):
+        if pack == self._active_name:
+            self.seal()
+        try:
+            (self.packs_dir / pack).unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        self.seal()
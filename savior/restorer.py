@@ -0,0 +1,369 @@
+"""Delta restore of a backup straight into the project tree.
+
+A restore is planned first: the backup's index hashes are compared with
+the current tree (using the incremental stat cache where it is still
+valid, hashing otherwise) to find the files that really need writing,
+deleting or a permission fix. Everything else is left alone, so editors
+and build tools only see the files that changed.
+
+The plan is then executed in parallel. File data is streamed from the
+archives and each file is written to a temp file beside its target, then
+renamed over it, so at most one file per worker of extra disk is used.
+
+PipedRestorer does the same for a full backup that is only available as
+a stream, such as a cloud download, without a local copy of the archive.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from stat import S_ISREG
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+try:
+    from .archive import BackupIndex, open_backup, open_backup_stream, backup_file_entries, is_within
+    from .hashing import get_hasher, default_jobs
+    from .incremental import IncrementalBackup, plan_chain, MANIFEST_NAME
+    from .gitindex import HASH_PREFIX as GIT_HASH_PREFIX
+except ImportError:
+    from archive import BackupIndex, open_backup, open_backup_stream, backup_file_entries, is_within
+    from hashing import get_hasher, default_jobs
+    from incremental import IncrementalBackup, plan_chain, MANIFEST_NAME
+    from gitindex import HASH_PREFIX as GIT_HASH_PREFIX
+
+COPY_BLOCK = 1024 * 1024
+TEMP_PREFIX = '.savior-restore-'
+
+
+class RestorePlan:
+    """The minimal set of changes that makes the project match a backup.
+
+    writes maps each file to write to its index entry (sha256 None when
+    the archive has no index, in which case the file is compared with
+    what's on disk while it is written). deletes lists files the backup
+    doesn't have; chmods maps files with the right contents but the wrong
+    permissions to the mode they should get.
+    """
+
+    def __init__(self):
+        self.writes: Dict[str, Dict] = {}
+        self.deletes: List[str] = []
+        self.chmods: Dict[str, int] = {}
+        self.unchanged = 0
+
+    @property
+    def bytes_to_write(self) -> int:
+        return sum(entry['size'] for entry in self.writes.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.writes or self.deletes or self.chmods)
+
+
+class _ProjectWriter:
+    """Writes files into a project tree, leaving identical ones untouched."""
+
+    def __init__(self, project_dir: Path):
+        self.project_dir = Path(project_dir)
+        self.root = self.project_dir.resolve()
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """lstat every project file outside .savior"""
+        current = {}
+        for root, dirs, files in os.walk(self.project_dir, followlinks=False):
+            if root == str(self.project_dir) and '.savior' in dirs:
+                dirs.remove('.savior')
+            for file in files:
+                file_path = Path(root) / file
+                try:
+                    current[file_path.relative_to(self.project_dir).as_posix()] = file_path.lstat()
+                except OSError:
+                    continue
+        return current
+
+    def _write(self, stats: Dict[str, int], name: str, reader, mode: int, mtime: float,
+               verify=None, known_changed: bool = False):
+        """Stream one file into place through a temp file next to it.
+
+        Unless known_changed, a file whose current contents turn out to be
+        identical is left untouched, apart from fixing its permissions.
+        """
+        target = self.project_dir / name
+        if not is_within(target.resolve(), self.root):
+            return  # Same protection tarfile's 'data' filter gives
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=target.parent, prefix=TEMP_PREFIX)
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, 'wb') as f:
+                for block in iter(lambda: reader.read(COPY_BLOCK), b''):
+                    f.write(block)
+                    digest.update(block)
+                    size += len(block)
+            if verify is not None:
+                verify()
+
+            if not known_changed and self._same_as(target, size, digest.hexdigest()):
+                os.unlink(temp_path)
+                if target.stat().st_mode & 0o7777 != mode & 0o7777:
+                    os.chmod(target, mode & 0o7777)
+                    stats['chmodded'] += 1
+                else:
+                    stats['skipped'] += 1
+                return
+
+            os.chmod(temp_path, mode & 0o7777)
+            os.utime(temp_path, (mtime, mtime))
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        stats['written'] += 1
+        stats['bytes_written'] += size
+
+    @staticmethod
+    def _same_as(target: Path, size: int, sha256: str) -> bool:
+        try:
+            if not target.is_file() or target.is_symlink() or target.stat().st_size != size:
+                return False
+            return get_hasher().hash_file(target, 'sha256') == sha256
+        except OSError:
+            return False
+
+
+class StreamingRestorer(_ProjectWriter):
+    """Restores the final state of a backup chain into project_dir.
+
+    chain is the list from resolve_chain(): a full backup, optionally
+    followed by the incremental backups built on it. stat_cache is the
+    incremental backup's file_states ({path: stat info and hash}); files
+    whose stat still matches it are not rehashed.
+    """
+
+    def __init__(self, project_dir: Path, chain: List[Path],
+                 stat_cache: Optional[Dict[str, Dict]] = None, jobs: Optional[int] = None):
+        super().__init__(project_dir)
+        self.chain = [Path(archive) for archive in chain]
+        self.winners, _ = plan_chain(self.chain)
+        self.stat_cache = stat_cache or {}
+        self.jobs = max(1, jobs or default_jobs())
+        self._indexes = {archive: BackupIndex.load(archive) for archive in self.chain}
+
+    def _names_from(self, archive: Path) -> Set[str]:
+        return {name for name, source in self.winners.items() if source == archive}
+
+    def entries(self, with_hashes: bool = False) -> Dict[str, Dict]:
+        """Index entry (name, size, mode, mtime, sha256) of every restored file.
+
+        Archives without a sidecar index have no stored hashes; with
+        with_hashes they are read once to compute them, otherwise their
+        sha256 is None.
+        """
+        result = {}
+        for archive in self.chain:
+            wanted = self._names_from(archive)
+            if not wanted:
+                continue
+
+            index = self._indexes[archive]
+            if index is not None:
+                files = index.files()
+            elif with_hashes:
+                files = backup_file_entries(archive)
+            else:
+                with open_backup(archive) as tar:
+                    files = [{'name': m.name, 'type': 'file', 'mode': m.mode, 'mtime': m.mtime,
+                              'size': m.size, 'sha256': None}
+                             for m in tar.getmembers() if m.isfile()]
+
+            for entry in files:
+                if entry['name'] in wanted:
+                    result[entry['name']] = entry
+        return result
+
+    def restore(self, progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, int]:
+        """Plan and execute a restore; returns counts of what was done."""
+        return self.execute(self.plan(), progress)
+
+    def _cached_hash(self, name: str, stat: os.stat_result) -> Optional[str]:
+        """The stat cache's hash for a file, if its stat hasn't changed since"""
+        cached = self.stat_cache.get(str(Path(name)))
+        if not cached or cached.get('racy') or 'hash' not in cached:
+            return None
+        if cached['hash'].startswith(GIT_HASH_PREFIX):
+            return None  # A git blob id, not comparable with sha256
+        info = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                'inode': stat.st_ino, 'ctime_ns': stat.st_ctime_ns}
+        if all(cached.get(key) == info[key] for key in IncrementalBackup.STAT_KEYS):
+            return cached['hash']
+        return None
+
+    def plan(self) -> RestorePlan:
+        """Work out which files to write, delete and chmod."""
+        plan = RestorePlan()
+        entries = self.entries()
+        current = self._scan()
+
+        plan.deletes = sorted(name for name in current if name not in self.winners)
+
+        to_hash = []
+        for name, entry in entries.items():
+            stat = current.get(name)
+            if (stat is None or not S_ISREG(stat.st_mode)
+                    or stat.st_size != entry['size'] or entry.get('sha256') is None):
+                plan.writes[name] = entry
+                continue
+            cached = self._cached_hash(name, stat)
+            if cached is None:
+                to_hash.append(name)
+            elif cached != entry['sha256']:
+                plan.writes[name] = entry
+            else:
+                self._check_mode(plan, name, entry, stat)
+
+        digests = get_hasher().hash_files([self.project_dir / name for name in to_hash], 'sha256')
+        for name in to_hash:
+            entry = entries[name]
+            if digests[self.project_dir / name] != entry['sha256']:
+                plan.writes[name] = entry
+            else:
+                self._check_mode(plan, name, entry, current[name])
+        return plan
+
+    @staticmethod
+    def _check_mode(plan: RestorePlan, name: str, entry: Dict, stat: os.stat_result):
+        mode = entry['mode'] & 0o7777
+        if stat.st_mode & 0o7777 != mode:
+            plan.chmods[name] = mode
+        else:
+            plan.unchanged += 1
+
+    def execute(self, plan: RestorePlan,
+                progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, int]:
+        """Apply a plan; returns counts of what was done.
+
+        Deletes run first, so a directory in the backup can take the place
+        of a file being deleted. Writes are split into runs of neighbouring
+        files, each read with its own stream, and spread over the worker
+        threads. progress(stage, done, total) is called as each run of
+        writes finishes.
+        """
+        stats = {'written': 0, 'bytes_written': 0, 'deleted': 0, 'chmodded': 0,
+                 'skipped': plan.unchanged}
+
+        for name in plan.deletes:
+            try:
+                (self.project_dir / name).unlink()
+                stats['deleted'] += 1
+            except OSError:
+                continue  # Skip files we can't remove
+
+        for name, mode in plan.chmods.items():
+            try:
+                os.chmod(self.project_dir / name, mode)
+                stats['chmodded'] += 1
+            except OSError:
+                continue
+
+        jobs = []
+        for archive in self.chain:
+            names = self._names_from(archive) & plan.writes.keys()
+            if not names:
+                continue
+            index = self._indexes[archive]
+            if index is None:
+                # A plain tar stream can only be read front to back
+                jobs.append((archive, None, names))
+            else:
+                for run in self._split_runs(index, names):
+                    jobs.append((archive, index, run))
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=min(self.jobs, max(1, len(jobs)))) as pool:
+            for job, result in zip(jobs, pool.map(lambda job: self._write_run(*job), jobs)):
+                for key, value in result.items():
+                    stats[key] += value
+                done += len(job[2])
+                if progress:
+                    progress('restore', done, len(plan.writes))
+        return stats
+
+    def _split_runs(self, index: BackupIndex, names: Set[str]) -> List[List[str]]:
+        """Split an archive's files into about self.jobs runs of similar size"""
+        entries = sorted((index.members[name] for name in names), key=lambda e: e['offset'])
+        target = max(1, sum(e['size'] for e in entries) // self.jobs)
+        runs, run, run_bytes = [], [], 0
+        for entry in entries:
+            run.append(entry['name'])
+            run_bytes += entry['size']
+            if run_bytes >= target:
+                runs.append(run)
+                run, run_bytes = [], 0
+        if run:
+            runs.append(run)
+        return runs
+
+    def _write_run(self, archive: Path, index: Optional[BackupIndex], names) -> Dict[str, int]:
+        stats = {'written': 0, 'bytes_written': 0, 'chmodded': 0, 'skipped': 0}
+        if index is not None:
+            for entry, reader in index.open_many(names):
+                self._write(stats, entry['name'], reader, entry['mode'], entry['mtime'],
+                            verify=reader.verify, known_changed=True)
+        else:
+            names = set(names)
+            with open_backup(archive) as tar:
+                for member in tar:
+                    if member.isfile() and member.name in names:
+                        self._write(stats, member.name, tar.extractfile(member),
+                                    member.mode, member.mtime)
+        return stats
+
+
+class PipedRestorer(_ProjectWriter):
+    """Restores a full backup read front to back from a stream.
+
+    With no index to plan from, each file is compared with the tree as it
+    arrives and only written if it differs; files the backup doesn't have
+    are deleted once the whole archive has been read.
+    """
+
+    def restore(self, stream) -> Dict[str, int]:
+        """Restore from a readable binary stream; returns counts like execute()."""
+        stats = {'written': 0, 'bytes_written': 0, 'deleted': 0, 'chmodded': 0, 'skipped': 0}
+        current = self._scan()
+        restored = set()
+
+        tar = open_backup_stream(stream)
+        try:
+            for number, member in enumerate(tar):
+                if number == 0 and member.name == MANIFEST_NAME and self._is_incremental(tar, member):
+                    raise ValueError("Incremental backups need the rest of their chain; "
+                                     "download them instead of restoring from a stream")
+                if member.isfile():
+                    restored.add(member.name)
+                    self._write(stats, member.name, tar.extractfile(member),
+                                member.mode, member.mtime)
+        finally:
+            tar.close()
+
+        for name in sorted(set(current) - restored):
+            try:
+                (self.project_dir / name).unlink()
+                stats['deleted'] += 1
+            except OSError:
+                continue  # Skip files we can't remove
+        return stats
+
+    @staticmethod
+    def _is_incremental(tar, member) -> bool:
+        # A project can have its own MANIFEST.json; only ours names a base
+        try:
+            return 'base_backup' in json.loads(tar.extractfile(member).read())
+        except (ValueError, TypeError):
+            return False
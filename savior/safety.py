@@ -14,6 +14,11 @@ from contextlib import contextmanager
 import threading
 import time
 
+try:
+    from .archive import open_backup
+except ImportError:
+    from archive import open_backup
+
 
 class FileLock:
     """Cross-platform file locking to prevent concurrent operations."""
@@ -163,6 +168,39 @@ class ResourceMonitor:
         self.max_memory_percent = 80  # Max memory usage
         self.min_disk_space_mb = 500  # Min free disk space
         self.max_file_descriptors_percent = 80  # Max FD usage
+        self.busy_cpu_percent = 60  # CPU used by other processes
+        self.busy_disk_percent = 50  # Time the disks spend on I/O
+        self._process = psutil.Process()
+        self._process.cpu_percent(None)
+        psutil.cpu_percent(None)
+        self._disk_sample = self._disk_busy_time()
+
+    @staticmethod
+    def _disk_busy_time() -> Optional[Tuple[float, int]]:
+        try:
+            counters = psutil.disk_io_counters()
+            return time.monotonic(), counters.busy_time
+        except (AttributeError, RuntimeError, OSError):
+            return None  # busy_time is only reported on Linux and FreeBSD
+
+    def check_busy(self) -> Tuple[bool, str]:
+        """Check whether the machine is busy with other work.
+
+        Compares CPU use and disk busy time since the previous call. Our
+        own CPU use is left out, so a running backup doesn't count.
+        """
+        cpus = psutil.cpu_count() or 1
+        others = psutil.cpu_percent(None) - self._process.cpu_percent(None) / cpus
+        if others > self.busy_cpu_percent:
+            return True, f"CPU busy: {others:.0f}%"
+
+        sample = self._disk_busy_time()
+        previous, self._disk_sample = self._disk_sample, sample
+        if sample and previous and sample[0] > previous[0]:
+            busy = (sample[1] - previous[1]) / ((sample[0] - previous[0]) * 1000) * 100
+            if busy > self.busy_disk_percent:
+                return True, f"Disk busy: {busy:.0f}%"
+        return False, ""
 
     def check_memory(self) -> Tuple[bool, str]:
         """Check if memory usage is safe."""
@@ -273,13 +311,11 @@ class SafeFileOperations:
     def safe_extract(archive_path: Path, extract_to: Path,
                     max_size_mb: int = 10000) -> Tuple[bool, str]:
         """Safely extract archive with size limits."""
-        import tarfile
-
         total_size = 0
         max_size = max_size_mb * 1024 * 1024
 
         try:
-            with tarfile.open(archive_path, 'r:gz') as tar:
+            with open_backup(archive_path) as tar:
                 # Check total extracted size first
                 for member in tar.getmembers():
                     total_size += member.size
@@ -320,11 +356,9 @@ class BackupIntegrityChecker:
 
     @staticmethod
     def verify_archive(archive_path: Path) -> Tuple[bool, str]:
-        """Verify tar.gz archive integrity."""
-        import tarfile
-
+        """Verify backup archive integrity (any supported codec)."""
         try:
-            with tarfile.open(archive_path, 'r:gz') as tar:
+            with open_backup(archive_path) as tar:
                 # Try to read all members
                 for member in tar.getmembers():
                     if member.isfile():
@@ -0,0 +1,205 @@
+"""Parallel directory scanner producing a table of file stats.
+
+A backup used to stat every file several times: once to decide whether
+it's a backup candidate, again to estimate the backup's size, and again
+when tar.add looked the path up. The scanner walks the tree with
+os.scandir, stats each file once through its DirEntry, and keeps the
+result in a FileTable that the later steps read instead.
+
+Directory listings are fanned out over a thread pool: scandir and stat
+release the GIL, so on large trees (and on network or cold disks in
+particular) several directories are read at once.
+"""
+
+import os
+import stat as stat_module
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    from .hashing import default_jobs
+except ImportError:
+    from hashing import default_jobs
+
+# Files this size or larger are left out of backups
+MAX_FILE_SIZE = 100 * 1024 * 1024
+
+
+class FileStat(NamedTuple):
+    """What a backup needs from a file's stat."""
+    size: int
+    mtime_ns: int
+    mode: int  # The link's own mode for symlinks, so they're archived as links
+    inode: int
+    ctime_ns: int
+
+    @classmethod
+    def from_stat(cls, st: os.stat_result, mode: Optional[int] = None) -> 'FileStat':
+        return cls(st.st_size, st.st_mtime_ns, st.st_mode if mode is None else mode,
+                   st.st_ino, st.st_ctime_ns)
+
+
+class FileTable(set):
+    """The set of scanned file paths, with each file's FileStat.
+
+    It is a set of Paths, so everything that took the old Set[Path] still
+    works; set operations give plain sets without the stats.
+    """
+
+    def __init__(self, paths: Iterable[Path] = ()):
+        super().__init__()
+        self.stats = {}
+        for path in paths:
+            self.add(path)
+
+    def add(self, path: Path, stat: Optional[FileStat] = None):
+        super().add(path)
+        if stat is not None:
+            self.stats[path] = stat
+
+    def update(self, *others: Iterable[Path]):
+        for other in others:
+            super().update(other)
+            if isinstance(other, FileTable):
+                self.stats.update(other.stats)
+
+    def discard(self, path: Path):
+        super().discard(path)
+        self.stats.pop(path, None)
+
+    def stat(self, path: Path) -> Optional[FileStat]:
+        """The scanned stat of path, or None if it wasn't scanned"""
+        return self.stats.get(path)
+
+    def total_size(self) -> int:
+        """Total size of the files, stat-ing only those not scanned"""
+        total = 0
+        for path in self:
+            stat = self.stats.get(path)
+            if stat is not None:
+                total += stat.size
+                continue
+            try:
+                total += path.stat().st_size
+            except OSError:
+                continue
+        return total
+
+
+def known_stat(files: Set[Path], path: Path) -> Optional[FileStat]:
+    """The scanned stat of path if files is a FileTable that has it"""
+    return files.stat(path) if isinstance(files, FileTable) else None
+
+
+class DirectoryScanner:
+    """Walks a project for backup candidates, like os.walk but in parallel.
+
+    ignore is called with each path relative to the project (os.sep
+    separated); ignored directories aren't entered. Symlinks to
+    directories are not followed, and unreadable directories are skipped,
+    both as os.walk does.
+    """
+
+    def __init__(self, project_dir: Path, ignore: Optional[Callable[[str], bool]] = None,
+                 jobs: Optional[int] = None, max_size: int = MAX_FILE_SIZE):
+        self.project_dir = Path(project_dir)
+        self.ignore = ignore or (lambda rel_path: False)
+        self.jobs = max(1, jobs or default_jobs())
+        self.max_size = max_size
+
+    def stat_file(self, path: Path) -> Optional[FileStat]:
+        """The FileStat of one file if it's a backup candidate, else None.
+
+        For paths known without a walk (the watcher's changed files); the
+        ignore rules are the caller's to check.
+        """
+        try:
+            st = os.lstat(path)
+            mode = st.st_mode
+            if stat_module.S_ISLNK(mode):
+                st = os.stat(path)
+            if (not stat_module.S_ISREG(st.st_mode) or st.st_size >= self.max_size
+                    or not os.access(path, os.R_OK)):
+                return None
+        except OSError:
+            return None
+        return FileStat.from_stat(st, mode)
+
+    def scan(self, root: Optional[Path] = None) -> FileTable:
+        """Backup candidates under root (default: the whole project)"""
+        root = Path(root) if root is not None else self.project_dir
+        try:
+            rel_root = root.relative_to(self.project_dir)
+        except ValueError:
+            return FileTable()
+        rel_root = '' if rel_root == Path('.') else str(rel_root)
+
+        table = FileTable()
+        if self.jobs == 1:
+            pending = [(root, rel_root)]
+            while pending:
+                files, subdirs = self._scan_dir(*pending.pop())
+                self._collect(table, files)
+                pending.extend(subdirs)
+            return table
+
+        # Workers post each listing to results; this thread merges them and
+        # submits the subdirectories, until no listing is outstanding
+        results = queue.Queue()
+        with ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix='savior-scan') as pool:
+            def submit(path: Path, rel: str):
+                pool.submit(self._scan_dir, path, rel).add_done_callback(results.put)
+
+            submit(root, rel_root)
+            outstanding = 1
+            while outstanding:
+                files, subdirs = results.get().result()
+                outstanding -= 1
+                self._collect(table, files)
+                for path, rel in subdirs:
+                    submit(path, rel)
+                outstanding += len(subdirs)
+        return table
+
+    @staticmethod
+    def _collect(table: FileTable, files: List[Tuple[Path, FileStat]]):
+        set.update(table, (path for path, _ in files))
+        table.stats.update(files)
+
+    def _scan_dir(self, path: Path, rel: str) -> Tuple[List[Tuple[Path, FileStat]], List[Tuple[Path, str]]]:
+        """(files, subdirectories) of one directory"""
+        files = []
+        subdirs = []
+        try:
+            it = os.scandir(path)
+        except OSError:
+            return files, subdirs
+
+        with it:
+            for entry in it:
+                rel_path = rel + os.sep + entry.name if rel else entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+
+                if is_dir:
+                    if not entry.is_symlink() and not self.ignore(rel_path):
+                        subdirs.append((path / entry.name, rel_path))
+                    continue
+                if self.ignore(rel_path):
+                    continue
+
+                try:
+                    # Cached on the entry: the only stat this file gets
+                    stat = entry.stat()
+                    if stat.st_size >= self.max_size or not os.access(entry.path, os.R_OK):
+                        continue
+                    mode = entry.stat(follow_symlinks=False).st_mode if entry.is_symlink() else stat.st_mode
+                except OSError:
+                    continue  # Vanished, a dangling link, or not ours to stat
+                # Joining onto the parent parses just the name, not the whole path
+                files.append((path / entry.name, FileStat.from_stat(stat, mode)))
+        return files, subdirs
@@ -0,0 +1,347 @@
+"""Watch many projects from one process.
+
+The daemon used to run a `savior watch` subprocess per project, each with
+its own interpreter, observer and incremental state. Here every project
+is a ProjectWatch on one shared watchdog observer, and one scheduler
+thread hands projects that are due to a bounded worker pool:
+
+    - each project keeps its own interval and smart/basic mode
+    - at most max_concurrent backups run at once, across all projects
+    - when more projects are due than there are workers, normal priority
+      projects go first, then adaptive, then low; ties go to whichever
+      has waited longest
+
+Nothing project-sized stays in memory between saves: the incremental
+file states are loaded for a save and dropped after it, so the resident
+cost of a watched project is its dirty set and a few small objects.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from watchdog.observers import Observer
+
+try:
+    from .activity import SmartWatcher
+    from .core import Savior, Backup
+    from .incremental import IncrementalBackup, resolve_chain
+    from .throttle import PRIORITIES, configure_throttle
+except ImportError:
+    from activity import SmartWatcher
+    from core import Savior, Backup
+    from incremental import IncrementalBackup, resolve_chain
+    from throttle import PRIORITIES, configure_throttle
+
+# Order in which due projects get a worker
+PRIORITY_RANK = {'normal': 0, 'adaptive': 1, 'low': 2}
+
+MAX_INTERVAL = 24 * 60  # Minutes
+IDLE_TIME = 2.0
+RETRY_DELAY = 5 * 60  # Seconds before retrying a failed save
+
+
+class ProjectWatch:
+    """One watched project: its settings, dirty tracking and save state."""
+
+    def __init__(self, path: Path, options: Dict, observer: Optional[Observer] = None):
+        self.path = Path(path)
+        self.options = dict(options)
+        self.interval = min(int(options.get('interval', 20)), MAX_INTERVAL) * 60
+        self.smart = options.get('smart', True)
+        self.incremental = options.get('incremental', True)
+        priority = options.get('priority')
+        self.priority = priority if priority in PRIORITIES else 'normal'
+        self.savior = Savior(self.path, exclude_git=bool(options.get('exclude_git')))
+        # Basic mode saves on the clock, but still uses the dirty set so
+        # incremental saves only scan what changed
+        self.watcher = SmartWatcher(self.path, None, idle_time=IDLE_TIME,
+                                    check_interval=self.interval, observer=observer)
+        self.started = datetime.now()
+        self.last_save = time.monotonic()
+        self.retry_at: Optional[float] = None
+        self.running = False
+        self.saves = 0
+        self.last_backup: Optional[str] = None
+        self.last_error: Optional[str] = None
+        if not self.savior.list_backups():
+            self.retry_at = self.last_save  # Take the first backup right away
+
+    @property
+    def rank(self) -> int:
+        return PRIORITY_RANK[self.priority]
+
+    def due_at(self, now: float) -> float:
+        """Monotonic time at which this project should next be saved"""
+        due = self.retry_at if self.retry_at is not None else self.last_save + self.interval
+        if self.smart and due <= now:
+            # Wait for a pause in activity, however long the work runs
+            idle_left = self.watcher.monitor.idle_remaining()
+            if idle_left > 0:
+                return now + idle_left
+        return due
+
+    def next_save(self) -> datetime:
+        """Wall-clock estimate of the next save, for status displays"""
+        due = self.retry_at if self.retry_at is not None else self.last_save + self.interval
+        return datetime.now() + timedelta(seconds=max(0.0, due - time.monotonic()))
+
+    def save(self):
+        """Back the project up once; runs on a scheduler worker"""
+        savior = self.savior
+        if not savior.list_backups():
+            # Incremental backups need a full one to build on
+            backup = savior.create_backup("Initial backup", show_progress=False)
+            self.watcher.take_changes()  # The full backup covered them
+        elif not self.incremental:
+            backup = savior.create_backup("Automatic backup", show_progress=False)
+        else:
+            backup = self._save_incremental()
+
+        self.saves += 1
+        self.last_backup = backup.timestamp.isoformat()
+        with savior._metadata_lock:
+            metadata = savior._load_metadata()
+            metadata['next_backup'] = (datetime.now() + timedelta(seconds=self.interval)).isoformat()
+            savior._save_metadata(metadata)
+
+    def _save_incremental(self) -> Backup:
+        savior = self.savior
+        changes = self.watcher.take_changes()
+        backups = savior.list_backups()
+        base_backup = backups[0].path if backups else None
+
+        # Loaded per save rather than kept: the states are the bulk of a
+        # project's memory and are only needed while saving
+        inc_backup = IncrementalBackup(savior.backup_dir, savior.project_dir)
+        try:
+            if changes is None:
+                files = savior._collect_files()
+                backup_path = inc_backup.create_incremental_backup(files, base_backup)
+            else:
+                dirty_files, dirty_dirs = changes
+                files = savior._collect_dirty(dirty_files, dirty_dirs)
+                backup_path = inc_backup.create_incremental_backup(
+                    files, base_backup, scope=dirty_files | dirty_dirs
+                )
+        except Exception:
+            self.watcher.requeue_changes(changes)
+            raise
+
+        backup = Backup(
+            timestamp=datetime.now(),
+            path=backup_path,
+            description="Incremental backup",
+            size=backup_path.stat().st_size
+        )
+        with savior._metadata_lock:
+            metadata = savior._load_metadata()
+            metadata['backups'].append(backup.to_dict())
+            savior._save_metadata(metadata)
+
+        # Already on a worker, so a long chain is folded in right here
+        try:
+            chain_length = len(resolve_chain(backup_path))
+        except (OSError, ValueError):
+            chain_length = 0
+        if chain_length > IncrementalBackup.MAX_CHAIN:
+            savior.synthesize_full(backup_path)
+        return backup
+
+    def start(self):
+        self.watcher.start()
+        self._record_session(started=True)
+
+    def stop(self):
+        self.watcher.stop()
+        self._record_session(started=False)
+
+    def _record_session(self, started: bool):
+        """Mirror `savior watch` in the project's metadata, for status and the app"""
+        savior = self.savior
+        try:
+            with savior._metadata_lock:
+                metadata = savior._load_metadata()
+                metadata['watching'] = started
+                sessions = metadata.setdefault('sessions', [])
+                if started:
+                    sessions.append({
+                        'started': self.started.isoformat(),
+                        'stopped': None,
+                        'mode': 'daemon',
+                        'interval': self.interval // 60,
+                        'cloud': False
+                    })
+                    metadata['watch_interval'] = self.interval // 60
+                    metadata['next_backup'] = self.next_save().isoformat()
+                elif sessions and sessions[-1].get('stopped') is None:
+                    sessions[-1]['stopped'] = datetime.now().isoformat()
+                savior._save_metadata(metadata)
+        except OSError:
+            pass  # Read-only or vanished project; watching still works
+
+    def to_dict(self) -> Dict:
+        return {
+            'pid': os.getpid(),
+            'started': self.started.isoformat(),
+            'options': self.options,
+            'running': self.running,
+            'saves': self.saves,
+            'last_backup': self.last_backup,
+            'next_backup': self.next_save().isoformat(),
+            'last_error': self.last_error
+        }
+
+
+class ProjectScheduler:
+    """Schedule backups for many projects on one observer and worker pool."""
+
+    def __init__(self, max_concurrent: int = 4, log: Optional[Callable[[str], None]] = None):
+        self.max_concurrent = max(1, max_concurrent)
+        self._log = log or (lambda message: None)
+        self._projects: Dict[str, ProjectWatch] = {}
+        self._cond = threading.Condition()
+        self._active = 0
+        self._running = False
+        self._observer = Observer()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                        thread_name_prefix='savior-project')
+        self._thread = threading.Thread(target=self._run, name='savior-scheduler', daemon=True)
+        self._throttle_key = None
+
+    def start(self):
+        self._running = True
+        self._observer.start()
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            projects = list(self._projects.values())
+            self._projects.clear()
+            self._cond.notify_all()
+        for project in projects:
+            project.stop()
+        self._pool.shutdown(wait=True)
+        if self._observer.is_alive():
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def add(self, path: str, options: Dict) -> ProjectWatch:
+        """Start watching path; raises ValueError if it already is watched"""
+        with self._cond:
+            if path in self._projects:
+                raise ValueError('Project already being watched')
+        project = ProjectWatch(Path(path), options, self._observer)
+        project.start()
+        with self._cond:
+            self._projects[path] = project
+            self._cond.notify_all()
+        self._update_throttle()
+        return project
+
+    def remove(self, path: str) -> bool:
+        with self._cond:
+            project = self._projects.pop(path, None)
+            self._cond.notify_all()
+        if project is None:
+            return False
+        project.stop()
+        self._update_throttle()
+        return True
+
+    def save_now(self, path: str) -> bool:
+        """Make a project due immediately (smart mode still waits for idle)"""
+        with self._cond:
+            project = self._projects.get(path)
+            if project is None:
+                return False
+            project.retry_at = time.monotonic()
+            self._cond.notify_all()
+        return True
+
+    def savior_for(self, path: str) -> Optional[Savior]:
+        """The Savior of a watched project, shared so metadata writes don't race"""
+        with self._cond:
+            project = self._projects.get(path)
+        return project.savior if project else None
+
+    def projects(self) -> Dict[str, Dict]:
+        with self._cond:
+            return {path: project.to_dict() for path, project in self._projects.items()}
+
+    def __len__(self) -> int:
+        return len(self._projects)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._projects
+
+    def _update_throttle(self):
+        """Configure the shared throttle from every project's limits.
+
+        I/O call sites share one process-wide throttle, so the tightest
+        limit any project asked for applies to all of them, and the
+        lowest priority wins.
+        """
+        with self._cond:
+            options = [project.options for project in self._projects.values()]
+        limits = []
+        for option in ('read_limit', 'write_limit', 'cloud_limit'):
+            rates = [int(o[option]) for o in options if o.get(option)]
+            limits.append(min(rates) if rates else 0)
+        priorities = {o.get('priority') for o in options}
+        priority = next((p for p in ('adaptive', 'low') if p in priorities), 'normal')
+
+        key = (*limits, priority)
+        if key != self._throttle_key:
+            self._throttle_key = key
+            configure_throttle(*limits, priority)
+
+    def _run(self):
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                ready: List[ProjectWatch] = []
+                wake: Optional[float] = None
+                for project in self._projects.values():
+                    if project.running:
+                        continue
+                    due = project.due_at(now)
+                    if due <= now:
+                        ready.append(project)
+                    elif wake is None or due < wake:
+                        wake = due
+
+                # Projects left over for lack of workers wait for a
+                # worker to finish, which notifies
+                ready.sort(key=lambda p: (p.rank, p.due_at(now)))
+                for project in ready[:self.max_concurrent - self._active]:
+                    project.running = True
+                    self._active += 1
+                    self._pool.submit(self._save, project)
+
+                self._cond.wait(None if wake is None else wake - now)
+
+    def _save(self, project: ProjectWatch):
+        try:
+            project.save()
+            project.last_error = None
+            project.retry_at = None
+            self._log(f"Saved {project.path}")
+        except Exception as e:
+            project.last_error = str(e)
+            project.retry_at = time.monotonic() + min(project.interval, RETRY_DELAY)
+            self._log(f"Save failed for {project.path}: {e}")
+        finally:
+            with self._cond:
+                project.running = False
+                if project.retry_at is None:
+                    project.last_save = time.monotonic()
+                self._active -= 1
+                self._cond.notify_all()
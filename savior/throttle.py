@@ -0,0 +1,271 @@
+"""Rate limits and priority for background backup I/O.
+
+Disk reads, archive writes and cloud transfers each draw from a token
+bucket, so a backup running in the background can be held to a few MB/s
+instead of saturating the disk or the uplink while someone is working.
+A rate of 0 means unlimited, and then nothing is wrapped or waited on.
+
+Priority modes:
+
+    normal    leave CPU and I/O priority alone
+    low       run at low CPU priority and idle I/O priority
+    adaptive  low CPU priority; while the machine is busy with other work
+              (see ResourceMonitor.check_busy) I/O drops to idle priority
+              and every rate is cut to a fraction of its limit
+
+An unprivileged process can't raise its CPU priority again once lowered,
+so adaptive mode only moves I/O priority and the rates back and forth.
+"""
+
+import re
+import sys
+import time
+import threading
+from typing import Optional
+
+import psutil
+
+PRIORITIES = ('normal', 'low', 'adaptive')
+
+LOW_NICE = 10
+BUSY_FACTOR = 0.25  # Share of each limit used while the machine is busy
+BUSY_RATE = 4 * 1024 * 1024  # Limit while busy for I/O that has none
+ADAPTIVE_INTERVAL = 2.0
+ADAPTIVE_HOLD = 10.0  # Stay throttled this long after the last busy sample
+
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_rate(text: str) -> int:
+    """Bytes per second from '512K', '20M', '1.5G/s' or plain bytes; 0 is unlimited."""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?(?:/S)?\s*', str(text).upper())
+    if not match:
+        raise ValueError(f"Invalid rate: {text!r} (expected e.g. 512K, 20M or 1G)")
+    return int(float(match.group(1)) * _UNITS[match.group(2)])
+
+
+class TokenBucket:
+    """Thread-safe token bucket handing out `rate` bytes per second.
+
+    A caller may take more than is available; it then sleeps off the debt,
+    and later callers queue behind it, so the long-run rate holds however
+    large or concurrent the requests are.
+    """
+
+    def __init__(self, rate: int = 0, burst: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._rate = max(0, rate)
+        self._burst = burst
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+
+    @property
+    def rate(self) -> int:
+        return self._rate
+
+    @property
+    def burst(self) -> int:
+        return self._burst or self._rate
+
+    def _refill(self, now: float):
+        if self._rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self._rate)
+        self._stamp = now
+
+    def set_rate(self, rate: int):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = max(0, rate)
+            self._tokens = min(self._tokens, self.burst)
+
+    def consume(self, amount: int):
+        """Take amount tokens, sleeping until the bucket can cover them."""
+        if self._rate <= 0 or amount <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= amount
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ThrottledReader:
+    """File wrapper whose reads draw from a bucket."""
+
+    def __init__(self, fileobj, bucket: TokenBucket):
+        self.fileobj = fileobj
+        self.bucket = bucket
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.bucket.consume(len(data))
+        return data
+
+    def readinto(self, buffer):
+        n = self.fileobj.readinto(buffer)
+        self.bucket.consume(n or 0)
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self.fileobj, name)
+
+
+class ThrottledWriter:
+    """File wrapper whose writes draw from a bucket."""
+
+    def __init__(self, fileobj, bucket: TokenBucket):
+        self.fileobj = fileobj
+        self.bucket = bucket
+
+    def write(self, data):
+        self.bucket.consume(len(data))
+        return self.fileobj.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.fileobj, name)
+
+
+def lower_cpu_priority():
+    """Run this process at low CPU priority (best effort)."""
+    try:
+        process = psutil.Process()
+        if sys.platform == 'win32':
+            process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        elif process.nice() < LOW_NICE:
+            process.nice(LOW_NICE)
+    except (psutil.Error, OSError, AttributeError):
+        pass
+
+
+def set_io_priority(idle: bool):
+    """Switch this process between idle and normal I/O priority where supported."""
+    try:
+        process = psutil.Process()
+        if sys.platform.startswith('linux'):
+            if idle:
+                process.ionice(psutil.IOPRIO_CLASS_IDLE)
+            else:
+                process.ionice(psutil.IOPRIO_CLASS_BE, 4)
+        elif sys.platform == 'win32':
+            process.ionice(psutil.IOPRIORITY_VERYLOW if idle else psutil.IOPRIORITY_NORMAL)
+    except (psutil.Error, OSError, AttributeError):
+        pass  # No ionice on macOS
+
+
+class Throttle:
+    """Rate limits for disk reads, archive writes and cloud transfers.
+
+    Limits are bytes per second, 0 for unlimited. While busy (adaptive
+    mode only) each bucket runs at BUSY_FACTOR of its limit, or BUSY_RATE
+    if it has none.
+    """
+
+    def __init__(self, read_rate: int = 0, write_rate: int = 0, network_rate: int = 0,
+                 priority: str = 'normal'):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        self.limits = {'read': read_rate, 'write': write_rate, 'network': network_rate}
+        self.priority = priority
+        self.busy = False
+        self.read = TokenBucket(read_rate)
+        self.write = TokenBucket(write_rate)
+        self.network = TokenBucket(network_rate)
+
+    @property
+    def limited(self) -> bool:
+        """Whether any I/O can ever be held back"""
+        return self.priority == 'adaptive' or any(self.limits.values())
+
+    def reader(self, fileobj):
+        """fileobj, throttled if reads are limited"""
+        return ThrottledReader(fileobj, self.read) if self.limited else fileobj
+
+    def writer(self, fileobj):
+        """fileobj, throttled if writes are limited"""
+        return ThrottledWriter(fileobj, self.write) if self.limited else fileobj
+
+    def set_busy(self, busy: bool):
+        """Slow everything down while the machine is busy, and back up after."""
+        if busy == self.busy:
+            return
+        self.busy = busy
+        for name, limit in self.limits.items():
+            if busy:
+                rate = max(1, int(limit * BUSY_FACTOR)) if limit else BUSY_RATE
+            else:
+                rate = limit
+            getattr(self, name).set_rate(rate)
+        set_io_priority(busy)
+
+
+class AdaptiveController:
+    """Background thread that marks a Throttle busy while the machine is.
+
+    monitor is a ResourceMonitor; its check_busy() leaves out this
+    process's own load, so a backup doesn't throttle itself.
+    """
+
+    def __init__(self, throttle: Throttle, monitor, interval: float = ADAPTIVE_INTERVAL,
+                 hold: float = ADAPTIVE_HOLD):
+        self.throttle = throttle
+        self.monitor = monitor
+        self.interval = interval
+        self.hold = hold
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='savior-throttle', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.throttle.set_busy(False)
+
+    def _run(self):
+        last_busy = None
+        while not self._stop.wait(self.interval):
+            busy, _ = self.monitor.check_busy()
+            now = time.monotonic()
+            if busy:
+                last_busy = now
+            self.throttle.set_busy(last_busy is not None and now - last_busy < self.hold)
+
+
+_default_throttle = Throttle()
+_controller: Optional[AdaptiveController] = None
+_default_lock = threading.Lock()
+
+
+def get_throttle() -> Throttle:
+    """Return the process-wide throttle shared by all I/O call sites."""
+    return _default_throttle
+
+
+def configure_throttle(read_rate: int = 0, write_rate: int = 0, network_rate: int = 0,
+                       priority: str = 'normal') -> Throttle:
+    """Replace the shared throttle; adaptive mode starts its monitor thread."""
+    global _default_throttle, _controller
+    throttle = Throttle(read_rate, write_rate, network_rate, priority)
+    with _default_lock:
+        if _controller is not None:
+            _controller.stop()
+            _controller = None
+        _default_throttle = throttle
+
+        if priority == 'low':
+            lower_cpu_priority()
+            set_io_priority(True)
+        elif priority == 'adaptive':
+            try:
+                from .safety import ResourceMonitor
+            except ImportError:
+                from safety import ResourceMonitor
+
+            lower_cpu_priority()
+            _controller = AdaptiveController(throttle, ResourceMonitor())
+            _controller.start()
+    return throttle
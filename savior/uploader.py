@@ -0,0 +1,354 @@
+"""Streaming multipart uploads of backups to cloud storage.
+
+A backup is read once, part by part, and each part is handed to a shared
+pool of upload threads as soon as it has been read; the file's SHA-256 is
+computed on the way. At most `window` parts are held in memory at once,
+across every file being uploaded, whatever the size of the backups.
+
+Progress of multipart uploads is saved to a state file after every part,
+so an interrupted upload of a large backup continues where it stopped
+instead of starting over.
+"""
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .throttle import get_throttle
+except ImportError:
+    from throttle import get_throttle
+
+PART_SIZE = 8 * 1024 * 1024
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3's minimum for every part but the last
+MAX_PARTS = 10000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_FILES = 2
+
+
+class S3Target:
+    """Upload target for boto3 S3 clients (AWS and S3-compatible stores)."""
+
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    def put(self, key: str, data: bytes, metadata: Dict[str, str]):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, Metadata=metadata)
+
+    def create(self, key: str, metadata: Dict[str, str]) -> str:
+        response = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, Metadata=metadata)
+        return response['UploadId']
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=data
+        )
+        return response['ETag']
+
+    def list_parts(self, key: str, upload_id: str) -> Optional[Dict[int, str]]:
+        """{part number: etag} already uploaded, or None if the upload is gone"""
+        parts = {}
+        marker = 0
+        try:
+            while True:
+                response = self.client.list_parts(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumberMarker=marker
+                )
+                for part in response.get('Parts', []):
+                    parts[part['PartNumber']] = part['ETag']
+                if not response.get('IsTruncated'):
+                    return parts
+                marker = response['NextPartNumberMarker']
+        except Exception:
+            return None
+
+    def complete(self, key: str, upload_id: str, parts: Dict[int, str]):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': parts[number]}
+                                       for number in sorted(parts)]}
+        )
+
+    def abort(self, key: str, upload_id: str):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+
+class LocalTarget:
+    """Upload target for a LocalStorageClient (NAS or shared drive).
+
+    Parts are staged in .uploads/<upload id>/ under the storage directory,
+    named <number>.<md5>, and joined into place when the upload completes.
+
+    A plain directory has nowhere to keep object metadata, so the metadata
+    passed to put and create (the checksum among it) is dropped. Arguments
+    prefixed with _ are part of the target interface but unused here.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.staging = Path(client.base_path) / '.uploads'
+
+    def put(self, key: str, data: bytes, _metadata: Dict[str, str]):
+        self.client.save(key, data)
+
+    def create(self, _key: str, _metadata: Dict[str, str]) -> str:
+        upload_id = uuid.uuid4().hex
+        (self.staging / upload_id).mkdir(parents=True)
+        return upload_id
+
+    def upload_part(self, _key: str, upload_id: str, number: int, data: bytes) -> str:
+        etag = hashlib.md5(data).hexdigest()
+        directory = self.staging / upload_id
+        for old in directory.glob(f'{number:05d}.*'):
+            old.unlink()
+        _write_atomic(directory / f'{number:05d}.{etag}', data)
+        return etag
+
+    def list_parts(self, _key: str, upload_id: str) -> Optional[Dict[int, str]]:
+        directory = self.staging / upload_id
+        if not directory.is_dir():
+            return None
+        parts = {}
+        for part in directory.iterdir():
+            number, _, etag = part.name.partition('.')
+            if number.isdigit() and etag:
+                parts[int(number)] = etag
+        return parts
+
+    def complete(self, key: str, upload_id: str, parts: Dict[int, str]):
+        directory = self.staging / upload_id
+        destination = Path(self.client.base_path) / key
+        destination.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=destination.parent, prefix='.savior-upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for number in sorted(parts):
+                    with open(directory / f'{number:05d}.{parts[number]}', 'rb') as part:
+                        shutil.copyfileobj(part, out, 1024 * 1024)
+            os.replace(temp_path, destination)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def abort(self, _key: str, upload_id: str):
+        shutil.rmtree(self.staging / upload_id, ignore_errors=True)
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write through a temp file, so a crash never leaves a partial file"""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+class UploadState:
+    """Multipart uploads in progress, keyed by object key.
+
+    Each record holds the upload id and the source file's path, size,
+    mtime and part size, so a resumed upload can tell whether the parts
+    already sent still belong to the same file. The JSON file is rewritten
+    after every change; with no path, state is kept in memory only.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.uploads: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if self.path and self.path.exists():
+            try:
+                with open(self.path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.path, json.dumps(self.uploads, indent=2).encode())
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self.uploads.get(key)
+
+    def start(self, key: str, record: Dict):
+        with self._lock:
+            self.uploads[key] = dict(record, parts={})
+            self._save()
+
+    def add_part(self, key: str, number: int, etag: str):
+        with self._lock:
+            self.uploads[key]['parts'][str(number)] = etag
+            self._save()
+
+    def finish(self, key: str):
+        with self._lock:
+            if self.uploads.pop(key, None) is not None:
+                self._save()
+
+
+class MultipartUploader:
+    """Uploads files to a target, in parallel parts, resuming where it can.
+
+    target is an S3Target or LocalTarget. Files no bigger than one part
+    are sent with a single put; larger ones as multipart uploads whose
+    parts go through a pool of `concurrency` threads shared by every file,
+    so one set of clients and connections serves all of them.
+    """
+
+    def __init__(self, target, state_file: Optional[Path] = None, part_size: int = PART_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, window: Optional[int] = None):
+        self.target = target
+        self.state = UploadState(state_file)
+        self.part_size = part_size
+        self.concurrency = max(1, concurrency)
+        self.window = max(1, window or self.concurrency * 2)
+        self._slots = threading.BoundedSemaphore(self.window)
+        self._parts = ThreadPoolExecutor(max_workers=self.concurrency,
+                                         thread_name_prefix='savior-upload')
+
+    def close(self):
+        self._parts.shutdown()
+
+    def _part_size_for(self, size: int) -> int:
+        # Grow parts for huge files so they stay within MAX_PARTS
+        return max(self.part_size, -(-size // MAX_PARTS))
+
+    def upload(self, source: Path, key: str, metadata: Optional[Dict[str, str]] = None) -> Dict:
+        """Upload one file; returns its key, size, sha256 and part counts."""
+        metadata = dict(metadata or {})
+        stat = source.stat()
+        part_size = self._part_size_for(stat.st_size)
+
+        if stat.st_size <= part_size:
+            data = source.read_bytes()
+            checksum = hashlib.sha256(data).hexdigest()
+            get_throttle().network.consume(len(data))
+            self.target.put(key, data, dict(metadata, checksum=checksum))
+            return {'key': key, 'size': len(data), 'sha256': checksum, 'parts': 1, 'resumed_parts': 0}
+
+        return self._upload_multipart(source, key, metadata, stat, part_size)
+
+    def _resume(self, key: str, fingerprint: Dict) -> Tuple[Optional[str], Dict[int, str]]:
+        """Upload id and finished parts of an earlier attempt at the same file"""
+        record = self.state.get(key)
+        if record is None:
+            return None, {}
+        if any(record.get(field) != value for field, value in fingerprint.items()):
+            # The file changed since; its parts are no use
+            try:
+                self.target.abort(key, record['upload_id'])
+            except Exception:
+                pass
+            self.state.finish(key)
+            return None, {}
+
+        parts = self.target.list_parts(key, record['upload_id'])
+        if parts is None:
+            self.state.finish(key)
+            return None, {}
+        return record['upload_id'], parts
+
+    def _upload_multipart(self, source: Path, key: str, metadata: Dict[str, str],
+                          stat: os.stat_result, part_size: int) -> Dict:
+        fingerprint = {'source': str(source), 'size': stat.st_size,
+                       'mtime_ns': stat.st_mtime_ns, 'part_size': part_size}
+        upload_id, done = self._resume(key, fingerprint)
+        if upload_id is None:
+            upload_id = self.target.create(key, metadata)
+            self.state.start(key, dict(fingerprint, upload_id=upload_id))
+
+        digest = hashlib.sha256()
+        futures = []
+        failed = threading.Event()
+        number = 0
+        with open(source, 'rb') as f:
+            while True:
+                self._slots.acquire()
+                if failed.is_set():
+                    # A part failed; stop reading and let the next attempt resume
+                    self._slots.release()
+                    break
+                try:
+                    data = f.read(part_size)
+                except BaseException:
+                    self._slots.release()
+                    raise
+                if not data:
+                    self._slots.release()
+                    break
+                number += 1
+                digest.update(data)
+                if number in done:
+                    # Uploaded by an earlier attempt; read only for the checksum
+                    self._slots.release()
+                    continue
+                futures.append(self._parts.submit(self._send_part, key, upload_id, number, data, failed))
+
+        parts = dict(done)
+        errors = []
+        for future in futures:
+            try:
+                part_number, etag = future.result()
+                parts[part_number] = etag
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            # Keep the upload and its state so the next attempt resumes it
+            raise errors[0]
+
+        self.target.complete(key, upload_id, {n: parts[n] for n in range(1, number + 1)})
+        self.state.finish(key)
+        return {'key': key, 'size': stat.st_size, 'sha256': digest.hexdigest(),
+                'parts': number, 'resumed_parts': len(done)}
+
+    def _send_part(self, key: str, upload_id: str, number: int, data: bytes,
+                   failed: threading.Event) -> Tuple[int, str]:
+        try:
+            get_throttle().network.consume(len(data))
+            etag = self.target.upload_part(key, upload_id, number, data)
+            self.state.add_part(key, number, etag)
+            return number, etag
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            self._slots.release()
+
+    def upload_many(self, items: Iterable[Tuple[Path, str, Dict[str, str]]],
+                    files: int = DEFAULT_FILES) -> List:
+        """Upload (source, key, metadata) items, `files` at a time.
+
+        Returns one entry per item, in order: upload()'s result, or the
+        exception that stopped that file.
+        """
+        items = list(items)
+        results = []
+        with ThreadPoolExecutor(max_workers=max(1, min(files, len(items)))) as pool:
+            futures = [pool.submit(self.upload, *item) for item in items]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+        return results
@@ -0,0 +1,194 @@
+import time
+import threading
+import pytest
+import tempfile
+import shutil
+from pathlib import Path
+from watchdog.events import (
+    FileModifiedEvent, FileMovedEvent, FileDeletedEvent,
+    DirCreatedEvent, DirModifiedEvent
+)
+
+from savior.activity import ActivityMonitor, SmartWatcher
+from savior.core import Savior
+
+
+class TestDirtySet:
+    def test_file_events_are_recorded(self):
+        """Modified, moved and deleted files land in the dirty set"""
+        monitor = ActivityMonitor()
+        monitor.on_any_event(FileModifiedEvent('/p/a.py'))
+        monitor.on_any_event(FileMovedEvent('/p/b.py', '/p/c.py'))
+        monitor.on_any_event(FileDeletedEvent('/p/d.py'))
+
+        files, dirs = monitor.take_dirty()
+
+        assert files == {Path('/p/a.py'), Path('/p/b.py'), Path('/p/c.py'), Path('/p/d.py')}
+        assert not dirs
+        assert monitor.take_dirty() == (set(), set())
+
+    def test_directory_events(self):
+        """New directories are rescanned; plain directory mtime bumps are not"""
+        monitor = ActivityMonitor()
+        monitor.on_any_event(DirCreatedEvent('/p/pkg'))
+        monitor.on_any_event(DirModifiedEvent('/p'))
+
+        assert monitor.take_dirty() == (set(), {Path('/p/pkg')})
+
+    def test_savior_dir_is_ignored(self):
+        """Writes to the backup directory are not changes to back up"""
+        monitor = ActivityMonitor()
+        monitor.on_any_event(FileModifiedEvent('/p/.savior/metadata.json'))
+
+        assert monitor.take_dirty() == (set(), set())
+
+    def test_overflow_requests_full_scan(self, monkeypatch):
+        """Too many dirty paths fall back to a full scan"""
+        monkeypatch.setattr(ActivityMonitor, 'MAX_DIRTY', 3)
+        monitor = ActivityMonitor()
+        for i in range(5):
+            monitor.on_any_event(FileModifiedEvent(f'/p/{i}.py'))
+
+        assert monitor.take_dirty() is None
+        assert monitor.take_dirty() == (set(), set())
+
+
+class TestReconciliation:
+    def test_first_and_periodic_saves_scan_everything(self):
+        """Full scans happen first and then every reconcile_interval"""
+        watcher = SmartWatcher(Path('/p'), lambda: None, reconcile_interval=3600)
+        assert watcher.take_changes() is None
+
+        watcher.monitor.on_any_event(FileModifiedEvent('/p/a.py'))
+        assert watcher.take_changes() == ({Path('/p/a.py')}, set())
+
+        watcher._last_reconcile = time.monotonic() - 3601
+        assert watcher.take_changes() is None
+
+    def test_failed_save_requeues_changes(self):
+        """Changes from a failed save are picked up by the next one"""
+        watcher = SmartWatcher(Path('/p'), lambda: None)
+        watcher.take_changes()
+        watcher.monitor.on_any_event(FileModifiedEvent('/p/a.py'))
+
+        changes = watcher.take_changes()
+        watcher.requeue_changes(changes)
+
+        assert watcher.take_changes() == changes
+
+
+class TestAdaptiveIdle:
+    def test_bursts_are_coalesced(self):
+        """Events within one burst don't count as pauses"""
+        monitor = ActivityMonitor(idle_threshold=2.0)
+        for _ in range(10):
+            monitor.on_any_event(FileModifiedEvent('/p/a.py'))
+
+        assert monitor.cadence is None
+        assert monitor.current_idle_threshold() == 2.0
+
+    def test_threshold_follows_edit_cadence(self):
+        """Regular 5 second pauses between edits raise the threshold"""
+        monitor = ActivityMonitor(idle_threshold=2.0)
+        for _ in range(20):
+            monitor.last_activity = time.monotonic() - 5
+            monitor.on_any_event(FileModifiedEvent('/p/a.py'))
+
+        assert monitor.current_idle_threshold() == pytest.approx(7.5, rel=0.05)
+        assert not monitor.is_idle()
+
+    def test_threshold_is_bounded(self):
+        """Long breaks don't count, and the threshold never exceeds MAX_IDLE"""
+        monitor = ActivityMonitor(idle_threshold=2.0)
+        monitor.last_activity = time.monotonic() - 3600
+        monitor.on_any_event(FileModifiedEvent('/p/a.py'))
+        assert monitor.cadence is None
+
+        monitor.cadence = 1000
+        assert monitor.current_idle_threshold() == ActivityMonitor.MAX_IDLE
+
+
+class TestSaveTrigger:
+    def make_watcher(self, saves, **kwargs):
+        watcher = SmartWatcher(Path('/p'), lambda: saves.append(time.monotonic()), **kwargs)
+        watcher.watching = True
+        watcher._watch_thread = threading.Thread(target=watcher._watch_loop, daemon=True)
+        watcher._watch_thread.start()
+        return watcher
+
+    def test_saves_once_per_interval_after_idle(self):
+        saves = []
+        watcher = self.make_watcher(saves, idle_time=0.05, check_interval=0.2)
+        watcher.monitor.last_activity = time.monotonic() - 1
+        try:
+            time.sleep(0.5)
+        finally:
+            watcher.stop()
+
+        # Saves at roughly 0.2 and 0.4 s: no missed slots, no doubles
+        assert len(saves) == 2
+        assert saves[1] - saves[0] >= 0.2
+
+    def test_waits_out_activity(self):
+        """A save that is due still waits for the burst of edits to end"""
+        saves = []
+        watcher = self.make_watcher(saves, idle_time=0.3, check_interval=0.05)
+        try:
+            deadline = time.monotonic() + 0.4
+            while time.monotonic() < deadline:
+                watcher.monitor.on_any_event(FileModifiedEvent('/p/a.py'))
+                # The stamp the watcher measures idle time from
+                last_event = watcher.monitor.last_activity
+                time.sleep(0.02)
+            assert not saves
+            time.sleep(0.5)
+        finally:
+            watcher.stop()
+
+        assert saves
+        # Small slack for clock granularity
+        assert saves[0] - last_event >= 0.3 - 0.005
+
+    def test_failed_save_is_retried_later(self):
+        attempts = []
+
+        def failing():
+            attempts.append(time.monotonic())
+            raise OSError('disk full')
+
+        watcher = SmartWatcher(Path('/p'), failing, idle_time=0.01, check_interval=0.05)
+        watcher.monitor.last_activity = time.monotonic() - 1
+        watcher.watching = True
+        thread = threading.Thread(target=watcher._watch_loop, daemon=True)
+        thread.start()
+        time.sleep(0.3)
+        watcher.stop()
+        thread.join(timeout=1)
+
+        # Retried after min(check_interval, RETRY_DELAY), not in a tight loop
+        assert 2 <= len(attempts) <= 7
+        assert all(b - a >= 0.045 for a, b in zip(attempts, attempts[1:]))
+        assert not thread.is_alive()
+
+
+class TestCollectDirty:
+    @pytest.fixture
+    def savior(self):
+        temp_dir = Path(tempfile.mkdtemp(prefix='savior_dirty_'))
+        (temp_dir / 'main.py').write_text('print(1)')
+        (temp_dir / 'pkg').mkdir()
+        (temp_dir / 'pkg' / 'mod.py').write_text('x = 1')
+        (temp_dir / '__pycache__').mkdir()
+        (temp_dir / '__pycache__' / 'main.cpython.pyc').write_text('')
+        yield Savior(temp_dir)
+        shutil.rmtree(temp_dir)
+
+    def test_matches_full_walk(self, savior):
+        """Dirty collection gives the full walk's answer for those paths"""
+        root = savior.project_dir
+        dirty = {root / 'main.py', root / '__pycache__' / 'main.cpython.pyc', root / 'missing.py'}
+
+        files = savior._collect_dirty(dirty, {root / 'pkg', root / '__pycache__'})
+
+        assert files == savior._collect_files()
+        assert files == {root / 'main.py', root / 'pkg' / 'mod.py'}
@@ -0,0 +1,215 @@
+import os
+import gzip
+import tarfile
+import tempfile
+import shutil
+import unittest
+from pathlib import Path
+
+from savior.archive import (
+    ArchiveWriter, open_backup, detect_codec, zstd_available,
+    strip_archive_extension, index_path, remove_backup, BackupIndex,
+    list_backup_files, extract_backup_files, read_backup_file
+)
+from savior.core import Savior
+
+
+class TestArchiveWriter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_archive_'))
+        self.src = self.test_dir / 'src'
+        self.src.mkdir()
+        self.contents = {}
+        for i in range(6):
+            data = os.urandom(2000) + bytes([i]) * (40000 + i * 7000)
+            (self.src / f'file_{i}.bin').write_bytes(data)
+            self.contents[f'file_{i}.bin'] = data
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _write(self, path, codec, **kwargs):
+        with ArchiveWriter(path, codec, threads=4, block_size=16 * 1024, **kwargs) as tar:
+            for name in sorted(self.contents):
+                tar.add(self.src / name, arcname=name)
+
+    def _read_all(self, tar):
+        return {m.name: tar.extractfile(m).read() for m in tar.getmembers() if m.isfile()}
+
+    def test_parallel_gzip_opens_with_tarfile(self):
+        """Concatenated gzip members are a valid .tar.gz"""
+        path = self.test_dir / 'backup.tar.gz'
+        self._write(path, 'gzip')
+
+        with tarfile.open(path, 'r:gz') as tar:
+            self.assertEqual(self._read_all(tar), self.contents)
+
+        # Also readable as a plain gzip stream
+        with gzip.open(path, 'rb') as f:
+            self.assertTrue(len(f.read()) > sum(len(d) for d in self.contents.values()))
+
+    def test_seek_points_recorded_per_block(self):
+        """Every block start is recorded with its compressed offset"""
+        path = self.test_dir / 'backup.tar.gz'
+        writer = ArchiveWriter(path, 'gzip', threads=2, block_size=16 * 1024)
+        with writer as tar:
+            for name in sorted(self.contents):
+                tar.add(self.src / name, arcname=name)
+
+        points = writer.seek_points
+        self.assertGreater(len(points), 1)
+        self.assertEqual(points[0], (0, 0))
+        self.assertTrue(all(b[0] - a[0] == 16 * 1024 for a, b in zip(points, points[1:])))
+
+        # Each seek point starts an independent gzip member
+        with open(path, 'rb') as f:
+            f.seek(points[1][1])
+            self.assertEqual(f.read(2), b'\x1f\x8b')
+
+    def test_uncompressed_archive(self):
+        """Codec 'none' writes a plain tar"""
+        path = self.test_dir / 'backup.tar'
+        self._write(path, 'none')
+
+        self.assertEqual(detect_codec(path), 'none')
+        with open_backup(path) as tar:
+            self.assertEqual(self._read_all(tar), self.contents)
+
+    @unittest.skipUnless(zstd_available(), 'zstandard not installed')
+    def test_zstd_roundtrip(self):
+        """zstd archives are detected and read back through open_backup"""
+        path = self.test_dir / 'backup.tar.zst'
+        self._write(path, 'zstd', level=3)
+
+        self.assertEqual(detect_codec(path), 'zstd')
+        with open_backup(path) as tar:
+            self.assertEqual(self._read_all(tar), self.contents)
+
+        out = self.test_dir / 'out'
+        with open_backup(path) as tar:
+            tar.extractall(out, filter='data')
+        self.assertEqual((out / 'file_3.bin').read_bytes(), self.contents['file_3.bin'])
+
+    def test_strip_archive_extension(self):
+        self.assertEqual(strip_archive_extension('backup.tar.gz'), 'backup')
+        self.assertEqual(strip_archive_extension('backup.tar.zst'), 'backup')
+        self.assertEqual(strip_archive_extension('backup.tar'), 'backup')
+
+
+class TestBackupIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_archive_index_'))
+        self.src = self.test_dir / 'src'
+        (self.src / 'sub').mkdir(parents=True)
+        self.contents = {}
+        for i in range(6):
+            name = f'sub/file_{i}.bin' if i % 2 else f'file_{i}.bin'
+            data = os.urandom(3000) + bytes([i]) * (30000 + i * 9000)
+            (self.src / name).write_bytes(data)
+            self.contents[name] = data
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _write(self, name, codec):
+        path = self.test_dir / name
+        with ArchiveWriter(path, codec, threads=2, block_size=16 * 1024) as tar:
+            for arcname in sorted(self.contents):
+                tar.add(self.src / arcname, arcname=arcname)
+        return path
+
+    def _check_random_reads(self, path):
+        index = BackupIndex.load(path)
+        self.assertIsNotNone(index)
+        self.assertEqual(sorted(e['name'] for e in index.files()), sorted(self.contents))
+        # Read out of order so later members come from later blocks
+        for name in sorted(self.contents, reverse=True):
+            self.assertEqual(index.read(name), self.contents[name])
+
+    def test_sidecar_written_next_to_archive(self):
+        path = self._write('backup.tar.gz', 'gzip')
+        sidecar = index_path(path)
+        self.assertTrue(sidecar.exists())
+        # Backups are listed by globbing *.tar*, so the sidecar must not match
+        self.assertNotIn('.tar', sidecar.name)
+
+    def test_gzip_random_access(self):
+        self._check_random_reads(self._write('backup.tar.gz', 'gzip'))
+
+    def test_uncompressed_random_access(self):
+        self._check_random_reads(self._write('backup.tar', 'none'))
+
+    @unittest.skipUnless(zstd_available(), 'zstandard not installed')
+    def test_zstd_random_access(self):
+        self._check_random_reads(self._write('backup.tar.zst', 'zstd'))
+
+    def test_corrupt_member_detected(self):
+        path = self._write('backup.tar', 'none')
+        index = BackupIndex.load(path)
+        entry = index.members['file_2.bin']
+        with open(path, 'r+b') as f:
+            f.seek(entry['offset'] + 100)
+            f.write(b'\xff' * 16)
+        with self.assertRaises(IOError):
+            index.read('file_2.bin')
+
+    def test_stale_index_ignored(self):
+        path = self._write('backup.tar.gz', 'gzip')
+        with open(path, 'ab') as f:
+            f.write(b'\0' * 10)
+        self.assertIsNone(BackupIndex.load(path))
+        # Falls back to scanning the archive
+        self.assertEqual(sorted(list_backup_files(path)), sorted(self.contents))
+        self.assertEqual(read_backup_file(path, 'sub/file_3.bin'), self.contents['sub/file_3.bin'])
+
+    def test_extract_selected_files(self):
+        path = self._write('backup.tar.gz', 'gzip')
+        for use_index in (True, False):
+            if not use_index:
+                index_path(path).unlink()
+            out = self.test_dir / f'out_{use_index}'
+            count = extract_backup_files(path, ['sub/file_1.bin', 'file_4.bin', 'missing'], out)
+            self.assertEqual(count, 2)
+            self.assertEqual((out / 'sub' / 'file_1.bin').read_bytes(), self.contents['sub/file_1.bin'])
+            self.assertEqual((out / 'file_4.bin').read_bytes(), self.contents['file_4.bin'])
+            self.assertFalse((out / 'file_0.bin').exists())
+
+    def test_remove_backup_deletes_sidecar(self):
+        path = self._write('backup.tar.gz', 'gzip')
+        remove_backup(path)
+        self.assertFalse(path.exists())
+        self.assertFalse(index_path(path).exists())
+
+
+class TestCreateBackupCodecs(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_archive_project_'))
+        (self.test_dir / 'main.py').write_text('print("hello")')
+        (self.test_dir / 'lib').mkdir()
+        (self.test_dir / 'lib' / 'data.txt').write_text('data ' * 5000)
+        self.savior = Savior(self.test_dir, jobs=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_gzip_backup_restores(self):
+        backup = self.savior.create_backup('gzip', show_progress=False)
+        self.assertTrue(backup.path.name.endswith('.tar.gz'))
+
+        (self.test_dir / 'main.py').write_text('changed')
+        self.assertTrue(self.savior.restore_backup(0, force=True, auto_backup=False))
+        self.assertEqual((self.test_dir / 'main.py').read_text(), 'print("hello")')
+
+    @unittest.skipUnless(zstd_available(), 'zstandard not installed')
+    def test_zstd_backup_restores(self):
+        backup = self.savior.create_backup('zstd', compression_level=19,
+                                           show_progress=False, codec='zstd')
+        self.assertTrue(backup.path.name.endswith('.tar.zst'))
+
+        (self.test_dir / 'lib' / 'data.txt').unlink()
+        self.assertTrue(self.savior.restore_backup(0, force=True, auto_backup=False))
+        self.assertEqual((self.test_dir / 'lib' / 'data.txt').read_text(), 'data ' * 5000)
+
+
+if __name__ == '__main__':
+    unittest.main()
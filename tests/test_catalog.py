@@ -0,0 +1,175 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from savior.archive import BackupIndex, backup_file_entries, index_path
+from savior.catalog import BackupCatalog
+from savior.core import Savior, Backup
+from savior.incremental import IncrementalBackup, MANIFEST_NAME
+
+
+class TestBackupCatalog(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_catalog_'))
+        self.catalog = BackupCatalog(self.test_dir / 'catalog.db')
+        self.now = datetime.now()
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _entry(self, name, digest, size=10):
+        return {'name': name, 'sha256': digest, 'size': size, 'mtime': 0}
+
+    def test_history_newest_first(self):
+        self.catalog.add_backup('a.tar.gz', self.now - timedelta(hours=2), 'first', 100,
+                                [self._entry('src/app.py', 'h1'), self._entry('README', 'r')])
+        self.catalog.add_backup('b.tar.gz', self.now, 'second', 200,
+                                [self._entry('src/app.py', 'h2')])
+
+        history = self.catalog.history('src/app.py')
+        self.assertEqual([v['backup'] for v in history], ['b.tar.gz', 'a.tar.gz'])
+        self.assertEqual([v['hash'] for v in history], ['h2', 'h1'])
+        self.assertEqual(self.catalog.history('missing.py'), [])
+
+    def test_search_by_substring(self):
+        self.catalog.add_backup('a.tar.gz', self.now, 'first', 100,
+                                [self._entry('src/app.py', 'h1'), self._entry('docs/app.md', 'd'),
+                                 self._entry('100%_done', 'p')])
+
+        self.assertEqual(sorted(self.catalog.search('app')), ['docs/app.md', 'src/app.py'])
+        # Patterns are literal, not LIKE wildcards
+        self.assertEqual(list(self.catalog.search('%')), ['100%_done'])
+        self.assertEqual(len(self.catalog.search()), 3)
+
+    def test_remove_backup(self):
+        self.catalog.add_backup('a.tar.gz', self.now, 'first', 100, [self._entry('only_here', 'x')])
+        self.catalog.add_backup('b.tar.gz', self.now, 'second', 100, [self._entry('shared', 'y')])
+        self.catalog.remove_backup('a.tar.gz')
+
+        self.assertEqual(self.catalog.backups(), {'b.tar.gz': 100})
+        self.assertEqual(list(self.catalog.search()), ['shared'])
+
+    def test_readding_replaces(self):
+        self.catalog.add_backup('a.tar.gz', self.now, 'first', 100, [self._entry('old', 'x')])
+        self.catalog.add_backup('a.tar.gz', self.now, 'first', 150, [self._entry('new', 'y')])
+
+        self.assertEqual(self.catalog.backups(), {'a.tar.gz': 150})
+        self.assertEqual(list(self.catalog.search()), ['new'])
+
+
+class TestSaviorCatalog(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_catalog_project_'))
+        (self.test_dir / 'src').mkdir()
+        (self.test_dir / 'src' / 'app.py').write_text('v1')
+        (self.test_dir / 'notes.txt').write_text('notes')
+        self.savior = Savior(self.test_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _backup(self, description, timestamp):
+        """Create a backup, then move it to timestamp (same-minute backups tie)"""
+        backup = self.savior.create_backup(description, show_progress=False)
+        metadata = self.savior._load_metadata()
+        metadata['backups'][-1]['timestamp'] = timestamp.isoformat()
+        self.savior._save_metadata(metadata)
+        self.savior.catalog.add_backup(
+            self.savior._catalog_key(backup.path), timestamp, description,
+            backup.size, BackupIndex.load(backup.path).files()
+        )
+        return backup
+
+    def test_backups_cataloged_when_created(self):
+        backup = self.savior.create_backup('first', show_progress=False)
+        versions = self.savior.catalog.history('src/app.py')
+        self.assertEqual(len(versions), 1)
+        self.assertEqual(versions[0]['backup'], self.savior._catalog_key(backup.path))
+        self.assertEqual(versions[0]['size'], 2)
+
+    def test_history_tracks_changes(self):
+        now = datetime.now()
+        self._backup('one', now - timedelta(hours=2))
+        (self.test_dir / 'src' / 'app.py').write_text('version two')
+        self._backup('two', now - timedelta(hours=1))
+
+        history = self.savior.file_history('src/app.py')
+        self.assertEqual([v['backup'].description for v in history], ['two', 'one'])
+        self.assertNotEqual(history[0]['hash'], history[1]['hash'])
+        self.assertTrue(history[0]['backup'].path.exists())
+
+    def test_backfill_existing_backups(self):
+        backup = self.savior.create_backup('first', show_progress=False)
+        self.savior.catalog.close()
+        self.savior._catalog = None
+        self.savior.catalog_file.unlink()
+        # Older archives may have no index either
+        index_path(backup.path).unlink()
+
+        self.assertEqual(self.savior.sync_catalog(), 1)
+        self.assertEqual(self.savior.sync_catalog(), 0)
+        found = self.savior.find_in_backups('app')
+        self.assertEqual(list(found), ['src/app.py'])
+        self.assertIsNotNone(found['src/app.py'][0]['hash'])
+
+    def test_incremental_manifest_not_cataloged(self):
+        full = self.savior.create_backup('base', show_progress=False)
+        inc = IncrementalBackup(self.savior.backup_dir, self.test_dir)
+        inc.find_changed_files(self.savior._collect_files())
+        (self.test_dir / 'src' / 'app.py').write_text('v2')
+        path = inc.create_incremental_backup(self.savior._collect_files(), full.path)
+        metadata = self.savior._load_metadata()
+        metadata['backups'].append(Backup(datetime.now(), path, 'Incremental backup', 0).to_dict())
+        self.savior._save_metadata(metadata)
+        # As cataloged before manifests were left out
+        self.savior.catalog.add_backup(
+            self.savior._catalog_key(path), datetime.now(), 'Incremental backup',
+            path.stat().st_size, backup_file_entries(path)
+        )
+        self.assertTrue(self.savior.catalog.history(MANIFEST_NAME))
+
+        self.savior.sync_catalog()
+        self.assertNotIn(MANIFEST_NAME, self.savior.find_in_backups())
+        self.assertEqual(len(self.savior.file_history('src/app.py')), 2)
+
+    def test_purge_removes_from_catalog(self):
+        now = datetime.now()
+        self._backup('one', now - timedelta(hours=2))
+        self._backup('two', now - timedelta(hours=1))
+        self.savior.purge_backups(keep_recent=1)
+
+        history = self.savior.file_history('src/app.py')
+        self.assertEqual([v['backup'].description for v in history], ['two'])
+
+    def test_resurrect_command_uses_catalog(self):
+        from savior.commands.recovery import resurrect, history
+
+        self.savior.create_backup('first', show_progress=False)
+        (self.test_dir / 'notes.txt').unlink()
+
+        runner = CliRunner()
+        cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        try:
+            result = runner.invoke(history, ['notes.txt'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            self.assertIn('1 version(s)', result.output)
+            self.assertIn('no longer exists', result.output)
+
+            result = runner.invoke(resurrect, [], input='y\n')
+            self.assertEqual(result.exit_code, 0, result.output)
+        finally:
+            os.chdir(cwd)
+
+        self.assertIn('notes.txt', result.output)
+        self.assertEqual((self.test_dir / 'notes.txt').read_text(), 'notes')
+
+
+if __name__ == '__main__':
+    unittest.main()
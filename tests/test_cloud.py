@@ -7,8 +7,15 @@ import json
 import configparser
 from datetime import datetime
 import sys
+import os
+import threading
+import time
+import hashlib
+import io
 
 from savior.cloud import CloudStorage, LocalStorageClient
+from savior.uploader import MultipartUploader, S3Target, LocalTarget
+from savior.downloader import ParallelDownloader, S3Source
 
 
 class TestCloudStorage(unittest.TestCase):
@@ -265,6 +272,435 @@ class TestLocalStorageClient(unittest.TestCase):
         self.assertIn('test-project/backup2.tar.gz', keys)
 
 
+class FakeS3:
+    """In-memory stand-in for the parts of a boto3 S3 client used for uploads"""
+
+    def __init__(self, fail_part=None, delay=0):
+        self.objects = {}
+        self.uploads = {}
+        self.part_calls = []
+        self.range_calls = []
+        self.fail_part = fail_part
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, Metadata=None):
+        self.objects[Key] = bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key, Metadata=None):
+        upload_id = f'upload-{len(self.uploads) + 1}'
+        self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self._lock:
+            self.part_calls.append(PartNumber)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if PartNumber == self.fail_part:
+                raise ConnectionError('connection reset')
+            etag = hashlib.md5(Body).hexdigest()
+            self.uploads[UploadId][PartNumber] = (etag, bytes(Body))
+            return {'ETag': etag}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def list_parts(self, Bucket, Key, UploadId, PartNumberMarker=0):
+        if UploadId not in self.uploads:
+            raise KeyError('NoSuchUpload')
+        return {'Parts': [{'PartNumber': n, 'ETag': etag}
+                          for n, (etag, _) in sorted(self.uploads[UploadId].items())],
+                'IsTruncated': False}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        data = b''
+        for part in MultipartUpload['Parts']:
+            etag, body = parts[part['PartNumber']]
+            assert etag == part['ETag']
+            data += body
+        self.objects[Key] = data
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self.objects[Key]
+        with self._lock:
+            self.range_calls.append(Range)
+        if Range is None:
+            return {'Body': io.BytesIO(data)}
+        start, end = (int(n) for n in Range[len('bytes='):].split('-'))
+        end = min(end, len(data) - 1)
+        return {'Body': io.BytesIO(data[start:end + 1]),
+                'ContentRange': f'bytes {start}-{end}/{len(data)}'}
+
+
+class TestMultipartUploader(unittest.TestCase):
+    PART = 64 * 1024
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.state_file = self.test_dir / 'uploads.json'
+        self.source = self.test_dir / 'backup.tar.gz'
+        self.data = os.urandom(self.PART * 5 + 1000)
+        self.source.write_bytes(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _uploader(self, target, **kwargs):
+        uploader = MultipartUploader(target, state_file=self.state_file, part_size=self.PART, **kwargs)
+        self.addCleanup(uploader.close)
+        return uploader
+
+    def test_multipart_upload_to_s3(self):
+        s3 = FakeS3()
+        result = self._uploader(S3Target(s3, 'bucket')).upload(self.source, 'p/backup.tar.gz')
+
+        self.assertEqual(s3.objects['p/backup.tar.gz'], self.data)
+        self.assertEqual(result['parts'], 6)
+        self.assertEqual(result['sha256'], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(json.loads(self.state_file.read_text()), {})
+
+    def test_small_file_is_a_single_put(self):
+        s3 = FakeS3()
+        self.source.write_bytes(b'small')
+        self._uploader(S3Target(s3, 'bucket')).upload(self.source, 'p/small.tar.gz')
+
+        self.assertEqual(s3.objects['p/small.tar.gz'], b'small')
+        self.assertEqual(s3.part_calls, [])
+
+    def test_window_bounds_parts_in_memory(self):
+        s3 = FakeS3(delay=0.02)
+        self._uploader(S3Target(s3, 'bucket'), concurrency=4, window=2).upload(self.source, 'k')
+
+        self.assertEqual(s3.objects['k'], self.data)
+        self.assertLessEqual(s3.max_in_flight, 2)
+
+    def test_interrupted_upload_resumes(self):
+        s3 = FakeS3(fail_part=4)
+        with self.assertRaises(ConnectionError):
+            self._uploader(S3Target(s3, 'bucket'), concurrency=1, window=1).upload(self.source, 'k')
+        self.assertIn('k', json.loads(self.state_file.read_text()))
+
+        s3.fail_part = None
+        s3.part_calls.clear()
+        result = self._uploader(S3Target(s3, 'bucket')).upload(self.source, 'k')
+
+        self.assertEqual(s3.objects['k'], self.data)
+        self.assertEqual(sorted(s3.part_calls), [4, 5, 6])
+        self.assertEqual(result['resumed_parts'], 3)
+        self.assertEqual(result['sha256'], hashlib.sha256(self.data).hexdigest())
+
+    def test_changed_source_restarts_upload(self):
+        s3 = FakeS3(fail_part=2)
+        with self.assertRaises(ConnectionError):
+            self._uploader(S3Target(s3, 'bucket'), concurrency=1, window=1).upload(self.source, 'k')
+
+        changed = os.urandom(len(self.data))
+        self.source.write_bytes(changed)
+        s3.fail_part = None
+        result = self._uploader(S3Target(s3, 'bucket')).upload(self.source, 'k')
+
+        self.assertEqual(s3.objects['k'], changed)
+        self.assertEqual(result['resumed_parts'], 0)
+        self.assertEqual(s3.uploads, {})
+
+    def test_local_storage_resumes(self):
+        storage = self.test_dir / 'nas'
+        storage.mkdir()
+        target = LocalTarget(LocalStorageClient(storage))
+
+        real_upload_part = target.upload_part
+
+        def flaky_upload_part(key, upload_id, number, data):
+            if number == 3:
+                raise OSError('share offline')
+            return real_upload_part(key, upload_id, number, data)
+
+        with patch.object(target, 'upload_part', side_effect=flaky_upload_part):
+            with self.assertRaises(OSError):
+                self._uploader(target, concurrency=1, window=1).upload(self.source, 'p/backup.tar.gz')
+
+        result = self._uploader(target).upload(self.source, 'p/backup.tar.gz')
+
+        self.assertEqual((storage / 'p' / 'backup.tar.gz').read_bytes(), self.data)
+        self.assertEqual(result['resumed_parts'], 2)
+        self.assertEqual(list((storage / '.uploads').iterdir()), [])
+
+    def test_upload_many_reports_each_file(self):
+        s3 = FakeS3(fail_part=2)
+        other = self.test_dir / 'other.tar.gz'
+        other.write_bytes(b'small backup')
+
+        results = self._uploader(S3Target(s3, 'bucket')).upload_many(
+            [(self.source, 'big', {}), (other, 'small', {})]
+        )
+
+        self.assertIsInstance(results[0], ConnectionError)
+        self.assertEqual(results[1]['size'], len(b'small backup'))
+        self.assertEqual(s3.objects['small'], b'small backup')
+
+    def test_cloud_storage_uploads_concurrently(self):
+        storage_path = self.test_dir / 'nas'
+        storage_path.mkdir()
+        config = configparser.ConfigParser()
+        config['cloud'] = {'provider': 'local', 'endpoint': str(storage_path), 'part_size_mb': '1'}
+        with open(self.test_dir / 'cloud.conf', 'w') as f:
+            config.write(f)
+        storage = CloudStorage(config_file=self.test_dir / 'cloud.conf')
+        self.addCleanup(lambda: storage.uploader.close())
+
+        big = self.test_dir / 'big.tar.gz'
+        big.write_bytes(os.urandom(3 * 1024 * 1024 + 5))
+        results = storage.upload_backups([self.source, big], 'project')
+
+        self.assertEqual(results, {self.source: True, big: True})
+        self.assertEqual((storage_path / 'project' / 'big.tar.gz').read_bytes(), big.read_bytes())
+        self.assertEqual((storage_path / 'project' / 'backup.tar.gz').read_bytes(), self.data)
+
+
+class TestParallelDownloader(unittest.TestCase):
+    PART = 64 * 1024
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.data = os.urandom(self.PART * 5 + 123)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _downloader(self, source, **kwargs):
+        downloader = ParallelDownloader(source, part_size=self.PART, **kwargs)
+        self.addCleanup(downloader.close)
+        return downloader
+
+    def test_ranged_download(self):
+        s3 = FakeS3()
+        s3.objects['k'] = self.data
+        dest = self.test_dir / 'out' / 'backup.tar.gz'
+
+        size = self._downloader(S3Source(s3, 'bucket')).download('k', dest)
+
+        self.assertEqual(size, len(self.data))
+        self.assertEqual(dest.read_bytes(), self.data)
+        self.assertEqual(len(s3.range_calls), 6)
+        self.assertTrue(all(r.startswith('bytes=') for r in s3.range_calls))
+
+    def test_read_ahead_is_bounded(self):
+        s3 = FakeS3()
+        s3.objects['k'] = self.data
+
+        reader = self._downloader(S3Source(s3, 'bucket'), concurrency=2, window=2).open('k')
+        reader.read(10)
+        time.sleep(0.05)
+        # The first range plus at most `window` fetched ahead
+        self.assertLessEqual(len(s3.range_calls), 3)
+        self.assertEqual(reader.read(10), self.data[10:20])
+        reader.close()
+
+    def test_short_range_fails_download(self):
+        s3 = FakeS3()
+        s3.objects['k'] = self.data
+        real_get = s3.get_object
+
+        def truncated(Bucket, Key, Range=None):
+            response = real_get(Bucket, Key, Range)
+            if not Range.startswith('bytes=0-'):
+                response['Body'] = io.BytesIO(response['Body'].read()[:-1])
+            return response
+
+        s3.get_object = truncated
+        dest = self.test_dir / 'backup.tar.gz'
+        with self.assertRaises(IOError):
+            self._downloader(S3Source(s3, 'bucket')).download('k', dest)
+        self.assertFalse(dest.exists())
+        self.assertEqual(list(self.test_dir.iterdir()), [])
+
+    def test_restore_from_cloud_without_local_copy(self):
+        from savior.core import Savior
+
+        project = self.test_dir / 'project'
+        project.mkdir()
+        (project / 'main.py').write_text('v1')
+        (project / 'data.bin').write_bytes(self.data)
+        savior = Savior(project)
+        backup = savior.create_backup('snapshot', show_progress=False)
+
+        storage_path = self.test_dir / 'nas'
+        storage_path.mkdir()
+        config = configparser.ConfigParser()
+        config['cloud'] = {'provider': 'local', 'endpoint': str(storage_path)}
+        with open(self.test_dir / 'cloud.conf', 'w') as f:
+            config.write(f)
+        storage = CloudStorage(config_file=self.test_dir / 'cloud.conf')
+        self.assertTrue(storage.upload_backup(backup.path, 'project'))
+
+        (project / 'main.py').write_text('v2')
+        (project / 'data.bin').unlink()
+        before = sorted(p.name for p in savior.backup_dir.rglob('*'))
+
+        stats = storage.restore_from_cloud(f'project/{backup.path.name}', project)
+
+        self.assertEqual((project / 'main.py').read_text(), 'v1')
+        self.assertEqual((project / 'data.bin').read_bytes(), self.data)
+        self.assertEqual(stats['written'], 2)
+        self.assertEqual(sorted(p.name for p in savior.backup_dir.rglob('*')), before)
+
+
+class TestDedupCloudSync(unittest.TestCase):
+    """Syncing backups and the dedup store to a local (NAS) provider"""
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.project = self.test_dir / 'project'
+        self.project.mkdir()
+        for i in range(20):
+            (self.project / f'module{i}.py').write_text(f'# module {i}\n' + 'x = 1\n' * 200 * (i + 1))
+
+        self.nas = self.test_dir / 'nas'
+        self.nas.mkdir()
+        config = configparser.ConfigParser()
+        config['cloud'] = {'provider': 'local', 'endpoint': str(self.nas)}
+        with open(self.test_dir / 'cloud.conf', 'w') as f:
+            config.write(f)
+        self.storage = CloudStorage(config_file=self.test_dir / 'cloud.conf')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _dedup_backup(self):
+        from savior.core_dedup import SaviorWithDedup
+
+        savior = SaviorWithDedup(self.project)
+        try:
+            savior.create_backup_dedup('snapshot', show_progress=False)
+        finally:
+            savior.dedup_store.close()
+        return savior.backup_dir
+
+    def test_second_sync_uploads_only_new_objects(self):
+        backup_dir = self._dedup_backup()
+        first = self.storage.sync_dedup_store(backup_dir, 'project')
+        self.assertEqual(first['manifests'], 1)
+        self.assertEqual(first['errors'], [])
+        self.assertGreater(first['objects'], 0)
+
+        time.sleep(1.1)  # Backup ids have one-second resolution
+        (self.project / 'module3.py').write_text('# changed\n' + 'y = 2\n' * 400)
+        self._dedup_backup()
+        second = self.storage.sync_dedup_store(backup_dir, 'project')
+
+        self.assertEqual(second['manifests'], 1)
+        self.assertEqual(second['objects'], 1)
+        self.assertEqual(second['skipped_objects'], first['objects'] - 1)
+        self.assertLess(second['bytes'], first['bytes'])
+
+        packs = self.storage.list_keys('project/dedup/packs/')
+        index = self.storage.list_keys('project/dedup/index/')
+        manifests = self.storage.list_keys('project/dedup/manifests/')
+        self.assertEqual((len(packs), len(index), len(manifests)), (2, 2, 2))
+
+        third = self.storage.sync_dedup_store(backup_dir, 'project')
+        self.assertEqual((third['manifests'], third['objects'], third['bytes']), (0, 0, 0))
+
+    def test_large_upload_is_split_into_segments(self):
+        from savior.dedup_sync import DedupCloudSync
+
+        backup_dir = self._dedup_backup()
+        with patch.object(DedupCloudSync, 'SEGMENT_SIZE', 256):
+            stats = self.storage.sync_dedup_store(backup_dir, 'project')
+
+        packs = self.storage.list_keys('project/dedup/packs/')
+        index = self.storage.list_keys('project/dedup/index/')
+        self.assertGreater(len(packs), 1)
+        self.assertEqual(len(packs), len(index))
+        listed = sum(len(json.loads(self.storage.read_object(obj['key']))) for obj in index)
+        self.assertEqual(listed, stats['objects'])
+        self.assertFalse(list((backup_dir / '.dedup_store').glob('.upload-*')))
+
+    def test_gc_waits_for_upload_in_flight(self):
+        from savior.dedup import DeduplicationStore
+
+        backup_dir = self._dedup_backup()
+        # Another process's store on the same directory
+        other = DeduplicationStore(backup_dir)
+        upload_file = self.storage.upload_file
+        collectors = []
+        blocked = []
+
+        def upload_during_gc(*args, **kwargs):
+            collector = threading.Thread(target=lambda: other.garbage_collect([]))
+            collector.start()
+            collector.join(0.5)
+            collectors.append(collector)
+            blocked.append(collector.is_alive())
+            return upload_file(*args, **kwargs)
+
+        with patch.object(self.storage, 'upload_file', side_effect=upload_during_gc):
+            stats = self.storage.sync_dedup_store(backup_dir, 'project')
+        for collector in collectors:
+            collector.join()
+        other.close()
+
+        self.assertEqual(stats['errors'], [])
+        self.assertTrue(blocked and all(blocked))
+
+    def test_lost_cache_is_rebuilt_from_the_remote_index(self):
+        backup_dir = self._dedup_backup()
+        self.storage.sync_dedup_store(backup_dir, 'project')
+
+        (backup_dir / '.dedup_store' / 'remote.db').unlink()
+        time.sleep(1.1)
+        self._dedup_backup()
+        stats = self.storage.sync_dedup_store(backup_dir, 'project')
+
+        self.assertEqual(stats['manifests'], 1)
+        self.assertEqual(stats['objects'], 0)
+        self.assertGreater(stats['skipped_objects'], 0)
+
+    def test_sync_backups_covers_every_layout(self):
+        from savior.core import Savior
+        from savior.incremental import IncrementalBackup
+
+        savior = Savior(self.project)
+        full = savior.create_backup('snapshot', show_progress=False, codec='zstd')
+        (self.project / 'module0.py').write_text('changed')
+        incremental = IncrementalBackup(savior.backup_dir, self.project).create_incremental_backup(
+            savior._collect_files(), full.path
+        )
+
+        results = self.storage.sync_backups(savior.backup_dir, 'project')
+
+        self.assertEqual(results['uploaded'], 2)
+        self.assertEqual(results['errors'], [])
+        keys = sorted(b['key'] for b in self.storage.list_backups('project'))
+        self.assertEqual(keys, sorted([
+            f"project/{full.path.relative_to(savior.backup_dir).as_posix()}",
+            f"project/{incremental.name}",
+        ]))
+
+        # Downloads land back in the same place
+        shutil.rmtree(full.path.parent)
+        results = self.storage.sync_backups(savior.backup_dir, 'project')
+        self.assertEqual((results['uploaded'], results['downloaded']), (0, 1))
+        self.assertTrue(full.path.exists())
+
+    def test_list_backups_leaves_out_the_dedup_store(self):
+        backup_dir = self._dedup_backup()
+        results = self.storage.sync_backups(backup_dir, 'project')
+
+        self.assertEqual(results['dedup']['manifests'], 1)
+        self.assertTrue(self.storage.list_keys('project/dedup/'))
+        self.assertEqual(self.storage.list_backups('project'), [])
+
+
 class TestCloudIntegration(unittest.TestCase):
     """Test integration with Savior core"""
 
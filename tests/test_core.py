@@ -6,6 +6,7 @@ from pathlib import Path
 from datetime import datetime
 
 from savior.core import Savior, Backup, SaviorIgnore
+from savior.ignore import IgnoreMatcher, fnmatch_should_ignore
 
 
 class TestSaviorCore:
@@ -107,6 +108,25 @@ class TestSaviorCore:
         assert ignore.should_ignore('test_data.txt')
         assert not ignore.should_ignore('main.py')
 
+    def test_compiled_matcher_matches_fnmatch(self):
+        """Compiled matcher must agree with the per-pattern fnmatch loop"""
+        patterns = ['.savior/', 'node_modules/', '*.py[cod]', '*$py.class', 'build/',
+                    '*.egg-info/', 'test_*.txt', 'docs/*.md', '*~', '.env', 'a/b/']
+        paths = [
+            'main.py', 'main.pyc', 'src/main.pyo', 'node_modules', 'src/node_modules/x.js',
+            'pkg.egg-info', 'pkg.egg-info/PKG-INFO', 'test_data.txt', 'sub/test_data.txt',
+            'docs/index.md', 'docs/api/index.md', 'notes.txt~', '.env', 'config/.env',
+            'a/b/c.txt', 'a', 'buildings/plan.txt', 'mybuild/x', 'foo$py.class', '',
+        ]
+
+        matcher = IgnoreMatcher(patterns)
+        for path in paths:
+            assert matcher.matches(path) == fnmatch_should_ignore(patterns, path), path
+
+    def test_compiled_matcher_no_patterns(self):
+        """An empty pattern list ignores nothing"""
+        assert not IgnoreMatcher([]).matches('anything.py')
+
 
 class TestBackup:
     def test_backup_creation(self):
@@ -0,0 +1,150 @@
+import time
+import socket
+import asyncio
+import threading
+import tempfile
+import shutil
+from pathlib import Path
+
+import pytest
+
+from savior import scheduler as scheduler_module
+from savior.daemon import (
+    SaviorDaemon, DaemonClient, FrameError, encode_frame, recv_frame
+)
+from savior.scheduler import ProjectScheduler
+
+
+@pytest.fixture
+def home(monkeypatch):
+    # Short path: Unix socket paths are limited to about 100 bytes
+    root = Path(tempfile.mkdtemp(prefix='sv', dir='/tmp'))
+    monkeypatch.setattr(Path, 'home', classmethod(lambda cls: root))
+    monkeypatch.setattr(scheduler_module, 'configure_throttle', lambda *args: None)
+    yield root
+    shutil.rmtree(root, ignore_errors=True)
+
+
+@pytest.fixture
+def daemon(home):
+    daemon = SaviorDaemon()
+    daemon.running = True
+    daemon.scheduler = ProjectScheduler()
+    daemon.scheduler.start()
+    thread = threading.Thread(target=asyncio.run, args=(daemon._serve(),), daemon=True)
+    thread.start()
+    # The socket file appears at bind(), a moment before listen()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(daemon.socket_file))
+            break
+        except OSError:
+            time.sleep(0.01)
+        finally:
+            probe.close()
+    yield daemon
+    daemon._request_stop()
+    thread.join(timeout=5)
+    daemon.scheduler.stop()
+
+
+@pytest.fixture
+def project(home):
+    path = home / 'project'
+    path.mkdir()
+    for i in range(20):
+        (path / f'file{i}.py').write_text(f'print({i})\n' * 100)
+    return path
+
+
+class TestFraming:
+    def test_round_trip(self):
+        left, right = socket.socketpair()
+        message = {'id': 1, 'data': 'x' * 100_000}
+        left.sendall(encode_frame(message))
+        assert recv_frame(right) == message
+
+    def test_oversized_frame_is_refused(self):
+        left, right = socket.socketpair()
+        left.sendall(encode_frame({'data': 'x' * 100}))
+        with pytest.raises(FrameError):
+            recv_frame(right, max_size=10)
+
+
+class TestDaemonRPC:
+    def test_commands_share_one_connection(self, daemon):
+        client = DaemonClient()
+        assert client.status()['running']
+        sock = client._sock
+        assert client.list_projects() == {'projects': {}}
+        assert client._sock is sock
+
+    def test_bad_token_is_rejected(self, daemon):
+        client = DaemonClient()
+        client.auth_token = 'wrong'
+        assert client.status() == {'error': 'Authentication failed'}
+
+    def test_large_responses_are_not_truncated(self, daemon, home):
+        client = DaemonClient()
+        paths = []
+        for i in range(40):
+            path = home / ('p' * 60 + str(i))
+            path.mkdir()
+            paths.append(str(path))
+            assert 'error' not in client.add_project(str(path), interval=20, smart=True)
+
+        projects = client.list_projects()['projects']
+        assert sorted(projects) == sorted(paths)
+
+    def test_backup_streams_progress(self, daemon, project):
+        events = []
+        result = DaemonClient().backup(str(project), 'from rpc', on_progress=events.append)
+
+        assert result['status'] == 'saved'
+        assert events
+        assert events[-1] == {'stage': 'backup', 'done': 20, 'total': 20}
+
+    def test_restore_streams_progress(self, daemon, project):
+        client = DaemonClient()
+        client.backup(str(project))
+        for i in range(20):
+            (project / f'file{i}.py').write_text('changed\n')
+
+        events = []
+        result = client.restore(str(project), 0, force=True, on_progress=events.append)
+
+        assert result['status'] == 'restored'
+        assert result['stats']['written'] == 20
+        assert events[-1]['stage'] == 'restore'
+        assert (project / 'file0.py').read_text() == 'print(0)\n' * 100
+
+    def test_requests_are_multiplexed(self, daemon, project):
+        """A slow backup doesn't hold up other requests on the connection"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(10)
+        sock.connect(str(daemon.socket_file))
+        sock.sendall(encode_frame({'id': 1, 'type': 'hello', 'auth': daemon.auth_token}))
+        assert recv_frame(sock)['data'] == {'status': 'ok'}
+
+        sock.sendall(encode_frame({'id': 2, 'type': 'backup', 'path': str(project)}))
+        sock.sendall(encode_frame({'id': 3, 'type': 'status'}))
+
+        results = {}
+        while len(results) < 2:
+            message = recv_frame(sock)
+            if message['event'] == 'result':
+                results[message['id']] = message['data']
+        sock.close()
+
+        assert results[2]['status'] == 'saved'
+        assert results[3]['running']
+
+    def test_client_reconnects_after_drop(self, daemon):
+        client = DaemonClient()
+        assert client.status()['running']
+        for writer in list(daemon._writers):
+            daemon._loop.call_soon_threadsafe(writer.close)
+        time.sleep(0.1)
+        assert client.status()['running']
@@ -5,6 +5,7 @@ import json
 import shutil
 import hashlib
 import tempfile
+import threading
 import unittest
 from pathlib import Path
 from datetime import datetime
@@ -14,6 +15,10 @@ from savior.dedup import (
     DedupBackupManifest,
     SmartDeduplicator
 )
+from savior.chunking import Chunker
+from savior.packfile import PackStore
+from savior.object_codec import ObjectCodec
+from savior.archive import zstd_available
 
 
 class TestDeduplicationStore(unittest.TestCase):
@@ -41,8 +46,45 @@ class TestDeduplicationStore(unittest.TestCase):
         """Test deduplication store initialization."""
         self.assertTrue(self.dedup_store.store_dir.exists())
         self.assertTrue(self.dedup_store.chunks_dir.exists())
-        self.assertTrue(self.dedup_store.index_file.exists())
-        self.assertTrue(self.dedup_store.stats_file.exists())
+        self.assertTrue(self.dedup_store.db_file.exists())
+
+    def test_migrates_json_index(self):
+        """A legacy index.json/stats.json is imported into the database once."""
+        metadata = self.dedup_store.store_file(self.test_files['file_0'])
+        legacy_index = self.dedup_store._load_index()
+        legacy_stats = self.dedup_store._load_stats()
+        self.dedup_store.close()
+        shutil.rmtree(self.test_dir / '.dedup_store' / 'chunks')
+        for path in (self.test_dir / '.dedup_store').glob('index.db*'):
+            path.unlink()
+
+        store_dir = self.test_dir / '.dedup_store'
+        (store_dir / 'index.json').write_text(json.dumps(legacy_index))
+        (store_dir / 'stats.json').write_text(json.dumps(legacy_stats))
+
+        store = DeduplicationStore(self.test_dir)
+        index = store._load_index()
+
+        self.assertEqual(index[metadata['hash']]['ref_count'], 1)
+        self.assertNotIn('refs', index[metadata['hash']])
+        self.assertEqual(store.get_dedup_stats()['total_stored'], legacy_stats['total_stored'])
+        self.assertFalse(store.index_file.exists())
+        self.assertTrue((store_dir / 'index.json.migrated').exists())
+
+    def test_batch_rolls_back_failed_block(self):
+        """Updates inside a failed batch are discarded."""
+        with self.assertRaises(RuntimeError):
+            with self.dedup_store.batch():
+                self.dedup_store.store_file(self.test_files['file_0'])
+                raise RuntimeError('abort')
+
+        self.assertEqual(self.dedup_store._load_index(), {})
+
+        with self.dedup_store.batch():
+            for name in ('file_0', 'file_1', 'file_3'):
+                self.dedup_store.store_file(self.test_files[name])
+
+        self.assertEqual(self.dedup_store.get_dedup_stats()['unique_chunks'], 2)
 
     def test_file_hashing(self):
         """Test file hash calculation."""
@@ -61,18 +103,18 @@ class TestDeduplicationStore(unittest.TestCase):
     def test_store_file_new(self):
         """Test storing a new file."""
         test_file = self.test_files['file_0']
-        backup_id = 'backup_001'
 
-        metadata = self.dedup_store.store_file(test_file, backup_id)
+        metadata = self.dedup_store.store_file(test_file)
 
         self.assertIsNotNone(metadata)
         self.assertIn('hash', metadata)
         self.assertIn('size', metadata)
         self.assertFalse(metadata.get('deduplicated', False))
 
-        # Check chunk was created
-        chunk_path = self.dedup_store._get_chunk_path(metadata['hash'])
-        self.assertTrue(chunk_path.exists())
+        # Small content is appended to a pack
+        entry = self.dedup_store.index.get(metadata['hash'])
+        self.assertIn('pack', entry)
+        self.assertTrue((self.dedup_store.packs_dir / entry['pack']).exists())
 
     def test_store_file_duplicate(self):
         """Test storing duplicate files (deduplication)."""
@@ -80,11 +122,11 @@ class TestDeduplicationStore(unittest.TestCase):
         test_file2 = self.test_files['file_3']  # Has same content as file_0
 
         # Store first file
-        metadata1 = self.dedup_store.store_file(test_file1, 'backup_001')
+        metadata1 = self.dedup_store.store_file(test_file1)
         self.assertFalse(metadata1.get('deduplicated', False))
 
         # Store duplicate file
-        metadata2 = self.dedup_store.store_file(test_file2, 'backup_002')
+        metadata2 = self.dedup_store.store_file(test_file2)
         self.assertTrue(metadata2.get('deduplicated', False))
 
         # Both should have same hash
@@ -97,10 +139,9 @@ class TestDeduplicationStore(unittest.TestCase):
     def test_retrieve_file(self):
         """Test retrieving a deduplicated file."""
         test_file = self.test_files['file_0']
-        backup_id = 'backup_001'
 
         # Store file
-        metadata = self.dedup_store.store_file(test_file, backup_id)
+        metadata = self.dedup_store.store_file(test_file)
         content_hash = metadata['hash']
 
         # Retrieve to new location
@@ -121,9 +162,9 @@ class TestDeduplicationStore(unittest.TestCase):
         test_file = self.test_files['file_0']
 
         # Store file from multiple backups
-        metadata1 = self.dedup_store.store_file(test_file, 'backup_001')
-        metadata2 = self.dedup_store.store_file(test_file, 'backup_002')
-        metadata3 = self.dedup_store.store_file(test_file, 'backup_003')
+        metadata1 = self.dedup_store.store_file(test_file)
+        metadata2 = self.dedup_store.store_file(test_file)
+        metadata3 = self.dedup_store.store_file(test_file)
 
         content_hash = metadata1['hash']
 
@@ -132,20 +173,19 @@ class TestDeduplicationStore(unittest.TestCase):
         self.assertEqual(index[content_hash]['ref_count'], 3)
 
         # Remove one reference
-        self.dedup_store.remove_reference(content_hash, 'backup_001')
+        self.dedup_store.remove_reference(content_hash)
         index = self.dedup_store._load_index()
         self.assertEqual(index[content_hash]['ref_count'], 2)
 
-        # Chunk should still exist
-        chunk_path = self.dedup_store._get_chunk_path(content_hash)
-        self.assertTrue(chunk_path.exists())
+        # Content should still be stored
+        self.assertIn(content_hash, self.dedup_store.index)
 
         # Remove all references
-        self.dedup_store.remove_reference(content_hash, 'backup_002')
-        self.dedup_store.remove_reference(content_hash, 'backup_003')
+        self.dedup_store.remove_reference(content_hash)
+        self.dedup_store.remove_reference(content_hash)
 
-        # Chunk should be deleted
-        self.assertFalse(chunk_path.exists())
+        # Content should be deleted
+        self.assertNotIn(content_hash, self.dedup_store.index)
 
     def test_cleanup_orphaned_chunks(self):
         """Test cleanup of orphaned chunks."""
@@ -157,7 +197,7 @@ class TestDeduplicationStore(unittest.TestCase):
 
         # Store valid file
         test_file = self.test_files['file_0']
-        self.dedup_store.store_file(test_file, 'backup_001')
+        self.dedup_store.store_file(test_file)
 
         # Run cleanup
         cleaned = self.dedup_store.cleanup_orphaned_chunks()
@@ -168,10 +208,10 @@ class TestDeduplicationStore(unittest.TestCase):
     def test_dedup_stats(self):
         """Test deduplication statistics."""
         # Store multiple files with some duplicates
-        self.dedup_store.store_file(self.test_files['file_0'], 'backup_001')
-        self.dedup_store.store_file(self.test_files['file_1'], 'backup_001')
-        self.dedup_store.store_file(self.test_files['file_3'], 'backup_002')  # Duplicate of file_0
-        self.dedup_store.store_file(self.test_files['file_4'], 'backup_002')  # Duplicate of file_0
+        self.dedup_store.store_file(self.test_files['file_0'])
+        self.dedup_store.store_file(self.test_files['file_1'])
+        self.dedup_store.store_file(self.test_files['file_3'])  # Duplicate of file_0
+        self.dedup_store.store_file(self.test_files['file_4'])  # Duplicate of file_0
 
         stats = self.dedup_store.get_dedup_stats()
 
@@ -186,6 +226,417 @@ class TestDeduplicationStore(unittest.TestCase):
         self.assertGreater(stats['dedup_ratio'], 0)
 
 
+class TestReferenceLifecycle(unittest.TestCase):
+    """Test refcounts, backup deletion and garbage collection."""
+
+    def setUp(self):
+        """Set up a store plus manifests for two backups."""
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_refs_'))
+        self.dedup_store = DeduplicationStore(
+            self.test_dir, chunk_threshold=8 * 1024,
+            min_chunk_size=256, avg_chunk_size=1024, max_chunk_size=4096
+        )
+        self.manifests = DedupBackupManifest(self.test_dir)
+
+        self.shared = self.test_dir / 'shared.txt'
+        self.shared.write_text('shared content ' * 100)
+        self.only_first = self.test_dir / 'first.txt'
+        self.only_first.write_text('first only ' * 100)
+        self.big = self.test_dir / 'big.bin'
+        self.big.write_bytes(os.urandom(32 * 1024))
+
+        self.first = self._backup('backup_001', [self.shared, self.only_first, self.big])
+        self.second = self._backup('backup_002', [self.shared, self.big])
+
+    def tearDown(self):
+        """Clean up test environment."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def _backup(self, backup_id, paths):
+        files = {p.name: self.dedup_store.store_file(p) for p in paths}
+        self.manifests.create_manifest(backup_id, files)
+        return self.manifests.load_manifest(backup_id)
+
+    def test_refcounts_without_backup_lists(self):
+        """Entries only carry a count of references."""
+        index = self.dedup_store._load_index()
+        shared_hash = self.first['files']['shared.txt']['hash']
+
+        self.assertEqual(index[shared_hash]['ref_count'], 2)
+        self.assertTrue(all('refs' not in entry for entry in index.values()))
+
+    def test_delete_backup_releases_only_its_content(self):
+        """Deleting a backup frees what nothing else references."""
+        only_hash = self.first['files']['first.txt']['hash']
+        shared_hash = self.first['files']['shared.txt']['hash']
+
+        deleted = self.dedup_store.delete_backup(self.first)
+
+        self.assertEqual(deleted, 1)
+        self.assertNotIn(only_hash, self.dedup_store.index)
+        self.assertEqual(self.dedup_store.index.ref_count(shared_hash), 1)
+
+        restored = self.test_dir / 'restored.bin'
+        big = self.second['files']['big.bin']
+        self.assertTrue(self.dedup_store.retrieve_file(big['hash'], restored, big['chunks']))
+        self.assertEqual(restored.read_bytes(), self.big.read_bytes())
+
+    def test_gc_matches_manifests(self):
+        """GC drops content from a manifest removed behind the store's back."""
+        self.manifests.delete_manifest('backup_001')
+        only_hash = self.first['files']['first.txt']['hash']
+
+        result = self.dedup_store.garbage_collect(self.manifests.iter_manifests())
+
+        self.assertEqual(result['deleted_objects'], 1)
+        self.assertNotIn(only_hash, self.dedup_store.index)
+
+        # Counts now mirror a store built from the remaining manifest only
+        for metadata in self.second['files'].values():
+            self.assertEqual(self.dedup_store.index.ref_count(metadata['hash']), 1)
+
+        gc_again = self.dedup_store.garbage_collect(self.manifests.iter_manifests())
+        self.assertEqual(gc_again['deleted_objects'], 0)
+
+    def test_gc_waits_for_backup_in_flight(self):
+        """Objects stored before their manifest is written survive GC."""
+        new_file = self.test_dir / 'new.txt'
+        new_file.write_text('stored, manifest not yet written')
+        # Another process's store on the same directory
+        other = DeduplicationStore(self.test_dir)
+        result = {}
+
+        with self.dedup_store.writing():
+            metadata = self.dedup_store.store_file(new_file)
+            collector = threading.Thread(target=lambda: result.update(
+                other.garbage_collect(self.manifests.iter_manifests())
+            ))
+            collector.start()
+            collector.join(0.5)
+            self.assertTrue(collector.is_alive())
+            self.manifests.create_manifest('backup_003', {'new.txt': metadata})
+
+        collector.join()
+        other.close()
+        self.assertEqual(result['deleted_objects'], 0)
+        self.assertIn(metadata['hash'], self.dedup_store.index)
+
+    def test_gc_refuses_unreadable_manifest(self):
+        """A corrupt manifest aborts GC instead of freeing its content."""
+        (self.manifests.manifests_dir / 'backup_003.json').write_text('{not json')
+
+        with self.assertRaises(ValueError):
+            self.dedup_store.garbage_collect(self.manifests.iter_manifests())
+
+        self.assertEqual(len(self.dedup_store._load_index()), len(
+            {m['hash'] for m in self.first['files'].values()}
+        ) + len(set(self.first['files']['big.bin']['chunks'])))
+
+
+class TestContentDefinedChunking(unittest.TestCase):
+    """Test chunked storage of large files."""
+
+    def setUp(self):
+        """Set up a store with small chunk sizes so tests stay fast."""
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_cdc_'))
+        self.dedup_store = DeduplicationStore(
+            self.test_dir, chunk_threshold=8 * 1024,
+            min_chunk_size=256, avg_chunk_size=1024, max_chunk_size=4096
+        )
+        self.data = os.urandom(64 * 1024)
+        self.big_file = self.test_dir / 'dump.sql'
+        self.big_file.write_bytes(self.data)
+
+    def tearDown(self):
+        """Clean up test environment."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_chunker_respects_bounds(self):
+        """Chunks reassemble exactly and stay within min/max sizes."""
+        chunker = Chunker(256, 1024, 4096)
+        chunks = chunker.split(self.data)
+
+        self.assertEqual(b''.join(chunks), self.data)
+        self.assertTrue(all(256 <= len(c) <= 4096 for c in chunks[:-1]))
+
+        with open(self.big_file, 'rb') as f:
+            self.assertEqual(list(chunker.iter_chunks(f, read_size=5000)), chunks)
+
+    def test_large_file_stored_as_chunks(self):
+        """Large files get an ordered chunk list and reassemble on retrieve."""
+        metadata = self.dedup_store.store_file(self.big_file)
+
+        self.assertIn('chunks', metadata)
+        self.assertGreater(len(metadata['chunks']), 1)
+
+        restore_path = self.test_dir / 'restored' / 'dump.sql'
+        self.assertTrue(self.dedup_store.retrieve_file(metadata['hash'], restore_path))
+        self.assertEqual(restore_path.read_bytes(), self.data)
+
+    def test_small_edit_stores_only_changed_chunks(self):
+        """Inserting bytes mid-file only stores chunks around the edit."""
+        self.dedup_store.store_file(self.big_file)
+        stored_before = self.dedup_store.get_dedup_stats()['total_stored']
+
+        edited = self.data[:30000] + b'INSERTED LINE\n' + self.data[30000:]
+        self.big_file.write_bytes(edited)
+        metadata = self.dedup_store.store_file(self.big_file)
+
+        stats = self.dedup_store.get_dedup_stats()
+        growth = stats['total_stored'] - stored_before
+        self.assertLess(growth, 3 * 4096)
+        self.assertGreater(stats['space_saved'], len(self.data) // 2)
+
+        restore_path = self.test_dir / 'restored.sql'
+        self.assertTrue(self.dedup_store.retrieve_file(
+            metadata['hash'], restore_path, metadata['chunks']))
+        self.assertEqual(restore_path.read_bytes(), edited)
+
+    def test_removing_last_reference_deletes_chunks(self):
+        """Chunks go away with the last file that references them."""
+        metadata = self.dedup_store.store_file(self.big_file)
+
+        self.dedup_store.remove_reference(metadata['hash'])
+
+        self.assertFalse(any(h in self.dedup_store.index for h in metadata['chunks']))
+        self.assertEqual(self.dedup_store._load_index(), {})
+        self.assertEqual(self.dedup_store.get_dedup_stats()['total_stored'], 0)
+
+
+class TestPackfiles(unittest.TestCase):
+    """Test packfile storage, sequential restore and repacking."""
+
+    def setUp(self):
+        """Set up a store with small packs and a handful of small files."""
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_packs_'))
+        self.dedup_store = DeduplicationStore(self.test_dir, max_pack_size=4096, compression=False)
+
+        self.files = {}
+        for i in range(20):
+            path = self.test_dir / 'src' / f'file_{i}.txt'
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(f'file {i} ' * 50)
+            self.files[path] = self.dedup_store.store_file(path)
+
+    def tearDown(self):
+        """Clean up test environment."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_pack_store_roundtrip(self):
+        """Appended objects read back by offset and by scanning the pack."""
+        packs = PackStore(self.test_dir / 'raw_packs')
+        objects = {hashlib.sha256(d).hexdigest(): d for d in (b'alpha', b'beta' * 100)}
+        locations = {h: packs.append(h, d) for h, d in objects.items()}
+
+        for content_hash, (pack, offset, length) in locations.items():
+            self.assertEqual(packs.read(pack, offset, length), objects[content_hash])
+
+        scanned = {h: data for h, _, data in packs.iter_pack(packs.active_name)}
+        self.assertEqual(scanned, objects)
+        packs.close()
+
+    def test_stores_never_share_a_pack(self):
+        """Two stores on one directory (two processes) get their own packs."""
+        first = PackStore(self.test_dir / 'raw_packs')
+        second = PackStore(self.test_dir / 'raw_packs')
+        # Both picked the next number before either created its pack
+        first._next_number = second._next_number = lambda: 1
+        a = first.append(hashlib.sha256(b'a').hexdigest(), b'a')[0]
+        b = second.append(hashlib.sha256(b'b').hexdigest(), b'b')[0]
+
+        self.assertNotEqual(a, b)
+        self.assertEqual([d for _, _, d in first.iter_pack(a)], [b'a'])
+        self.assertEqual([d for _, _, d in second.iter_pack(b)], [b'b'])
+        first.close()
+        second.close()
+
+    def test_small_objects_share_packs(self):
+        """Many small files end up in a few rotated packs, not one file each."""
+        packs = self.dedup_store.packs.pack_sizes()
+
+        self.assertGreater(len(packs), 1)
+        self.assertLess(len(packs), len(self.files))
+        self.assertFalse(any(self.dedup_store.chunks_dir.iterdir()))
+
+    def test_retrieve_files_restores_everything(self):
+        """Batch retrieval writes every file with the right content."""
+        restore_dir = self.test_dir / 'restored'
+        items = [(m['hash'], restore_dir / p.name, None) for p, m in self.files.items()]
+
+        results = self.dedup_store.retrieve_files(reversed(items))
+
+        self.assertTrue(all(results.values()))
+        for path in self.files:
+            self.assertEqual((restore_dir / path.name).read_text(), path.read_text())
+
+    def test_repack_reclaims_dead_objects(self):
+        """Repack drops dead packs, compacts sparse ones and keeps live data."""
+        before = sum(self.dedup_store.packs.pack_sizes().values())
+        keep = list(self.files.items())[::5]
+        for path, metadata in self.files.items():
+            if (path, metadata) not in keep:
+                self.dedup_store.remove_reference(metadata['hash'])
+
+        result = self.dedup_store.repack()
+
+        self.assertGreater(result['packs_deleted'] + result['packs_rewritten'], 0)
+        self.assertGreater(result['bytes_reclaimed'], 0)
+        self.assertLess(sum(self.dedup_store.packs.pack_sizes().values()), before)
+
+        for path, metadata in keep:
+            restored = self.test_dir / 'restored' / path.name
+            self.assertTrue(self.dedup_store.retrieve_file(metadata['hash'], restored))
+            self.assertEqual(restored.read_text(), path.read_text())
+
+    def test_repack_waits_for_backup_in_flight(self):
+        """A pack another backup is still filling is not deleted as dead."""
+        new_file = self.test_dir / 'new.txt'
+        new_file.write_text('appended, index not yet committed')
+        # Another process's store on the same directory
+        other = DeduplicationStore(self.test_dir, max_pack_size=4096, compression=False)
+        result = {}
+
+        with self.dedup_store.writing():
+            with self.dedup_store.batch():
+                metadata = self.dedup_store.store_file(new_file)
+                repacker = threading.Thread(target=lambda: result.update(other.repack()))
+                repacker.start()
+                repacker.join(0.5)
+                self.assertTrue(repacker.is_alive())
+
+        repacker.join()
+        other.close()
+        restored = self.test_dir / 'restored.txt'
+        self.assertTrue(self.dedup_store.retrieve_file(metadata['hash'], restored))
+        self.assertEqual(restored.read_text(), new_file.read_text())
+
+    def test_repack_moves_loose_objects_into_packs(self):
+        """Small objects written as loose files before packs are packed."""
+        loose_store = DeduplicationStore(self.test_dir / 'old', pack_threshold=0)
+        path = next(iter(self.files))
+        metadata = loose_store.store_file(path)
+        chunk_path = loose_store._get_chunk_path(metadata['hash'])
+        self.assertTrue(chunk_path.exists())
+        loose_store.close()
+
+        store = DeduplicationStore(self.test_dir / 'old')
+        result = store.repack()
+
+        self.assertEqual(result['objects_packed'], 1)
+        self.assertFalse(chunk_path.exists())
+        restored = self.test_dir / 'restored.txt'
+        self.assertTrue(store.retrieve_file(metadata['hash'], restored))
+        self.assertEqual(restored.read_text(), path.read_text())
+        store.close()
+
+    def test_chunk_path_lookup_creates_nothing(self):
+        """Computing a loose object's path has no filesystem side effects."""
+        chunk_path = self.dedup_store._get_chunk_path('ab' + '0' * 62)
+        self.assertFalse(chunk_path.parent.exists())
+
+
+class TestObjectCompression(unittest.TestCase):
+    """Test per-object compression in the store."""
+
+    def setUp(self):
+        """Set up a store and some source-like text."""
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_compress_'))
+        self.dedup_store = DeduplicationStore(self.test_dir)
+        self.text = ''.join(f'def function_{i}(value):\n    return value * {i}\n\n'
+                            for i in range(200))
+
+    def tearDown(self):
+        """Clean up test environment."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def _store(self, name, content):
+        path = self.test_dir / 'src' / name
+        path.parent.mkdir(exist_ok=True)
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            path.write_text(content)
+        return path, self.dedup_store.store_file(path)
+
+    def test_text_is_compressed_and_restored(self):
+        """Source text is stored compressed and reads back unchanged."""
+        path, metadata = self._store('module.py', self.text)
+        entry = self.dedup_store.index.get(metadata['hash'])
+
+        self.assertIn('codec', entry)
+        self.assertLess(entry['stored_size'], entry['size'])
+
+        restored = self.test_dir / 'restored.py'
+        self.assertTrue(self.dedup_store.retrieve_file(metadata['hash'], restored))
+        self.assertEqual(restored.read_text(), self.text)
+
+    def test_compression_ratio_reported_separately(self):
+        """Compression shows up in its own ratio, not the dedup ratio."""
+        self._store('module.py', self.text)
+        stats = self.dedup_store.get_dedup_stats()
+
+        self.assertGreater(stats['compression_ratio'], 0.5)
+        self.assertEqual(stats['dedup_ratio'], 0.0)
+        self.assertLess(stats['stored_bytes'], stats['total_stored'])
+
+    def test_skipped_types_and_random_data_stored_raw(self):
+        """Compressed formats and incompressible data are not recompressed."""
+        _, image = self._store('logo.png', self.text)
+        _, noise = self._store('noise.bin', os.urandom(20000))
+
+        for metadata in (image, noise):
+            entry = self.dedup_store.index.get(metadata['hash'])
+            self.assertNotIn('codec', entry)
+            self.assertEqual(entry['stored_size'], entry['size'])
+
+    def test_large_loose_object_streamed(self):
+        """Objects too big for packs are stream-compressed to their own file."""
+        self.dedup_store = DeduplicationStore(self.test_dir / 'big', chunking=False)
+        content = self.text * 200
+        path, metadata = self._store('generated.py', content)
+        entry = self.dedup_store.index.get(metadata['hash'])
+
+        self.assertNotIn('pack', entry)
+        self.assertEqual(entry['stored_size'],
+                         self.dedup_store._get_chunk_path(metadata['hash']).stat().st_size)
+        self.assertLess(entry['stored_size'], len(content))
+
+        restored = self.test_dir / 'restored.py'
+        self.assertTrue(self.dedup_store.retrieve_file(metadata['hash'], restored))
+        self.assertEqual(restored.read_text(), content)
+
+    def test_zlib_fallback(self):
+        """Without zstd, objects are compressed with zlib."""
+        codec = ObjectCodec(self.test_dir / 'dicts', use_zstd=False)
+        data = self.text.encode()
+
+        name, payload = codec.compress(data)
+
+        self.assertEqual(name, 'zlib')
+        self.assertEqual(codec.decompress(name, payload), data)
+
+    @unittest.skipUnless(zstd_available(), "zstandard not installed")
+    def test_dictionary_trained_from_small_objects(self):
+        """After enough small objects a dictionary is trained and used."""
+        import savior.object_codec as object_codec
+
+        codec = ObjectCodec(self.test_dir / 'dicts')
+        for i in range(object_codec.DICT_TRAIN_SAMPLES):
+            codec.compress(f'import os\n\nclass Model{i}:\n    field_{i} = {i * 7}\n'.encode() * 3)
+
+        sample = b'import os\n\nclass Model9999:\n    field_9999 = 1\n' * 3
+        name, payload = codec.compress(sample)
+
+        self.assertTrue(name.startswith('zstd:'))
+        self.assertTrue(any((self.test_dir / 'dicts').glob('*.zdict')))
+        reopened = ObjectCodec(self.test_dir / 'dicts')
+        self.assertEqual(reopened.decompress(name, payload), sample)
+
+
 class TestDedupBackupManifest(unittest.TestCase):
     """Test backup manifest functionality."""
 
@@ -0,0 +1,122 @@
+import json
+import hashlib
+
+import pytest
+
+from savior import filestate
+from savior.filestate import FileStateTable, GIT_HASH_PREFIX
+
+
+def state(i, **extra):
+    info = {
+        'mtime': (1_700_000_000_000_000_000 + i) / 1e9,
+        'mtime_ns': 1_700_000_000_000_000_000 + i,
+        'ctime_ns': 1_700_000_000_000_000_000 + i,
+        'inode': 1000 + i,
+        'size': 10 * i,
+        'hash': hashlib.sha256(str(i).encode()).hexdigest()
+    }
+    info.update(extra)
+    return info
+
+
+@pytest.fixture
+def table_path(tmp_path):
+    return tmp_path / '.savior' / 'file_states.bin'
+
+
+class TestFileStateTable:
+    def test_round_trip(self, table_path):
+        table = FileStateTable(table_path)
+        table['main.py'] = state(1)
+        table['src/ünï.py'] = state(2, racy=True)
+        table['lib.py'] = state(3, hash=GIT_HASH_PREFIX + 'ab' * 20)
+        table.save()
+
+        reopened = FileStateTable(table_path)
+        assert len(reopened) == 3
+        assert reopened['main.py'] == state(1)
+        assert reopened['src/ünï.py'] == state(2, racy=True)
+        assert reopened['lib.py']['hash'] == GIT_HASH_PREFIX + 'ab' * 20
+        assert 'missing.py' not in reopened
+        assert reopened.get('missing.py') is None
+
+    def test_deletes_survive_reload(self, table_path):
+        table = FileStateTable(table_path)
+        table.update({'a.py': state(1), 'b.py': state(2)})
+        table.save()
+        del table['a.py']
+        table['b.py'] = state(5)
+        table.save()
+
+        reopened = FileStateTable(table_path)
+        assert set(reopened) == {'b.py'}
+        assert reopened['b.py'] == state(5)
+        with pytest.raises(KeyError):
+            del reopened['a.py']
+
+    def test_saves_append_only_changes(self, table_path):
+        table = FileStateTable(table_path)
+        table.update({f'f{i}.py': state(i) for i in range(100)})
+        table.compact()
+        snapshot = table_path.read_bytes()
+
+        table['f1.py'] = state(1000)
+        table.save()
+
+        assert table_path.read_bytes() == snapshot
+        assert table.journal_path.stat().st_size == filestate.JOURNAL_ENTRY.size + len('f1.py')
+        assert FileStateTable(table_path)['f1.py'] == state(1000)
+
+    def test_compacts_a_long_journal(self, table_path, monkeypatch):
+        monkeypatch.setattr(filestate, 'COMPACT_MIN', 10)
+        table = FileStateTable(table_path)
+        for i in range(20):
+            table[f'f{i}.py'] = state(i)
+        table.save()
+
+        assert table.journal_path.stat().st_size == 0
+        reopened = FileStateTable(table_path)
+        assert len(reopened) == 20
+        assert all(reopened[f'f{i}.py'] == state(i) for i in range(20))
+
+    def test_torn_journal_tail_is_ignored(self, table_path):
+        table = FileStateTable(table_path)
+        table['a.py'] = state(1)
+        table['b.py'] = state(2)
+        table.save()
+        data = table.journal_path.read_bytes()
+        table.journal_path.write_bytes(data[:-3])
+
+        reopened = FileStateTable(table_path)
+        assert set(reopened) == {'a.py'}
+        # The tail is cut off, so later saves replay again
+        assert table.journal_path.stat().st_size == filestate.JOURNAL_ENTRY.size + len('a.py')
+        reopened['c.py'] = state(3)
+        reopened.save()
+        assert set(FileStateTable(table_path)) == {'a.py', 'c.py'}
+
+    def test_corrupt_snapshot_starts_empty(self, table_path):
+        table_path.parent.mkdir(parents=True)
+        table_path.write_bytes(b'SVFS' + b'\xff' * 100)
+        assert len(FileStateTable(table_path)) == 0
+
+    def test_imports_legacy_json(self, table_path):
+        legacy = table_path.parent / 'file_states.json'
+        legacy.parent.mkdir(parents=True)
+        legacy.write_text(json.dumps({
+            'main.py': state(1),
+            'old.py': {'mtime': 1.0, 'size': 3, 'hash': 'd41d8cd98f00b204e9800998ecf8427e'},
+        }, indent=2))
+
+        table = FileStateTable(table_path, legacy_path=legacy)
+
+        # md5 hashes from old versions are dropped and rehashed
+        assert set(table) == {'main.py'}
+        assert table['main.py'] == state(1)
+        assert not legacy.exists()
+        assert FileStateTable(table_path, legacy_path=legacy)['main.py'] == state(1)
+
+    def test_unsupported_hash_is_refused(self, table_path):
+        with pytest.raises(ValueError):
+            FileStateTable(table_path)['a.py'] = state(1, hash='abc123')
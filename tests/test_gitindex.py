@@ -0,0 +1,154 @@
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from savior.gitindex import GitIndex, find_git_dir, HASH_PREFIX
+from savior.hashing import get_hasher, GIT_BLOB
+from savior.incremental import IncrementalBackup
+from savior.scanner import FileStat
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason='git not installed')
+
+
+def git(repo, *args):
+    return subprocess.run(['git', *args], cwd=repo, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def repo():
+    """A git work tree with committed files older than its index"""
+    root = Path(tempfile.mkdtemp(prefix='savior_git_'))
+    git(root, 'init', '-q')
+    (root / 'main.py').write_text('print("hello")\n')
+    (root / 'src').mkdir()
+    (root / 'src' / 'utils.py').write_text('def helper(): pass\n')
+    (root / 'src' / 'data.bin').write_bytes(os.urandom(5000))
+
+    # Older than the index, so git's entries aren't racily clean
+    old = time.time() - 60
+    for path in root.rglob('*'):
+        if path.is_file() and '.git' not in path.parts:
+            os.utime(path, (old, old))
+    git(root, 'add', '.')
+
+    yield root
+    shutil.rmtree(root)
+
+
+def _stat(path):
+    return FileStat.from_stat(path.stat())
+
+
+def _files(project):
+    return {p for p in project.rglob('*')
+            if p.is_file() and '.git' not in p.parts and '.savior' not in p.parts}
+
+
+class TestGitIndex:
+    def test_no_repository(self, tmp_path):
+        assert find_git_dir(tmp_path) is None
+        assert GitIndex.load(tmp_path) is None
+
+    def test_follows_gitdir_file(self, repo, tmp_path):
+        worktree = tmp_path / 'wt'
+        worktree.mkdir()
+        (worktree / '.git').write_text(f'gitdir: {repo / ".git"}\n')
+        assert find_git_dir(worktree) == repo / '.git'
+
+    @pytest.mark.parametrize('version', ['2', '3', '4'])
+    def test_blob_ids_match_git(self, repo, version):
+        git(repo, 'update-index', '--index-version', version)
+        index = GitIndex.load(repo)
+
+        assert len(index) == 3
+        for name in ('main.py', 'src/utils.py', 'src/data.bin'):
+            path = repo / name
+            assert index.blob_id(name, _stat(path)) == git(repo, 'hash-object', name)
+
+    def test_modified_file_is_not_trusted(self, repo):
+        index = GitIndex.load(repo)
+        (repo / 'main.py').write_text('print("changed")\n')
+        assert index.blob_id('main.py', _stat(repo / 'main.py')) is None
+
+    def test_racily_clean_file_is_not_trusted(self, repo):
+        now = time.time()
+        os.utime(repo / 'main.py', (now, now))
+        git(repo, 'add', 'main.py')
+        index = GitIndex.load(repo)
+        assert index.blob_id('main.py', _stat(repo / 'main.py')) is None
+
+    def test_untracked_file(self, repo):
+        (repo / 'new.py').write_text('x = 1\n')
+        index = GitIndex.load(repo)
+        assert 'new.py' not in index
+        assert index.blob_id('new.py', _stat(repo / 'new.py')) is None
+
+    def test_unchanged_index_is_parsed_once(self, repo):
+        first = GitIndex.load(repo)
+        with patch.object(GitIndex, '_parse', wraps=GitIndex._parse) as parse:
+            assert GitIndex.load(repo) is first
+            assert parse.call_count == 0
+
+            (repo / 'new.py').write_text('x = 1\n')
+            git(repo, 'add', 'new.py')
+            assert 'new.py' in GitIndex.load(repo)
+            assert parse.call_count == 1
+
+    def test_unreadable_index(self, repo):
+        (repo / '.git' / 'index').write_bytes(b'DIRC\x00\x00\x00\x63garbage')
+        assert GitIndex.load(repo) is None
+
+    def test_git_blob_hash(self, repo):
+        assert get_hasher().hash_file(repo / 'src' / 'data.bin', GIT_BLOB) == \
+            git(repo, 'hash-object', 'src/data.bin')
+
+
+class TestGitAwareScan:
+    def test_tracked_files_are_not_hashed(self, repo):
+        inc = IncrementalBackup(repo / '.savior')
+        with patch.object(inc, '_get_file_hash', wraps=inc._get_file_hash) as hasher:
+            added, modified, deleted = inc.find_changed_files(_files(repo))
+
+        assert hasher.call_count == 0
+        assert len(added) == 3
+        assert inc.file_states['main.py']['hash'] == HASH_PREFIX + git(repo, 'hash-object', 'main.py')
+
+    def test_modified_and_untracked_files_are_hashed(self, repo):
+        (repo / 'main.py').write_text('print("changed")\n')
+        (repo / 'new.py').write_text('x = 1\n')
+
+        inc = IncrementalBackup(repo / '.savior')
+        with patch.object(inc, '_get_file_hash', wraps=inc._get_file_hash) as hasher:
+            inc.find_changed_files(_files(repo))
+
+        hashed = {call.args[0].name for call in hasher.call_args_list}
+        assert hashed == {'main.py', 'new.py'}
+        # Hashed the way git would, so committing them later changes nothing
+        assert inc.file_states['new.py']['hash'] == HASH_PREFIX + git(repo, 'hash-object', 'new.py')
+
+    def test_edit_is_detected_as_modified(self, repo):
+        inc = IncrementalBackup(repo / '.savior')
+        inc.find_changed_files(_files(repo))
+        inc._save_states()
+
+        old = time.time() - 30
+        (repo / 'src' / 'utils.py').write_text('def helper(): return 1\n')
+        os.utime(repo / 'src' / 'utils.py', (old, old))
+
+        inc = IncrementalBackup(repo / '.savior')
+        added, modified, deleted = inc.find_changed_files(_files(repo))
+        assert modified == {repo / 'src' / 'utils.py'}
+        assert not added and not deleted
+
+    def test_paranoid_mode_ignores_the_index(self, repo):
+        inc = IncrementalBackup(repo / '.savior', paranoid=True)
+        with patch.object(inc, '_get_file_hash', wraps=inc._get_file_hash) as hasher:
+            inc.find_changed_files(_files(repo))
+        assert hasher.call_count == 3
@@ -0,0 +1,63 @@
+import hashlib
+import tempfile
+import shutil
+import unittest
+from pathlib import Path
+
+from savior import hashing
+from savior.hashing import FileHasher, get_hasher, set_default_jobs
+
+
+class TestFileHasher(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_hashing_'))
+        self.files = []
+        for i in range(8):
+            path = self.test_dir / f'file_{i}.bin'
+            path.write_bytes(bytes([i]) * (3000 + i * 1000))
+            self.files.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        set_default_jobs(None)
+
+    def test_hash_file_matches_hashlib(self):
+        """Large-buffer reads produce the same digest as hashlib"""
+        hasher = FileHasher(jobs=2, read_size=1024)
+        for algorithm in ('sha256', 'md5'):
+            expected = hashlib.new(algorithm, self.files[3].read_bytes()).hexdigest()
+            self.assertEqual(hasher.hash_file(self.files[3], algorithm), expected)
+
+    def test_hash_files_parallel(self):
+        """Batch hashing returns a digest per file"""
+        hasher = FileHasher(jobs=4)
+        digests = hasher.hash_files(self.files)
+
+        self.assertEqual(list(digests), self.files)
+        for path, digest in digests.items():
+            self.assertEqual(digest, hashlib.sha256(path.read_bytes()).hexdigest())
+        hasher.shutdown()
+
+    def test_unreadable_files_map_to_none(self):
+        """Missing files don't abort the batch"""
+        missing = self.test_dir / 'missing.txt'
+        digests = FileHasher(jobs=2).hash_files([self.files[0], missing])
+
+        self.assertIsNotNone(digests[self.files[0]])
+        self.assertIsNone(digests[missing])
+
+    def test_map_preserves_order(self):
+        """map returns results in input order"""
+        self.assertEqual(FileHasher(jobs=3).map(lambda x: x * 2, range(20)),
+                         [x * 2 for x in range(20)])
+
+    def test_set_default_jobs(self):
+        """The shared hasher can be resized"""
+        set_default_jobs(3)
+        self.assertEqual(get_hasher().jobs, 3)
+        set_default_jobs(None)
+        self.assertEqual(get_hasher().jobs, hashing.default_jobs())
+
+
+if __name__ == '__main__':
+    unittest.main()
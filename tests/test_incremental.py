@@ -0,0 +1,306 @@
+import os
+import time
+import pytest
+import tempfile
+import shutil
+from pathlib import Path
+from datetime import datetime
+from unittest.mock import patch
+
+import savior.incremental as incremental
+from savior.archive import detect_codec, list_backup_files, remove_backup
+from savior.core import Savior, Backup
+from savior.incremental import IncrementalBackup, resolve_chain, plan_chain
+
+
+class TestIncrementalBackup:
+    @pytest.fixture
+    def temp_project(self):
+        """Create a temporary project directory"""
+        temp_dir = Path(tempfile.mkdtemp(prefix='savior_inc_'))
+        (temp_dir / 'main.py').write_text('print("hello")')
+        (temp_dir / 'src').mkdir()
+        (temp_dir / 'src' / 'utils.py').write_text('def helper(): pass')
+
+        # Push mtimes out of the racy window so stat info is trusted
+        old = time.time() - 60
+        for path in temp_dir.rglob('*'):
+            if path.is_file():
+                os.utime(path, (old, old))
+
+        yield temp_dir
+        shutil.rmtree(temp_dir)
+
+    def _files(self, project):
+        return {p for p in project.rglob('*') if p.is_file() and '.savior' not in p.parts}
+
+    def test_project_dir_defaults_to_parent(self, temp_project):
+        """Backup dir lives inside the project by default"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        assert inc.project_dir == temp_project
+
+    def test_first_scan_reports_all_added(self, temp_project):
+        """Every file is new on the first scan"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        added, modified, deleted = inc.find_changed_files(self._files(temp_project))
+
+        assert len(added) == 2
+        assert not modified
+        assert not deleted
+        assert 'src/utils.py' in inc.file_states
+
+    def test_unchanged_files_are_not_rehashed(self, temp_project):
+        """Matching stat info reuses the stored hash"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        inc.find_changed_files(self._files(temp_project))
+
+        inc = IncrementalBackup(temp_project / '.savior')
+        with patch.object(inc, '_get_file_hash', wraps=inc._get_file_hash) as hasher:
+            added, modified, deleted = inc.find_changed_files(self._files(temp_project))
+
+        assert hasher.call_count == 0
+        assert not (added or modified or deleted)
+
+    def test_unchanged_scan_writes_no_states(self, temp_project):
+        """Only changed states are appended to the state journal"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        inc.find_changed_files(self._files(temp_project))
+        journal = inc.file_states.journal_path
+        size = journal.stat().st_size
+
+        IncrementalBackup(temp_project / '.savior').find_changed_files(self._files(temp_project))
+        assert journal.stat().st_size == size
+
+        (temp_project / 'src' / 'utils.py').unlink()
+        inc = IncrementalBackup(temp_project / '.savior')
+        inc.find_changed_files(self._files(temp_project))
+        assert journal.stat().st_size > size
+        assert set(IncrementalBackup(temp_project / '.savior').file_states) == {'main.py'}
+
+    def test_scanned_files_are_not_stat_again(self, temp_project):
+        """Stats the scanner took are reused by the change scan"""
+        files = Savior(temp_project)._collect_files()
+        inc = IncrementalBackup(temp_project / '.savior')
+        stat_calls = []
+        path_stat = Path.stat
+
+        def tracking_stat(path, *args, **kwargs):
+            stat_calls.append(path)
+            return path_stat(path, *args, **kwargs)
+
+        with patch.object(Path, 'stat', tracking_stat):
+            added, _, _ = inc.find_changed_files(files)
+
+        assert added == files
+        assert not files & set(stat_calls)
+        assert inc.file_states['main.py']['mtime_ns'] == files.stat(temp_project / 'main.py').mtime_ns
+
+    def test_changed_stat_triggers_rehash(self, temp_project):
+        """A modified file is rehashed and reported"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        inc.find_changed_files(self._files(temp_project))
+
+        (temp_project / 'main.py').write_text('print("changed")')
+        (temp_project / 'src' / 'utils.py').unlink()
+
+        with patch.object(inc, '_get_file_hash', wraps=inc._get_file_hash) as hasher:
+            added, modified, deleted = inc.find_changed_files(self._files(temp_project))
+
+        assert hasher.call_count == 1
+        assert modified == {temp_project / 'main.py'}
+        assert deleted == {'src/utils.py'}
+
+    def test_paranoid_mode_rehashes_everything(self, temp_project):
+        """Paranoid mode ignores stat info"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        inc.find_changed_files(self._files(temp_project))
+
+        inc = IncrementalBackup(temp_project / '.savior', paranoid=True)
+        with patch.object(inc, '_get_file_hash', wraps=inc._get_file_hash) as hasher:
+            inc.find_changed_files(self._files(temp_project))
+
+        assert hasher.call_count == 2
+
+    def test_recently_modified_files_are_not_trusted(self, temp_project):
+        """Files touched during the scan window are rehashed next time"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        (temp_project / 'main.py').write_text('print("fresh")')
+        inc.find_changed_files(self._files(temp_project))
+
+        assert inc.file_states['main.py'].get('racy')
+
+        with patch.object(inc, '_get_file_hash', wraps=inc._get_file_hash) as hasher:
+            inc.find_changed_files(self._files(temp_project))
+
+        assert hasher.call_count == 1
+
+    def test_incremental_archive_uses_project_paths(self, temp_project):
+        """Archive members are stored relative to the project root"""
+        import tarfile
+
+        inc = IncrementalBackup(temp_project / '.savior')
+        backup_path = inc.create_incremental_backup(self._files(temp_project))
+
+        with tarfile.open(backup_path, 'r:gz') as tar:
+            names = set(tar.getnames())
+
+        assert {'MANIFEST.json', 'main.py', 'src/utils.py'} <= names
+
+    def test_incremental_archive_honours_codec(self, temp_project):
+        """codec and level pick the archive format like full backups"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        backup_path = inc.create_incremental_backup(self._files(temp_project), level=0)
+
+        assert backup_path.name.endswith('.tar')
+        assert detect_codec(backup_path) == 'none'
+        assert incremental.read_manifest(backup_path) is not None
+
+    def test_failed_archive_keeps_changes_pending(self, temp_project):
+        """States are only saved once the archive is written"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        with patch.object(incremental, 'ArchiveWriter', side_effect=OSError('disk full')):
+            with pytest.raises(OSError):
+                inc.create_incremental_backup(self._files(temp_project))
+
+        assert not list((temp_project / '.savior').glob('incremental_*'))
+        assert len(inc.file_states) == 0
+        assert len(IncrementalBackup(temp_project / '.savior').file_states) == 0
+
+        added, _, _ = inc.find_changed_files(self._files(temp_project))
+        assert len(added) == 2
+
+    def test_scoped_scan_only_touches_dirty_paths(self, temp_project):
+        """A dirty-set scan updates states in scope and keeps the rest"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        inc.find_changed_files(self._files(temp_project))
+
+        (temp_project / 'main.py').write_text('print("changed")')
+        new_file = temp_project / 'src' / 'new.py'
+        new_file.write_text('x = 1')
+        (temp_project / 'src' / 'utils.py').unlink()
+
+        with patch.object(inc, '_get_file_hash', wraps=inc._get_file_hash) as hasher:
+            added, modified, deleted = inc.find_changed_in(
+                {temp_project / 'main.py', new_file},
+                {temp_project / 'main.py', temp_project / 'src'}
+            )
+
+        assert added == {new_file}
+        assert modified == {temp_project / 'main.py'}
+        assert deleted == {'src/utils.py'}
+        assert hasher.call_count == 2
+        assert set(inc.file_states) == {'main.py', 'src/new.py'}
+
+    def test_scoped_scan_keeps_states_outside_scope(self, temp_project):
+        """Files outside the dirty set are neither rescanned nor dropped"""
+        inc = IncrementalBackup(temp_project / '.savior')
+        inc.find_changed_files(self._files(temp_project))
+
+        added, modified, deleted = inc.find_changed_in(set(), {temp_project / 'gone.py'})
+
+        assert not (added or modified or deleted)
+        assert set(inc.file_states) == {'main.py', 'src/utils.py'}
+
+
+class TestBackupChains:
+    @pytest.fixture
+    def chain_project(self):
+        """A full backup followed by two incremental ones"""
+        temp_dir = Path(tempfile.mkdtemp(prefix='savior_chain_'))
+        (temp_dir / 'main.py').write_text('v1')
+        (temp_dir / 'keep.py').write_text('unchanged')
+        (temp_dir / 'old.py').write_text('deleted later')
+
+        savior = Savior(temp_dir)
+        full = savior.create_backup('base', show_progress=False)
+        inc = IncrementalBackup(savior.backup_dir, temp_dir)
+        inc.find_changed_files(savior._collect_files())
+
+        (temp_dir / 'main.py').write_text('v2')
+        first = inc.create_incremental_backup(savior._collect_files(), full.path)
+
+        (temp_dir / 'old.py').unlink()
+        (temp_dir / 'new.py').write_text('added')
+        (temp_dir / 'main.py').write_text('v3 final')
+        second = inc.create_incremental_backup(savior._collect_files(), first)
+
+        yield temp_dir, savior, [full.path, first, second]
+        shutil.rmtree(temp_dir)
+
+    def _read_tree(self, root):
+        return {str(p.relative_to(root)): p.read_text() for p in root.rglob('*') if p.is_file()}
+
+    def test_resolve_chain(self, chain_project):
+        _, _, chain = chain_project
+        assert resolve_chain(chain[-1]) == chain
+        assert resolve_chain(chain[0]) == chain[:1]
+
+    def test_plan_picks_newest_version(self, chain_project):
+        _, _, chain = chain_project
+        winners, deleted = plan_chain(chain)
+
+        assert winners == {'main.py': chain[2], 'keep.py': chain[0], 'new.py': chain[2]}
+        assert deleted == {'old.py'}
+
+    def test_restore_chain_extracts_each_file_once(self, chain_project):
+        project, savior, chain = chain_project
+        target = project.parent / (project.name + '_restored')
+        target.mkdir()
+        (target / 'old.py').write_text('stale')
+
+        inc = IncrementalBackup(savior.backup_dir, project)
+        with patch.object(incremental, 'extract_backup_files',
+                          wraps=incremental.extract_backup_files) as extract:
+            inc.restore_chain(chain[-1], target)
+        try:
+            extracted = [name for call in extract.call_args_list for name in call.args[1]]
+            assert sorted(extracted) == ['keep.py', 'main.py', 'new.py']
+            assert self._read_tree(target) == {
+                'main.py': 'v3 final', 'keep.py': 'unchanged', 'new.py': 'added'
+            }
+        finally:
+            shutil.rmtree(target)
+
+    def test_broken_chain_is_reported(self, chain_project):
+        _, _, chain = chain_project
+        remove_backup(chain[1])
+        with pytest.raises(FileNotFoundError):
+            resolve_chain(chain[-1])
+
+    def test_synthesize_full_replaces_chain(self, chain_project):
+        project, savior, chain = chain_project
+        inc = IncrementalBackup(savior.backup_dir, project)
+
+        assert inc.synthesize_full(chain[-1]) == chain[:-1]
+        assert resolve_chain(chain[-1]) == [chain[-1]]
+        assert sorted(list_backup_files(chain[-1])) == ['keep.py', 'main.py', 'new.py']
+
+        # The bases can go without affecting it
+        for path in chain[:-1]:
+            remove_backup(path)
+        target = project.parent / (project.name + '_synth')
+        try:
+            inc.restore_chain(chain[-1], target)
+            assert self._read_tree(target)['main.py'] == 'v3 final'
+        finally:
+            shutil.rmtree(target)
+
+    def test_savior_synthesize_truncates_incrementals(self, chain_project):
+        project, savior, chain = chain_project
+        metadata = savior._load_metadata()
+        for path in chain[1:]:
+            metadata['backups'].append(Backup(datetime.now(), path, 'Incremental backup', 0).to_dict())
+        savior._save_metadata(metadata)
+
+        removed = savior.synthesize_full(chain[-1], truncate=True)
+
+        # Only the intermediate incremental goes; the original full backup stays
+        assert removed == [chain[1]]
+        assert not chain[1].exists() and chain[0].exists()
+        sizes = {b.path: b.size for b in savior.list_backups()}
+        assert chain[1] not in sizes
+        assert sizes[chain[2]] == chain[2].stat().st_size
+
+        assert savior.restore_backup(0, force=True, auto_backup=False)
+        assert (project / 'main.py').read_text() == 'v3 final'
+        assert not (project / 'old.py').exists()
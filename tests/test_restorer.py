@@ -0,0 +1,201 @@
+import gc
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+import savior.restorer as restorer_module
+from savior.archive import index_path
+from savior.core import Savior
+from savior.incremental import IncrementalBackup
+from savior.restorer import StreamingRestorer, PipedRestorer, TEMP_PREFIX
+
+
+class TestStreamingRestore:
+    @pytest.fixture
+    def project(self):
+        temp_dir = Path(tempfile.mkdtemp(prefix='savior_restore_'))
+        (temp_dir / 'src').mkdir()
+        (temp_dir / 'main.py').write_text('print("hello")')
+        (temp_dir / 'src' / 'utils.py').write_text('def helper(): pass')
+        (temp_dir / 'big.bin').write_bytes(os.urandom(300_000))
+        os.chmod(temp_dir / 'main.py', 0o755)
+        yield temp_dir
+        # Close catalogs still held by tracebacks now, not halfway through rmtree
+        gc.collect()
+        shutil.rmtree(temp_dir)
+
+    def _backup(self, project):
+        savior = Savior(project)
+        return savior, savior.create_backup('snapshot', show_progress=False)
+
+    def test_restores_changed_deleted_and_extra_files(self, project):
+        savior, backup = self._backup(project)
+        original = (project / 'big.bin').read_bytes()
+
+        (project / 'main.py').write_text('changed')
+        (project / 'big.bin').unlink()
+        (project / 'src' / 'extra.py').write_text('not in backup')
+
+        stats = StreamingRestorer(project, [backup.path]).restore()
+
+        assert (project / 'main.py').read_text() == 'print("hello")'
+        assert os.stat(project / 'main.py').st_mode & 0o777 == 0o755
+        assert (project / 'big.bin').read_bytes() == original
+        assert not (project / 'src' / 'extra.py').exists()
+        assert stats['written'] == 2
+        assert stats['deleted'] == 1
+        assert stats['skipped'] == 1
+        assert stats['bytes_written'] == len('print("hello")') + len(original)
+
+    def test_unchanged_files_are_not_rewritten(self, project):
+        savior, backup = self._backup(project)
+        inode = os.stat(project / 'big.bin').st_ino
+
+        stats = StreamingRestorer(project, [backup.path]).restore()
+
+        assert stats['written'] == 0
+        assert stats['skipped'] == 3
+        assert os.stat(project / 'big.bin').st_ino == inode
+
+    def test_without_index_compares_while_streaming(self, project):
+        savior, backup = self._backup(project)
+        index_path(backup.path).unlink()
+        inode = os.stat(project / 'big.bin').st_ino
+        (project / 'main.py').write_text('changed')
+
+        stats = StreamingRestorer(project, [backup.path]).restore()
+
+        assert (project / 'main.py').read_text() == 'print("hello")'
+        assert os.stat(project / 'big.bin').st_ino == inode
+        assert stats['written'] == 1
+        assert stats['skipped'] == 2
+
+    def test_failed_write_leaves_file_and_no_temp(self, project):
+        savior, backup = self._backup(project)
+        (project / 'main.py').write_text('changed')
+
+        with patch.object(restorer_module.os, 'replace', side_effect=OSError('disk full')):
+            with pytest.raises(OSError):
+                StreamingRestorer(project, [backup.path]).restore()
+
+        assert (project / 'main.py').read_text() == 'changed'
+        assert not list(project.rglob(TEMP_PREFIX + '*'))
+
+    def test_savior_restore_backup_streams(self, project):
+        savior, backup = self._backup(project)
+        (project / 'src' / 'utils.py').write_text('broken')
+
+        with patch('savior.core.StreamingRestorer', wraps=StreamingRestorer) as restorer:
+            assert savior.restore_backup(0, force=True, auto_backup=False)
+
+        restorer.assert_called_once()
+        assert (project / 'src' / 'utils.py').read_text() == 'def helper(): pass'
+        assert (project / '.savior').exists()
+
+    def test_plan_fixes_permissions_without_rewriting(self, project):
+        savior, backup = self._backup(project)
+        os.chmod(project / 'main.py', 0o644)
+        inode = os.stat(project / 'main.py').st_ino
+
+        restorer = StreamingRestorer(project, [backup.path])
+        plan = restorer.plan()
+        assert plan.chmods == {'main.py': 0o755}
+        assert not plan.writes and not plan.deletes
+
+        stats = restorer.execute(plan)
+        assert stats['chmodded'] == 1
+        assert stats['written'] == 0
+        assert os.stat(project / 'main.py').st_mode & 0o777 == 0o755
+        assert os.stat(project / 'main.py').st_ino == inode
+
+    def test_plan_counts_bytes_to_write(self, project):
+        savior, backup = self._backup(project)
+        (project / 'big.bin').write_bytes(b'x' * 300_000)
+        (project / 'src' / 'utils.py').unlink()
+
+        plan = StreamingRestorer(project, [backup.path]).plan()
+        assert sorted(plan.writes) == ['big.bin', 'src/utils.py']
+        assert plan.bytes_to_write == 300_000 + len('def helper(): pass')
+        assert plan.unchanged == 1
+
+    def test_stat_cache_skips_hashing(self, project):
+        savior, backup = self._backup(project)
+        cache = {}
+        for name in ('main.py', 'src/utils.py', 'big.bin'):
+            st = os.stat(project / name)
+            cache[str(Path(name))] = {
+                'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'inode': st.st_ino,
+                'ctime_ns': st.st_ctime_ns,
+                'hash': savior.catalog.history(name)[0]['hash'],
+            }
+
+        restorer = StreamingRestorer(project, [backup.path], stat_cache=cache)
+        with patch.object(restorer_module, 'get_hasher') as hasher:
+            hasher.return_value.hash_files.return_value = {}
+            plan = restorer.plan()
+
+        assert not plan
+        assert plan.unchanged == 3
+        hasher.return_value.hash_files.assert_called_once_with([], 'sha256')
+
+    def test_parallel_restore_of_many_files(self, project):
+        for i in range(40):
+            (project / 'src' / f'mod{i}.py').write_text(f'value = {i}\n' * (i + 1))
+        savior, backup = self._backup(project)
+        for i in range(0, 40, 3):
+            (project / 'src' / f'mod{i}.py').write_text('edited')
+
+        stats = StreamingRestorer(project, [backup.path], jobs=4).restore()
+
+        assert stats['written'] == 14
+        for i in range(40):
+            assert (project / 'src' / f'mod{i}.py').read_text() == f'value = {i}\n' * (i + 1)
+
+
+class TestPipedRestore:
+    @pytest.fixture
+    def project(self):
+        temp_dir = Path(tempfile.mkdtemp(prefix='savior_piped_'))
+        (temp_dir / 'src').mkdir()
+        (temp_dir / 'main.py').write_text('print("hello")')
+        (temp_dir / 'src' / 'utils.py').write_text('def helper(): pass')
+        (temp_dir / 'data.bin').write_bytes(os.urandom(200_000))
+        yield temp_dir
+        shutil.rmtree(temp_dir)
+
+    @pytest.mark.parametrize('codec', ['gzip', 'zstd', 'none'])
+    def test_restores_from_a_stream(self, project, codec):
+        savior = Savior(project)
+        backup = savior.create_backup('snapshot', show_progress=False, codec=codec)
+        inode = os.stat(project / 'data.bin').st_ino
+
+        (project / 'main.py').write_text('changed')
+        os.chmod(project / 'src' / 'utils.py', 0o600)
+        (project / 'extra.txt').write_text('not in backup')
+
+        with open(backup.path, 'rb', buffering=0) as stream:
+            stats = PipedRestorer(project).restore(stream)
+
+        assert (project / 'main.py').read_text() == 'print("hello")'
+        assert os.stat(project / 'src' / 'utils.py').st_mode & 0o777 == 0o644
+        assert not (project / 'extra.txt').exists()
+        assert os.stat(project / 'data.bin').st_ino == inode
+        assert stats == {'written': 1, 'bytes_written': len('print("hello")'), 'deleted': 1,
+                         'chmodded': 1, 'skipped': 1}
+
+    def test_refuses_incremental_backups(self, project):
+        savior = Savior(project)
+        full = savior.create_backup('base', show_progress=False)
+        inc = IncrementalBackup(savior.backup_dir, project)
+        inc.find_changed_files(savior._collect_files())
+        (project / 'main.py').write_text('changed')
+        incremental = inc.create_incremental_backup(savior._collect_files(), full.path)
+
+        with open(incremental, 'rb', buffering=0) as stream:
+            with pytest.raises(ValueError):
+                PipedRestorer(project).restore(stream)
+        assert (project / 'main.py').read_text() == 'changed'
@@ -0,0 +1,157 @@
+import os
+import shutil
+import tarfile
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from savior.archive import ArchiveWriter, BackupIndex, is_within
+from savior.core import Savior
+from savior.scanner import DirectoryScanner, FileTable, FileStat
+
+
+@pytest.fixture
+def project():
+    root = Path(tempfile.mkdtemp(prefix='savior_scan_'))
+    for d in range(5):
+        for s in range(3):
+            sub = root / f'pkg{d}' / f'sub{s}'
+            sub.mkdir(parents=True)
+            for f in range(4):
+                (sub / f'mod{f}.py').write_text(f'x = {d}{s}{f}\n')
+    (root / 'main.py').write_text('print("hello")\n')
+    (root / '__pycache__').mkdir()
+    (root / '__pycache__' / 'main.cpython.pyc').write_bytes(b'\0' * 10)
+    (root / 'pkg0' / 'debug.log').write_text('log\n')
+    (root / 'big.bin').write_bytes(b'\0' * 4096)
+    os.symlink(root / 'pkg1', root / 'linked_dir')
+    os.symlink(root / 'main.py', root / 'linked.py')
+    os.symlink(root / 'missing.py', root / 'dangling.py')
+    (root / '.saviorignore').write_text('*.log\n')
+    yield root
+    shutil.rmtree(root)
+
+
+def walk_files(savior, root):
+    """The os.walk collection the scanner replaced"""
+    files = set()
+    for dirpath, dirs, filenames in os.walk(root, followlinks=False):
+        rel_root = Path(dirpath).relative_to(savior.project_dir)
+        dirs[:] = [d for d in dirs if not savior.ignore.should_ignore(str(rel_root / d))]
+        for filename in filenames:
+            if not savior.ignore.should_ignore(str(rel_root / filename)):
+                path = Path(dirpath) / filename
+                if savior._is_backup_candidate(path):
+                    files.add(path)
+    return files
+
+
+class TestDirectoryScanner:
+    @pytest.mark.parametrize('jobs', [1, 4])
+    def test_matches_os_walk(self, project, jobs):
+        savior = Savior(project)
+        table = DirectoryScanner(project, savior.ignore.should_ignore, jobs=jobs).scan()
+
+        assert table == walk_files(savior, project)
+        assert project / 'linked.py' in table
+        assert project / 'dangling.py' not in table
+        assert not any('linked_dir' in p.parts or '__pycache__' in p.parts for p in table)
+        assert project / 'pkg0' / 'debug.log' not in table
+
+    def test_records_stats(self, project):
+        table = DirectoryScanner(project, jobs=4).scan()
+        for path in (project / 'main.py', project / 'big.bin'):
+            st = path.stat()
+            assert table.stat(path) == FileStat(st.st_size, st.st_mtime_ns, st.st_mode, st.st_ino, st.st_ctime_ns)
+        # Symlinks keep their own mode
+        assert table.stat(project / 'linked.py').mode == os.lstat(project / 'linked.py').st_mode
+
+    def test_subtree(self, project):
+        table = DirectoryScanner(project, jobs=2).scan(project / 'pkg2')
+        assert len(table) == 12
+        assert all(is_within(path, project / 'pkg2') for path in table)
+
+    def test_max_size(self, project):
+        table = DirectoryScanner(project, max_size=4096).scan()
+        assert project / 'big.bin' not in table
+        assert project / 'main.py' in table
+
+    def test_stat_file(self, project):
+        scanner = DirectoryScanner(project, max_size=4096)
+        table = DirectoryScanner(project, max_size=4096).scan()
+        for path in (project / 'main.py', project / 'linked.py'):
+            assert scanner.stat_file(path) == table.stat(path)
+        for path in (project / 'big.bin', project / 'dangling.py', project / 'pkg0', project / 'gone.py'):
+            assert scanner.stat_file(path) is None
+
+    def test_collect_dirty_keeps_stats(self, project):
+        savior = Savior(project)
+        changed = [project / 'main.py', project / 'pkg0' / 'debug.log', project / 'dangling.py']
+        files = savior._collect_dirty(changed)
+        assert files == {project / 'main.py'}
+        assert files.stat(project / 'main.py') == savior._collect_files().stat(project / 'main.py')
+
+    def test_collect_files_uses_scanner(self, project):
+        savior = Savior(project)
+        files = savior._collect_files()
+        assert isinstance(files, FileTable)
+        assert files == walk_files(savior, project)
+        assert savior._estimate_backup_size(files) == int(
+            sum(path.stat().st_size for path in files) * 0.4
+        )
+
+
+class TestFileTable:
+    def test_behaves_as_a_set(self, tmp_path):
+        table = FileTable([tmp_path / 'a', tmp_path / 'b'])
+        assert table == {tmp_path / 'a', tmp_path / 'b'}
+        assert table.stat(tmp_path / 'a') is None
+
+    def test_update_merges_stats(self, tmp_path):
+        stat = FileStat(1, 2, 0o100644, 3, 4)
+        first = FileTable()
+        first.add(tmp_path / 'a', stat)
+        merged = FileTable()
+        merged.update(first, {tmp_path / 'b'})
+        assert merged == {tmp_path / 'a', tmp_path / 'b'}
+        assert merged.stat(tmp_path / 'a') == stat
+
+    def test_total_size_stats_unscanned_files(self, tmp_path):
+        (tmp_path / 'a').write_bytes(b'x' * 10)
+        table = FileTable([tmp_path / 'a'])
+        table.add(tmp_path / 'b', FileStat(5, 0, 0o100644, 0, 0))
+        assert table.total_size() == 15
+
+
+class TestAddFile:
+    def test_same_members_as_tar_add(self, project, tmp_path):
+        table = DirectoryScanner(project).scan()
+        names = sorted(table)
+
+        with ArchiveWriter(tmp_path / 'scanned.tar', 'none') as tar:
+            for path in names:
+                tar.add_file(path, str(path.relative_to(project)), table.stat(path))
+        with ArchiveWriter(tmp_path / 'plain.tar', 'none') as tar:
+            for path in names:
+                tar.add(path, arcname=str(path.relative_to(project)))
+
+        def members(path):
+            with tarfile.open(path) as tar:
+                return [(m.name, m.type, m.mode, m.size, int(m.mtime), m.uid, m.uname,
+                         tar.extractfile(m).read() if m.isfile() else m.linkname)
+                        for m in tar.getmembers()]
+
+        assert members(tmp_path / 'scanned.tar') == members(tmp_path / 'plain.tar')
+        index = BackupIndex.load(tmp_path / 'scanned.tar')
+        assert index is not None
+
+    def test_file_changed_since_scan(self, project, tmp_path):
+        table = DirectoryScanner(project).scan()
+        path = project / 'main.py'
+        path.write_text('print("a much longer file than when it was scanned")\n')
+
+        with ArchiveWriter(tmp_path / 'out.tar', 'none') as tar:
+            tar.add_file(path, 'main.py', table.stat(path))
+        with tarfile.open(tmp_path / 'out.tar') as tar:
+            assert tar.extractfile('main.py').read() == path.read_bytes()
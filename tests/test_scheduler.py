@@ -0,0 +1,163 @@
+import time
+import threading
+import tempfile
+import shutil
+from pathlib import Path
+
+import pytest
+
+from savior import scheduler as scheduler_module
+from savior.scheduler import ProjectScheduler, ProjectWatch
+
+
+@pytest.fixture
+def projects():
+    root = Path(tempfile.mkdtemp())
+    paths = []
+    for i in range(6):
+        path = root / f'project{i}'
+        path.mkdir()
+        (path / 'main.py').write_text(f'print({i})\n')
+        paths.append(path)
+    yield paths
+    shutil.rmtree(root)
+
+
+@pytest.fixture(autouse=True)
+def no_throttle(monkeypatch):
+    """Keep tests from reconfiguring the process-wide throttle"""
+    monkeypatch.setattr(scheduler_module, 'configure_throttle', lambda *args: None)
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestProjectWatch:
+    def test_first_backup_is_due_right_away(self, projects):
+        project = ProjectWatch(projects[0], {'interval': 20, 'smart': False})
+        assert project.due_at(time.monotonic()) <= time.monotonic()
+
+    def test_smart_mode_waits_for_idle(self, projects):
+        project = ProjectWatch(projects[0], {'interval': 20})
+        project.watcher.monitor.last_activity = time.monotonic()
+        now = time.monotonic()
+        assert project.due_at(now) > now
+
+    def test_saves_full_then_incremental(self, projects):
+        project = ProjectWatch(projects[0], {'interval': 20, 'smart': False})
+        project.start()
+        try:
+            project.save()
+            (projects[0] / 'main.py').write_text('print("changed")\n')
+            project.save()
+        finally:
+            project.stop()
+
+        backups = project.savior.list_backups()
+        assert len(backups) == 2
+        assert project.saves == 2
+        assert not project.savior.is_watching()
+
+
+class TestProjectScheduler:
+    def test_runs_initial_backups_for_every_project(self, projects):
+        scheduler = ProjectScheduler(max_concurrent=2)
+        scheduler.start()
+        try:
+            for path in projects:
+                scheduler.add(str(path), {'interval': 20, 'smart': False})
+            assert wait_for(lambda: all(
+                info['saves'] == 1 for info in scheduler.projects().values()
+            ))
+        finally:
+            scheduler.stop()
+
+        for path in projects:
+            assert list((path / '.savior').rglob('*.tar.gz'))
+
+    def test_respects_concurrency_limit(self, projects, monkeypatch):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def slow_save(self):
+            with lock:
+                active.append(self)
+                peak.append(len(active))
+            time.sleep(0.1)
+            with lock:
+                active.remove(self)
+            self.saves += 1
+
+        monkeypatch.setattr(ProjectWatch, 'save', slow_save)
+        scheduler = ProjectScheduler(max_concurrent=2)
+        scheduler.start()
+        try:
+            for path in projects:
+                scheduler.add(str(path), {'interval': 20, 'smart': False})
+            assert wait_for(lambda: all(
+                info['saves'] == 1 for info in scheduler.projects().values()
+            ))
+        finally:
+            scheduler.stop()
+
+        assert max(peak) == 2
+
+    def test_higher_priority_goes_first(self, projects, monkeypatch):
+        order = []
+        gate = threading.Event()
+
+        def record_save(self):
+            gate.wait(5)
+            order.append(self.priority)
+            self.saves += 1
+
+        monkeypatch.setattr(ProjectWatch, 'save', record_save)
+        scheduler = ProjectScheduler(max_concurrent=1)
+        # Queue everything before the scheduler thread looks at it
+        for path, priority in zip(projects, ['low', 'normal', 'adaptive', 'low']):
+            scheduler.add(str(path), {'interval': 20, 'smart': False, 'priority': priority})
+        scheduler.start()
+        try:
+            gate.set()
+            assert wait_for(lambda: len(order) == 4)
+        finally:
+            scheduler.stop()
+
+        assert order == ['normal', 'adaptive', 'low', 'low']
+
+    def test_add_and_remove(self, projects):
+        scheduler = ProjectScheduler()
+        scheduler.start()
+        try:
+            scheduler.add(str(projects[0]), {'interval': 20})
+            with pytest.raises(ValueError):
+                scheduler.add(str(projects[0]), {'interval': 20})
+            assert str(projects[0]) in scheduler
+
+            assert scheduler.remove(str(projects[0]))
+            assert not scheduler.remove(str(projects[0]))
+            assert len(scheduler) == 0
+        finally:
+            scheduler.stop()
+
+    def test_failed_save_is_retried_later(self, projects, monkeypatch):
+        def failing_save(self):
+            raise OSError('disk full')
+
+        monkeypatch.setattr(ProjectWatch, 'save', failing_save)
+        scheduler = ProjectScheduler()
+        scheduler.start()
+        try:
+            scheduler.add(str(projects[0]), {'interval': 20, 'smart': False})
+            assert wait_for(lambda: scheduler.projects()[str(projects[0])]['last_error'])
+            project = scheduler._projects[str(projects[0])]
+            assert project.retry_at > time.monotonic()
+        finally:
+            scheduler.stop()
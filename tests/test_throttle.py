@@ -0,0 +1,149 @@
+import io
+import tempfile
+import shutil
+import time
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from savior.throttle import (
+    TokenBucket, Throttle, ThrottledReader, AdaptiveController,
+    parse_rate, configure_throttle, get_throttle, BUSY_RATE
+)
+from savior.archive import ArchiveWriter, BackupIndex
+
+
+class TestParseRate(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(parse_rate('0'), 0)
+        self.assertEqual(parse_rate('4096'), 4096)
+        self.assertEqual(parse_rate('512K'), 512 * 1024)
+        self.assertEqual(parse_rate('20m'), 20 * 1024 * 1024)
+        self.assertEqual(parse_rate('1.5G/s'), int(1.5 * 1024 ** 3))
+        self.assertEqual(parse_rate('2MB'), 2 * 1024 * 1024)
+
+    def test_rejects_garbage(self):
+        for text in ('', 'fast', '-1M', '10X'):
+            with self.assertRaises(ValueError):
+                parse_rate(text)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_unlimited_never_waits(self):
+        bucket = TokenBucket(0)
+        start = time.monotonic()
+        for _ in range(1000):
+            bucket.consume(10 * 1024 * 1024)
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_holds_the_rate(self):
+        """After the initial burst, consumers wait for the tokens they take"""
+        bucket = TokenBucket(1000 * 1000)
+        start = time.monotonic()
+        for _ in range(10):
+            bucket.consume(150 * 1000)  # 1.5 MB: one second's burst plus 0.5 s
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+    def test_shared_between_threads(self):
+        bucket = TokenBucket(2 * 1000 * 1000)
+        bucket.consume(bucket.burst)  # Start empty
+
+        def worker():
+            for _ in range(4):
+                bucket.consume(125 * 1000)
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 1 MB in total at 2 MB/s, however it was split
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+    def test_reader_counts_bytes(self):
+        bucket = TokenBucket(0)
+        with patch.object(bucket, 'consume') as consume:
+            reader = ThrottledReader(io.BytesIO(b'x' * 100), bucket)
+            self.assertEqual(reader.read(60), b'x' * 60)
+            self.assertEqual(reader.read(), b'x' * 40)
+        self.assertEqual([c.args[0] for c in consume.call_args_list], [60, 40])
+
+
+class TestThrottle(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp(prefix='test_throttle_'))
+
+    def tearDown(self):
+        configure_throttle()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_unlimited_throttle_wraps_nothing(self):
+        throttle = Throttle()
+        f = io.BytesIO()
+        self.assertIs(throttle.reader(f), f)
+        self.assertIs(throttle.writer(f), f)
+
+    @patch('savior.throttle.set_io_priority')
+    def test_busy_scales_limits_down_and_back(self, set_io_priority):
+        throttle = Throttle(read_rate=8 * 1024 * 1024, priority='adaptive')
+
+        throttle.set_busy(True)
+        self.assertEqual(throttle.read.rate, 2 * 1024 * 1024)
+        self.assertEqual(throttle.write.rate, BUSY_RATE)  # No limit of its own
+        set_io_priority.assert_called_with(True)
+
+        throttle.set_busy(False)
+        self.assertEqual(throttle.read.rate, 8 * 1024 * 1024)
+        self.assertEqual(throttle.write.rate, 0)
+        set_io_priority.assert_called_with(False)
+
+    @patch('savior.throttle.set_io_priority')
+    def test_controller_follows_the_monitor(self, set_io_priority):
+        throttle = Throttle(priority='adaptive')
+        answers = iter([(True, 'CPU busy'), (False, '')] + [(False, '')] * 100)
+
+        class Monitor:
+            def check_busy(self):
+                return next(answers)
+
+        controller = AdaptiveController(throttle, Monitor(), interval=0.01, hold=0.03)
+        controller.start()
+        deadline = time.monotonic() + 2
+        while not throttle.busy and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertTrue(throttle.busy)
+        while throttle.busy and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertFalse(throttle.busy)  # Released once the hold ran out
+        controller.stop()
+
+    def test_archive_writes_are_limited(self):
+        source = self.test_dir / 'data.bin'
+        source.write_bytes(b'\0' * 600 * 1000)
+
+        configure_throttle(write_rate=1000 * 1000)
+        get_throttle().write.consume(get_throttle().write.burst)  # Start empty
+        start = time.monotonic()
+        with ArchiveWriter(self.test_dir / 'backup.tar', 'none') as tar:
+            tar.add(source, arcname='data.bin')
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+        index = BackupIndex.load(self.test_dir / 'backup.tar')
+        self.assertEqual(index.read('data.bin'), source.read_bytes())
+
+    @patch('savior.throttle.set_io_priority')
+    @patch('savior.throttle.lower_cpu_priority')
+    def test_configure_replaces_the_shared_throttle(self, lower_cpu_priority, set_io_priority):
+        throttle = configure_throttle(read_rate=1024, network_rate=2048, priority='low')
+        self.assertIs(get_throttle(), throttle)
+        self.assertEqual((throttle.read.rate, throttle.network.rate), (1024, 2048))
+        lower_cpu_priority.assert_called_once_with()
+        set_io_priority.assert_called_once_with(True)
+        with self.assertRaises(ValueError):
+            configure_throttle(priority='turbo')
+
+
+if __name__ == '__main__':
+    unittest.main()